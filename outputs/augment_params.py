@@ -1,14 +1,25 @@
 # augment_params.py
 from __future__ import annotations
 from pathlib import Path
-import json
+from typing import Optional
+import json, sys
 from copy import deepcopy
 
+_PARAM_RULES = Path(__file__).resolve().parents[1] / "reglas" / "param_rules"
+if str(_PARAM_RULES) not in sys.path:
+    sys.path.append(str(_PARAM_RULES))
+from bundle_store import BundleStore
+
 # === INPUTS ===================================================================
 
 ROOT = Path(__file__).resolve().parents[2]  # .../LV_vsc
 BUNDLE_IN  = ROOT / "outputs" / "params" / "R-Low" / "params_R-Low.json"
 BUNDLE_OUT = ROOT / "outputs" / "params" / "R-Low" / "params_R-Low__augmented.json"
+# Almacén columnar de parámetros (runner.save_results_bundle con store_root): si existe, el bundle
+# base sale de ahí (GENERATION = None → la más reciente); si no, de BUNDLE_IN
+STORE_DIR  = ROOT / "outputs" / "params"
+SEGMENT    = "R-Low"
+GENERATION = None
 
 # Percentiles a usar cuando tengamos que CREAR una regla que no existe en el bundle
 PCTS_ALL = ["p85","p90","p95","p97","p99"]
@@ -214,11 +225,19 @@ def augment_bundle(bundle: dict, defaults: dict) -> dict:
 
     return out
 
+def load_base_bundle(store_dir: Path = STORE_DIR, segment: str = SEGMENT,
+                     generation: Optional[str] = GENERATION, json_path: Path = BUNDLE_IN) -> tuple[dict, str]:
+    """(bundle base, origen): el segmento desde el almacén o, si no está (o falta pyarrow), el JSON."""
+    try:
+        return BundleStore.open(store_dir).to_bundle(segment, generation=generation), f"{store_dir} [{segment}]"
+    except (ImportError, FileNotFoundError, KeyError):
+        with open(json_path, "r", encoding="utf-8") as f:
+            return json.load(f), str(json_path)
+
 # === RUN ======================================================================
 
 if __name__ == "__main__":
-    with open(BUNDLE_IN, "r", encoding="utf-8") as f:
-        bundle = json.load(f)
+    bundle, source = load_base_bundle()
 
     augmented = augment_bundle(bundle, CURRENT_DEFAULTS)
 
@@ -227,5 +246,5 @@ if __name__ == "__main__":
         json.dump(augmented, f, ensure_ascii=False, indent=2)
 
     print("✔ Bundle augmentado.")
-    print(f"  IN : {BUNDLE_IN}")
+    print(f"  IN : {source}")
     print(f"  OUT: {BUNDLE_OUT}")
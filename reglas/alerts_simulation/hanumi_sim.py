@@ -2,64 +2,49 @@ from __future__ import annotations
 from typing import Dict, Any, Iterable
 import pandas as pd
 import numpy as np
-from utils import load_tx_base, filter_subsubs, restrict_counts_after
+from utils import restrict_counts_after, get_metrics
+from thresholds import ThresholdIndex, RuleMetrics
 
 # Overrides fijos opcionales (None => usar bundle/escenario)
 FIXED_HANUMI_NUMBER: float | None = None
 FIXED_HANUMI_FACTOR: float | None = None
 
-def simulate_hanumi(
+def prepare_hanumi(
     tx_path: str,
     *,
     subsubs: Iterable[str] | str,
-    scenarios: Dict[str, Dict[str, Any]],
     count_from: str = "2025-02-21",
-) -> pd.DataFrame:
+) -> RuleMetrics:
     """
     HANUMI: ventanas cliente–día (Inbound Cash)
       S3N >= Number  AND  AVG177N > 0  AND  (S3N / AVG177N) > Factor
     Sólo se cuentan ventanas con fecha >= count_from, pero el histórico se usa completo.
     """
-    df = load_tx_base(tx_path)
-    df = filter_subsubs(df, subsubs)
-
-    base = df[
-        (df["tx_direction"].eq("Inbound")) &
-        (df["tx_type"].eq("Cash")) &
-        (df["customer_id"].notna()) &
-        (df["tx_date_time"].notna())
-    ][["customer_id","tx_date_time"]].copy()
-
-    if base.empty:
-        return pd.DataFrame([{"escenario": k, "alertas": 0} for k in scenarios])
-
-    parts = []
-    for cid, sub in base.groupby("customer_id", sort=False):
-        daily_n = (sub.set_index("tx_date_time")
-                      .assign(x=1)["x"]
-                      .resample("D").sum()
-                      .astype(float))
-        if daily_n.empty:
-            continue
-        s3n = daily_n.rolling("3D").sum()
-        avg177n = s3n.shift(3).rolling("177D", min_periods=1).mean()
-        parts.append(pd.DataFrame({"customer_id": cid, "date": daily_n.index, "S3N": s3n.values, "AVG177N": avg177n.values}))
-    M = pd.concat(parts, ignore_index=True) if parts else pd.DataFrame(columns=["customer_id","date","S3N","AVG177N"])
+    # Panel cliente × día Inbound Cash: S3N, AVG177N (misma métrica que run_parameters_hanumi)
+    M = get_metrics(tx_path, "hanum", subsubs, direction="Inbound")
     if M.empty:
-        return pd.DataFrame([{"escenario": k, "alertas": 0} for k in scenarios])
+        return RuleMetrics.empty()
 
     M["Factor"] = np.where(M["AVG177N"] > 0, M["S3N"] / M["AVG177N"], np.nan)
     countable = restrict_counts_after(M, "date", count_from)
 
-    rows = []
-    for name, pars in scenarios.items():
+    # una fila por (cliente, día): contar filas = contar ventanas
+    ix = ThresholdIndex(M, ["S3N", "Factor"], mask=(M["AVG177N"] > 0) & countable)
+
+    def conds(pars: Dict[str, Any]) -> Dict[str, tuple]:
         Number = FIXED_HANUMI_NUMBER if FIXED_HANUMI_NUMBER is not None else float(pars.get("Number", np.nan))
         Factor = FIXED_HANUMI_FACTOR if FIXED_HANUMI_FACTOR is not None else float(pars.get("Factor", np.nan))
-        m = (
-            (M["S3N"] >= Number) &
-            (M["AVG177N"] > 0) &
-            (M["Factor"] > Factor)
-        ).fillna(False)
-        cnt = int(M.loc[m & countable, ["customer_id","date"]].drop_duplicates().shape[0])
-        rows.append({"escenario": name, "alertas": cnt})
-    return pd.DataFrame(rows)
+        return {"S3N": (">=", Number), "Factor": (">", Factor)}
+
+    return RuleMetrics(ix, {"Number": ("S3N", ">="), "Factor": ("Factor", ">")}, conds,
+                       defaults={"Number": FIXED_HANUMI_NUMBER, "Factor": FIXED_HANUMI_FACTOR})
+
+def simulate_hanumi(
+    tx_path: str,
+    *,
+    subsubs: Iterable[str] | str,
+    scenarios: Dict[str, Dict[str, Any]],
+    count_from: str = "2025-02-21",
+) -> pd.DataFrame:
+    """Alertas por escenario sobre las métricas de prepare_hanumi (ver su docstring)."""
+    return prepare_hanumi(tx_path, subsubs=subsubs, count_from=count_from).run(scenarios)
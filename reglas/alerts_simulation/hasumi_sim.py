@@ -2,53 +2,43 @@ from __future__ import annotations
 from typing import Dict, Any, Iterable
 import pandas as pd
 import numpy as np
-from utils import load_tx_base, filter_subsubs, restrict_counts_after
+from utils import restrict_counts_after, get_metrics
+from thresholds import ThresholdIndex, RuleMetrics
 
-def simulate_hasumi(
+def prepare_hasumi(
     tx_path: str,
     *,
     subsubs: Iterable[str] | str,
-    scenarios: Dict[str, Dict[str, Any]],
     count_from: str = "2025-02-21",
-) -> pd.DataFrame:
+) -> RuleMetrics:
     """
     HASUMI (Inbound Cash): ventanas cliente–día
       S3 > Amount  AND  avg3_hist = (S180 - S3)/59 > 0  AND  S3 > Factor * avg3_hist
     """
-    df = load_tx_base(tx_path)
-    df = filter_subsubs(df, subsubs)
-
-    base = df[
-        (df["tx_direction"].eq("Inbound")) &
-        (df["tx_type"].eq("Cash")) &
-        (df["customer_id"].notna()) &
-        (df["tx_date_time"].notna()) &
-        (df["tx_base_amount"].notna())
-    ][["customer_id","tx_date_time","tx_base_amount"]].copy()
-
-    if base.empty:
-        return pd.DataFrame([{"escenario": k, "alertas": 0} for k in scenarios])
-
-    parts = []
-    for cid, sub in base.groupby("customer_id", sort=False):
-        daily = (sub.set_index("tx_date_time")["tx_base_amount"].abs().resample("D").sum())
-        if daily.empty:
-            continue
-        s3 = daily.rolling("3D").sum()
-        s180 = daily.rolling("180D").sum()
-        parts.append(pd.DataFrame({"customer_id": cid, "date": daily.index, "S3": s3.values, "S180": s180.values}))
-    M = pd.concat(parts, ignore_index=True) if parts else pd.DataFrame(columns=["customer_id","date","S3","S180"])
+    # Panel cliente × día Inbound Cash: S3, S180 (misma métrica que run_parameters_hasumi)
+    M = get_metrics(tx_path, "hasum", subsubs, direction="Inbound")
     if M.empty:
-        return pd.DataFrame([{"escenario": k, "alertas": 0} for k in scenarios])
+        return RuleMetrics.empty()
 
     M["avg3_hist"] = (M["S180"] - M["S3"]) / 59.0
     countable = restrict_counts_after(M, "date", count_from)
 
-    rows = []
-    for name, pars in scenarios.items():
+    ix = ThresholdIndex(M, ["S3", "avg3_hist"], mask=(M["avg3_hist"] > 0) & countable)
+
+    def count(pars: Dict[str, Any]) -> int:
         A = float(pars.get("Amount", np.inf))
         F = float(pars.get("Factor", np.inf))
-        m = (M["S3"] > A) & (M["avg3_hist"] > 0) & (M["S3"] > F * M["avg3_hist"])
-        cnt = int(M.loc[m & countable, ["customer_id","date"]].drop_duplicates().shape[0])
-        rows.append({"escenario": name, "alertas": cnt})
-    return pd.DataFrame(rows)
+        r = ix.select(S3=(">", A))
+        return int(np.count_nonzero(r["S3"] > F * r["avg3_hist"]))
+
+    return RuleMetrics(ix, {"Amount": ("S3", ">")}, count=count)
+
+def simulate_hasumi(
+    tx_path: str,
+    *,
+    subsubs: Iterable[str] | str,
+    scenarios: Dict[str, Dict[str, Any]],
+    count_from: str = "2025-02-21",
+) -> pd.DataFrame:
+    """Alertas por escenario sobre las métricas de prepare_hasumi (ver su docstring)."""
+    return prepare_hasumi(tx_path, subsubs=subsubs, count_from=count_from).run(scenarios)
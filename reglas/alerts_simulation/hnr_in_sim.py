@@ -2,32 +2,30 @@ from __future__ import annotations
 from typing import Dict, Any, Iterable
 import pandas as pd
 import numpy as np
-from utils import load_tx_base, filter_subsubs, restrict_counts_after
+from utils import load_tx_base, restrict_counts_after, DailyPanel
+from thresholds import ThresholdIndex, RuleMetrics
 
 # number fijo opcional para todos los escenarios (None => usar bundle/escenario)
 FIXED_HNR_IN_NUMBER: float | None = None
 
-def simulate_hnr_in(
+def prepare_hnr_in(
     tx_path: str,
     *,
     subsubs: Iterable[str] | str,
-    scenarios: Dict[str, Dict[str, Any]],
     count_from: str = "2025-02-21",
-) -> pd.DataFrame:
+) -> RuleMetrics:
     """
     HNR-IN: ventanas cliente–día
       Inbound Cash, tx_base_amount > 1000, amount original “redondo”
       y CNT30 (rolling 30d) > Number
     """
-    df = load_tx_base(tx_path)
-    df = filter_subsubs(df, subsubs)
+    df = load_tx_base(tx_path, subsubs=subsubs, direction="Inbound", tx_type="Cash",
+                      columns=["customer_id", "tx_date_time", "tx_amount", "tx_base_amount"])
 
     amt_orig = df["tx_amount"].fillna(0.0001)
     is_round = np.isfinite(amt_orig) & np.isclose(amt_orig % 1000, 0, atol=1e-9)
 
     base = df[
-        (df["tx_direction"].eq("Inbound")) &
-        (df["tx_type"].eq("Cash")) &
         (df["tx_base_amount"] > 1000) &
         (df["tx_date_time"].notna()) &
         (df["customer_id"].notna()) &
@@ -35,20 +33,26 @@ def simulate_hnr_in(
     ][["customer_id","tx_date_time"]].copy()
 
     if base.empty:
-        return pd.DataFrame([{"escenario": k, "alertas": 0} for k in scenarios])
+        return RuleMetrics.empty()
 
-    parts=[]
-    for cid, sub in base.groupby("customer_id", sort=False):
-        daily_cnt = (sub.set_index("tx_date_time").assign(x=1)["x"].resample("D").sum().fillna(0.0))
-        cnt30 = daily_cnt.rolling("30D").sum()
-        parts.append(pd.DataFrame({"customer_id": cid, "date": cnt30.index, "CNT30": cnt30.values}))
-    M = pd.concat(parts, ignore_index=True)
+    P = DailyPanel.build(base, "customer_id")
+    M = P.frame(CNT30=P.rolling_sum(P.daily_count(), 30))
 
     countable = restrict_counts_after(M, "date", count_from)
-    rows=[]
-    for name, pars in scenarios.items():
+    ix = ThresholdIndex(M, ["CNT30"], mask=countable)
+
+    def conds(pars: Dict[str, Any]) -> Dict[str, tuple]:
         N = FIXED_HNR_IN_NUMBER if FIXED_HNR_IN_NUMBER is not None else float(pars.get("Number", np.inf))
-        m = (M["CNT30"] > N)
-        cnt = int(M.loc[m & countable, ["customer_id","date"]].drop_duplicates().shape[0])
-        rows.append({"escenario": name, "alertas": cnt})
-    return pd.DataFrame(rows)
+        return {"CNT30": (">", N)}
+
+    return RuleMetrics(ix, {"Number": ("CNT30", ">")}, conds, defaults={"Number": FIXED_HNR_IN_NUMBER})
+
+def simulate_hnr_in(
+    tx_path: str,
+    *,
+    subsubs: Iterable[str] | str,
+    scenarios: Dict[str, Dict[str, Any]],
+    count_from: str = "2025-02-21",
+) -> pd.DataFrame:
+    """Alertas por escenario sobre las métricas de prepare_hnr_in (ver su docstring)."""
+    return prepare_hnr_in(tx_path, subsubs=subsubs, count_from=count_from).run(scenarios)
@@ -3,7 +3,8 @@ from typing import Dict, Any, Iterable
 import numpy as np
 import pandas as pd
 
-from utils import load_tx_base, filter_subsubs, restrict_counts_after
+from utils import load_tx_base, daily_table, restrict_counts_after, DailyPanel
+from thresholds import ThresholdIndex, RuleMetrics
 
 # =================== Variables fijas editables ===================
 IN_OUT_1_NUMBER_FIXED: float = 2.0     # IN_cnt_14d > Number
@@ -11,70 +12,70 @@ IN_OUT_1_PERCENTAGE_FIXED: float = 80  # OUT >= (P%)*IN_sum_14d
 WINDOW_DAYS: int = 14
 # ================================================================
 
-def simulate_in_out_1(
+def prepare_in_out_1(
     tx_path: str,
     *,
     subsubs: Iterable[str] | str,
-    scenarios: Dict[str, Dict[str, Any]],
     count_from: str = "2025-02-21",
-) -> pd.DataFrame:
+) -> RuleMetrics:
     """
     IN-OUT-1 — por transacción OUT:
       - Outbound & Cash
       - amount > Amount
       - IN_cnt_14d > Number
       - amount >= (Percentage/100)*IN_sum_14d
+    IN 14d = rolling de 14 días sobre los días IN del cliente (primer a último día IN), pegado
+    a cada OUT por (cliente, día); fuera de ese rango vale 0. Clientes sin IN no alertan.
     Cuenta solo OUT con fecha >= count_from (IN 14d usa histórico).
     """
-    df = load_tx_base(tx_path)
-    df = filter_subsubs(df, subsubs)
-
-    base = df[df["tx_date_time"].notna() & df["tx_base_amount"].notna() & df["customer_id"].notna()].copy()
-    IN_  = base[base["tx_direction"].eq("Inbound")  & base["tx_type"].eq("Cash")][["customer_id","tx_date_time","tx_base_amount"]]
-    OUT_ = base[base["tx_direction"].eq("Outbound") & base["tx_type"].eq("Cash")][["customer_id","tx_date_time","tx_base_amount"]]
+    df = load_tx_base(tx_path, subsubs=subsubs, direction="Outbound", tx_type="Cash",
+                      columns=["customer_id", "tx_date_time", "tx_base_amount"])
+    OUT_ = df[df["tx_date_time"].notna() & df["tx_base_amount"].notna() & df["customer_id"].notna()]
 
-    if OUT_.empty:
-        return pd.DataFrame([{"escenario": k, "alertas": 0} for k in scenarios])
+    # IN diarias por cliente (agregado diario de metric_store) → sumas/conteos móviles de 14 días
+    D = daily_table(tx_path, subsubs, direction="Inbound", tx_type="Cash")
+    D = D[D["n_amt"] > 0].reset_index(drop=True)
 
-    # Precalcular IN diarias por cliente
-    in_daily = {}
-    for cid, sub in IN_.groupby("customer_id", sort=False):
-        daily = (sub.set_index("tx_date_time")["tx_base_amount"].abs()
-                    .resample("D").agg(["sum","count"])
-                    .rename(columns={"sum":"IN_sum","count":"IN_cnt"}))
-        in_daily[cid] = daily
+    if OUT_.empty or D.empty:
+        return RuleMetrics.empty()
 
-    rows = []
-    # máscara de conteo por fecha para OUT
-    OUT_ = OUT_.sort_values(["customer_id","tx_date_time"]).reset_index(drop=True)
-    countable = restrict_counts_after(OUT_, "tx_date_time", count_from)
+    P = DailyPanel.from_daily(D, "customer_id")
+    W = P.frame(
+        IN14_sum=P.rolling_sum(P.daily_sum(D["abs_sum"]), WINDOW_DAYS),
+        IN14_cnt=P.rolling_sum(P.daily_sum(D["n_amt"]), WINDOW_DAYS),
+    )
 
-    for name, pars in scenarios.items():
-        A = float(pars.get("Amount", np.inf))
-        N = float(pars.get("Number", IN_OUT_1_NUMBER_FIXED))
-        P = float(pars.get("Percentage", IN_OUT_1_PERCENTAGE_FIXED))
+    # cada OUT toma la ventana de su (cliente, día) con un solo merge
+    O = pd.DataFrame({
+        "customer_id": OUT_["customer_id"],
+        "date": OUT_["tx_date_time"].dt.floor("D"),
+        "tx_date_time": OUT_["tx_date_time"],
+        "AMT": OUT_["tx_base_amount"].abs().astype(float),
+    }).reset_index(drop=True)
+    O = O.merge(W, on=["customer_id", "date"], how="left", sort=False)
+    O[["IN14_sum", "IN14_cnt"]] = O[["IN14_sum", "IN14_cnt"]].fillna(0.0)
 
-        ok_flags = []
-        for cid, sub_out in OUT_.groupby("customer_id", sort=False):
-            ind = in_daily.get(cid)
-            if ind is None or ind.empty:
-                continue
-            IN14_sum = ind["IN_sum"].rolling(f"{WINDOW_DAYS}D").sum()
-            IN14_cnt = ind["IN_cnt"].rolling(f"{WINDOW_DAYS}D").sum()
+    has_in = O["customer_id"].isin(W["customer_id"].unique())
+    countable = restrict_counts_after(O, "tx_date_time", count_from)
 
-            for t, amt in zip(sub_out["tx_date_time"], sub_out["tx_base_amount"].abs()):
-                d = pd.Timestamp(t.normalize())
-                if d in IN14_sum.index:
-                    # valores hasta ese día
-                    val_sum = float(IN14_sum.loc[:d].iloc[-1]) if not IN14_sum.loc[:d].empty else 0.0
-                    val_cnt = float(IN14_cnt.loc[:d].iloc[-1]) if not IN14_cnt.loc[:d].empty else 0.0
-                else:
-                    val_sum = 0.0; val_cnt = 0.0
+    ix = ThresholdIndex(O, ["AMT", "IN14_cnt", "IN14_sum"], mask=has_in & countable)
 
-                cond = (amt > A) & (val_cnt > N) & (amt >= (P/100.0) * val_sum)
-                ok_flags.append(cond)
+    def count(pars: Dict[str, Any]) -> int:
+        A = float(pars.get("Amount", np.inf))
+        N = float(pars.get("Number", IN_OUT_1_NUMBER_FIXED))
+        Pct = float(pars.get("Percentage", IN_OUT_1_PERCENTAGE_FIXED))
+        r = ix.select(AMT=(">", A), IN14_cnt=(">", N))
+        return int(np.count_nonzero(r["AMT"] >= (Pct/100.0) * r["IN14_sum"]))
 
-        ok_flags = pd.Series(ok_flags, index=OUT_.index, dtype=bool) if len(ok_flags)==len(OUT_) else pd.Series(False, index=OUT_.index)
-        rows.append({"escenario": name, "alertas": int((ok_flags & countable).sum())})
+    return RuleMetrics(ix, {"Amount": ("AMT", ">"), "Number": ("IN14_cnt", ">")}, count=count,
+                       defaults={"Number": IN_OUT_1_NUMBER_FIXED, "Percentage": IN_OUT_1_PERCENTAGE_FIXED})
 
-    return pd.DataFrame(rows)
+def simulate_in_out_1(
+    tx_path: str,
+    *,
+    subsubs: Iterable[str] | str,
+    scenarios: Dict[str, Dict[str, Any]],
+    count_from: str = "2025-02-21",
+) -> pd.DataFrame:
+    """Alertas por escenario sobre las métricas de prepare_in_out_1 (ver su docstring)."""
+    return prepare_in_out_1(tx_path, subsubs=subsubs, count_from=count_from).run(scenarios)
@@ -1,23 +1,81 @@
 from __future__ import annotations
+from collections import Counter, deque
 from typing import Dict, Any, Iterable
 import numpy as np
 import pandas as pd
 
-from utils import load_tx_base, filter_subsubs, restrict_counts_after
+from utils import load_tx_base, restrict_counts_after
+from thresholds import ThresholdIndex, RuleMetrics
 
 # =================== Variables fijas editables ===================
 # Solo hay Number; el JSON trae "Counterparties_30d" por percentil,
 # lo mapeamos a Number cuando venga del bundle, o puedes fijarlo acá
 OCMC1_NUMBER_FALLBACK: float = 2.0
+WINDOW_DAYS: int = 30
 # ================================================================
 
-def simulate_ocmc_1(
+_DAY_NS = 86_400 * 10**9
+
+def counterparty_windows(
+    cids: np.ndarray,
+    times_ns: np.ndarray,
+    cps: np.ndarray,
+    window_days: int = WINDOW_DAYS,
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Una pasada lineal por cliente (filas ordenadas por cliente y fecha), día a día, con una
+    ventana deque/Counter como run_parameters_ocmc_1. Por tx con día d devuelve:
+      uniq : contrapartes distintas del cliente con tx en los días [d-29, d] (día d completo)
+      pair : tx del mismo par (cid, cpid) entre d-29 00:00 y d 00:00 (la propia tx solo
+             cuenta si es exactamente a medianoche)
+    """
+    n = len(cids)
+    uniq = np.zeros(n, dtype=float)
+    pair = np.zeros(n, dtype=np.int64)
+    days = times_ns // _DAY_NS
+    midnight = (times_ns % _DAY_NS) == 0
+
+    win: deque = deque()
+    freq: Counter = Counter()
+    distinct = 0
+    i = 0
+    while i < n:
+        if i == 0 or cids[i] != cids[i - 1]:
+            win.clear(); freq.clear(); distinct = 0
+        d = days[i]
+        j = i + 1
+        while j < n and days[j] == d and cids[j] == cids[i]:
+            j += 1
+
+        # sale de la ventana lo anterior a d-29
+        cutoff = d - (window_days - 1)
+        while win and win[0][0] < cutoff:
+            _, cp0 = win.popleft()
+            freq[cp0] -= 1
+            if freq[cp0] == 0:
+                distinct -= 1
+
+        # pares: histórico [d-29, d-1] (+ tx del día d exactamente a medianoche)
+        mid = Counter(cps[i:j][midnight[i:j]].tolist()) if midnight[i:j].any() else None
+        for k in range(i, j):
+            pair[k] = freq[cps[k]] + (mid[cps[k]] if mid else 0)
+
+        for k in range(i, j):
+            cp = cps[k]
+            win.append((d, cp))
+            prev = freq[cp]; freq[cp] += 1
+            if prev == 0:
+                distinct += 1
+        uniq[i:j] = distinct
+        i = j
+    return uniq, pair
+
+def prepare_ocmc_1(
     tx_path: str,
     *,
     subsubs: Iterable[str] | str,
-    scenarios: Dict[str, Dict[str, Any]],
     count_from: str = "2025-02-21",
-) -> pd.DataFrame:
+) -> RuleMetrics:
     """
     OCMC_1 — transacciones (primerizas):
       - unique count(counterparty_id) por cliente en 30d > Number
@@ -25,53 +83,42 @@ def simulate_ocmc_1(
       - Excluye cpid 'NA'
     Solo se cuentan tx con fecha >= count_from (ventanas 30d usan histórico).
     """
-    df = load_tx_base(tx_path)
-    df = filter_subsubs(df, subsubs)
+    df = load_tx_base(tx_path, subsubs=subsubs,
+                      columns=["customer_id", "counterparty_id", "tx_date_time"])
 
+    # cpid nulo nunca suma contrapartes ni marca primeriza: se descarta junto con 'NA'
     df = df[
         df["tx_date_time"].notna()
         & df["customer_id"].notna()
+        & df["counterparty_id"].notna()
         & df["counterparty_id"].astype(str).ne("NA")
-    ][["customer_id","counterparty_id","tx_date_time"]].copy()
-
+    ]
     if df.empty:
-        return pd.DataFrame([{"escenario": k, "alertas": 0} for k in scenarios])
-
-    df = df.sort_values(["customer_id","tx_date_time"]).reset_index(drop=True)
-
-    parts = []
-    for cid, sub in df.groupby("customer_id", sort=False):
-        day_idx = pd.date_range(sub["tx_date_time"].min().normalize(),
-                                sub["tx_date_time"].max().normalize(), freq="D")
-        cp_daily = (
-            sub.groupby([pd.Grouper(key="tx_date_time", freq="D"), "counterparty_id"])
-               .size()
-               .unstack("counterparty_id", fill_value=0)
-               .reindex(day_idx, fill_value=0)
-        )
-        uniq30 = (cp_daily.gt(0).rolling(window=30, min_periods=1).sum().gt(0).sum(axis=1))
-        # marcar si es primera en 30d para ese par (cid, cpid)
-        first_flags = []
-        for _, row in sub.iterrows():
-            d = row["tx_date_time"].normalize()
-            mask_30 = (sub["tx_date_time"] >= d - pd.Timedelta(days=29)) & (sub["tx_date_time"] <= d)
-            cnt_pair_30 = (sub.loc[mask_30, "counterparty_id"] == row["counterparty_id"]).sum()
-            first_flags.append(int(cnt_pair_30 == 1))
-        sub = sub.copy()
-        sub["_is_first30"] = first_flags
-        sub["_uniq30_at_day"] = sub["tx_date_time"].dt.normalize().map(uniq30).astype(float)
-        parts.append(sub)
-
-    G = pd.concat(parts, ignore_index=True) if parts else pd.DataFrame(columns=df.columns.tolist()+["_is_first30","_uniq30_at_day"])
-    if G.empty:
-        return pd.DataFrame([{"escenario": k, "alertas": 0} for k in scenarios])
+        return RuleMetrics.empty()
+
+    cids = pd.factorize(df["customer_id"])[0]
+    cps = pd.factorize(df["counterparty_id"])[0]
+    times = df["tx_date_time"].to_numpy(dtype="datetime64[ns]").view("i8")
+    order = np.lexsort((times, cids))
+    uniq, pair = counterparty_windows(cids[order], times[order], cps[order])
 
+    G = pd.DataFrame({"tx_date_time": df["tx_date_time"].to_numpy()[order], "U30": uniq})
     countable = restrict_counts_after(G, "tx_date_time", count_from)
 
-    rows = []
-    for name, pars in scenarios.items():
+    ix = ThresholdIndex(G, ["U30"], mask=(pair == 1) & countable)
+
+    def conds(pars: Dict[str, Any]) -> Dict[str, tuple]:
         N = float(pars.get("Number", pars.get("Counterparties_30d", OCMC1_NUMBER_FALLBACK)))
-        m = (G["_is_first30"].eq(1) & (G["_uniq30_at_day"] > N))
-        rows.append({"escenario": name, "alertas": int((m & countable).sum())})
+        return {"U30": (">", N)}
 
-    return pd.DataFrame(rows)
+    return RuleMetrics(ix, {"Number": ("U30", ">"), "Counterparties_30d": ("U30", ">")}, conds)
+
+def simulate_ocmc_1(
+    tx_path: str,
+    *,
+    subsubs: Iterable[str] | str,
+    scenarios: Dict[str, Dict[str, Any]],
+    count_from: str = "2025-02-21",
+) -> pd.DataFrame:
+    """Alertas por escenario sobre las métricas de prepare_ocmc_1 (ver su docstring)."""
+    return prepare_ocmc_1(tx_path, subsubs=subsubs, count_from=count_from).run(scenarios)
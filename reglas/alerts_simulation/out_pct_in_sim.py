@@ -3,19 +3,19 @@ from typing import Dict, Any, Iterable
 import pandas as pd
 import numpy as np
 
-from utils import load_tx_base, filter_subsubs
+from utils import daily_table, DailyPanel
+from thresholds import ThresholdIndex, RuleMetrics
 
 # parámetros “globales” fijos para la regla (los puedes editar aquí)
 OUT_PCT_IN_LOW_DEFAULT  = 90.0
 OUT_PCT_IN_HIGH_DEFAULT = 110.0
 
-def simulate_out_pct_in(
+def prepare_out_pct_in(
     tx_path: str,
     *,
     subsubs: Iterable[str] | str,
-    scenarios: Dict[str, Dict[str, Any]],
     count_from: str = "2025-02-21",
-) -> pd.DataFrame:
+) -> RuleMetrics:
     """
     OUT>%IN — Ventanas cliente–día:
       OUT30 > Amount_OUT_30d
@@ -23,79 +23,24 @@ def simulate_out_pct_in(
     Se cuentan solo ventanas con date >= count_from, pero se usa todo el histórico
     para los rollings de 30 días.
     """
-    df = load_tx_base(tx_path)
-    df = filter_subsubs(df, subsubs)
-
-    # base
-    base_mask = (
-        df["tx_date_time"].notna() &
-        df["tx_base_amount"].notna() &
-        df["customer_id"].notna()
-    )
-    OUT_ = df[base_mask & df["tx_direction"].astype(str).str.title().eq("Outbound")][
-        ["customer_id", "tx_date_time", "tx_base_amount"]
-    ].copy()
-    IN_  = df[base_mask & df["tx_direction"].astype(str).str.title().eq("Inbound")][
-        ["customer_id", "tx_date_time", "tx_base_amount"]
-    ].copy()
-
-    rows = []
-
-    if OUT_.empty:
+    # agregado diario (metric_store): Σ |tx_base_amount| por cliente–día–dirección
+    D = daily_table(tx_path, subsubs, direction=["Inbound", "Outbound"])
+    D = D[D["n_amt"] > 0].reset_index(drop=True)
+    is_out = D["tx_direction"].eq("Outbound").to_numpy()
+    if not is_out.any():
         # si no hay OUT, todos los escenarios dan 0
-        return pd.DataFrame([{"escenario": k, "alertas": 0} for k in scenarios])
-
-    parts = []
-    for cid, sub_out in OUT_.groupby("customer_id", sort=False):
-        out_daily = (
-            sub_out.set_index("tx_date_time")["tx_base_amount"]
-                   .abs()
-                   .resample("D").sum()
-        )
-
-        sub_in = IN_[IN_["customer_id"].eq(cid)]
-        if sub_in.empty:
-            in_daily = pd.Series(dtype=float)  # vacío; lo rellenamos luego
-        else:
-            in_daily = (
-                sub_in.set_index("tx_date_time")["tx_base_amount"]
-                      .abs()
-                      .resample("D").sum()
-            )
-
-        # Rango de fechas robusto a vacíos
-        mins, maxs = [], []
-        if not out_daily.index.empty:
-            mins.append(out_daily.index.min())
-            maxs.append(out_daily.index.max())
-        if not in_daily.index.empty:
-            mins.append(in_daily.index.min())
-            maxs.append(in_daily.index.max())
-
-        if not mins:
-            # cliente sin series válidas
-            continue
-
-        idx = pd.date_range(min(mins), max(maxs), freq="D")
+        return RuleMetrics.empty()
 
-        out_daily = out_daily.reindex(idx, fill_value=0.0)
-        # si in_daily estaba vacío, quedará todo NaN; rellenamos a 0
-        in_daily  = in_daily.reindex(idx).fillna(0.0)
-
-        OUT30 = out_daily.rolling("30D", min_periods=1).sum()
-        IN30  = in_daily.rolling("30D", min_periods=1).sum()
-
-        parts.append(pd.DataFrame({
-            "customer_id": cid,
-            "date": idx,
-            "OUT30": OUT30.values,
-            "IN30": IN30.values
-        }))
-
-    M = pd.concat(parts, ignore_index=True) if parts else pd.DataFrame(columns=["customer_id","date","OUT30","IN30"])
+    # OUT e IN en un mismo panel: cada cliente cubre la unión de sus días OUT/IN
+    P = DailyPanel.from_daily(D, "customer_id")
+    M = P.frame(
+        OUT30=P.rolling_sum(P.daily_sum(D["abs_sum"], is_out), 30),
+        IN30=P.rolling_sum(P.daily_sum(D["abs_sum"], ~is_out), 30),
+    )
+    M = M[P.group_any(is_out)].reset_index(drop=True)   # solo clientes con OUT
 
     if M.empty:
-        return pd.DataFrame([{"escenario": k, "alertas": 0} for k in scenarios])
+        return RuleMetrics.empty()
 
     # máscara de conteo (desde marzo inclusive)
     count_from_ts = pd.Timestamp(count_from).normalize()
@@ -107,20 +52,28 @@ def simulate_out_pct_in(
         H = float(s.get("High", OUT_PCT_IN_HIGH_DEFAULT)) # %
         return L, H
 
-    out_rows = []
-    for name, pars in scenarios.items():
+    # contar solo ventanas desde count_from
+    ix = ThresholdIndex(M, ["OUT30", "IN30"], mask=(M["IN30"] > 0) & countable)
+
+    def count(pars: Dict[str, Any]) -> int:
         A = float(pars.get("Amount_OUT_30d", 0.0))
         L, H = low_high_for(pars)
 
-        m = (
-            (M["OUT30"] > A) &
-            (M["IN30"] > 0) &
-            (M["OUT30"] >= M["IN30"] * (L/100.0)) &
-            (M["OUT30"] <= M["IN30"] * (H/100.0))
-        )
+        r = ix.select(OUT30=(">", A))
+        return int(np.count_nonzero(
+            (r["OUT30"] >= r["IN30"] * (L/100.0)) &
+            (r["OUT30"] <= r["IN30"] * (H/100.0))
+        ))
 
-        # contar solo ventanas desde count_from
-        count = int(M.loc[m & countable, ["customer_id", "date"]].drop_duplicates().shape[0])
-        out_rows.append({"escenario": name, "alertas": count})
+    return RuleMetrics(ix, {"Amount_OUT_30d": ("OUT30", ">")}, count=count,
+                       defaults={"Low": OUT_PCT_IN_LOW_DEFAULT, "High": OUT_PCT_IN_HIGH_DEFAULT})
 
-    return pd.DataFrame(out_rows)
+def simulate_out_pct_in(
+    tx_path: str,
+    *,
+    subsubs: Iterable[str] | str,
+    scenarios: Dict[str, Dict[str, Any]],
+    count_from: str = "2025-02-21",
+) -> pd.DataFrame:
+    """Alertas por escenario sobre las métricas de prepare_out_pct_in (ver su docstring)."""
+    return prepare_out_pct_in(tx_path, subsubs=subsubs, count_from=count_from).run(scenarios)
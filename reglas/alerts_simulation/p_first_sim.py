@@ -3,20 +3,20 @@ from typing import Dict, Any, Iterable
 import pandas as pd
 import numpy as np
 
-from utils import load_tx_base, filter_subsubs, restrict_counts_after
+from utils import load_tx_base, restrict_counts_after
+from thresholds import ThresholdIndex, RuleMetrics
 
 P_FIRST_DAYS_DEFAULT = 7  # fijo, editable aquí
 
-def simulate_p_first(
+def prepare_p_first(
     tx_path: str,
     *,
     subsubs: Iterable[str] | str,
-    scenarios: Dict[str, Dict[str, Any]],
     count_from: str = "2025-02-21",
     days_fixed: int | None = None,
-) -> pd.DataFrame:
-    df = load_tx_base(tx_path)
-    df = filter_subsubs(df, subsubs)
+) -> RuleMetrics:
+    df = load_tx_base(tx_path, subsubs=subsubs,
+                      columns=["customer_id", "tx_date_time", "customer_account_creation_date", "tx_base_amount"])
 
     # ✅ Casts defensivos: forzar UTC en ambas fechas
     df["tx_date_time"] = pd.to_datetime(df.get("tx_date_time"), errors="coerce", utc=True)
@@ -33,7 +33,7 @@ def simulate_p_first(
     ][["customer_id","tx_date_time","customer_account_creation_date","tx_base_amount"]].copy()
 
     g = g.sort_values(["customer_id","tx_date_time"])
-    g["tx_order"] = g.groupby("customer_id").cumcount() + 1
+    g["tx_order"] = g.groupby("customer_id", observed=True).cumcount() + 1
 
     # ✅ Ambas columnas ahora son datetime64[ns, UTC]; resta segura
     td = g["tx_date_time"] - g["customer_account_creation_date"]
@@ -43,16 +43,24 @@ def simulate_p_first(
     countable = restrict_counts_after(g, "tx_date_time", count_from)
 
 
-    out = []
-    for name, pars in scenarios.items():
+    elig = g["tx_order"].eq(1) & (g["days_from_open"] >= 0) & countable
+    ix = ThresholdIndex(g, ["tx_base_amount", "days_from_open"], mask=elig)
+
+    def conds(pars: Dict[str, Any]) -> Dict[str, tuple]:
         A = float(pars.get("Amount", 0.0))
         D = int(pars.get("Days", days_fixed or P_FIRST_DAYS_DEFAULT))
-        m = (
-            g["tx_order"].eq(1)
-            & (g["days_from_open"] >= 0)
-            & (g["days_from_open"] <= D)
-            & (g["tx_base_amount"] > A)
-        )
-        cnt = int((m & countable).sum())
-        out.append({"escenario": name, "alertas": cnt})
-    return pd.DataFrame(out)
+        return {"tx_base_amount": (">", A), "days_from_open": ("<=", D)}
+
+    return RuleMetrics(ix, {"Amount": ("tx_base_amount", ">"), "Days": ("days_from_open", "<=")}, conds,
+                       defaults={"Days": days_fixed or P_FIRST_DAYS_DEFAULT})
+
+def simulate_p_first(
+    tx_path: str,
+    *,
+    subsubs: Iterable[str] | str,
+    scenarios: Dict[str, Dict[str, Any]],
+    count_from: str = "2025-02-21",
+    days_fixed: int | None = None,
+) -> pd.DataFrame:
+    """Alertas por escenario sobre las métricas de prepare_p_first (ver su docstring)."""
+    return prepare_p_first(tx_path, subsubs=subsubs, count_from=count_from, days_fixed=days_fixed).run(scenarios)
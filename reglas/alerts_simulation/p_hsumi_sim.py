@@ -4,120 +4,59 @@ from typing import Dict, Any, Iterable
 import pandas as pd
 import numpy as np
 
-from utils import load_tx_base, filter_subsubs, restrict_counts_after
+from utils import load_tx_base, restrict_counts_after
+from thresholds import CrossingIndex, RuleMetrics
+from kernels import group_layout
 
-def _to_dt_utc(s):
-    """Convierte a datetime UTC de forma segura."""
-    return pd.to_datetime(s, errors="coerce", utc=True)
+WINDOW_DAYS: int = 30
 
-def simulate_p_hsumi(
+def prepare_p_hsumi(
     tx_path: str,
     *,
     subsubs: Iterable[str] | str,
-    scenarios: Dict[str, Dict[str, Any]],
     count_from: str = "2025-02-21",
-) -> pd.DataFrame:
+) -> RuleMetrics:
     """
     P-HSUMI — Gatillo por transacción:
       Regla: tx_direction = Inbound AND tx_type = Cash AND S30_after(tx) > Amount
       Gatillo: se cuenta la transacción que hace cruzar el umbral (S30_before <= A < S30_after)
 
-    Notas:
-      - El rolling de 30 días usa TODO el historial previo.
-      - El conteo final considera sólo transacciones con tx_date_time >= count_from.
-      - Se trabaja en UTC para evitar choques tz-aware/naive.
-
-    Retorna:
-      DataFrame con columnas: ['escenario', 'alertas']
+      - S30_after = suma(|monto|) del cliente en (t-30d, t], hasta la propia tx
+      - S30_before = S30_after - |monto| de la tx
+    Se calculan una sola vez por transacción; cada Amount es una consulta sobre CrossingIndex.
+    El rolling usa TODO el historial previo; se cuentan solo tx con tx_date_time >= count_from.
     """
-    # -------------------- Carga base y normalización --------------------
-    df = load_tx_base(tx_path)
-    df = filter_subsubs(df, subsubs)
-
-    # Normaliza columnas usadas
-    df["tx_direction"]   = df.get("tx_direction", "").astype(str).str.title()
-    df["tx_type"]        = df.get("tx_type", "").astype(str).str.title()
-    df["tx_base_amount"] = pd.to_numeric(df.get("tx_base_amount"), errors="coerce")
-    df["tx_date_time"]   = _to_dt_utc(df.get("tx_date_time"))
-    df["customer_id"]    = df.get("customer_id")
-
-    # Filtro mínimo de elegibilidad (Inbound + Cash, fechas/montos válidos)
-    m = (
-        df["tx_direction"].eq("Inbound")
-        & df["tx_type"].eq("Cash")
-        & df["customer_id"].notna()
-        & df["tx_date_time"].notna()
-        & df["tx_base_amount"].notna()
-    )
-    base = df.loc[m, ["customer_id", "tx_date_time", "tx_base_amount"]].copy()
+    df = load_tx_base(tx_path, subsubs=subsubs, direction="Inbound", tx_type="Cash",
+                      columns=["customer_id", "tx_date_time", "tx_base_amount"])
 
+    base = df[df["customer_id"].notna() & df["tx_date_time"].notna() & df["tx_base_amount"].notna()]
     if base.empty:
-        # estructura de salida consistente si no hay datos
-        return pd.DataFrame([{"escenario": k, "alertas": 0} for k in scenarios])
-
-    # -------------------- Preparación por cliente -----------------------
-    # (No cortamos por fecha aquí: el rolling necesita historial completo)
-    # Se calcularán triggers por transacción y luego se filtrará por count_from.
-    count_from_mask_dummy = restrict_counts_after(
-        base.rename(columns={"tx_date_time": "_tmp_dt"}).assign(_tmp_dt=_to_dt_utc(base["tx_date_time"])),
-        "_tmp_dt",
-        count_from,
-    )
-    # Solo usamos count_from_mask_dummy para forzar la conversión interna a UTC sin errores.
-    # El filtrado real lo aplicaremos a los gatillos, no a la base (para no romper el rolling).
-
-    # -------------------- Función interna: triggers para un Amount -------
-    def _triggers_for_amount(amount: float) -> pd.DataFrame:
-        """
-        Devuelve las transacciones (filas) que gatillan la alerta para el umbral 'amount'.
-        Implementa:
-          - S30_after = suma(|monto|) en (t-30d, t]
-          - S30_before = S30_after - monto_actual
-          - Gatillo si: S30_before <= amount < S30_after
-        """
-        parts = []
-        # Procesar por cliente mantiene la lógica de ventanas separadas.
-        for cid, sub in base.groupby("customer_id", sort=False):
-            sub = sub.sort_values("tx_date_time").copy()
-
-            # Serie por transacción, indexada por el timestamp de esa transacción
-            # (puede haber duplicados de timestamp sin problema)
-            amt_abs = sub["tx_base_amount"].abs().astype(float).values
-            s = pd.Series(amt_abs, index=sub["tx_date_time"].values)
-
-            # Rolling de 30 días basado en tiempo; resultado alineado por posición
-            S30_after = s.rolling("30D").sum().values
-            S30_before = S30_after - amt_abs  # quita el aporte de la transacción actual
-
-            sub["S30_after"]  = S30_after
-            sub["S30_before"] = S30_before
+        return RuleMetrics.empty()
 
-            mask = (sub["S30_before"] <= amount) & (sub["S30_after"] > amount)
-            if mask.any():
-                parts.append(sub.loc[mask, ["customer_id", "tx_date_time", "tx_base_amount"]])
+    # (cliente, fecha) contiguos; un solo rolling("30D") agrupado para todos los clientes.
+    # Se usa el rolling de pandas (suma compensada) y no sumas acumuladas: así S30_before
+    # da 0 exacto en la primera tx de cada ventana y el gatillo en Amount = 0 no cambia.
+    order, ts, offsets = group_layout(base, "customer_id")
+    amt = base["tx_base_amount"].abs().to_numpy(dtype=float)[order]
+    grp = np.repeat(np.arange(len(offsets) - 1), np.diff(offsets))
+    S30_after = (pd.Series(amt, index=pd.DatetimeIndex(ts.view("datetime64[ns]")))
+                   .groupby(grp).rolling(f"{WINDOW_DAYS}D").sum().to_numpy())
+    S30_before = S30_after - amt
 
-        if not parts:
-            return pd.DataFrame(columns=["customer_id", "tx_date_time", "tx_base_amount"])
+    countable = restrict_counts_after(base.iloc[order], "tx_date_time", count_from)
+    cx = CrossingIndex(S30_before, S30_after, col="S30", mask=countable.to_numpy())
 
-        return pd.concat(parts, ignore_index=True)
+    def conds(pars: Dict[str, Any]) -> Dict[str, tuple]:
+        return {"S30": ("cross", float(pars.get("Amount", 0.0)))}
 
-    # -------------------- Ejecutar escenarios ---------------------------
-    # Filtro final por fecha de la transacción gatillo (no del historial)
-    out_rows = []
-    count_from_ts = pd.to_datetime(count_from, utc=True)
+    return RuleMetrics(cx, {"Amount": ("S30", "cross")}, conds)
 
-    for name, pars in scenarios.items():
-        A = float(pars.get("Amount", 0.0))
-        trig = _triggers_for_amount(A)
-
-        if trig.empty:
-            out_rows.append({"escenario": name, "alertas": 0})
-            continue
-
-        # Asegurar tz UTC y filtrar solo desde count_from en adelante
-        trig["tx_date_time"] = _to_dt_utc(trig["tx_date_time"])
-        trig = trig[trig["tx_date_time"] >= count_from_ts]
-
-        out_rows.append({"escenario": name, "alertas": int(trig.shape[0])})
-
-    return pd.DataFrame(out_rows)
+def simulate_p_hsumi(
+    tx_path: str,
+    *,
+    subsubs: Iterable[str] | str,
+    scenarios: Dict[str, Dict[str, Any]],
+    count_from: str = "2025-02-21",
+) -> pd.DataFrame:
+    """Alertas por escenario sobre las métricas de prepare_p_hsumi (ver su docstring)."""
+    return prepare_p_hsumi(tx_path, subsubs=subsubs, count_from=count_from).run(scenarios)
@@ -2,41 +2,44 @@ from __future__ import annotations
 from typing import Dict, Any, Iterable
 import pandas as pd
 
-from utils import load_tx_base, filter_subsubs
+from utils import load_tx_base, DailyPanel
+from thresholds import ThresholdIndex, RuleMetrics
 
-def simulate_p_hvi(
+def prepare_p_hvi(
     tx_path: str,
     *,
     subsubs: Iterable[str] | str,
-    scenarios: Dict[str, Dict[str, Any]],
     count_from: str = "2025-02-21",
-) -> pd.DataFrame:
-    df = load_tx_base(tx_path)
-    df = filter_subsubs(df, subsubs)
+) -> RuleMetrics:
+    df = load_tx_base(tx_path, subsubs=subsubs, direction="Inbound", tx_type="Cash",
+                      columns=["customer_id", "tx_date_time"])
 
     g = df[
-        df["tx_direction"].astype(str).str.title().eq("Inbound")
-        & df["tx_type"].astype(str).str.title().eq("Cash")
-        & df["customer_id"].notna()
+        df["customer_id"].notna()
         & df["tx_date_time"].notna()
     ][["customer_id","tx_date_time"]].copy()
 
     if g.empty:
-        return pd.DataFrame([{"escenario": k, "alertas": 0} for k in scenarios])
-
-    parts=[]
-    for cid, sub in g.groupby("customer_id", sort=False):
-        daily = sub.set_index("tx_date_time").assign(x=1)["x"].resample("D").sum().fillna(0.0)
-        C30 = daily.rolling("30D", min_periods=1).sum()
-        parts.append(pd.DataFrame({"customer_id": cid, "date": C30.index, "C30": C30.values}))
+        return RuleMetrics.empty()
 
-    M = pd.concat(parts, ignore_index=True)
+    P = DailyPanel.build(g, "customer_id")
+    M = P.frame(C30=P.rolling_sum(P.daily_count(), 30))
     count_from_ts = pd.Timestamp(count_from).normalize()
     M = M.loc[M["date"] >= count_from_ts].copy()
 
-    out=[]
-    for name, pars in scenarios.items():
-        N = float(pars.get("Number", 0))
-        cnt = int(M.loc[M["C30"] > N, ["customer_id","date"]].drop_duplicates().shape[0])
-        out.append({"escenario": name, "alertas": cnt})
-    return pd.DataFrame(out)
+    ix = ThresholdIndex(M, ["C30"])
+
+    def conds(pars: Dict[str, Any]) -> Dict[str, tuple]:
+        return {"C30": (">", float(pars.get("Number", 0)))}
+
+    return RuleMetrics(ix, {"Number": ("C30", ">")}, conds)
+
+def simulate_p_hvi(
+    tx_path: str,
+    *,
+    subsubs: Iterable[str] | str,
+    scenarios: Dict[str, Dict[str, Any]],
+    count_from: str = "2025-02-21",
+) -> pd.DataFrame:
+    """Alertas por escenario sobre las métricas de prepare_p_hvi (ver su docstring)."""
+    return prepare_p_hvi(tx_path, subsubs=subsubs, count_from=count_from).run(scenarios)
@@ -1,32 +1,43 @@
 from __future__ import annotations
 from typing import Dict, Any, Iterable
+import numpy as np
 import pandas as pd
 
-from utils import load_tx_base, filter_subsubs, restrict_counts_after
+from utils import load_tx_base, restrict_counts_after
+from thresholds import ThresholdIndex, RuleMetrics
 
-def simulate_p_lval(
+def prepare_p_lval(
     tx_path: str,
     *,
     subsubs: Iterable[str] | str,
-    scenarios: Dict[str, Dict[str, Any]],
     count_from: str = "2025-02-21",
-) -> pd.DataFrame:
-    df = load_tx_base(tx_path)
-    df = filter_subsubs(df, subsubs)
+) -> RuleMetrics:
+    df = load_tx_base(tx_path, subsubs=subsubs,
+                      columns=["customer_expected_amount", "tx_base_amount", "tx_date_time"])
 
     df["_exp"] = pd.to_numeric(df.get("customer_expected_amount"), errors="coerce").fillna(0.0)
 
     g = df[df["tx_base_amount"].notna() & df["tx_date_time"].notna()][["_exp","tx_base_amount","tx_date_time"]].copy()
     if g.empty:
-        return pd.DataFrame([{"escenario": k, "alertas": 0} for k in scenarios])
+        return RuleMetrics.empty()
 
     base_elig = g["_exp"] != 0
     countable = restrict_counts_after(g, "tx_date_time", count_from)
+    ix = ThresholdIndex(g, ["tx_base_amount", "_exp"], mask=base_elig & countable)
 
-    out=[]
-    for name, pars in scenarios.items():
+    def count(pars: Dict[str, Any]) -> int:
+        # monto > esperado × Factor no es un umbral fijo sobre una columna
         F = float(pars.get("Factor", 0.0))
-        m = base_elig & (g["tx_base_amount"] > g["_exp"] * F)
-        cnt = int((m & countable).sum())
-        out.append({"escenario": name, "alertas": cnt})
-    return pd.DataFrame(out)
+        return int(np.count_nonzero(ix.cols["tx_base_amount"] > ix.cols["_exp"] * F))
+
+    return RuleMetrics(ix, {}, count=count)
+
+def simulate_p_lval(
+    tx_path: str,
+    *,
+    subsubs: Iterable[str] | str,
+    scenarios: Dict[str, Dict[str, Any]],
+    count_from: str = "2025-02-21",
+) -> pd.DataFrame:
+    """Alertas por escenario sobre las métricas de prepare_p_lval."""
+    return prepare_p_lval(tx_path, subsubs=subsubs, count_from=count_from).run(scenarios)
@@ -2,20 +2,20 @@ from __future__ import annotations
 from typing import Dict, Any, Iterable
 import pandas as pd
 
-from utils import load_tx_base, filter_subsubs, restrict_counts_after
+from utils import load_tx_base, restrict_counts_after
+from thresholds import ThresholdIndex, RuleMetrics
 
 P_SECOND_DAYS_DEFAULT = 7  # fijo
 
-def simulate_p_second(
+def prepare_p_second(
     tx_path: str,
     *,
     subsubs: Iterable[str] | str,
-    scenarios: Dict[str, Dict[str, Any]],
     count_from: str = "2025-02-21",
     days_fixed: int | None = None,
-) -> pd.DataFrame:
-    df = load_tx_base(tx_path)
-    df = filter_subsubs(df, subsubs)
+) -> RuleMetrics:
+    df = load_tx_base(tx_path, subsubs=subsubs,
+                      columns=["customer_id", "tx_date_time", "customer_account_creation_date", "tx_base_amount"])
 
     df["tx_date_time"] = pd.to_datetime(df.get("tx_date_time"), errors="coerce", utc=True)
     df["customer_account_creation_date"] = pd.to_datetime(df.get("customer_account_creation_date"), errors="coerce", utc=True)
@@ -29,26 +29,34 @@ def simulate_p_second(
     ][["customer_id","tx_date_time","customer_account_creation_date","tx_base_amount"]].copy()
 
     if g.empty:
-        return pd.DataFrame([{"escenario": k, "alertas": 0} for k in scenarios])
+        return RuleMetrics.empty()
 
     g = g.sort_values(["customer_id","tx_date_time"])
-    g["tx_order"] = g.groupby("customer_id").cumcount() + 1
+    g["tx_order"] = g.groupby("customer_id", observed=True).cumcount() + 1
 
     td = g["tx_date_time"] - g["customer_account_creation_date"]
     g["days_from_open"] = td.dt.total_seconds() / 86400.0
 
     countable = restrict_counts_after(g, "tx_date_time", count_from)
 
-    out = []
-    for name, pars in scenarios.items():
+    elig = g["tx_order"].eq(2) & (g["days_from_open"] >= 0) & countable
+    ix = ThresholdIndex(g, ["tx_base_amount", "days_from_open"], mask=elig)
+
+    def conds(pars: Dict[str, Any]) -> Dict[str, tuple]:
         A = float(pars.get("Amount", 0.0))
         D = int(pars.get("Days", days_fixed or P_SECOND_DAYS_DEFAULT))
-        m = (
-            g["tx_order"].eq(2)
-            & (g["days_from_open"] >= 0)
-            & (g["days_from_open"] <= D)
-            & (g["tx_base_amount"] > A)
-        )
-        cnt = int((m & countable).sum())
-        out.append({"escenario": name, "alertas": cnt})
-    return pd.DataFrame(out)
+        return {"tx_base_amount": (">", A), "days_from_open": ("<=", D)}
+
+    return RuleMetrics(ix, {"Amount": ("tx_base_amount", ">"), "Days": ("days_from_open", "<=")}, conds,
+                       defaults={"Days": days_fixed or P_SECOND_DAYS_DEFAULT})
+
+def simulate_p_second(
+    tx_path: str,
+    *,
+    subsubs: Iterable[str] | str,
+    scenarios: Dict[str, Dict[str, Any]],
+    count_from: str = "2025-02-21",
+    days_fixed: int | None = None,
+) -> pd.DataFrame:
+    """Alertas por escenario sobre las métricas de prepare_p_second (ver su docstring)."""
+    return prepare_p_second(tx_path, subsubs=subsubs, count_from=count_from, days_fixed=days_fixed).run(scenarios)
@@ -2,33 +2,41 @@ from __future__ import annotations
 from typing import Dict, Any, Iterable
 import pandas as pd
 
-from utils import load_tx_base, filter_subsubs, restrict_counts_after
+from utils import load_tx_base, restrict_counts_after
+from thresholds import ThresholdIndex, RuleMetrics
 
-def simulate_p_tli(
+def prepare_p_tli(
     tx_path: str,
     *,
     subsubs: Iterable[str] | str,
-    scenarios: Dict[str, Dict[str, Any]],
     count_from: str = "2025-02-21",
-) -> pd.DataFrame:
-    df = load_tx_base(tx_path)
-    df = filter_subsubs(df, subsubs)
+) -> RuleMetrics:
+    df = load_tx_base(tx_path, subsubs=subsubs, direction="Inbound",
+                      columns=["tx_base_amount", "tx_date_time"])
 
     g = df[
-        df["tx_direction"].astype(str).str.title().eq("Inbound")
-        & df["tx_base_amount"].notna()
+        df["tx_base_amount"].notna()
         & df["tx_date_time"].notna()
     ][["tx_base_amount","tx_date_time"]].copy()
 
     if g.empty:
-        return pd.DataFrame([{"escenario": k, "alertas": 0} for k in scenarios])
+        return RuleMetrics.empty()
 
     countable = restrict_counts_after(g, "tx_date_time", count_from)
 
-    out=[]
-    for name, pars in scenarios.items():
-        A = float(pars.get("Amount", 0.0))
-        m = g["tx_base_amount"] > A
-        cnt = int((m & countable).sum())
-        out.append({"escenario": name, "alertas": cnt})
-    return pd.DataFrame(out)
+    ix = ThresholdIndex(g, ["tx_base_amount"], mask=countable)
+
+    def conds(pars: Dict[str, Any]) -> Dict[str, tuple]:
+        return {"tx_base_amount": (">", float(pars.get("Amount", 0.0)))}
+
+    return RuleMetrics(ix, {"Amount": ("tx_base_amount", ">")}, conds)
+
+def simulate_p_tli(
+    tx_path: str,
+    *,
+    subsubs: Iterable[str] | str,
+    scenarios: Dict[str, Dict[str, Any]],
+    count_from: str = "2025-02-21",
+) -> pd.DataFrame:
+    """Alertas por escenario sobre las métricas de prepare_p_tli (ver su docstring)."""
+    return prepare_p_tli(tx_path, subsubs=subsubs, count_from=count_from).run(scenarios)
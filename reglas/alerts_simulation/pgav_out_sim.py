@@ -3,7 +3,8 @@ from typing import Dict, Any, Iterable
 import pandas as pd
 import numpy as np
 
-from utils import load_tx_base, filter_subsubs, restrict_counts_after
+from utils import restrict_counts_after, get_metrics
+from thresholds import ThresholdIndex, RuleMetrics
 
 # ============================================================================
 # 👉 EDITA AQUÍ: valor fijo para Number en PGAV-OUT
@@ -15,23 +16,12 @@ FIXED_PGAV_OUT_NUMBER: int | None = 203
 # ============================================================================
 
 
-def _roll_7d_sum_count(sub: pd.DataFrame) -> pd.DataFrame:
-    out = (
-        sub.set_index("tx_date_time")["tx_base_amount"]
-           .rolling("7D")
-           .agg(["sum", "count"])
-    )
-    out.index = sub.index
-    return out
-
-
-def simulate_pgav_out(
+def prepare_pgav_out(
     tx_path: str,
     *,
     subsubs: Iterable[str] | str,
-    scenarios: Dict[str, Dict[str, Any]],
     count_from: str = "2025-02-21",
-) -> pd.DataFrame:
+) -> RuleMetrics:
     """
     PGAV-OUT: cuenta transacciones que cumplen los umbrales del escenario.
     Condiciones:
@@ -43,59 +33,46 @@ def simulate_pgav_out(
     Se cuentan solo las transacciones con tx_date_time >= count_from,
     pero el rolling de 7d usa todo el histórico previo para contexto.
     """
-    df = load_tx_base(tx_path)
-    df = filter_subsubs(df, subsubs)
-
-    GROUP_COL = "customer_sub_sub_type" if "customer_sub_sub_type" in df.columns else "customer_type"
-
-    g = df[
-        (df["tx_direction"].eq("Outbound"))
-        & (df["tx_type"].eq("Cash"))
-        & (df["tx_base_amount"].notna())
-        & (df["tx_date_time"].notna())
-    ].copy()
-
+    # por tx Outbound Cash: prev_sum7/prev_cnt7/factor del grupo (misma métrica que run_parameters_pgav_out)
+    g = get_metrics(tx_path, "pgav", subsubs, direction="Outbound")
     if g.empty:
-        return pd.DataFrame([{"escenario": k, "alertas": 0} for k in scenarios])
-
-    g = g.sort_values([GROUP_COL, "tx_date_time"]).reset_index(drop=True)
-    tmp = (
-        g[[GROUP_COL, "tx_date_time", "tx_base_amount"]]
-        .groupby(GROUP_COL, group_keys=False)
-        .apply(_roll_7d_sum_count)
-    )
-
-    g["prev_sum7"] = tmp["sum"] - g["tx_base_amount"]
-    g["prev_cnt7"] = tmp["count"] - 1
-    g["peer_avg7_excl"] = np.where(g["prev_cnt7"] > 0, g["prev_sum7"] / g["prev_cnt7"], np.nan)
-    g["factor"] = np.where(g["peer_avg7_excl"] > 0, g["tx_base_amount"] / g["peer_avg7_excl"], np.nan)
+        return RuleMetrics.empty()
 
     countable = restrict_counts_after(g, "tx_date_time", count_from)
 
-    def _mask_for_scenario(dfm: pd.DataFrame, pars: Dict[str, Any]) -> pd.Series:
-        m = pd.Series(True, index=dfm.index)
+    # umbrales del escenario como condiciones sobre columnas indexadas (las ausentes no filtran)
+    def _conds_for_scenario(pars: Dict[str, Any]) -> Dict[str, tuple]:
+        c = {}
 
         # Amount
         if "Amount" in pars and pd.notna(pars["Amount"]):
-            m &= dfm["tx_base_amount"] >= float(pars["Amount"])
+            c["tx_base_amount"] = (">=", float(pars["Amount"]))
 
         # Factor
         if "Factor" in pars and pd.notna(pars["Factor"]):
-            m &= dfm["factor"] > float(pars["Factor"])
+            c["factor"] = (">", float(pars["Factor"]))
 
         # Number (usar fijo si está definido; si no, usar del escenario si existe)
         if FIXED_PGAV_OUT_NUMBER is not None:
-            m &= dfm["prev_cnt7"] >= float(FIXED_PGAV_OUT_NUMBER)
+            c["prev_cnt7"] = (">=", float(FIXED_PGAV_OUT_NUMBER))
         else:
             if "Number" in pars and pd.notna(pars["Number"]):
-                m &= dfm["prev_cnt7"] >= float(pars["Number"])
+                c["prev_cnt7"] = (">=", float(pars["Number"]))
+
+        return c
 
-        return m.fillna(False)
+    ix = ThresholdIndex(g, ["tx_base_amount", "factor", "prev_cnt7"], mask=countable)
 
-    rows = []
-    for name, pars in scenarios.items():
-        m_alert = _mask_for_scenario(g, pars)
-        count = int(g.loc[m_alert & countable].shape[0])
-        rows.append({"escenario": name, "alertas": count})
+    # Unidad = transacciones que cumplen
+    return RuleMetrics(ix, {"Amount": ("tx_base_amount", ">="), "Factor": ("factor", ">"), "Number": ("prev_cnt7", ">=")},
+                       _conds_for_scenario, defaults={"Number": FIXED_PGAV_OUT_NUMBER})
 
-    return pd.DataFrame(rows)
+def simulate_pgav_out(
+    tx_path: str,
+    *,
+    subsubs: Iterable[str] | str,
+    scenarios: Dict[str, Dict[str, Any]],
+    count_from: str = "2025-02-21",
+) -> pd.DataFrame:
+    """Alertas por escenario sobre las métricas de prepare_pgav_out (ver su docstring)."""
+    return prepare_pgav_out(tx_path, subsubs=subsubs, count_from=count_from).run(scenarios)
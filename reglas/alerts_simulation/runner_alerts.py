@@ -1,6 +1,9 @@
 from __future__ import annotations
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
+from typing import Callable, Optional
 import json
+import time
 import warnings
 import pandas as pd
 
@@ -35,6 +38,11 @@ from rvt_in_sim import simulate_rvt_in
 from rvt_out_sim import simulate_rvt_out
 from sumcci_sim import simulate_sumcci
 from sumcco_sim import simulate_sumcco
+from sweep import sweep
+from utils import SimSession
+from scenarios import SPECS, ScenarioMatrix, compile_scenarios
+from sim_cache import SimCache
+from bundle_store import BundleStore
 
 import re, unicodedata
 
@@ -62,11 +70,22 @@ warnings.filterwarnings("ignore", category=FutureWarning)
 ROOT = Path(__file__).resolve().parents[2]
 TX_PATH = ROOT / "data" / "tx" / "datos_trx__with_subsub_oficial.csv"
 PARAMS_BUNDLE = ROOT / "outputs" / "params" / "R-Low" / "params_R-Low.json"
+# Alternativa al JSON: carpeta del almacén de parámetros (param_rules/bundle_store.py) y su segmento;
+# PARAMS_GENERATION = None toma la generación más reciente. PARAMS_STORE = None usa PARAMS_BUNDLE.
+PARAMS_STORE      = None            # p. ej. ROOT / "outputs" / "params"
+PARAMS_SEGMENT    = "R-Low"
+PARAMS_GENERATION = None
 
 COUNT_FROM = pd.Timestamp("2025-02-21", tz="UTC")
 SUBSUBS_ACTUAL = ["R-Low", "R-High"]
 SUBSUBS_NUEVO  = ["R-High"]
 
+# True: también simula el escenario "Actual" de cada regla sobre SUBSUBS_ACTUAL
+SIM_ACTUAL = False
+# "serial" | "process" (un job regla×segmento por worker; None = os.cpu_count())
+EXECUTOR    = "process"
+MAX_WORKERS = None
+
 # Parámetros “Actuales” de reglas (si quieres comparar contra situación vigente)
 ACTUAL_PARAMS = {
     "PGAV-IN":  {"Amount": 20000000, "Factor": 5, "Number": 139},
@@ -104,766 +123,211 @@ ACTUAL_PARAMS = {
 
 OUT_DIR = ROOT / "outputs" / "alerts_sim"
 
+# Curvas umbral → alertas (opcional). Cada entrada: (regla, parámetro, grilla[, base]).
+# Ej: ("RVT-IN", "Amount", np.linspace(0, 2e8, 201), {"Number": 6})
+SWEEPS: list[tuple] = []
+
+# Caché de resultados por (regla, CSV, subsubs, COUNT_FROM, escenario, código) en
+# <dir del CSV>/.tx_cache/sim_results (sim_cache.py); SIM_CACHE_MB = tope en disco (LRU)
+SIM_CACHE    = True
+SIM_CACHE_MB = 64
+
 
 # ------------------------------------------------------------
 # Helpers de bundle
 # ------------------------------------------------------------
-def _load_bundle(p: Path) -> dict:
+def _load_bundle(p: Path, segment: Optional[str] = None, generation: Optional[str] = None) -> dict:
+    """JSON de params_<SUBSUB>.json o, si `p` es la carpeta del almacén, el bundle de `segment`."""
+    if Path(p).is_dir():
+        return BundleStore.open(p).to_bundle(segment, generation=generation)
     with open(p, "r", encoding="utf-8") as f:
         return json.load(f)
 
-def _rows(bundle: dict, rule_key: str, table_key: str) -> list[dict]:
-    return (
-        bundle.get("rules", {})
-              .get(rule_key, {})
-              .get(table_key, {})
-              .get("percentiles", [])
-        or []
-    )
-
-def _first_float(row: dict, *keys: str) -> float | None:
-    for k in keys:
-        if k in row and row[k] is not None:
-            try:
-                return float(row[k])
-            except Exception:
-                pass
-    return None
-
 
 # ------------------------------------------------------------
-# Builders de escenarios por regla (desde bundle, sin pcts hardcode)
+# Tabla de reglas (orden de los resúmenes) y ejecución en paralelo
 # ------------------------------------------------------------
-def build_rvt_scenarios(bundle: dict, rule_key: str, include_actual: bool) -> dict[str, dict]:
-    scen: dict[str, dict] = {}
-    # amount
-    for r in _rows(bundle, rule_key, "amount"):
-        pct = str(r.get("percentil","")).strip()
-        a = _first_float(r, "Amount_CLP", "Amount")
-        if pct and a is not None:
-            scen.setdefault(pct, {})["Amount"] = a
-    # number
-    for r in _rows(bundle, rule_key, "number"):
-        pct = str(r.get("percentil","")).strip()
-        n = _first_float(r, "Number", "Number_ceil", "Number_ceiled", "Number_raw")
-        if pct and n is not None:
-            scen.setdefault(pct, {})["Number"] = n
-    if include_actual and rule_key in ACTUAL_PARAMS:
-        scen["Actual"] = dict(ACTUAL_PARAMS[rule_key])
-    return scen
-
-def build_sumcc_scenarios(bundle: dict, rule_key: str, include_actual: bool) -> dict[str, dict]:
-    scen: dict[str, dict] = {}
-    rows = bundle.get("rules", {}).get(rule_key, {}).get("percentiles", [])
-    for r in rows:
-        pct = str(r.get("percentil","")).strip()
-        a = _first_float(r, "Amount_CLP", "Amount")
-        if pct and a is not None:
-            scen.setdefault(pct, {})["Amount"] = a
-    if include_actual and rule_key in ACTUAL_PARAMS:
-        scen["Actual"] = dict(ACTUAL_PARAMS[rule_key])
-    return scen
-
-def build_amount_only(bundle: dict, rule_key: str, json_field: str, include_actual: bool) -> dict[str, dict]:
-    scen: dict[str, dict] = {}
-    rows = bundle.get("rules", {}).get(rule_key, {}).get("percentiles", [])
-    for r in rows:
-        pct = str(r.get("percentil","")).strip()
-        a = _first_float(r, json_field, "Amount", "Amount_CLP", "Amount_S3")
-        if pct and a is not None:
-            scen.setdefault(pct, {})["Amount"] = a
-    if include_actual and rule_key in ACTUAL_PARAMS:
-        scen["Actual"] = dict(ACTUAL_PARAMS[rule_key])
-    return scen
-
-def build_number_only(bundle: dict, rule_key: str, *json_fields: str, include_actual: bool) -> dict[str, dict]:
-    scen: dict[str, dict] = {}
-    rows = bundle.get("rules", {}).get(rule_key, {}).get("percentiles", [])
-    for r in rows:
-        pct = str(r.get("percentil","")).strip()
-        n = _first_float(r, *json_fields, "Number", "Number_ceil", "Number_ceiled", "Number_raw")
-        if pct and n is not None:
-            scen.setdefault(pct, {})["Number"] = n
-    if include_actual and rule_key in ACTUAL_PARAMS:
-        scen["Actual"] = dict(ACTUAL_PARAMS[rule_key])
-    return scen
-
-def build_factor_only(bundle: dict, rule_key: str, include_actual: bool) -> dict[str, dict]:
-    scen: dict[str, dict] = {}
-    rows = bundle.get("rules", {}).get(rule_key, {}).get("percentiles", [])
-    for r in rows:
-        pct = str(r.get("percentil","")).strip()
-        f = _first_float(r, "Factor", "Factor_int", "Factor_rec", "Factor_raw")
-        if pct and f is not None:
-            scen.setdefault(pct, {})["Factor"] = f
-    if include_actual and rule_key in ACTUAL_PARAMS:
-        scen["Actual"] = dict(ACTUAL_PARAMS[rule_key])
-    return scen
-
-def build_p_first(bundle: dict, include_actual: bool) -> dict[str, dict]:
-    # P-1st: Amount_CLP
-    return build_amount_only(bundle, "P-1st", "Amount_CLP", include_actual)
-
-def build_p_second(bundle: dict, include_actual: bool) -> dict[str, dict]:
-    # P-2nd: Amount_CLP
-    return build_amount_only(bundle, "P-2nd", "Amount_CLP", include_actual)
-
-def build_p_hsumi(bundle: dict, include_actual: bool) -> dict[str, dict]:
-    # P-HSUMI: Amount_30d_max_per_customer_CLP
-    return build_amount_only(bundle, "P-HSUMI", "Amount_30d_max_per_customer_CLP", include_actual)
-
-def build_p_hsumo(bundle: dict, include_actual: bool) -> dict[str, dict]:
-    # P-HSUMO: Amount_30d_max_per_customer_CLP
-    return build_amount_only(bundle, "P-HSUMO", "Amount_30d_max_per_customer_CLP", include_actual)
-
-def build_p_hvi(bundle: dict, include_actual: bool) -> dict[str, dict]:
-    # P-HVI: Number_max30d
-    return build_number_only(bundle, "P-HVI", "Number_max30d", include_actual=include_actual)
-
-def build_p_hvo(bundle: dict, include_actual: bool) -> dict[str, dict]:
-    # P-HVO: Number_max30d
-    return build_number_only(bundle, "P-HVO", "Number_max30d", include_actual=include_actual)
-
-def build_p_lbal(bundle: dict, include_actual: bool) -> dict[str, dict]:
-    # P-LBAL: Balance_after_tx
-    scen: dict[str, dict] = {}
-    rows = bundle.get("rules", {}).get("P-LBAL", {}).get("percentiles", [])
-    for r in rows:
-        pct = str(r.get("percentil","")).strip()
-        b  = _first_float(r, "Balance_after_tx", "Balance")
-        if pct and b is not None:
-            scen.setdefault(pct, {})["Balance"] = b
-    if include_actual and "P-LBAL" in ACTUAL_PARAMS:
-        scen["Actual"] = dict(ACTUAL_PARAMS["P-LBAL"])
-    return scen
-
-def build_p_lval(bundle: dict, include_actual: bool) -> dict[str, dict]:
-    # P-LVAL: Factor_(int|raw)
-    return build_factor_only(bundle, "P-LVAL", include_actual)
-
-def build_p_tli(bundle: dict, include_actual: bool) -> dict[str, dict]:
-    # P-TLI: Amount_CLP
-    return build_amount_only(bundle, "P-TLI", "Amount_CLP", include_actual)
-
-def build_p_tlo(bundle: dict, include_actual: bool) -> dict[str, dict]:
-    # P-TLO: Amount_CLP
-    return build_amount_only(bundle, "P-TLO", "Amount_CLP", include_actual)
-
-def build_pgav_scenarios(bundle: dict, rule_key: str, include_actual: bool) -> dict[str, dict]:
-    scen: dict[str, dict] = {}
-
-    for r in _rows(bundle, rule_key, "amount"):
-        pct = str(r.get("percentil","")).strip()
-        val = _first_float(r, "Amount_CLP", "Amount")
-        if pct and val is not None:
-            scen.setdefault(pct, {})["Amount"] = val
-    for r in _rows(bundle, rule_key, "factor"):
-        pct = str(r.get("percentil","")).strip()
-        val = _first_float(r, "Factor", "Factor_int", "Factor_raw")
-        if pct and val is not None:
-            scen.setdefault(pct, {})["Factor"] = val
-    for r in _rows(bundle, rule_key, "number"):
-        pct = str(r.get("percentil","")).strip()
-        val = _first_float(r, "Number", "Number_ceil", "Number_ceiled", "Number_raw")
-        if pct and val is not None:
-            scen.setdefault(pct, {})["Number"] = val
-
-    if include_actual and rule_key in ACTUAL_PARAMS:
-        scen["Actual"] = dict(ACTUAL_PARAMS[rule_key])
-    return scen
-
-def build_hanum_xy_scenarios(bundle: dict, rule_key: str, include_actual: bool) -> dict[str, dict]:
-    scen: dict[str, dict] = {}
-    rows = bundle.get("rules", {}).get(rule_key, {}).get("percentiles", [])
-    for r in rows:
-        pct = str(r.get("percentil","")).strip()
-        if not pct:
-            continue
-        n = _first_float(r, "Number", "Number_ceil", "Number_ceiled", "Number_raw")
-        f = _first_float(r, "Factor", "Factor_int", "Factor_ceiled", "Factor_raw")
-        if n is not None or f is not None:
-            scen.setdefault(pct, {})
-            if n is not None: scen[pct]["Number"] = n
-            if f is not None: scen[pct]["Factor"] = f
-    if include_actual and rule_key in ACTUAL_PARAMS:
-        scen["Actual"] = dict(ACTUAL_PARAMS[rule_key])
-    return scen
-
-def build_hasum_xy_scenarios(bundle: dict, rule_key: str, include_actual: bool) -> dict[str, dict]:
-    scen: dict[str, dict] = {}
-    rows = bundle.get("rules", {}).get(rule_key, {}).get("percentiles", [])
-    for r in rows:
-        pct = str(r.get("percentil","")).strip()
-        if not pct:
-            continue
-        a = _first_float(r, "Amount_S3", "Amount")
-        f = _first_float(r, "Factor", "Factor_int", "Factor_raw")
-        if a is not None or f is not None:
-            scen.setdefault(pct, {})
-            if a is not None: scen[pct]["Amount"] = a
-            if f is not None: scen[pct]["Factor"] = f
-    if include_actual and rule_key in ACTUAL_PARAMS:
-        scen["Actual"] = dict(ACTUAL_PARAMS[rule_key])
-    return scen
-
-def build_in_gt_out_scenarios(bundle: dict, include_actual: bool) -> dict[str, dict]:
-    scen: dict[str, dict] = {}
-    rows = bundle.get("rules", {}).get("IN>%OUT", {}).get("percentiles", [])
-    for r in rows:
-        pct = str(r.get("percentil","")).strip()
-        a = _first_float(r, "Amount_IN_30d")
-        if pct and a is not None:
-            scen.setdefault(pct, {})["Amount_IN_30d"] = a
-    if include_actual and "IN>%OUT" in ACTUAL_PARAMS:
-        scen["Actual"] = dict(ACTUAL_PARAMS["IN>%OUT"])
-    return scen
-
-def build_hnr_scenarios(bundle: dict, rule_key: str, include_actual: bool) -> dict[str, dict]:
-    scen: dict[str, dict] = {}
-    rows = bundle.get("rules", {}).get(rule_key, {}).get("percentiles", [])
-    for r in rows:
-        pct = str(r.get("percentil","")).strip()
-        n = _first_float(r, "Number", "Number_ceil", "Number_ceiled", "Number_raw", "Number_max30d")
-        if pct and n is not None:
-            scen.setdefault(pct, {})["Number"] = n
-    if include_actual and rule_key in ACTUAL_PARAMS:
-        scen["Actual"] = dict(ACTUAL_PARAMS[rule_key])
-    return scen
-
-# ====== NUEVOS builders ======
-def build_in_avg_scenarios(bundle: dict, include_actual: bool) -> dict[str, dict]:
-    scen: dict[str, dict] = {}
-    rows = bundle.get("rules", {}).get("IN>AVG", {}).get("percentiles", [])
-    for r in rows:
-        pct = str(r.get("percentil","")).strip()
-        A = _first_float(r, "Amount")
-        F = _first_float(r, "Factor", "Factor_raw")
-        if not pct:
-            continue
-        if A is not None or F is not None:
-            scen.setdefault(pct, {})
-            if A is not None: scen[pct]["Amount"] = A
-            if F is not None: scen[pct]["Factor"] = F
-    if include_actual and "IN>AVG" in ACTUAL_PARAMS:
-        scen["Actual"] = dict(ACTUAL_PARAMS["IN>AVG"])
-    return scen
-
-def build_out_avg_scenarios(bundle: dict, include_actual: bool) -> dict[str, dict]:
-    scen: dict[str, dict] = {}
-    rows = bundle.get("rules", {}).get("OUT>AVG", {}).get("percentiles", [])
-    for r in rows:
-        pct = str(r.get("percentil","")).strip()
-        A = _first_float(r, "Amount")
-        F = _first_float(r, "Factor", "Factor_raw")
-        if not pct:
-            continue
-        if A is not None or F is not None:
-            scen.setdefault(pct, {})
-            if A is not None: scen[pct]["Amount"] = A
-            if F is not None: scen[pct]["Factor"] = F
-    if include_actual and "OUT>AVG" in ACTUAL_PARAMS:
-        scen["Actual"] = dict(ACTUAL_PARAMS["OUT>AVG"])
-    return scen
-
-def build_in_out_1_scenarios(bundle: dict, include_actual: bool) -> dict[str, dict]:
-    scen: dict[str, dict] = {}
-    rows = bundle.get("rules", {}).get("IN-OUT-1 Amount", {}).get("percentiles", [])
-    for r in rows:
-        pct = str(r.get("percentil","")).strip()
-        A = _first_float(r, "Amount_CLP", "Amount")
-        if pct and A is not None:
-            scen.setdefault(pct, {})["Amount"] = A
-    if include_actual and "IN-OUT-1" in ACTUAL_PARAMS:
-        scen["Actual"] = dict(ACTUAL_PARAMS["IN-OUT-1"])
-    return scen
-
-def build_out_pct_in_scenarios(bundle: dict, include_actual: bool) -> dict[str, dict]:
-    scen: dict[str, dict] = {}
-    rows = bundle.get("rules", {}).get("OUT>%IN", {}).get("percentiles", [])
-    for r in rows:
-        pct = str(r.get("percentil","")).strip()
-        A = _first_float(r, "Amount_OUT_30d")
-        if pct and A is not None:
-            scen.setdefault(pct, {})["Amount_OUT_30d"] = A
-    if include_actual and "OUT>%IN" in ACTUAL_PARAMS:
-        scen["Actual"] = dict(ACTUAL_PARAMS["OUT>%IN"])
-    return scen
-
-def build_numcci_scenarios(bundle: dict, include_actual: bool) -> dict[str, dict]:
-    scen: dict[str, dict] = {}
-    rows = bundle.get("rules", {}).get("NUMCCI", {}).get("percentiles", [])
-    for r in rows:
-        pct = str(r.get("percentil","")).strip()
-        n = _first_float(r, "Number", "Number_ceil", "Number_raw")
-        if pct and n is not None:
-            scen.setdefault(pct, {})["Number"] = n
-    if include_actual and "NUMCCI" in ACTUAL_PARAMS:
-        scen["Actual"] = dict(ACTUAL_PARAMS["NUMCCI"])
-    return scen
-
-def build_numcco_scenarios(bundle: dict, include_actual: bool) -> dict[str, dict]:
-    scen: dict[str, dict] = {}
-    rows = bundle.get("rules", {}).get("NUMCCO", {}).get("percentiles", [])
-    for r in rows:
-        pct = str(r.get("percentil","")).strip()
-        n = _first_float(r, "Number", "Number_ceil", "Number_raw")
-        if pct and n is not None:
-            scen.setdefault(pct, {})["Number"] = n
-    if include_actual and "NUMCCO" in ACTUAL_PARAMS:
-        scen["Actual"] = dict(ACTUAL_PARAMS["NUMCCO"])
-    return scen
-
-def build_ocmc_1_scenarios(bundle: dict, include_actual: bool) -> dict[str, dict]:
-    scen: dict[str, dict] = {}
-    rows = bundle.get("rules", {}).get("OCMC_1", {}).get("percentiles", [])
-    for r in rows:
-        pct = str(r.get("percentil","")).strip()
-        n = _first_float(r, "Counterparties_30d", "Ceil")
-        if pct and n is not None:
-            scen.setdefault(pct, {})["Counterparties_30d"] = n
-    if include_actual and "OCMC_1" in ACTUAL_PARAMS:
-        scen["Actual"] = dict(ACTUAL_PARAMS["OCMC_1"])
-    return scen
-
-def build_p_pctbal_scenarios(bundle: dict, include_actual: bool) -> dict[str, dict]:
-    scen: dict[str, dict] = {}
-    rows = bundle.get("rules", {}).get("P-%BAL", {}).get("percentiles", [])
-    for r in rows:
-        pct = str(r.get("percentil","")).strip()
-        b = _first_float(r, "Balance")
-        if pct and b is not None:
-            scen.setdefault(pct, {})["Balance"] = b
-    if include_actual and "P-%BAL" in ACTUAL_PARAMS:
-        scen["Actual"] = dict(ACTUAL_PARAMS["P-%BAL"])
-    return scen
-# ========================================
+# (regla, simulate_*); los escenarios de cada regla salen de scenarios.SPECS
+SIM_RULES: list[tuple[str, Callable[..., pd.DataFrame]]] = [
+    ("PGAV-IN",  simulate_pgav_in),
+    ("PGAV-OUT", simulate_pgav_out),
+    ("HANUMI",   simulate_hanumi),
+    ("HANUMO",   simulate_hanumo),
+    ("HASUMI",   simulate_hasumi),
+    ("HASUMO",   simulate_hasumo),
+    ("HNR-IN",   simulate_hnr_in),
+    ("HNR-OUT",  simulate_hnr_out),
+    ("IN>%OUT",  simulate_in_gt_out),
+    ("IN>AVG",   simulate_in_avg),
+    ("OUT>AVG",  simulate_out_avg),
+    ("IN-OUT-1", simulate_in_out_1),
+    ("OUT>%IN",  simulate_out_pct_in),
+    ("NUMCCI",   simulate_numcci),
+    ("NUMCCO",   simulate_numcco),
+    ("OCMC_1",   simulate_ocmc_1),
+    ("P-%BAL",   simulate_p_pctbal),
+    ("P-1st",    simulate_p_first),
+    ("P-2nd",    simulate_p_second),
+    ("P-HSUMI",  simulate_p_hsumi),
+    ("P-HSUMO",  simulate_p_hsumo),
+    ("P-HVI",    simulate_p_hvi),
+    ("P-HVO",    simulate_p_hvo),
+    ("P-LBAL",   simulate_p_lbal),
+    ("P-LVAL",   simulate_p_lval),
+    ("P-TLI",    simulate_p_tli),
+    ("P-TLO",    simulate_p_tlo),
+    ("RVT-IN",   simulate_rvt_in),
+    ("RVT-OUT",  simulate_rvt_out),
+    ("SUMCCI",   simulate_sumcci),
+    ("SUMCCO",   simulate_sumcco),
+]
+_SIMULATORS = dict(SIM_RULES)
+
+# Reglas más lentas: se envían primero al pool para que no queden solas al final
+HEAVY_RULES = ("OCMC_1", "IN-OUT-1", "P-HSUMI", "P-HSUMO", "HANUMI", "HANUMO", "HASUMI", "HASUMO")
+
+EXECUTORS = ("serial", "process")
+
+def build_jobs(bundle: dict, subsubs, *, tipo: str) -> list[tuple]:
+    """
+    [(tipo, regla, subsubs, escenarios)] en el orden de SIM_RULES; escenarios es la
+    ScenarioMatrix de la regla (compile_scenarios, una pasada por el bundle). tipo="actual"
+    deja solo el escenario "Actual" de cada regla; tipo="nuevo" todos los pXX del bundle.
+    Para varios segmentos basta concatenar las listas de cada uno.
+    """
+    actual = ACTUAL_PARAMS if tipo == "actual" else None
+    mats = compile_scenarios(bundle, {regla: SPECS[regla] for regla, _ in SIM_RULES}, actual=actual)
+    jobs = []
+    for regla, _ in SIM_RULES:
+        sc = mats[regla].select(["Actual"]) if tipo == "actual" else mats[regla]
+        if len(sc):
+            jobs.append((tipo, regla, subsubs, sc))
+    return jobs
+
+# SimSession del proceso worker (heredada por fork o creada en el initializer)
+_WORKER_SESSION = None
+
+def _init_worker(tx_path: str) -> None:
+    global _WORKER_SESSION
+    if _WORKER_SESSION is None:
+        _WORKER_SESSION = SimSession(tx_path)
+
+def _run_job(idx: int, job: tuple, count_from, session=None):
+    """Simula un job y devuelve (idx, DataFrame con `regla`, segundos)."""
+    _, regla, subsubs, sc = job
+    session = _WORKER_SESSION if session is None else session
+    t0 = time.perf_counter()
+    df = _SIMULATORS[regla](session, subsubs=subsubs, scenarios=sc, count_from=count_from).assign(regla=regla)
+    return idx, df, time.perf_counter() - t0
+
+def run_jobs(
+    session: SimSession,
+    jobs: list[tuple],
+    *,
+    count_from=None,
+    executor: str = "serial",
+    max_workers: Optional[int] = None,
+    cache: Optional[SimCache] = None,
+) -> list[pd.DataFrame]:
+    """
+    Un DataFrame por job, siempre en el orden de `jobs` (el resumen no depende del executor).
+    executor="process": jobs repartidos en un ProcessPoolExecutor (max_workers=None = núcleos);
+    las reglas de HEAVY_RULES se envían primero. Los workers usan la sesión ya cargada
+    (fork) o la recrean desde la caché columnar del CSV (spawn).
+    Con `cache` (sim_cache.SimCache) solo se simulan los escenarios que no estén guardados
+    para (regla, CSV, subsubs, count_from, código); si no falta ninguno el CSV no se carga.
+    """
+    if executor not in EXECUTORS:
+        raise ValueError(f"executor debe ser uno de {EXECUTORS}: {executor!r}")
+    global _WORKER_SESSION
+    count_from = COUNT_FROM if count_from is None else count_from
+    done: list = [None] * len(jobs)
+
+    # escenarios ya guardados por job y lo que queda por simular
+    keys: list = [None] * len(jobs)
+    hits: list[dict] = [{} for _ in jobs]
+    todo = list(jobs)
+    if cache is not None:
+        fp = session.fingerprint()
+        for i, (tipo, regla, subsubs, sc) in enumerate(jobs):
+            if isinstance(sc, ScenarioMatrix):
+                keys[i] = cache.key(regla, _SIMULATORS[regla], fp, subsubs, count_from)
+                hits[i], miss = cache.lookup(keys[i], sc)
+                todo[i] = (tipo, regla, subsubs, miss)
+
+    def _label(idx):
+        return "Actual" if jobs[idx][0] == "actual" else "new scenarios"
+
+    def _merged(idx, df):
+        regla, sc = jobs[idx][1], jobs[idx][3]
+        alertas = dict(hits[idx])
+        if df is not None:
+            alertas.update(zip(df["escenario"], df["alertas"]))
+        return pd.DataFrame({"escenario": sc.names, "alertas": pd.Series([alertas[n] for n in sc.names],
+                                                                         dtype="int64")}).assign(regla=regla)
+
+    def _collect(idx, df, secs):
+        if keys[idx] is not None:
+            cache.store(keys[idx], todo[idx][3], df)
+        done[idx] = _merged(idx, df) if hits[idx] else df
+        n_hit = len(hits[idx])
+        extra = f", {n_hit} escenarios desde caché" if n_hit else ""
+        print(f"Simulated {jobs[idx][1]} for {_label(idx)} ({secs:.1f}s{extra}).")
+
+    pending = []
+    for idx, job in enumerate(todo):
+        if len(job[3]):
+            pending.append(idx)
+        else:
+            done[idx] = _merged(idx, None)
+            print(f"Cached {jobs[idx][1]} for {_label(idx)} ({len(hits[idx])} escenarios).")
+
+    if executor == "serial" or not pending:
+        for idx in pending:
+            _collect(*_run_job(idx, todo[idx], count_from, session))
+        return done
+
+    heavy = {r: i for i, r in enumerate(HEAVY_RULES)}
+    order = sorted(pending, key=lambda i: (jobs[i][1] not in heavy, heavy.get(jobs[i][1], 0), i))
+    session.tx                                     # cargar antes del fork: los workers la heredan
+    _WORKER_SESSION = session
+    try:
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker,
+                                 initargs=(str(session),)) as pool:
+            futs = [pool.submit(_run_job, i, todo[i], count_from) for i in order]
+            for fut in as_completed(futs):
+                _collect(*fut.result())
+    finally:
+        _WORKER_SESSION = None
+    return done
+
 
 # ------------------------------------------------------------
 # Runner principal
 # ------------------------------------------------------------
 def main():
     OUT_DIR.mkdir(parents=True, exist_ok=True)
-    bundle = _load_bundle(PARAMS_BUNDLE)
-
-    # ===================== Simulación ACTUAL (segmento completo) =====================
-    res_actual = []
-
-    # PGAV-IN / PGAV-OUT (solo "Actual")
-    # sc_in_act  = build_pgav_scenarios(bundle, "PGAV-IN", include_actual=True)
-    # sc_out_act = build_pgav_scenarios(bundle, "PGAV-OUT", include_actual=True)
-    # df = simulate_pgav_in(str(TX_PATH), subsubs=SUBSUBS_ACTUAL, scenarios={"Actual": sc_in_act["Actual"]}, count_from=COUNT_FROM).assign(regla="PGAV-IN")
-    # res_actual.append(df)
-    # df = simulate_pgav_out(str(TX_PATH), subsubs=SUBSUBS_ACTUAL, scenarios={"Actual": sc_out_act["Actual"]}, count_from=COUNT_FROM).assign(regla="PGAV-OUT")
-    # res_actual.append(df)
-    # print("Simulated PGAV-IN and PGAV-OUT for Actual.")
-
-    # # HANUMI / HANUMO
-    # sc_hmi = build_hanum_xy_scenarios(bundle, "HANUMI", include_actual=True)
-    # if "Actual" in sc_hmi:
-    #     df = simulate_hanumi(str(TX_PATH), subsubs=SUBSUBS_ACTUAL, scenarios={"Actual": sc_hmi["Actual"]}, count_from=COUNT_FROM).assign(regla="HANUMI")
-    #     res_actual.append(df)
-    # sc_hmo = build_hanum_xy_scenarios(bundle, "HANUMO", include_actual=True)
-    # if "Actual" in sc_hmo:
-    #     df = simulate_hanumo(str(TX_PATH), subsubs=SUBSUBS_ACTUAL, scenarios={"Actual": sc_hmo["Actual"]}, count_from=COUNT_FROM).assign(regla="HANUMO")
-    #     res_actual.append(df)
-    # print("Simulated HANUMI and HANUMO for Actual.")
-
-    # # HASUMI / HASUMO
-    # sc_hsi = build_hasum_xy_scenarios(bundle, "HASUMI", include_actual=True)
-    # if "Actual" in sc_hsi:
-    #     df = simulate_hasumi(str(TX_PATH), subsubs=SUBSUBS_ACTUAL, scenarios={"Actual": sc_hsi["Actual"]}, count_from=COUNT_FROM).assign(regla="HASUMI")
-    #     res_actual.append(df)
-    # sc_hso = build_hasum_xy_scenarios(bundle, "HASUMO", include_actual=True)
-    # if "Actual" in sc_hso:
-    #     df = simulate_hasumo(str(TX_PATH), subsubs=SUBSUBS_ACTUAL, scenarios={"Actual": sc_hso["Actual"]}, count_from=COUNT_FROM).assign(regla="HASUMO")
-    #     res_actual.append(df)
-    # print("Simulated HASUMI and HASUMO for Actual.")
-
-    # # HNR-IN / HNR-OUT
-    # sc_hnri = build_hnr_scenarios(bundle, "HNR-IN", include_actual=True)
-    # if "Actual" in sc_hnri:
-    #     df = simulate_hnr_in(str(TX_PATH), subsubs=SUBSUBS_ACTUAL, scenarios={"Actual": sc_hnri["Actual"]}, count_from=COUNT_FROM).assign(regla="HNR-IN")
-    #     res_actual.append(df)
-    # sc_hnro = build_hnr_scenarios(bundle, "HNR-OUT", include_actual=True)
-    # if "Actual" in sc_hnro:
-    #     df = simulate_hnr_out(str(TX_PATH), subsubs=SUBSUBS_ACTUAL, scenarios={"Actual": sc_hnro["Actual"]}, count_from=COUNT_FROM).assign(regla="HNR-OUT")
-    #     res_actual.append(df)
-    # print("Simulated HNR-IN and HNR-OUT for Actual.")
-
-    # # IN>%OUT
-    # sc_in_gt_out = build_in_gt_out_scenarios(bundle, include_actual=True)
-    # if "Actual" in sc_in_gt_out:
-    #     df = simulate_in_gt_out(str(TX_PATH), subsubs=SUBSUBS_ACTUAL, scenarios={"Actual": sc_in_gt_out["Actual"]}, count_from=COUNT_FROM).assign(regla="IN>%OUT")
-    #     res_actual.append(df)
-    # print("Simulated IN>%OUT for Actual.")
-
-    # # IN>AVG
-    # sc = build_in_avg_scenarios(bundle, include_actual=True)
-    # if "Actual" in sc:
-    #     df = simulate_in_avg(str(TX_PATH), subsubs=SUBSUBS_ACTUAL, scenarios={"Actual": sc["Actual"]}, count_from=COUNT_FROM).assign(regla="IN>AVG")
-    #     res_actual.append(df)
-    # print("Simulated IN>AVG for Actual.")
-
-    # # OUT>AVG
-    # sc = build_out_avg_scenarios(bundle, include_actual=True)
-    # if "Actual" in sc:
-    #     df = simulate_out_avg(str(TX_PATH), subsubs=SUBSUBS_ACTUAL, scenarios={"Actual": sc["Actual"]}, count_from=COUNT_FROM).assign(regla="OUT>AVG")
-    #     res_actual.append(df)
-    # print("Simulated OUT>AVG for Actual.")
-
-    # # IN-OUT-1
-    # sc = build_in_out_1_scenarios(bundle, include_actual=True)
-    # if "Actual" in sc:
-    #     df = simulate_in_out_1(str(TX_PATH), subsubs=SUBSUBS_ACTUAL, scenarios={"Actual": sc["Actual"]}, count_from=COUNT_FROM).assign(regla="IN-OUT-1")
-    #     res_actual.append(df)
-    # print("Simulated IN-OUT-1 for Actual.")
-
-    # # OUT>%IN
-    # sc = build_out_pct_in_scenarios(bundle, include_actual=True)
-    # if "Actual" in sc:
-    #     df = simulate_out_pct_in(str(TX_PATH), subsubs=SUBSUBS_ACTUAL, scenarios={"Actual": sc["Actual"]}, count_from=COUNT_FROM).assign(regla="OUT>%IN")
-    #     res_actual.append(df)
-    # print("Simulated OUT>%IN for Actual.")
-
-    # # NUMCCI
-    # sc = build_numcci_scenarios(bundle, include_actual=True)
-    # if "Actual" in sc:
-    #     df = simulate_numcci(str(TX_PATH), subsubs=SUBSUBS_ACTUAL, scenarios={"Actual": sc["Actual"]}, count_from=COUNT_FROM).assign(regla="NUMCCI")
-    #     res_actual.append(df)
-    # print("Simulated NUMCCI for Actual.")
-
-    # # NUMCCO
-    # sc = build_numcco_scenarios(bundle, include_actual=True)
-    # if "Actual" in sc:
-    #     df = simulate_numcco(str(TX_PATH), subsubs=SUBSUBS_ACTUAL, scenarios={"Actual": sc["Actual"]}, count_from=COUNT_FROM).assign(regla="NUMCCO")
-    #     res_actual.append(df)
-    # print("Simulated NUMCCO for Actual.")
-
-    # # OCMC_1
-    # sc = build_ocmc_1_scenarios(bundle, include_actual=True)
-    # if "Actual" in sc:
-    #     df = simulate_ocmc_1(str(TX_PATH), subsubs=SUBSUBS_ACTUAL, scenarios={"Actual": sc["Actual"]}, count_from=COUNT_FROM).assign(regla="OCMC_1")
-    #     res_actual.append(df)
-    # print("Simulated OCMC_1 for Actual.")
-
-    # # P-%BAL
-    # sc = build_p_pctbal_scenarios(bundle, include_actual=True)
-    # if "Actual" in sc:
-    #     df = simulate_p_pctbal(str(TX_PATH), subsubs=SUBSUBS_ACTUAL, scenarios={"Actual": sc["Actual"]}, count_from=COUNT_FROM).assign(regla="P-%BAL")
-    #     res_actual.append(df)
-    # print("Simulated P-%BAL for Actual.")
-
-    # # P-1st
-    # sc = build_p_first(bundle, include_actual=True)
-    # if "Actual" in sc:
-    #     df = simulate_p_first(str(TX_PATH), subsubs=SUBSUBS_ACTUAL, scenarios={"Actual": sc["Actual"]}, count_from=COUNT_FROM).assign(regla="P-1st")
-    #     res_actual.append(df)
-    # print("Simulated P-1st for Actual.")
-
-    # # P-2nd
-    # sc = build_p_second(bundle, include_actual=True)
-    # if "Actual" in sc:
-    #     df = simulate_p_second(str(TX_PATH), subsubs=SUBSUBS_ACTUAL, scenarios={"Actual": sc["Actual"]}, count_from=COUNT_FROM).assign(regla="P-2nd")
-    #     res_actual.append(df)
-    # print("Simulated P-2nd for Actual.")
-
-    # # P-HSUMI
-    # sc = build_p_hsumi(bundle, include_actual=True)
-    # if "Actual" in sc:
-    #     df = simulate_p_hsumi(str(TX_PATH), subsubs=SUBSUBS_ACTUAL, scenarios={"Actual": sc["Actual"]}, count_from=COUNT_FROM).assign(regla="P-HSUMI")
-    #     res_actual.append(df)
-    # print("Simulated P-HSUMI for Actual.")
-
-    # # P-HSUMO
-    # sc = build_p_hsumo(bundle, include_actual=True)
-    # if "Actual" in sc:
-    #     df = simulate_p_hsumo(str(TX_PATH), subsubs=SUBSUBS_ACTUAL, scenarios={"Actual": sc["Actual"]}, count_from=COUNT_FROM).assign(regla="P-HSUMO")
-    #     res_actual.append(df)
-    # print("Simulated P-HSUMO for Actual.")
-
-    # # P-HVI
-    # sc = build_p_hvi(bundle, include_actual=True)
-    # if "Actual" in sc:
-    #     df = simulate_p_hvi(str(TX_PATH), subsubs=SUBSUBS_ACTUAL, scenarios={"Actual": sc["Actual"]}, count_from=COUNT_FROM).assign(regla="P-HVI")
-    #     res_actual.append(df)
-    # print("Simulated P-HVI for Actual.")
-
-    # # P-HVO
-    # sc = build_p_hvo(bundle, include_actual=True)
-    # if "Actual" in sc:
-    #     df = simulate_p_hvo(str(TX_PATH), subsubs=SUBSUBS_ACTUAL, scenarios={"Actual": sc["Actual"]}, count_from=COUNT_FROM).assign(regla="P-HVO")
-    #     res_actual.append(df)
-    # print("Simulated P-HVO for Actual.")
-
-    # # P-LBAL
-    # sc = build_p_lbal(bundle, include_actual=True)
-    # if "Actual" in sc:
-    #     df = simulate_p_lbal(str(TX_PATH), subsubs=SUBSUBS_ACTUAL, scenarios={"Actual": sc["Actual"]}, count_from=COUNT_FROM).assign(regla="P-LBAL")
-    #     res_actual.append(df)
-    # print("Simulated P-LBAL for Actual.")
-
-    # # P-LVAL
-    # sc = build_p_lval(bundle, include_actual=True)
-    # if "Actual" in sc:
-    #     df = simulate_p_lval(str(TX_PATH), subsubs=SUBSUBS_ACTUAL, scenarios={"Actual": sc["Actual"]}, count_from=COUNT_FROM).assign(regla="P-LVAL")
-    #     res_actual.append(df)
-    # print("Simulated P-LVAL for Actual.")
-
-    # # P-TLI
-    # sc = build_p_tli(bundle, include_actual=True)
-    # if "Actual" in sc:
-    #     df = simulate_p_tli(str(TX_PATH), subsubs=SUBSUBS_ACTUAL, scenarios={"Actual": sc["Actual"]}, count_from=COUNT_FROM).assign(regla="P-TLI")
-    #     res_actual.append(df)
-    # print("Simulated P-TLI for Actual.")
-
-    # # P-TLO
-    # sc = build_p_tlo(bundle, include_actual=True)
-    # if "Actual" in sc:
-    #     df = simulate_p_tlo(str(TX_PATH), subsubs=SUBSUBS_ACTUAL, scenarios={"Actual": sc["Actual"]}, count_from=COUNT_FROM).assign(regla="P-TLO")
-    #     res_actual.append(df)
-    # print("Simulated P-TLO for Actual.")
-
-    # # RVT-IN
-    # sc = build_rvt_scenarios(bundle, "RVT-IN", include_actual=True)
-    # if "Actual" in sc:
-    #     df = simulate_rvt_in(str(TX_PATH), subsubs=SUBSUBS_ACTUAL, scenarios={"Actual": sc["Actual"]}, count_from=COUNT_FROM).assign(regla="RVT-IN")
-    #     res_actual.append(df)
-    # print("Simulated RVT-IN for Actual.")
-
-    # # RVT-OUT
-    # sc = build_rvt_scenarios(bundle, "RVT-OUT", include_actual=True)
-    # if "Actual" in sc:
-    #     df = simulate_rvt_out(str(TX_PATH), subsubs=SUBSUBS_ACTUAL, scenarios={"Actual": sc["Actual"]}, count_from=COUNT_FROM).assign(regla="RVT-OUT")
-    #     res_actual.append(df)
-    # print("Simulated RVT-OUT for Actual.")
-
-    # # SUMCCI
-    # sc = build_sumcc_scenarios(bundle, "SUMCCI", include_actual=True)
-    # if "Actual" in sc:
-    #     df = simulate_sumcci(str(TX_PATH), subsubs=SUBSUBS_ACTUAL, scenarios={"Actual": sc["Actual"]}, count_from=COUNT_FROM).assign(regla="SUMCCI")
-    #     res_actual.append(df)
-    # print("Simulated SUMCCI for Actual.")
-
-    # # SUMCCO
-    # sc = build_sumcc_scenarios(bundle, "SUMCCO", include_actual=True)
-    # if "Actual" in sc:
-    #     df = simulate_sumcco(str(TX_PATH), subsubs=SUBSUBS_ACTUAL, scenarios={"Actual": sc["Actual"]}, count_from=COUNT_FROM).assign(regla="SUMCCO")
-    #     res_actual.append(df)
-    # print("Simulated SUMCCO for Actual.")
-
+    bundle = (_load_bundle(PARAMS_STORE, PARAMS_SEGMENT, PARAMS_GENERATION) if PARAMS_STORE is not None
+              else _load_bundle(PARAMS_BUNDLE))
 
-    df_actual = pd.concat(res_actual, ignore_index=True) if res_actual else pd.DataFrame(columns=["regla","escenario","alertas"])
+    # Una sola carga del CSV para todas las reglas (actual y nuevo) y los barridos; la sesión
+    # lo carga recién cuando algún job no está en la caché de resultados
+    session = SimSession(TX_PATH)
+    cache = SimCache.for_source(TX_PATH, max_mb=SIM_CACHE_MB) if SIM_CACHE else None
 
+    jobs = []
+    # ===================== Simulación ACTUAL (segmento completo) =====================
+    if SIM_ACTUAL:
+        jobs += build_jobs(bundle, SUBSUBS_ACTUAL, tipo="actual")
     # ===================== Simulación NUEVA (subsub objetivo, todos pXX) =============
-    res_new = []
-
-    # PGAV
-    sc = build_pgav_scenarios(bundle, "PGAV-IN", include_actual=False)
-    if sc:
-        df = simulate_pgav_in(str(TX_PATH), subsubs=SUBSUBS_NUEVO, scenarios=sc, count_from=COUNT_FROM).assign(regla="PGAV-IN")
-        res_new.append(df)
-    sc = build_pgav_scenarios(bundle, "PGAV-OUT", include_actual=False)
-    if sc:
-        df = simulate_pgav_out(str(TX_PATH), subsubs=SUBSUBS_NUEVO, scenarios=sc, count_from=COUNT_FROM).assign(regla="PGAV-OUT")
-        res_new.append(df)
-    print("Simulated PGAV-IN and PGAV-OUT for new scenarios.")
-
-    # HANUMI/HANUMO
-    sc = build_hanum_xy_scenarios(bundle, "HANUMI", include_actual=False)
-    if sc:
-        df = simulate_hanumi(str(TX_PATH), subsubs=SUBSUBS_NUEVO, scenarios=sc, count_from=COUNT_FROM).assign(regla="HANUMI")
-        res_new.append(df)
-    sc = build_hanum_xy_scenarios(bundle, "HANUMO", include_actual=False)
-    if sc:
-        df = simulate_hanumo(str(TX_PATH), subsubs=SUBSUBS_NUEVO, scenarios=sc, count_from=COUNT_FROM).assign(regla="HANUMO")
-        res_new.append(df)
-    print("Simulated HANUMI and HANUMO for new scenarios.")
-
-    # HASUMI/HASUMO
-    sc = build_hasum_xy_scenarios(bundle, "HASUMI", include_actual=False)
-    if sc:
-        df = simulate_hasumi(str(TX_PATH), subsubs=SUBSUBS_NUEVO, scenarios=sc, count_from=COUNT_FROM).assign(regla="HASUMI")
-        res_new.append(df)
-    sc = build_hasum_xy_scenarios(bundle, "HASUMO", include_actual=False)
-    if sc:
-        df = simulate_hasumo(str(TX_PATH), subsubs=SUBSUBS_NUEVO, scenarios=sc, count_from=COUNT_FROM).assign(regla="HASUMO")
-        res_new.append(df)
-    print("Simulated HASUMI and HASUMO for new scenarios.")
-
-    # HNR-IN/OUT
-    sc = build_hnr_scenarios(bundle, "HNR-IN", include_actual=False)
-    if sc:
-        df = simulate_hnr_in(str(TX_PATH), subsubs=SUBSUBS_NUEVO, scenarios=sc, count_from=COUNT_FROM).assign(regla="HNR-IN")
-        res_new.append(df)
-    sc = build_hnr_scenarios(bundle, "HNR-OUT", include_actual=False)
-    if sc:
-        df = simulate_hnr_out(str(TX_PATH), subsubs=SUBSUBS_NUEVO, scenarios=sc, count_from=COUNT_FROM).assign(regla="HNR-OUT")
-        res_new.append(df)
-    print("Simulated HNR-IN and HNR-OUT for new scenarios.")
-
-    # IN>%OUT (bundle)
-    sc = build_in_gt_out_scenarios(bundle, include_actual=False)
-    if sc:
-        df = simulate_in_gt_out(str(TX_PATH), subsubs=SUBSUBS_NUEVO, scenarios=sc, count_from=COUNT_FROM).assign(regla="IN>%OUT")
-        res_new.append(df)
-    print("Simulated IN>%OUT for new scenarios.")
-
-    # IN>AVG
-    sc = build_in_avg_scenarios(bundle, include_actual=False)
-    if sc:
-        df = simulate_in_avg(str(TX_PATH), subsubs=SUBSUBS_NUEVO, scenarios=sc, count_from=COUNT_FROM).assign(regla="IN>AVG")
-        res_new.append(df)
-    print("Simulated IN>AVG for new scenarios.")
-
-    # OUT>AVG
-    sc = build_out_avg_scenarios(bundle, include_actual=False)
-    if sc:
-        df = simulate_out_avg(str(TX_PATH), subsubs=SUBSUBS_NUEVO, scenarios=sc, count_from=COUNT_FROM).assign(regla="OUT>AVG")
-        res_new.append(df)
-    print("Simulated OUT>AVG for new scenarios.")
-
-    # IN-OUT-1
-    sc = build_in_out_1_scenarios(bundle, include_actual=False)
-    if sc:
-        df = simulate_in_out_1(str(TX_PATH), subsubs=SUBSUBS_NUEVO, scenarios=sc, count_from=COUNT_FROM).assign(regla="IN-OUT-1")
-        res_new.append(df)
-    print("Simulated IN-OUT-1 for new scenarios.")
-
-    # OUT>%IN
-    sc = build_out_pct_in_scenarios(bundle, include_actual=False)
-    if sc:
-        df = simulate_out_pct_in(str(TX_PATH), subsubs=SUBSUBS_NUEVO, scenarios=sc, count_from=COUNT_FROM).assign(regla="OUT>%IN")
-        res_new.append(df)
-    print("Simulated OUT>%IN for new scenarios.")
-
-    # NUMCCI
-    sc = build_numcci_scenarios(bundle, include_actual=False)
-    if sc:
-        df = simulate_numcci(str(TX_PATH), subsubs=SUBSUBS_NUEVO, scenarios=sc, count_from=COUNT_FROM).assign(regla="NUMCCI")
-        res_new.append(df)
-    print("Simulated NUMCCI for new scenarios.")
-
-    # NUMCCO
-    sc = build_numcco_scenarios(bundle, include_actual=False)
-    if sc:
-        df = simulate_numcco(str(TX_PATH), subsubs=SUBSUBS_NUEVO, scenarios=sc, count_from=COUNT_FROM).assign(regla="NUMCCO")
-        res_new.append(df)
-    print("Simulated NUMCCO for new scenarios.")
-
-    # OCMC_1
-    sc = build_ocmc_1_scenarios(bundle, include_actual=False)
-    if sc:
-        df = simulate_ocmc_1(str(TX_PATH), subsubs=SUBSUBS_NUEVO, scenarios=sc, count_from=COUNT_FROM).assign(regla="OCMC_1")
-        res_new.append(df)
-    print("Simulated OCMC_1 for new scenarios.")
-
-    # P-%BAL
-    sc = build_p_pctbal_scenarios(bundle, include_actual=False)
-    if sc:
-        df = simulate_p_pctbal(str(TX_PATH), subsubs=SUBSUBS_NUEVO, scenarios=sc, count_from=COUNT_FROM).assign(regla="P-%BAL")
-        res_new.append(df)
-    print("Simulated P-%BAL for new scenarios.")
-
-    # P-1st
-    sc = build_p_first(bundle, include_actual=False)
-    if sc:
-        df = simulate_p_first(str(TX_PATH), subsubs=SUBSUBS_NUEVO, scenarios=sc, count_from=COUNT_FROM).assign(regla="P-1st")
-        res_new.append(df)
-    print("Simulated P-1st for new scenarios.")
-
-    # P-2nd
-    sc = build_p_second(bundle, include_actual=False)
-    if sc:
-        df = simulate_p_second(str(TX_PATH), subsubs=SUBSUBS_NUEVO, scenarios=sc, count_from=COUNT_FROM).assign(regla="P-2nd")
-        res_new.append(df)
-    print("Simulated P-2nd for new scenarios.")
-
-    # P-HSUMI
-    sc = build_p_hsumi(bundle, include_actual=False)
-    if sc:
-        df = simulate_p_hsumi(str(TX_PATH), subsubs=SUBSUBS_NUEVO, scenarios=sc, count_from=COUNT_FROM).assign(regla="P-HSUMI")
-        res_new.append(df)
-    print("Simulated P-HSUMI for new scenarios.")
-
-    # P-HSUMO
-    sc = build_p_hsumo(bundle, include_actual=False)
-    if sc:
-        df = simulate_p_hsumo(str(TX_PATH), subsubs=SUBSUBS_NUEVO, scenarios=sc, count_from=COUNT_FROM).assign(regla="P-HSUMO")
-        res_new.append(df)
-    print("Simulated P-HSUMO for new scenarios.")
-
-    # P-HVI
-    sc = build_p_hvi(bundle, include_actual=False)
-    if sc:
-        df = simulate_p_hvi(str(TX_PATH), subsubs=SUBSUBS_NUEVO, scenarios=sc, count_from=COUNT_FROM).assign(regla="P-HVI")
-        res_new.append(df)
-    print("Simulated P-HVI for new scenarios.")
-
-    # P-HVO
-    sc = build_p_hvo(bundle, include_actual=False)
-    if sc:
-        df = simulate_p_hvo(str(TX_PATH), subsubs=SUBSUBS_NUEVO, scenarios=sc, count_from=COUNT_FROM).assign(regla="P-HVO")
-        res_new.append(df)
-    print("Simulated P-HVO for new scenarios.")
-
-    # P-LBAL
-    sc = build_p_lbal(bundle, include_actual=False)
-    if sc:
-        df = simulate_p_lbal(str(TX_PATH), subsubs=SUBSUBS_NUEVO, scenarios=sc, count_from=COUNT_FROM).assign(regla="P-LBAL")
-        res_new.append(df)
-    print("Simulated P-LBAL for new scenarios.")
-
-    # P-LVAL
-    sc = build_p_lval(bundle, include_actual=False)
-    if sc:
-        df = simulate_p_lval(str(TX_PATH), subsubs=SUBSUBS_NUEVO, scenarios=sc, count_from=COUNT_FROM).assign(regla="P-LVAL")
-        res_new.append(df)
-    print("Simulated P-LVAL for new scenarios.")
-
-    # P-TLI
-    sc = build_p_tli(bundle, include_actual=False)
-    if sc:
-        df = simulate_p_tli(str(TX_PATH), subsubs=SUBSUBS_NUEVO, scenarios=sc, count_from=COUNT_FROM).assign(regla="P-TLI")
-        res_new.append(df)
-    print("Simulated P-TLI for new scenarios.")
-
-    # P-TLO
-    sc = build_p_tlo(bundle, include_actual=False)
-    if sc:
-        df = simulate_p_tlo(str(TX_PATH), subsubs=SUBSUBS_NUEVO, scenarios=sc, count_from=COUNT_FROM).assign(regla="P-TLO")
-        res_new.append(df)
-    print("Simulated P-TLO for new scenarios.")
-
-    # RVT-IN
-    sc = build_rvt_scenarios(bundle, "RVT-IN", include_actual=False)
-    if sc:
-        df = simulate_rvt_in(str(TX_PATH), subsubs=SUBSUBS_NUEVO, scenarios=sc, count_from=COUNT_FROM).assign(regla="RVT-IN")
-        res_new.append(df)
-    print("Simulated RVT-IN for new scenarios.")
-
-    # RVT-OUT
-    sc = build_rvt_scenarios(bundle, "RVT-OUT", include_actual=False)
-    if sc:
-        df = simulate_rvt_out(str(TX_PATH), subsubs=SUBSUBS_NUEVO, scenarios=sc, count_from=COUNT_FROM).assign(regla="RVT-OUT")
-        res_new.append(df)
-    print("Simulated RVT-OUT for new scenarios.")
-
-    # SUMCCI
-    sc = build_sumcc_scenarios(bundle, "SUMCCI", include_actual=False)
-    if sc:
-        df = simulate_sumcci(str(TX_PATH), subsubs=SUBSUBS_NUEVO, scenarios=sc, count_from=COUNT_FROM).assign(regla="SUMCCI")
-        res_new.append(df)
-    print("Simulated SUMCCI for new scenarios.")
-
-    # SUMCCO
-    sc = build_sumcc_scenarios(bundle, "SUMCCO", include_actual=False)
-    if sc:
-        df = simulate_sumcco(str(TX_PATH), subsubs=SUBSUBS_NUEVO, scenarios=sc, count_from=COUNT_FROM).assign(regla="SUMCCO")
-        res_new.append(df)
-    print("Simulated SUMCCO for new scenarios.")
-
+    jobs += build_jobs(bundle, SUBSUBS_NUEVO, tipo="nuevo")
 
+    results = run_jobs(session, jobs, count_from=COUNT_FROM, executor=EXECUTOR, max_workers=MAX_WORKERS,
+                       cache=cache)
+    res_actual = [df for job, df in zip(jobs, results) if job[0] == "actual"]
+    res_new    = [df for job, df in zip(jobs, results) if job[0] == "nuevo"]
 
+    df_actual = pd.concat(res_actual, ignore_index=True) if res_actual else pd.DataFrame(columns=["regla","escenario","alertas"])
     df_new = pd.concat(res_new, ignore_index=True) if res_new else pd.DataFrame(columns=["regla","escenario","alertas"])
 
     # ===================== Resumen largo + compacto ===============================
@@ -902,6 +366,21 @@ def main():
     print(f"  - Resumen largo (JSON): {OUT_DIR/'alerts_summary_long.json'}")
     print(f"  - Resumen compacto:     {out_compact_path}")
 
+    # ===================== Barridos de umbrales (opcional) ==========================
+    if SWEEPS:
+        curves = []
+        for spec in SWEEPS:
+            rule, param, grid = spec[:3]
+            base = spec[3] if len(spec) > 3 else None
+            c = sweep(rule, param, grid, tx_path=session, subsubs=SUBSUBS_NUEVO,
+                      count_from=COUNT_FROM, base=base)
+            curves.append({"regla": rule, "param": param, "base": base or {},
+                           "umbral": c[param].tolist(), "alertas": c["alertas"].astype(int).tolist()})
+        out_sweep_path = OUT_DIR / f"alerts_sweep__{seg_slug}.json"
+        with open(out_sweep_path, "w", encoding="utf-8") as f:
+            json.dump(curves, f, ensure_ascii=False, indent=2)
+        print(f"  - Barridos:             {out_sweep_path}")
+
 
 
 if __name__ == "__main__":
@@ -0,0 +1,176 @@
+# scenarios.py
+"""
+Registro de escenarios por regla: de qué tabla del bundle (params_<SUBSUB>.json) sale cada
+parámetro del escenario y con qué columnas (alias en orden de preferencia). Reemplaza a los
+build_*_scenarios escritos a mano; compile_scenarios recorre el bundle una vez y arma, por
+regla, una matriz de umbrales (percentiles × parámetros):
+
+    mats = compile_scenarios(bundle, actual=ACTUAL_PARAMS)
+    m = mats["RVT-IN"]
+    m.names, m.params, m.values      # ["p85", ..., "Actual"], ["Amount", "Number"], ndarray float
+    m.to_dict()                      # {"p85": {"Amount": ..., "Number": ...}, ...}
+    RuleMetrics.run(m)               # igual que con el dict (thresholds.py)
+
+Un parámetro sin valor en un percentil queda NaN en la matriz y fuera del dict de ese
+escenario (la regla usa su default, igual que antes).
+"""
+from __future__ import annotations
+from typing import Any, Dict, Iterable, List, Mapping, NamedTuple, Optional, Tuple
+import numpy as np
+
+# alias habituales de las tablas de parametrización
+AMOUNT = ("Amount_CLP", "Amount")
+NUMBER = ("Number", "Number_ceil", "Number_ceiled", "Number_raw")
+FACTOR = ("Factor", "Factor_int", "Factor_raw")
+
+class Param(NamedTuple):
+    """Parámetro `key` del escenario: primera columna de `fields` con valor en la tabla `table`."""
+    key: str
+    fields: Tuple[str, ...]
+    table: Optional[str] = None           # subtabla ("amount", "number", ...); None = tabla única
+
+class RuleSpec(NamedTuple):
+    """Regla: parámetros y nombre de la regla en el bundle / en ACTUAL_PARAMS si difieren."""
+    rule: str
+    params: Tuple[Param, ...]
+    bundle_key: Optional[str] = None
+    actual_key: Optional[str] = None
+
+    @property
+    def source(self) -> str:
+        return self.bundle_key or self.rule
+
+def _amount_only(rule: str, field: str) -> RuleSpec:
+    return RuleSpec(rule, (Param("Amount", (field, "Amount", "Amount_CLP", "Amount_S3")),))
+
+def _pgav(rule: str) -> RuleSpec:
+    return RuleSpec(rule, (Param("Amount", AMOUNT, "amount"), Param("Factor", FACTOR, "factor"),
+                           Param("Number", NUMBER, "number")))
+
+def _rvt(rule: str) -> RuleSpec:
+    return RuleSpec(rule, (Param("Amount", AMOUNT, "amount"), Param("Number", NUMBER, "number")))
+
+def _hanum(rule: str) -> RuleSpec:
+    return RuleSpec(rule, (Param("Number", NUMBER), Param("Factor", ("Factor", "Factor_int", "Factor_ceiled", "Factor_raw"))))
+
+def _hasum(rule: str) -> RuleSpec:
+    return RuleSpec(rule, (Param("Amount", ("Amount_S3", "Amount")), Param("Factor", FACTOR)))
+
+def _avg(rule: str) -> RuleSpec:
+    return RuleSpec(rule, (Param("Amount", ("Amount",)), Param("Factor", ("Factor", "Factor_raw"))))
+
+def _p_max30d(rule: str) -> RuleSpec:
+    return RuleSpec(rule, (Param("Number", ("Number_max30d",) + NUMBER),))
+
+# Orden = orden de los resúmenes de runner_alerts
+SPECS: Dict[str, RuleSpec] = {s.rule: s for s in [
+    _pgav("PGAV-IN"),
+    _pgav("PGAV-OUT"),
+    _hanum("HANUMI"),
+    _hanum("HANUMO"),
+    _hasum("HASUMI"),
+    _hasum("HASUMO"),
+    RuleSpec("HNR-IN",  (Param("Number", NUMBER + ("Number_max30d",)),)),
+    RuleSpec("HNR-OUT", (Param("Number", NUMBER + ("Number_max30d",)),)),
+    RuleSpec("IN>%OUT", (Param("Amount_IN_30d", ("Amount_IN_30d",)),)),
+    _avg("IN>AVG"),
+    _avg("OUT>AVG"),
+    RuleSpec("IN-OUT-1", (Param("Amount", AMOUNT),), bundle_key="IN-OUT-1 Amount"),
+    RuleSpec("OUT>%IN", (Param("Amount_OUT_30d", ("Amount_OUT_30d",)),)),
+    RuleSpec("NUMCCI",  (Param("Number", ("Number", "Number_ceil", "Number_raw")),)),
+    RuleSpec("NUMCCO",  (Param("Number", ("Number", "Number_ceil", "Number_raw")),)),
+    RuleSpec("OCMC_1",  (Param("Counterparties_30d", ("Counterparties_30d", "Ceil")),)),
+    RuleSpec("P-%BAL",  (Param("Balance", ("Balance",)),)),
+    _amount_only("P-1st", "Amount_CLP"),
+    _amount_only("P-2nd", "Amount_CLP"),
+    _amount_only("P-HSUMI", "Amount_30d_max_per_customer_CLP"),
+    _amount_only("P-HSUMO", "Amount_30d_max_per_customer_CLP"),
+    _p_max30d("P-HVI"),
+    _p_max30d("P-HVO"),
+    RuleSpec("P-LBAL", (Param("Balance", ("Balance_after_tx", "Balance")),)),
+    RuleSpec("P-LVAL", (Param("Factor", ("Factor", "Factor_int", "Factor_rec", "Factor_raw")),)),
+    _amount_only("P-TLI", "Amount_CLP"),
+    _amount_only("P-TLO", "Amount_CLP"),
+    _rvt("RVT-IN"),
+    _rvt("RVT-OUT"),
+    RuleSpec("SUMCCI", (Param("Amount", AMOUNT),)),
+    RuleSpec("SUMCCO", (Param("Amount", AMOUNT),)),
+]}
+
+class ScenarioMatrix:
+    """Escenarios de una regla: values[i, j] = umbral del parámetro params[j] en names[i] (NaN = sin valor)."""
+
+    def __init__(self, rule: str, names: List[str], params: List[str], values: np.ndarray):
+        self.rule = rule
+        self.names = list(names)
+        self.params = list(params)
+        self.values = np.asarray(values, dtype=float).reshape(len(self.names), len(self.params))
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def __repr__(self) -> str:
+        return f"ScenarioMatrix({self.rule!r}, {len(self.names)} escenarios × {self.params})"
+
+    def column(self, param: str) -> np.ndarray:
+        return self.values[:, self.params.index(param)]
+
+    def rows(self) -> Iterable[Tuple[str, Dict[str, float]]]:
+        """(escenario, {parámetro: umbral}) sin los NaN, en orden."""
+        for name, v in zip(self.names, self.values):
+            yield name, {p: float(x) for p, x in zip(self.params, v) if not np.isnan(x)}
+
+    def to_dict(self) -> Dict[str, Dict[str, float]]:
+        return dict(self.rows())
+
+    def select(self, names: Iterable[str]) -> "ScenarioMatrix":
+        """Submatriz con los escenarios pedidos que existan (en el orden de la matriz)."""
+        keep = set(names)
+        idx = [i for i, n in enumerate(self.names) if n in keep]
+        return ScenarioMatrix(self.rule, [self.names[i] for i in idx], self.params, self.values[idx])
+
+def _first_float(row: Mapping[str, Any], keys: Iterable[str]) -> Optional[float]:
+    for k in keys:
+        if k in row and row[k] is not None:
+            try:
+                return float(row[k])
+            except (TypeError, ValueError):
+                pass
+    return None
+
+def _table_rows(bundle: dict, rule_key: str, table: Optional[str]) -> list:
+    node = bundle.get("rules", {}).get(rule_key, {})
+    if table is not None:
+        node = node.get(table, {})
+    return node.get("percentiles", []) or []
+
+def compile_rule(bundle: dict, spec: RuleSpec, *, actual: Optional[Mapping[str, Mapping[str, Any]]] = None
+                 ) -> ScenarioMatrix:
+    """Matriz de escenarios de una regla (un escenario por percentil + "Actual" si `actual` lo trae)."""
+    params = list(dict.fromkeys(p.key for p in spec.params))
+    cells: Dict[str, Dict[str, float]] = {}
+    tables: Dict[Optional[str], list] = {}
+    for p in spec.params:
+        if p.table not in tables:
+            tables[p.table] = _table_rows(bundle, spec.source, p.table)
+        for r in tables[p.table]:
+            pct = str(r.get("percentil", "")).strip()
+            v = _first_float(r, p.fields)
+            if pct and v is not None:
+                cells.setdefault(pct, {})[p.key] = v
+    act = (actual or {}).get(spec.actual_key or spec.rule)
+    if act is not None:
+        cells["Actual"] = {k: float(v) for k, v in act.items()}
+        params += [k for k in act if k not in params]
+    values = np.full((len(cells), len(params)), np.nan)
+    col = {p: j for j, p in enumerate(params)}
+    for i, c in enumerate(cells.values()):
+        for k, v in c.items():
+            values[i, col[k]] = v
+    return ScenarioMatrix(spec.rule, list(cells), params, values)
+
+def compile_scenarios(bundle: dict, specs: Optional[Mapping[str, RuleSpec]] = None, *,
+                      actual: Optional[Mapping[str, Mapping[str, Any]]] = None) -> Dict[str, ScenarioMatrix]:
+    """{regla: ScenarioMatrix} para todas las reglas de `specs` (por defecto SPECS), en su orden."""
+    specs = SPECS if specs is None else specs
+    return {rule: compile_rule(bundle, spec, actual=actual) for rule, spec in specs.items()}
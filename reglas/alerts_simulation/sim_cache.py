@@ -0,0 +1,150 @@
+# sim_cache.py
+"""
+Caché en disco de resultados de simulate_*: alertas por escenario, direccionadas por contenido.
+
+    cache = SimCache.for_source(TX_PATH)
+    key = cache.key("RVT-IN", simulate_rvt_in, session.fingerprint(), ["R-High"], COUNT_FROM)
+    hits, missing = cache.lookup(key, matrix)    # {escenario: alertas}, ScenarioMatrix por simular
+    cache.store(key, missing, df)                # df = simulate_*(..., scenarios=missing)
+
+La clave de un archivo es (regla, hash del CSV, esquema, sub-subsegmentos, count_from, versión
+del código) y dentro de él cada escenario se guarda por sus umbrales (no por su nombre): cambiar
+los parámetros de una regla solo simula los escenarios nuevos de esa regla. La versión del código
+es el hash del módulo *_sim.py de la regla más los módulos compartidos (ENGINE_FILES), así que
+editar una regla (o sus FIXED_*) invalida solo esa regla.
+
+Archivos en <dir del CSV>/.tx_cache/sim_results/*.json. Al leer se actualiza su mtime y al
+escribir se borran los menos usados hasta quedar bajo max_mb (LRU).
+"""
+from __future__ import annotations
+import hashlib, json, os, sys
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple, Union
+import pandas as pd
+
+from tx_cache import CACHE_DIRNAME, file_hash, _write_atomic
+from tx_frame import schema_tag
+from scenarios import ScenarioMatrix
+
+RESULTS_DIRNAME = "sim_results"
+SIM_CACHE_MAX_MB = 64
+
+_HERE = Path(__file__).resolve().parent
+_PARAM_RULES = _HERE.parent / "param_rules"
+# módulos que cambian el resultado de cualquier regla (además del *_sim.py de cada una)
+ENGINE_FILES = [_HERE / "thresholds.py", _HERE / "utils.py"] + [
+    _PARAM_RULES / f for f in ("tx_frame.py", "tx_cache.py", "windows.py", "kernels.py",
+                               "layout.py", "metric_store.py")]
+
+_CODE: Dict[str, str] = {}
+
+def _code_hash(files: Iterable[Path]) -> str:
+    files = [str(p) for p in files]
+    key = "|".join(files)
+    if key not in _CODE:
+        h = hashlib.blake2b(digest_size=12)
+        for p in files:
+            h.update(p.rsplit(os.sep, 1)[-1].encode("utf-8"))
+            h.update(file_hash(p).encode("ascii") if os.path.exists(p) else b"-")
+        _CODE[key] = h.hexdigest()
+    return _CODE[key]
+
+def code_version(fn: Callable[..., Any]) -> str:
+    """Hash del módulo de `fn` + ENGINE_FILES."""
+    mod = sys.modules.get(getattr(fn, "__module__", ""), None)
+    own = [Path(mod.__file__)] if mod is not None and getattr(mod, "__file__", None) else []
+    return _code_hash(own + ENGINE_FILES)
+
+def scenario_key(pars: Dict[str, float]) -> str:
+    """Umbrales canónicos de un escenario (orden de parámetros y tipo int/float no importan)."""
+    return json.dumps({k: float(pars[k]) for k in sorted(pars)}, sort_keys=True)
+
+def _subs_key(subsubs) -> Optional[list]:
+    if subsubs is None:
+        return None
+    return sorted({subsubs} if isinstance(subsubs, str) else set(map(str, subsubs)))
+
+class SimCache:
+    """Resultados por escenario en <root>/<regla>__<digest>.json, con LRU por tamaño total."""
+
+    def __init__(self, root: Union[str, Path], *, max_mb: float = SIM_CACHE_MAX_MB):
+        self.root = Path(root)
+        self.max_bytes = int(max_mb * 1024 * 1024)
+
+    @classmethod
+    def for_source(cls, tx_path: Union[str, Path], **kw: Any) -> "SimCache":
+        return cls(Path(tx_path).parent / CACHE_DIRNAME / RESULTS_DIRNAME, **kw)
+
+    def key(self, rule: str, fn: Callable[..., Any], fingerprint: Optional[Dict[str, Any]],
+            subsubs, count_from) -> Optional[str]:
+        """Nombre de archivo de (regla, datos, sub-subsegmentos, count_from, código); None sin fingerprint."""
+        if not fingerprint or not fingerprint.get("hash"):
+            return None
+        body = {"rule": rule, "code": code_version(fn), "source": fingerprint["hash"], "schema": schema_tag(),
+                "subsubs": _subs_key(subsubs),
+                "count_from": None if count_from is None else pd.Timestamp(count_from).isoformat()}
+        digest = hashlib.blake2b(json.dumps(body, sort_keys=True, default=str).encode("utf-8"),
+                                 digest_size=12).hexdigest()
+        slug = "".join(c if c.isalnum() or c in "-_" else "_" for c in rule)
+        return f"{slug}__{digest}.json"
+
+    def _read(self, key: str) -> Dict[str, int]:
+        p = self.root / key
+        try:
+            with open(p, "r", encoding="utf-8") as f:
+                out = json.load(f).get("results", {})
+            os.utime(p)                                    # LRU: último uso
+            return out
+        except (OSError, ValueError, AttributeError):
+            return {}
+
+    def lookup(self, key: Optional[str], scenarios: ScenarioMatrix) -> Tuple[Dict[str, int], ScenarioMatrix]:
+        """({escenario: alertas} ya guardados, submatriz de escenarios que faltan)."""
+        if key is None:
+            return {}, scenarios
+        stored = self._read(key)
+        hits = {}
+        for name, pars in scenarios.rows():
+            k = scenario_key(pars)
+            if k in stored:
+                hits[name] = int(stored[k])
+        return hits, scenarios.select([n for n in scenarios.names if n not in hits])
+
+    def store(self, key: Optional[str], scenarios: ScenarioMatrix, df: pd.DataFrame) -> None:
+        """Agrega al archivo de `key` las alertas de `df` (salida de simulate_* sobre `scenarios`)."""
+        if key is None or not len(scenarios):
+            return
+        alertas = dict(zip(df["escenario"], df["alertas"]))
+        new = {scenario_key(pars): int(alertas[name]) for name, pars in scenarios.rows() if name in alertas}
+        self.root.mkdir(parents=True, exist_ok=True)
+        results = dict(self._read(key), **new)
+        def _dump(p: str) -> None:
+            with open(p, "w", encoding="utf-8") as f:
+                json.dump({"results": results}, f, sort_keys=True)
+        _write_atomic(self.root / key, _dump)
+        self.evict(keep=key)
+
+    def evict(self, keep: Optional[str] = None) -> None:
+        """Borra los archivos menos usados hasta quedar bajo max_bytes (nunca `keep`)."""
+        files = []
+        for p in self.root.glob("*.json"):
+            try:
+                st = p.stat()
+            except OSError:
+                continue
+            files.append((st.st_mtime_ns, st.st_size, p))
+        total = sum(size for _, size, _ in files)
+        for _, size, p in sorted(files):
+            if total <= self.max_bytes:
+                break
+            if p.name == keep:
+                continue
+            try:
+                p.unlink()
+                total -= size
+            except OSError:
+                pass
+
+    def clear(self) -> None:
+        for p in self.root.glob("*.json"):
+            p.unlink()
@@ -0,0 +1,167 @@
+"""
+Curvas umbral → alertas sobre las métricas precalculadas de cada regla.
+
+    curva = sweep("RVT-IN", "Amount", np.linspace(0, 2e8, 400),
+                  tx_path=TX_PATH, subsubs=["R-High"], base={"Number": 6})
+    sup   = sweep_2d("PGAV-IN", "Amount", amounts, "Factor", factors, tx_path=TX_PATH, subsubs=["R-High"])
+
+Las métricas de (regla, versión del CSV, subsubs, count_from) se calculan una vez y se reutilizan en
+todas las curvas/superficies de la sesión; se guardan las últimas SWEEP_CACHE_SIZE (LRU) y las de
+versiones anteriores del mismo CSV se sueltan. tx_path puede ser la ruta o una utils.SimSession.
+Cada punto es el conteo de simulate_* para el escenario `base` con ese umbral: los parámetros que
+`base` no trae toman los fijos del archivo de la regla (o su default, igual que un escenario sin
+ese parámetro), y un parámetro fijo en el archivo da una curva plana.
+"""
+from __future__ import annotations
+from collections import OrderedDict
+from typing import Dict, Any, Callable, Iterable, Optional, Tuple
+import numpy as np
+import pandas as pd
+
+from thresholds import RuleMetrics
+from utils import SimSession
+from tx_cache import source_fingerprint
+from pgav_in_sim import prepare_pgav_in
+from pgav_out_sim import prepare_pgav_out
+from hanumi_sim import prepare_hanumi
+from hanumo_sim import prepare_hanumo
+from hasumi_sim import prepare_hasumi
+from hasumo_sim import prepare_hasumo
+from hnr_in_sim import prepare_hnr_in
+from hnr_out_sim import prepare_hnr_out
+from in_gt_out_sim import prepare_in_gt_out
+from in_avg_sim import prepare_in_avg
+from in_out_1_sim import prepare_in_out_1
+from out_avg_sim import prepare_out_avg
+from out_pct_in_sim import prepare_out_pct_in
+from numcci_sim import prepare_numcci
+from numcco_sim import prepare_numcco
+from ocmc_1_sim import prepare_ocmc_1
+from p_pctbal_sim import prepare_p_pctbal
+from p_first_sim import prepare_p_first
+from p_second_sim import prepare_p_second
+from p_hsumi_sim import prepare_p_hsumi
+from p_hsumo_sim import prepare_p_hsumo
+from p_hvi_sim import prepare_p_hvi
+from p_hvo_sim import prepare_p_hvo
+from p_lbal_sim import prepare_p_lbal
+from p_lval_sim import prepare_p_lval
+from p_tli_sim import prepare_p_tli
+from p_tlo_sim import prepare_p_tlo
+from rvt_in_sim import prepare_rvt_in
+from rvt_out_sim import prepare_rvt_out
+from sumcci_sim import prepare_sumcci
+from sumcco_sim import prepare_sumcco
+
+COUNT_FROM_DEFAULT = pd.Timestamp("2025-02-21", tz="UTC")   # como runner_alerts.COUNT_FROM
+# RuleMetrics guardadas en memoria (cada una trae los arreglos por alerta de su regla)
+SWEEP_CACHE_SIZE = 8
+
+PREPARERS: Dict[str, Callable[..., RuleMetrics]] = {
+    "PGAV-IN":  prepare_pgav_in,
+    "PGAV-OUT": prepare_pgav_out,
+    "HANUMI":   prepare_hanumi,
+    "HANUMO":   prepare_hanumo,
+    "HASUMI":   prepare_hasumi,
+    "HASUMO":   prepare_hasumo,
+    "HNR-IN":   prepare_hnr_in,
+    "HNR-OUT":  prepare_hnr_out,
+    "IN>%OUT":  prepare_in_gt_out,
+    "IN>AVG":   prepare_in_avg,
+    "IN-OUT-1": prepare_in_out_1,
+    "OUT>AVG":  prepare_out_avg,
+    "OUT>%IN":  prepare_out_pct_in,
+    "NUMCCI":   prepare_numcci,
+    "NUMCCO":   prepare_numcco,
+    "OCMC_1":   prepare_ocmc_1,
+    "P-%BAL":   prepare_p_pctbal,
+    "P-1st":    prepare_p_first,
+    "P-2nd":    prepare_p_second,
+    "P-HSUMI":  prepare_p_hsumi,
+    "P-HSUMO":  prepare_p_hsumo,
+    "P-HVI":    prepare_p_hvi,
+    "P-HVO":    prepare_p_hvo,
+    "P-LBAL":   prepare_p_lbal,
+    "P-LVAL":   prepare_p_lval,
+    "P-TLI":    prepare_p_tli,
+    "P-TLO":    prepare_p_tlo,
+    "RVT-IN":   prepare_rvt_in,
+    "RVT-OUT":  prepare_rvt_out,
+    "SUMCCI":   prepare_sumcci,
+    "SUMCCO":   prepare_sumcco,
+}
+
+_METRICS: "OrderedDict[Tuple, RuleMetrics]" = OrderedDict()
+
+def _key(rule: str, tx_path, subsubs, count_from) -> Tuple:
+    """(regla, CSV, hash del CSV, subsubs, count_from): un CSV modificado no reutiliza métricas viejas."""
+    subs = (subsubs,) if isinstance(subsubs, str) else tuple(map(str, subsubs))
+    fp = tx_path.fingerprint() if isinstance(tx_path, SimSession) else source_fingerprint(tx_path)
+    return (rule, str(tx_path), (fp or {}).get("hash"), subs, str(count_from))
+
+def rule_metrics(
+    rule: str,
+    tx_path: str,
+    *,
+    subsubs: Iterable[str] | str,
+    count_from: str = COUNT_FROM_DEFAULT,
+    refresh: bool = False,
+) -> RuleMetrics:
+    """Métricas de la regla (cacheadas en memoria por regla/versión del CSV/subsubs/count_from, LRU)."""
+    if rule not in PREPARERS:
+        raise KeyError(f"Regla sin barrido disponible: {rule}. Opciones: {sorted(PREPARERS)}")
+    k = _key(rule, tx_path, subsubs, count_from)
+    if refresh or k not in _METRICS:
+        for old in [o for o in _METRICS if o[1] == k[1] and o[2] != k[2]]:   # versiones previas del CSV
+            del _METRICS[old]
+        _METRICS[k] = PREPARERS[rule](tx_path, subsubs=subsubs, count_from=count_from)
+        while len(_METRICS) > SWEEP_CACHE_SIZE:
+            _METRICS.popitem(last=False)
+    _METRICS.move_to_end(k)
+    return _METRICS[k]
+
+def clear_cache() -> None:
+    _METRICS.clear()
+
+def _resolve(rule, metrics, tx_path, subsubs, count_from) -> RuleMetrics:
+    if metrics is not None:
+        return metrics
+    if tx_path is None or subsubs is None:
+        raise ValueError("sweep necesita metrics=... o bien tx_path y subsubs.")
+    return rule_metrics(rule, tx_path, subsubs=subsubs, count_from=count_from)
+
+def sweep(
+    rule: str,
+    param: str,
+    grid: Iterable[float],
+    *,
+    tx_path: Optional[str] = None,
+    subsubs: Iterable[str] | str | None = None,
+    count_from: str = COUNT_FROM_DEFAULT,
+    base: Optional[Dict[str, Any]] = None,
+    metrics: Optional[RuleMetrics] = None,
+) -> pd.DataFrame:
+    """Curva de alertas: DataFrame [param, alertas] con una fila por umbral de `grid`."""
+    rm = _resolve(rule, metrics, tx_path, subsubs, count_from)
+    g = np.asarray(list(grid), dtype=float)
+    return pd.DataFrame({param: g, "alertas": rm.curve(param, g, base=base)})
+
+def sweep_2d(
+    rule: str,
+    param_x: str,
+    grid_x: Iterable[float],
+    param_y: str,
+    grid_y: Iterable[float],
+    *,
+    tx_path: Optional[str] = None,
+    subsubs: Iterable[str] | str | None = None,
+    count_from: str = COUNT_FROM_DEFAULT,
+    base: Optional[Dict[str, Any]] = None,
+    metrics: Optional[RuleMetrics] = None,
+) -> pd.DataFrame:
+    """Superficie de alertas: índice = umbrales de param_x, columnas = umbrales de param_y."""
+    rm = _resolve(rule, metrics, tx_path, subsubs, count_from)
+    gx = np.asarray(list(grid_x), dtype=float)
+    gy = np.asarray(list(grid_y), dtype=float)
+    return pd.DataFrame(rm.surface(param_x, gx, param_y, gy, base=base),
+                        index=pd.Index(gx, name=param_x), columns=pd.Index(gy, name=param_y))
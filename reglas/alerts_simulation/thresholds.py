@@ -0,0 +1,295 @@
+from __future__ import annotations
+from typing import Dict, Any, Callable, Iterable, Optional, Tuple
+import numpy as np
+import pandas as pd
+
+# Comparaciones soportadas en los escenarios: (operador, umbral)
+_OPS = {
+    ">":  np.greater,
+    ">=": np.greater_equal,
+    "<":  np.less,
+    "<=": np.less_equal,
+}
+
+# umbrales de prueba (no enteros) para ver si un parámetro llega tal cual a su columna
+_PROBES = (1.25, 2.5)
+
+class ThresholdIndex:
+    """
+    Métricas de una regla ordenadas UNA vez por la primera columna (clave primaria).
+    Cada escenario se responde con searchsorted sobre la clave primaria y, si hay más
+    condiciones, comparando solo el tramo que sobrevive (nunca el frame completo).
+
+        ix = ThresholdIndex(M, ["N30", "S30"], mask=countable)
+        ix.count(N30=(">", 5), S30=(">", 1e6))
+        ix.curve("N30", ">", np.arange(0, 200))        # cientos de umbrales, un solo sort
+
+    Filas fuera de `mask` se descartan al construir. Los NaN de la clave primaria quedan
+    al final del orden y nunca cumplen una condición sobre ella (igual que una máscara).
+    Un umbral NaN en cualquier condición da 0 alertas (como `col > NaN`).
+    """
+
+    def __init__(self, df: pd.DataFrame, cols: Iterable[str], *, mask=None):
+        cols = list(cols)
+        if not cols:
+            raise ValueError("ThresholdIndex necesita al menos una columna.")
+        miss = [c for c in cols if c not in df.columns]
+        if miss:
+            raise KeyError(f"Faltan columnas para ThresholdIndex: {miss}")
+        keep = np.ones(len(df), dtype=bool) if mask is None else np.asarray(pd.Series(mask).fillna(False), dtype=bool)
+        primary = np.asarray(df[cols[0]], dtype=float)[keep]
+        order = np.argsort(primary, kind="stable")       # NaN al final
+        self.primary = cols[0]
+        self.cols: Dict[str, np.ndarray] = {c: np.asarray(df[c], dtype=float)[keep][order] for c in cols}
+        self.n = int(order.size)
+        self.n_valid = int(np.count_nonzero(~np.isnan(self.cols[self.primary])))
+
+    def __len__(self) -> int:
+        return self.n
+
+    # ---------------- tramo por la clave primaria ----------------
+
+    def _bounds(self, op: str, t: float) -> Tuple[int, int]:
+        v = self.cols[self.primary][:self.n_valid]
+        if op == ">":
+            return int(np.searchsorted(v, t, side="right")), self.n_valid
+        if op == ">=":
+            return int(np.searchsorted(v, t, side="left")), self.n_valid
+        if op == "<":
+            return 0, int(np.searchsorted(v, t, side="left"))
+        if op == "<=":
+            return 0, int(np.searchsorted(v, t, side="right"))
+        raise ValueError(f"Operador no soportado: {op!r}")
+
+    def _slice(self, conds: Dict[str, Tuple[str, float]]) -> Optional[slice]:
+        """Tramo que cumple la condición primaria (None si algún umbral es NaN)."""
+        for c, (op, t) in conds.items():
+            if c not in self.cols:
+                raise KeyError(f"Columna no indexada: {c}")
+            if op not in _OPS:
+                raise ValueError(f"Operador no soportado: {op!r}")
+            if t is None or pd.isna(t):
+                return None
+        if self.primary in conds:
+            lo, hi = self._bounds(*conds[self.primary])
+            return slice(lo, max(lo, hi))
+        return slice(0, self.n)
+
+    def _rest(self, sl: slice, conds: Dict[str, Tuple[str, float]]) -> Optional[np.ndarray]:
+        m = None
+        for c, (op, t) in conds.items():
+            if c == self.primary:
+                continue
+            hit = _OPS[op](self.cols[c][sl], float(t))
+            m = hit if m is None else (m & hit)
+        return m
+
+    # ---------------- consultas ----------------
+
+    def count(self, **conds: Tuple[str, float]) -> int:
+        """Nº de filas que cumplen todas las condiciones col=(op, umbral)."""
+        sl = self._slice(conds)
+        if sl is None:
+            return 0
+        m = self._rest(sl, conds)
+        return int(sl.stop - sl.start) if m is None else int(np.count_nonzero(m))
+
+    def select(self, **conds: Tuple[str, float]) -> Dict[str, np.ndarray]:
+        """Columnas indexadas de las filas que cumplen (para condiciones que no son umbrales)."""
+        sl = self._slice(conds)
+        if sl is None:
+            return {c: v[:0] for c, v in self.cols.items()}
+        m = self._rest(sl, conds)
+        return {c: (v[sl] if m is None else v[sl][m]) for c, v in self.cols.items()}
+
+    def curve(self, col: str, op: str, thresholds, **fixed: Tuple[str, float]) -> np.ndarray:
+        """
+        Conteos para muchos umbrales de `col` en una pasada: se filtra por `fixed`, se ordena
+        `col` de las filas restantes y cada umbral es un searchsorted.
+        """
+        if op not in _OPS:
+            raise ValueError(f"Operador no soportado: {op!r}")
+        t = np.asarray(thresholds, dtype=float)
+        if col in fixed:
+            raise ValueError(f"{col} no puede estar fijo y barrido a la vez.")
+        v = self.select(**fixed)[col] if fixed else self.cols[col]
+        v = np.sort(v[~np.isnan(v)])
+        if op in (">", ">="):
+            out = v.size - np.searchsorted(v, t, side="right" if op == ">" else "left")
+        else:
+            out = np.searchsorted(v, t, side="left" if op == "<" else "right")
+        out = out.astype(np.int64)
+        out[np.isnan(t)] = 0
+        return out
+
+    def surface(self, col_x: str, op_x: str, grid_x, col_y: str, op_y: str, grid_y,
+                **fixed: Tuple[str, float]) -> np.ndarray:
+        """Matriz [len(grid_x), len(grid_y)] de conteos: una curva de col_y por cada umbral de col_x."""
+        gx = np.asarray(grid_x, dtype=float)
+        out = np.zeros((gx.size, len(grid_y)), dtype=np.int64)
+        for i, tx in enumerate(gx):
+            out[i] = self.curve(col_y, op_y, grid_y, **dict(fixed, **{col_x: (op_x, tx)}))
+        return out
+
+
+class CrossingIndex:
+    """
+    Gatillos por cruce de umbral: la fila i cuenta para A si before_i <= A < after_i
+    (la transacción que hace pasar el acumulado de <= A a > A). Con before <= after,
+
+        #{before <= A < after} = #{before <= A} - #{after <= A}
+
+    así que bastan los dos extremos ordenados UNA vez y dos searchsorted por umbral:
+    O((n + k) log n) para k umbrales. Misma interfaz que ThresholdIndex con op "cross":
+
+        cx = CrossingIndex(S30_before, S30_after, col="S30", mask=countable)
+        cx.count(S30=("cross", 5e6));  cx.curve("S30", "cross", np.linspace(0, 1e9, 2000))
+    """
+
+    def __init__(self, before, after, *, col: str, mask=None):
+        b = np.asarray(before, dtype=float); a = np.asarray(after, dtype=float)
+        if b.shape != a.shape:
+            raise ValueError("CrossingIndex: before y after deben tener el mismo largo.")
+        keep = ~(np.isnan(b) | np.isnan(a))
+        if mask is not None:
+            keep &= np.asarray(pd.Series(mask).fillna(False), dtype=bool)
+        if np.any(b[keep] > a[keep]):
+            raise ValueError("CrossingIndex: before debe ser <= after en todas las filas.")
+        self.primary = col
+        self.before = np.sort(b[keep])
+        self.after = np.sort(a[keep])
+        self.n = int(self.before.size)
+
+    def __len__(self) -> int:
+        return self.n
+
+    def _check(self, col: str, op: str) -> None:
+        if col != self.primary:
+            raise KeyError(f"Columna no indexada: {col}")
+        if op != "cross":
+            raise ValueError(f"Operador no soportado: {op!r}")
+
+    def curve(self, col: str, op: str, thresholds, **fixed: Tuple[str, float]) -> np.ndarray:
+        self._check(col, op)
+        if fixed:
+            raise ValueError("CrossingIndex no admite condiciones adicionales.")
+        t = np.asarray(thresholds, dtype=float)
+        out = (np.searchsorted(self.before, t, side="right")
+               - np.searchsorted(self.after, t, side="right")).astype(np.int64)
+        out[np.isnan(t)] = 0
+        return out
+
+    def count(self, **conds: Tuple[str, float]) -> int:
+        (col, (op, t)), = conds.items()
+        return int(self.curve(col, op, [t])[0])
+
+
+class RuleMetrics:
+    """
+    Métricas precalculadas de una regla (lo que hoy arma cada simulate_* antes del loop de
+    escenarios) + cómo traducir un escenario a condiciones:
+
+      params : {"Number": ("CNT30", ">"), ...}  parámetro del escenario -> (columna, operador)
+      conds  : pars -> {col: (op, umbral)}      semántica exacta de simulate_* (defaults, fijos)
+      count  : pars -> int                      opcional, para condiciones que no son umbrales
+      defaults : valores de la regla para parámetros que el barrido no recibe (fijos del archivo)
+
+    run() reproduce simulate_*; curve()/surface() barren umbrales sobre las mismas métricas y
+    cada punto es lo que daría run() con ese escenario (base + defaults + umbral barrido).
+    """
+
+    def __init__(
+        self,
+        ix: Optional[ThresholdIndex | CrossingIndex],
+        params: Dict[str, Tuple[str, str]],
+        conds: Optional[Callable[[Dict[str, Any]], Dict[str, Tuple[str, float]]]] = None,
+        *,
+        count: Optional[Callable[[Dict[str, Any]], int]] = None,
+        defaults: Optional[Dict[str, Any]] = None,
+    ):
+        self.ix = ix
+        self.params = dict(params)
+        self._conds = conds
+        self._count = count
+        self.defaults = dict(defaults or {})
+
+    @classmethod
+    def empty(cls) -> "RuleMetrics":
+        """Sin filas elegibles: todo escenario/umbral da 0 alertas."""
+        return cls(None, {})
+
+    def count(self, pars: Dict[str, Any]) -> int:
+        if self.ix is None:
+            return 0
+        if self._count is not None:
+            return int(self._count(pars))
+        return self.ix.count(**self._conds(pars))
+
+    def run(self, scenarios) -> pd.DataFrame:
+        """
+        Alertas por escenario. `scenarios` es {nombre: {parámetro: umbral}} o una matriz de
+        escenarios (scenarios.ScenarioMatrix: names, params, values; NaN = parámetro ausente).
+        """
+        if not isinstance(scenarios, dict):
+            return self.run_matrix(scenarios.names, scenarios.params, scenarios.values)
+        return pd.DataFrame([{"escenario": k, "alertas": self.count(v)} for k, v in scenarios.items()])
+
+    def run_matrix(self, names: Iterable[str], params: Iterable[str], values) -> pd.DataFrame:
+        """Como run() para una matriz [escenarios, parámetros] de umbrales (NaN = ausente)."""
+        names, params = list(names), list(params)
+        values = np.asarray(values, dtype=float).reshape(len(names), len(params))
+        present = ~np.isnan(values)
+        counts = [self.count({p: float(x) for p, x, ok in zip(params, row, hit) if ok})
+                  for row, hit in zip(values, present)]
+        return pd.DataFrame({"escenario": names, "alertas": pd.Series(counts, dtype=np.int64)})
+
+    def _swept_conds(self, base: Optional[Dict[str, Any]], *swept: str) -> Optional[Dict[str, Tuple[str, float]]]:
+        """
+        Condiciones de count() para `base` sin las columnas barridas, o None si algún parámetro
+        barrido no llega tal cual a su columna (fijo en el archivo de la regla, redondeado,
+        condición que no es umbral...): ahí se cuenta punto por punto.
+        """
+        if self._count is not None or self._conds is None or any(p not in self.params for p in swept):
+            return None
+        cols = {self.params[p][0] for p in swept}
+        pars = dict(self.defaults, **(base or {}))
+        rest = None
+        for v in _PROBES:
+            c = self._conds(dict(pars, **{p: v for p in swept}))
+            for p in swept:
+                col, op = self.params[p]
+                if col not in c or c[col][0] != op or float(c[col][1]) != v:
+                    return None
+            other = {k: (o, float(t)) for k, (o, t) in c.items() if k not in cols}
+            if rest is not None and other != rest:
+                return None
+            rest = other
+        return rest
+
+    def curve(self, param: str, grid, base: Optional[Dict[str, Any]] = None) -> np.ndarray:
+        """Alertas por umbral de `param`: cada punto es count() de `base` con ese umbral."""
+        grid = np.asarray(grid, dtype=float)
+        if self.ix is None:
+            return np.zeros(grid.size, dtype=np.int64)
+        fixed = self._swept_conds(base, param)
+        if fixed is not None:
+            col, op = self.params[param]
+            return self.ix.curve(col, op, grid, **fixed)
+        base = dict(self.defaults, **(base or {}))
+        return np.array([self.count(dict(base, **{param: v})) for v in grid], dtype=np.int64)
+
+    def surface(self, param_x: str, grid_x, param_y: str, grid_y,
+                base: Optional[Dict[str, Any]] = None) -> np.ndarray:
+        """Matriz de alertas [len(grid_x), len(grid_y)] para dos parámetros a la vez."""
+        gx = np.asarray(grid_x, dtype=float); gy = np.asarray(grid_y, dtype=float)
+        if self.ix is None:
+            return np.zeros((gx.size, gy.size), dtype=np.int64)
+        if param_x in self.params and param_y in self.params and self.params[param_x][0] == self.params[param_y][0]:
+            raise ValueError(f"{param_x} y {param_y} filtran la misma columna ({self.params[param_x][0]}).")
+        fixed = self._swept_conds(base, param_x, param_y)
+        if fixed is not None:
+            (cx, ox), (cy, oy) = self.params[param_x], self.params[param_y]
+            return self.ix.surface(cx, ox, gx, cy, oy, gy, **fixed)
+        base = dict(self.defaults, **(base or {}))
+        return np.array([[self.count(dict(base, **{param_x: x, param_y: y})) for y in gy] for x in gx],
+                        dtype=np.int64)
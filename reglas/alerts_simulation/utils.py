@@ -1,11 +1,22 @@
 from __future__ import annotations
 from pathlib import Path
 from typing import Dict, Any, Iterable, Optional, Tuple
+from collections import OrderedDict
 import json
 import pandas as pd
 import numpy as np
+import sys
 from datetime import datetime
 
+# Carga/normalización de transacciones compartida con param_rules
+_PARAM_RULES_DIR = Path(__file__).resolve().parent.parent / "param_rules"
+if str(_PARAM_RULES_DIR) not in sys.path:
+    sys.path.append(str(_PARAM_RULES_DIR))
+from tx_frame import load_tx_frame, read_tx_view, date_bound, TxFrame, SUBSUB_COL
+from windows import DailyPanel
+from metric_store import get_metrics as _get_metrics, daily_table as _daily_table
+from tx_cache import source_fingerprint
+
 # --------- Lectura de bundle de parámetros ---------
 
 def load_params_bundle(bundle_path: str | Path) -> Dict[str, Any]:
@@ -119,15 +130,141 @@ def scenarios_from_bundle_split_tables(
 
 # --------- Carga de transacciones y filtros comunes ---------
 
-def load_tx_base(tx_path: str | Path) -> pd.DataFrame:
-    df = pd.read_csv(tx_path, dtype={"customer_id": "string"}, encoding="utf-8-sig")
-    df["tx_date_time"]   = pd.to_datetime(df["tx_date_time"], errors="coerce")
-    df["tx_base_amount"] = pd.to_numeric(df.get("tx_base_amount"), errors="coerce")
-    df["tx_amount"]      = pd.to_numeric(df.get("tx_amount"), errors="coerce")
-    df["tx_direction"]   = df.get("tx_direction", "").astype(str).str.title()
-    df["tx_type"]        = df.get("tx_type", "").astype(str).str.title()
-    df["tx_currency"]    = df.get("tx_currency", "").astype(str).str.upper()
-    return df
+# vistas filtradas que guarda una SimSession (LRU): una por combinación de filtros/fechas
+SESSION_VIEWS_MAX = 16
+
+class SimSession:
+    """
+    Transacciones de una simulación cargadas y normalizadas UNA vez. Se pasa en lugar de
+    tx_path a cualquier simulate_*/prepare_* (o a sweep): load_tx_base y get_metrics la
+    reconocen y sirven los subconjuntos desde memoria.
+
+        session = SimSession(TX_PATH)
+        simulate_hnr_in(session, subsubs=["R-High"], scenarios=sc)
+
+    Cada filtro (subsubs, direction, tx_type, currency, fechas) se aplica una sola vez por
+    sesión y queda cacheado (las últimas SESSION_VIEWS_MAX combinaciones); cada llamada
+    recibe solo sus columnas, en un frame propio.
+    El CSV se carga la primera vez que se usa: una corrida que sale entera de la caché de
+    resultados (sim_cache.py) no lo lee.
+    """
+
+    def __init__(self, tx_path: str | Path, *, cache: bool = True):
+        self.tx_path = str(tx_path)
+        self.cache = cache
+        self._tx: Optional[TxFrame] = None
+        self._views: "OrderedDict[Tuple, pd.DataFrame]" = OrderedDict()
+
+    @property
+    def tx(self) -> TxFrame:
+        if self._tx is None:
+            self._tx = load_tx_frame(self.tx_path, cache=self.cache)
+        return self._tx
+
+    @property
+    def loaded(self) -> bool:
+        return self._tx is not None
+
+    def fingerprint(self) -> Optional[Dict[str, Any]]:
+        """Fingerprint del CSV (del frame si ya está cargado; si no, sin cargarlo)."""
+        if self._tx is not None:
+            return self._tx.fingerprint
+        return source_fingerprint(self.tx_path) if self.cache else None
+
+    def __str__(self) -> str:
+        return self.tx_path
+
+    @staticmethod
+    def _norm(v) -> Optional[Tuple[str, ...]]:
+        if v is None:
+            return None
+        return (str(v),) if isinstance(v, str) else tuple(sorted(map(str, v)))
+
+    def view(
+        self,
+        *,
+        columns: Optional[Iterable[str]] = None,
+        subsubs: Iterable[str] | str | None = None,
+        direction: Iterable[str] | str | None = None,
+        tx_type: Iterable[str] | str | None = None,
+        currency: Iterable[str] | str | None = None,
+        date_from=None,
+        date_to=None,
+    ) -> pd.DataFrame:
+        """Mismo contrato que load_tx_base con filtros, servido desde la sesión."""
+        df = self.tx.df
+        tz = getattr(df["tx_date_time"].dt, "tz", None) if "tx_date_time" in df.columns else None
+        key = (self._norm(subsubs), self._norm(direction), self._norm(tx_type), self._norm(currency),
+               None if date_from is None else date_bound(date_from, tz),
+               None if date_to is None else date_bound(date_to, tz))
+        sub = self._views.get(key)
+        if sub is None:
+            m = np.ones(len(df), dtype=bool)
+            for col, vals in ((SUBSUB_COL, key[0]), ("tx_direction", key[1]),
+                              ("tx_type", key[2]), ("tx_currency", key[3])):
+                if vals is not None and col in df.columns:
+                    m &= df[col].isin(vals).to_numpy()
+            if key[4] is not None:
+                m &= (df["tx_date_time"] >= key[4]).to_numpy()
+            if key[5] is not None:
+                m &= (df["tx_date_time"] < key[5]).to_numpy()
+            sub = df[m].reset_index(drop=True)
+            self._views[key] = sub
+            while len(self._views) > SESSION_VIEWS_MAX:
+                self._views.popitem(last=False)
+        self._views.move_to_end(key)
+        if columns is None:
+            return sub.copy()
+        return sub.reindex(columns=[c for c in columns if c in sub.columns])   # copia sin marca de "slice"
+
+    def clear(self) -> None:
+        self._views.clear()
+
+def get_metrics(src, name: str, subsubsegments, **kw: Any) -> pd.DataFrame:
+    """metric_store.get_metrics que además acepta una SimSession."""
+    if isinstance(src, SimSession):
+        src = src.tx
+    return _get_metrics(src, name, subsubsegments, **kw)
+
+def daily_table(src, subsubsegments, **kw: Any) -> pd.DataFrame:
+    """metric_store.daily_table (agregado cliente × día × dirección × tipo × moneda) que acepta una SimSession."""
+    if isinstance(src, SimSession):
+        src = src.tx
+    return _daily_table(src, subsubsegments, **kw)
+
+def load_tx_base(
+    tx_path: str | Path | SimSession,
+    *,
+    cache: bool = True,
+    columns: Optional[Iterable[str]] = None,
+    subsubs: Iterable[str] | str | None = None,
+    direction: Iterable[str] | str | None = None,
+    tx_type: Iterable[str] | str | None = None,
+    currency: Iterable[str] | str | None = None,
+    date_from=None,
+    date_to=None,
+) -> pd.DataFrame:
+    """
+    Misma normalización que param_rules (tx_frame.normalize_tx). Con cache=True se lee
+    la copia columnar de <dir>/.tx_cache si el CSV no cambió.
+
+    Sin filtros devuelve el CSV completo. Con columns/subsubs/direction/tx_type/currency/
+    date_from/date_to (tx_date_time ∈ [date_from, date_to)) se leen solo esas columnas y
+    filas directamente de la caché (ver tx_frame.read_tx_view); el resultado ya no necesita
+    filter_subsubs ni .copy().
+    Si tx_path es una SimSession, los filtros se sirven desde la sesión (sin releer el CSV).
+    """
+    if isinstance(tx_path, SimSession):
+        if cache is not True:
+            raise ValueError("cache no aplica a una SimSession (ya está cargada).")
+        return tx_path.view(columns=columns, subsubs=subsubs, direction=direction, tx_type=tx_type,
+                            currency=currency, date_from=date_from, date_to=date_to)
+    where = {c: v for c, v in (("tx_direction", direction), ("tx_type", tx_type), ("tx_currency", currency))
+             if v is not None}
+    if columns is None and subsubs is None and not where and date_from is None and date_to is None:
+        return load_tx_frame(tx_path, cache=cache).df
+    return read_tx_view(tx_path, columns=columns, subsubsegments=subsubs, where=where,
+                        date_from=date_from, date_to=date_to, cache=cache)
 
 def filter_subsubs(df: pd.DataFrame, subsubs: Iterable[str] | str) -> pd.DataFrame:
     if isinstance(subsubs, str):
@@ -135,7 +272,8 @@ def filter_subsubs(df: pd.DataFrame, subsubs: Iterable[str] | str) -> pd.DataFra
     else:
         target = set(map(str, subsubs))
     if "customer_sub_sub_type" in df.columns:
-        return df[df["customer_sub_sub_type"].astype(str).isin(target)].copy()
+        # isin directo sobre la categórica: compara categorías, no cada fila como str
+        return df[df["customer_sub_sub_type"].isin(target)].copy()
     return df.copy()
 
 # --------- Utilidad: contar solo desde COUNT_FROM (con contexto completo) ---------
@@ -0,0 +1,215 @@
+# bundle_store.py
+"""
+Almacén columnar de parámetros: todas las tablas de percentiles de todos los sub-subsegmentos y
+generaciones (corridas de parametrización) en una sola tabla larga
+
+    generation | segment | rule | subtable | row | percentil | field | value | text
+
+más un manifest JSON chico. Se escribe junto a los params_<SUBSUB>.json (runner.save_results_bundle)
+y se lee memory-mapped; las consultas son O(1) por (segmento, regla, subtabla, percentil):
+
+    st = BundleStore.open(ROOT / "outputs" / "params")
+    st.value("R-High", "RVT-IN", "p95", "Amount_CLP", subtable="amount")
+    st.rows("R-High", "HANUMI")              # mismas filas que bundle["rules"]["HANUMI"]["percentiles"]
+    st.to_bundle("R-High")                   # dict igual al params_R-High.json
+
+`value` es float (NaN si la celda no es numérica); `text` guarda las celdas de texto (etiquetas
+de grupo, el propio percentil y "" de celdas vacías), así la exportación a JSON reproduce el
+bundle original, incluido el orden de reglas y columnas.
+Sin `generation` se usa la más reciente de cada segmento.
+"""
+from __future__ import annotations
+import json, os
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow.feather as _feather
+except ImportError:  # el JSON sigue siendo la salida principal; el almacén necesita pyarrow
+    _feather = None
+
+STORE_FILE    = "params_store.feather"
+MANIFEST_FILE = "params_store.manifest.json"
+STORE_SCHEMA  = 1
+STORE_COLUMNS = ["generation", "segment", "rule", "subtable", "row", "percentil", "field", "value", "text"]
+
+def _require_pyarrow() -> None:
+    if _feather is None:
+        raise ImportError("Se necesita pyarrow para el almacén de parámetros (pip install pyarrow).")
+
+def _paths(root: Union[str, Path]) -> Tuple[Path, Path]:
+    root = Path(root)
+    return root / STORE_FILE, root / MANIFEST_FILE
+
+def bundle_table(bundle: Dict[str, Any]) -> pd.DataFrame:
+    """Tabla larga (STORE_COLUMNS) de un bundle con la estructura de params_<SUBSUB>.json."""
+    meta = bundle.get("meta", {})
+    gen, seg = str(meta.get("generated_at", "")), str(meta.get("subsubsegment", ""))
+    recs = []
+    for rule, node in bundle.get("rules", {}).items():
+        tables = [("", node)] if "percentiles" in node else list(node.items())
+        for sub, tbl in tables:
+            for i, row in enumerate(tbl.get("percentiles", [])):
+                pct = str(row.get("percentil", ""))
+                for field, v in row.items():     # "percentil" también va como campo: conserva el orden
+                    num = isinstance(v, (int, float)) and not isinstance(v, bool)
+                    recs.append((gen, seg, rule, sub, i, pct, field,
+                                 float(v) if num else np.nan, None if num else str(v)))
+    return pd.DataFrame.from_records(recs, columns=STORE_COLUMNS).astype({"row": np.int32})
+
+def _read_manifest(p: Path) -> Dict[str, Any]:
+    try:
+        with open(p, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {"schema": STORE_SCHEMA, "generations": {}}
+
+def _write_atomic(p: Path, write) -> None:
+    tmp = p.with_name(p.name + f".tmp{os.getpid()}")
+    try:
+        write(str(tmp))
+        os.replace(tmp, p)
+    finally:
+        if tmp.exists():
+            tmp.unlink()
+
+def write_bundles(root: Union[str, Path], bundles: Union[Dict[str, Any], Iterable[Dict[str, Any]]]) -> Path:
+    """
+    Agrega (o reemplaza) los bundles en el almacén de `root`: cada bundle es una
+    (generación, segmento) identificada por meta.generated_at / meta.subsubsegment.
+    """
+    _require_pyarrow()
+    bundles = [bundles] if isinstance(bundles, dict) else list(bundles)
+    data_p, manifest_p = _paths(root)
+    data_p.parent.mkdir(parents=True, exist_ok=True)
+    manifest = _read_manifest(manifest_p)
+    if manifest.get("schema") != STORE_SCHEMA:
+        manifest = {"schema": STORE_SCHEMA, "generations": {}}
+
+    new = pd.concat([bundle_table(b) for b in bundles], ignore_index=True) if bundles else None
+    old = None
+    if data_p.exists() and manifest["generations"]:
+        old = _feather.read_table(str(data_p)).to_pandas()
+        if new is not None:
+            done = pd.MultiIndex.from_frame(new[["generation", "segment"]].drop_duplicates())
+            old = old[~pd.MultiIndex.from_frame(old[["generation", "segment"]]).isin(done)]
+    table = pd.concat([t for t in (old, new) if t is not None], ignore_index=True)
+    # tramos contiguos por (generación, segmento); dentro, el orden del bundle (reglas y filas)
+    table = table.sort_values(["generation", "segment"], kind="stable").reset_index(drop=True)
+
+    for b in bundles:
+        meta = b.get("meta", {})
+        gen, seg = str(meta.get("generated_at", "")), str(meta.get("subsubsegment", ""))
+        manifest["generations"].setdefault(gen, {})[seg] = {k: v for k, v in meta.items()}
+    manifest["rows"] = int(len(table))
+    _write_atomic(data_p, lambda p: _feather.write_feather(table, p, compression="uncompressed"))
+    def _dump(p: str) -> None:
+        with open(p, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+    _write_atomic(manifest_p, _dump)
+    return data_p
+
+class BundleStore:
+    """
+    Almacén abierto: tabla memory-mapped en tramos por (generación, segmento). Al abrir solo se ubican los
+    tramos de cada (generación, segmento); el índice {(regla, subtabla, percentil): filas} de un
+    tramo se arma la primera vez que se consulta (lineal en ese tramo, no en todo el almacén).
+    """
+
+    def __init__(self, table: pd.DataFrame, manifest: Dict[str, Any]):
+        self.table = table
+        self.manifest = manifest
+        self._cols = {c: table[c].to_numpy() for c in STORE_COLUMNS}
+        gen, seg = self._cols["generation"], self._cols["segment"]
+        cut = np.flatnonzero(np.r_[True, (gen[1:] != gen[:-1]) | (seg[1:] != seg[:-1])]) if len(table) else []
+        bounds = np.r_[cut, len(table)].astype(np.int64)
+        self._blocks: Dict[Tuple[str, str], Tuple[int, int]] = {
+            (gen[lo], seg[lo]): (int(lo), int(hi)) for lo, hi in zip(bounds[:-1], bounds[1:])}
+        self._index: Dict[Tuple[str, str], Dict[tuple, List[int]]] = {}
+        latest: Dict[str, str] = {}
+        for g, segs in manifest.get("generations", {}).items():
+            for sg in segs:
+                if sg not in latest or g > latest[sg]:
+                    latest[sg] = g
+        self._latest = latest
+
+    @classmethod
+    def open(cls, root: Union[str, Path]) -> "BundleStore":
+        _require_pyarrow()
+        data_p, manifest_p = _paths(root)
+        if not data_p.exists():
+            raise FileNotFoundError(f"No hay almacén de parámetros en: {Path(root)}")
+        table = _feather.read_table(str(data_p), memory_map=True).to_pandas()
+        return cls(table, _read_manifest(manifest_p))
+
+    def segments(self) -> List[str]:
+        return sorted(self._latest)
+
+    def generations(self, segment: Optional[str] = None) -> List[str]:
+        gens = self.manifest.get("generations", {})
+        return sorted(g for g, segs in gens.items() if segment is None or segment in segs)
+
+    def _block(self, segment: str, generation: Optional[str]) -> Tuple[str, Dict[tuple, List[int]]]:
+        """(generación, índice) del segmento; sin generación, la más reciente."""
+        if generation is None:
+            if segment not in self._latest:
+                raise KeyError(f"Segmento sin parámetros en el almacén: {segment}")
+            generation = self._latest[segment]
+        key = (generation, segment)
+        ix = self._index.get(key)
+        if ix is None:
+            ix = {}
+            lo, hi = self._blocks.get(key, (0, 0))
+            c = self._cols
+            for i, k in enumerate(zip(c["rule"][lo:hi], c["subtable"][lo:hi], c["percentil"][lo:hi]), lo):
+                ix.setdefault(k, []).append(i)
+            self._index[key] = ix
+        return generation, ix
+
+    def _cell(self, i: int) -> Any:
+        x = self._cols["text"][i]
+        return x if x is not None else float(self._cols["value"][i])
+
+    def fields(self, segment: str, rule: str, percentil: str, *, subtable: str = "",
+               generation: Optional[str] = None) -> Dict[str, Any]:
+        """{campo: valor} de la fila `percentil` (primera si hay varias, p. ej. por grupo)."""
+        _, ix = self._block(segment, generation)
+        pos = ix.get((rule, subtable, percentil), [])
+        row = self._cols["row"]
+        first = min((row[i] for i in pos), default=None)
+        field = self._cols["field"]
+        return {field[i]: self._cell(i) for i in pos if row[i] == first and field[i] != "percentil"}
+
+    def value(self, segment: str, rule: str, percentil: str, field: str, *, subtable: str = "",
+              generation: Optional[str] = None, default: float = np.nan) -> Any:
+        return self.fields(segment, rule, percentil, subtable=subtable, generation=generation).get(field, default)
+
+    def _rows(self, pos: Iterable[int]) -> List[Dict[str, Any]]:
+        c = self._cols
+        out: Dict[int, Dict[str, Any]] = {}
+        for i in pos:
+            out.setdefault(int(c["row"][i]), {})[c["field"][i]] = self._cell(i)
+        return [out[r] for r in sorted(out)]
+
+    def rows(self, segment: str, rule: str, subtable: str = "", *,
+             generation: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Filas de una tabla como en el JSON ({"percentil": ..., campo: valor, ...})."""
+        _, ix = self._block(segment, generation)
+        return self._rows(i for (r, sub, _), pos in ix.items() if r == rule and sub == subtable for i in pos)
+
+    def to_bundle(self, segment: str, *, generation: Optional[str] = None) -> Dict[str, Any]:
+        """Exporta un segmento al formato de params_<SUBSUB>.json (mismo dict que json.load)."""
+        gen, ix = self._block(segment, generation)
+        tables: Dict[Tuple[str, str], List[int]] = {}
+        for (rule, sub, _), pos in ix.items():
+            tables.setdefault((rule, sub), []).extend(pos)
+        bundle = {"meta": dict(self.manifest["generations"][gen][segment]), "rules": {}}
+        for (rule, sub), pos in tables.items():
+            node = {"percentiles": self._rows(pos)}
+            if sub:
+                bundle["rules"].setdefault(rule, {})[sub] = node
+            else:
+                bundle["rules"][rule] = node
+        return bundle
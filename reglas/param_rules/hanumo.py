@@ -2,6 +2,9 @@
 from __future__ import annotations
 import pandas as pd, numpy as np, math
 from typing import Iterable, Union, Dict, Any
+from tx_frame import as_tx_frame
+from metric_store import get_metrics
+from quantiles import quantile
 
 DEFAULT_NUMBER_QS = (0.85, 0.90, 0.95, 0.97, 0.99)
 DEFAULT_FACTOR_QS = (0.95, 0.97, 0.99)
@@ -16,41 +19,23 @@ def run_parameters_hanumo(
     factor_qs: Iterable[float] = DEFAULT_FACTOR_QS,
     verbose: bool = False,
 ) -> Dict[str, Any]:
-    df = pd.read_csv(path, dtype={"customer_id":"string"}, encoding="utf-8-sig", low_memory=False)
+    tx = as_tx_frame(path)
     req = {"customer_id","tx_date_time","tx_direction","tx_type","customer_sub_sub_type"}
-    miss = [c for c in req if c not in df.columns]
+    miss = [c for c in req if c not in tx.df.columns]
     if miss: raise KeyError(f"Faltan columnas HANUMO: {miss}")
 
-    df["tx_date_time"] = pd.to_datetime(df["tx_date_time"], errors="coerce")
-    df["tx_direction"] = df["tx_direction"].astype(str).str.title()
-    df["tx_type"]      = df["tx_type"].astype(str).str.title()
+    # Panel cliente × día: S3N = conteo 3D, AVG177N = media 177D de S3N desplazado 3 días
+    # (métrica compartida con la simulación, ver metric_store)
+    M = get_metrics(tx, "hanum", subsubsegments, direction="Outbound")
+    S3N, AVG177N = M["S3N"].to_numpy(), M["AVG177N"].to_numpy()
 
-    targets = set(_as_list(subsubsegments))
-    df = df[df["customer_sub_sub_type"].astype(str).isin(targets)].copy()
+    ok_num = S3N > 0
+    ok_fac = ok_num & (AVG177N > 0)
+    S_num = pd.Series(S3N[ok_num], dtype=float)
+    S_fac = pd.Series(S3N[ok_fac] / AVG177N[ok_fac], dtype=float).replace([np.inf,-np.inf], np.nan).dropna()
 
-    mask = df["tx_direction"].eq("Outbound") & df["tx_type"].eq("Cash") & df["tx_date_time"].notna()
-    g = df.loc[mask, ["customer_id","tx_date_time"]].copy()
-
-    num_points, fac_points = [], []
-    for _, sub in g.groupby("customer_id", sort=False):
-        sub = sub.sort_values("tx_date_time")
-        daily_cnt = sub.set_index("tx_date_time").assign(x=1)["x"].resample("D").sum().fillna(0)
-        if daily_cnt.empty: continue
-        S3N = daily_cnt.rolling("3D").sum()
-        AVG177N = S3N.shift(3).rolling("177D", min_periods=1).mean()
-
-        ok_num = S3N.notna() & (S3N > 0)
-        if ok_num.any(): num_points.append(S3N.loc[ok_num])
-
-        ok_fac = ok_num & AVG177N.notna() & (AVG177N > 0)
-        if ok_fac.any():
-            fac_points.append((S3N.loc[ok_fac] / AVG177N.loc[ok_fac]).replace([np.inf,-np.inf], np.nan).dropna())
-
-    S_num = pd.concat(num_points) if num_points else pd.Series(dtype=float)
-    S_fac = pd.concat(fac_points) if fac_points else pd.Series(dtype=float)
-
-    num_q = S_num.quantile(list(number_qs)) if len(S_num) else pd.Series(index=list(number_qs), dtype=float)
-    fac_q = S_fac.quantile(list(factor_qs)) if len(S_fac) else pd.Series(index=list(factor_qs), dtype=float)
+    num_q = quantile(S_num, number_qs)
+    fac_q = quantile(S_fac, factor_qs)
 
     idx = sorted(set(list(number_qs)) | set(list(factor_qs)))
     out = pd.DataFrame({
@@ -2,6 +2,9 @@
 from __future__ import annotations
 import pandas as pd, numpy as np, math
 from typing import Iterable, Union, Dict, Any
+from tx_frame import as_tx_frame
+from metric_store import get_metrics
+from quantiles import quantile
 
 DEFAULT_AMOUNT_QS = (0.85, 0.90, 0.95, 0.97, 0.99)
 DEFAULT_FACTOR_QS = (0.95, 0.97, 0.99)
@@ -16,42 +19,23 @@ def run_parameters_hasumi(
     factor_qs: Iterable[float] = DEFAULT_FACTOR_QS,
     verbose: bool = False,
 ) -> Dict[str, Any]:
-    df = pd.read_csv(path, dtype={"customer_id":"string"}, encoding="utf-8-sig", low_memory=False)
+    tx = as_tx_frame(path)
     req = {"customer_id","tx_date_time","tx_base_amount","tx_direction","tx_type","customer_sub_sub_type"}
-    miss = [c for c in req if c not in df.columns]
+    miss = [c for c in req if c not in tx.df.columns]
     if miss: raise KeyError(f"Faltan columnas HASUMI: {miss}")
 
-    df["tx_date_time"]   = pd.to_datetime(df["tx_date_time"], errors="coerce")
-    df["tx_base_amount"] = pd.to_numeric(df["tx_base_amount"], errors="coerce")
-    df["tx_direction"]   = df["tx_direction"].astype(str).str.title()
-    df["tx_type"]        = df["tx_type"].astype(str).str.title()
+    # Panel cliente × día: S3 = monto abs 3D, AVG177 = media 177D de S3 desplazado 3 días
+    # (métrica compartida con la simulación, ver metric_store)
+    M = get_metrics(tx, "hasum", subsubsegments, direction="Inbound")
+    S3, AVG177 = M["S3"].to_numpy(), M["AVG177"].to_numpy()
 
-    targets = set(_as_list(subsubsegments))
-    df = df[df["customer_sub_sub_type"].astype(str).isin(targets)].copy()
+    ok_amt = S3 > 0
+    ok_fac = ok_amt & (AVG177 > 0)
+    S_amt = pd.Series(S3[ok_amt], dtype=float)
+    S_fac = pd.Series(S3[ok_fac] / AVG177[ok_fac], dtype=float).replace([np.inf,-np.inf], np.nan).dropna()
 
-    mask = df["tx_direction"].eq("Inbound") & df["tx_type"].eq("Cash") & df["tx_date_time"].notna() & df["tx_base_amount"].notna()
-    g = df.loc[mask, ["customer_id","tx_date_time","tx_base_amount"]].copy()
-
-    amt_points, fac_points = [], []
-    for _, sub in g.groupby("customer_id", sort=False):
-        sub = sub.sort_values("tx_date_time")
-        daily = sub.set_index("tx_date_time")["tx_base_amount"].abs().resample("D").sum()
-        if daily.empty: continue
-        S3 = daily.rolling("3D").sum()
-        AVG177 = S3.shift(3).rolling("177D", min_periods=1).mean()
-
-        ok_amt = (S3 > 0) & S3.notna()
-        if ok_amt.any(): amt_points.append(S3.loc[ok_amt])
-
-        ok_fac = ok_amt & (AVG177 > 0) & AVG177.notna()
-        if ok_fac.any():
-            fac_points.append((S3.loc[ok_fac] / AVG177.loc[ok_fac]).replace([np.inf,-np.inf], np.nan).dropna())
-
-    S_amt = pd.concat(amt_points) if amt_points else pd.Series(dtype=float)
-    S_fac = pd.concat(fac_points) if fac_points else pd.Series(dtype=float)
-
-    amount_q = S_amt.quantile(list(amount_qs)) if len(S_amt) else pd.Series(index=list(amount_qs), dtype=float)
-    factor_q = S_fac.quantile(list(factor_qs)) if len(S_fac) else pd.Series(index=list(factor_qs), dtype=float)
+    amount_q = quantile(S_amt, amount_qs)
+    factor_q = quantile(S_fac, factor_qs)
 
     idx = sorted(set(list(amount_qs)) | set(list(factor_qs)))
     out = pd.DataFrame({
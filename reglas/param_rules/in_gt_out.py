@@ -1,6 +1,9 @@
 from __future__ import annotations
 import pandas as pd, numpy as np
 from typing import Iterable, Union, Dict, Any
+from tx_frame import as_tx_frame
+from windows import DailyPanel
+from quantiles import quantile
 
 DEFAULT_PCTS = (0.85, 0.90, 0.95, 0.97, 0.98, 0.99)
 
@@ -16,16 +19,7 @@ def run_parameters_in_gt_out(
     use_abs: bool = True,
     verbose: bool = False,
 ) -> Dict[str, Any]:
-    df = pd.read_csv(path, dtype={"customer_id":"string"}, encoding="utf-8-sig", low_memory=False)
-    df["tx_date_time"]   = pd.to_datetime(df["tx_date_time"], errors="coerce")
-    df["tx_base_amount"] = pd.to_numeric(df["tx_base_amount"], errors="coerce")
-    df["tx_direction"]   = df["tx_direction"].astype(str).str.title()
-    if filter_to_cash and "tx_type" in df.columns:
-        df["tx_type"] = df["tx_type"].astype(str).str.title()
-
-    targets = set(_as_list(subsubsegments))
-    df = df[df["customer_sub_sub_type"].astype(str).isin(targets)].copy()
-
+    df = as_tx_frame(path).select(subsubsegments)
     mask = df["tx_direction"].eq("Inbound") & df["tx_date_time"].notna() & df["tx_base_amount"].notna()
     if filter_to_cash and "tx_type" in df.columns:
         mask &= df["tx_type"].eq("Cash")
@@ -36,13 +30,9 @@ def run_parameters_in_gt_out(
         return {"meta":{"clients":0,"windows":0}, "percentiles": tbl}
 
     g["amt"] = g["tx_base_amount"].abs() if use_abs else g["tx_base_amount"]
-    parts = []
-    for cid, sub in g.groupby("customer_id", sort=False):
-        daily = sub.set_index("tx_date_time")["amt"].resample("D").sum()
-        parts.append(daily.rolling(f"{window_days}D").sum().rename(cid))
-
-    s = pd.concat([ser.dropna().astype(float) for ser in parts], axis=0) if parts else pd.Series(dtype=float)
-    q = s.quantile(list(percentiles)) if len(s) else pd.Series(index=list(percentiles), dtype=float)
+    P = DailyPanel.build(g, "customer_id")
+    s = pd.Series(P.rolling_sum(P.daily_sum(g["amt"]), window_days), dtype=float)
+    q = quantile(s, percentiles)
 
     tbl = pd.DataFrame({"percentil":[f"p{int(p*100)}" for p in percentiles],
                         "Amount_IN_30d":[q.get(p, np.nan) for p in percentiles]})
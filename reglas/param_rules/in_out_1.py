@@ -1,6 +1,8 @@
 from __future__ import annotations
 import pandas as pd, numpy as np
 from typing import Iterable, Union, Dict, Any
+from tx_frame import as_tx_frame
+from quantiles import quantile
 
 DEFAULT_PCTS = (0.85, 0.90, 0.95, 0.97, 0.99)
 
@@ -13,11 +15,7 @@ def run_parameters_in_out_1_amount(
     percentiles: Iterable[float] = DEFAULT_PCTS,
     verbose: bool = False,
 ) -> Dict[str, Any]:
-    df = pd.read_csv(path, dtype={"customer_id":"string"}, encoding="utf-8-sig", low_memory=False)
-    df["tx_base_amount"] = pd.to_numeric(df["tx_base_amount"], errors="coerce")
-
-    targets = set(_as_list(subsubsegments))
-    df = df[df["customer_sub_sub_type"].astype(str).isin(targets)].copy()
+    df = as_tx_frame(path).select(subsubsegments)
 
     m = (df["tx_direction"].astype(str).str.title().eq("Outbound") &
          df["tx_type"].astype(str).str.title().eq("Cash") &
@@ -25,7 +23,7 @@ def run_parameters_in_out_1_amount(
          (df["tx_base_amount"] > 0))
     s = df.loc[m, "tx_base_amount"].astype(float)
 
-    q = s.quantile(list(percentiles)) if len(s) else pd.Series(index=list(percentiles), dtype=float)
+    q = quantile(s, percentiles)
     tbl = pd.DataFrame({"percentil":[f"p{int(p*100)}" for p in percentiles],
                         "Amount_CLP":[q.get(p, np.nan) for p in percentiles]})
     # p90 sugerido (igual que tu celda)
@@ -0,0 +1,152 @@
+# kernels.py
+"""
+Ventanas de N días sobre transacciones ordenadas por (grupo, fecha), todo el arreglo a la vez.
+Los grupos son tramos contiguos descritos por `offsets` (len = grupos + 1), como en CSR.
+
+    order, ts, offsets = group_layout(g, "customer_id")
+    c = forward_count(ts, offsets, 30)          # nº de tx en [t_i, t_i + 30D]
+    best = group_max(c, offsets)                # máximo por cliente
+
+Con filas de un TxFrame, tx.layout().group(g, "customer_id") devuelve lo mismo sin reordenar
+(layout.py: orden canónico por cliente calculado una vez por frame).
+"""
+from __future__ import annotations
+import pandas as pd, numpy as np
+from typing import Iterable, Optional, Union
+from windows import DAY_NS, group_codes
+
+try:
+    import numba as _numba
+except ImportError:  # sin numba: mismas funciones vía searchsorted (NumPy, nivel C)
+    _numba = None
+
+# ---------------- layout ----------------
+
+def as_ns(ts) -> np.ndarray:
+    """Fechas → int64 ns (UTC si traen zona horaria)."""
+    return np.asarray(pd.Series(ts).values).astype("datetime64[ns]").view(np.int64)
+
+def group_layout(df: pd.DataFrame, keys: Union[str, Iterable[str]], time_col: str = "tx_date_time"):
+    """
+    (order, ts, offsets): `order` reordena df por (grupo en orden de aparición, fecha) con sort
+    estable; `ts` son las fechas en ns ya reordenadas; `offsets` los cortes de cada grupo.
+    Filas con clave nula quedan fuera (como groupby); las fechas deben venir sin nulos.
+    """
+    code = group_codes(df, keys)
+    ts = as_ns(df[time_col])
+    keep = np.flatnonzero(code >= 0)
+    order = keep[np.lexsort((ts[keep], code[keep]))]
+    code = code[order]
+    n_groups = int(code.max()) + 1 if len(code) else 0
+    offsets = np.concatenate([[0], np.cumsum(np.bincount(code, minlength=n_groups))]).astype(np.int64)
+    return order, ts[order], offsets
+
+def _group_of_row(offsets: np.ndarray) -> np.ndarray:
+    return np.repeat(np.arange(len(offsets) - 1), np.diff(offsets))
+
+# ---------------- búsqueda de extremos ----------------
+
+if _numba is not None:
+    @_numba.njit(cache=True)
+    def _forward_end_nb(ts, offsets, delta):
+        out = np.empty(ts.size, dtype=np.int64)
+        for g in range(offsets.size - 1):
+            j = offsets[g]; hi = offsets[g + 1]
+            for i in range(offsets[g], hi):
+                end = ts[i] + delta
+                while j < hi and ts[j] <= end:
+                    j += 1
+                out[i] = j
+        return out
+
+    @_numba.njit(cache=True)
+    def _trailing_start_nb(ts, offsets, delta):
+        out = np.empty(ts.size, dtype=np.int64)
+        for g in range(offsets.size - 1):
+            lo = offsets[g]
+            for i in range(offsets[g], offsets[g + 1]):
+                start = ts[i] - delta
+                while ts[lo] <= start:
+                    lo += 1
+                out[i] = lo
+        return out
+
+def _composite(ts: np.ndarray, bound: np.ndarray, offsets: np.ndarray):
+    """
+    Claves (grupo, rango de fecha) comparables en un solo int64: el rango denso de la unión
+    {ts, bound} preserva el orden dentro del grupo y no desborda aunque haya muchos grupos.
+    """
+    _, inv = np.unique(np.concatenate([ts, bound]), return_inverse=True)
+    width = np.int64(inv.max() + 1) if inv.size else np.int64(1)
+    grp = _group_of_row(offsets).astype(np.int64) * width
+    return grp + inv[:ts.size], grp + inv[ts.size:]
+
+def forward_end(ts: np.ndarray, offsets: np.ndarray, days: int) -> np.ndarray:
+    """Por fila i: primer índice j del grupo con ts[j] > ts[i] + days (fin exclusivo de la ventana)."""
+    delta = np.int64(days) * DAY_NS
+    if _numba is not None:
+        return _forward_end_nb(ts, offsets, delta)
+    key, end = _composite(ts, ts + delta, offsets)
+    return np.searchsorted(key, end, side="right")
+
+def trailing_start(ts: np.ndarray, offsets: np.ndarray, days: int) -> np.ndarray:
+    """Por fila i: primer índice lo del grupo con ts[lo] > ts[i] - days (ventana (t-N, t], como rolling)."""
+    delta = np.int64(days) * DAY_NS
+    if _numba is not None:
+        return _trailing_start_nb(ts, offsets, delta)
+    key, start = _composite(ts, ts - delta, offsets)
+    return np.searchsorted(key, start, side="right")
+
+# ---------------- agregados por fila ----------------
+
+def _group_prefix(values: np.ndarray, offsets: np.ndarray) -> np.ndarray:
+    """Suma acumulada que se reinicia en cada grupo (la precisión no depende de los demás clientes)."""
+    v = np.asarray(values, dtype=float)
+    if v.size == 0:
+        return v
+    return pd.Series(v).groupby(_group_of_row(offsets)).cumsum().to_numpy()
+
+def _range_sum(P: np.ndarray, offsets: np.ndarray, lo: np.ndarray, hi: np.ndarray) -> np.ndarray:
+    """Σ values[lo:hi] dentro del grupo de cada fila, con P = _group_prefix."""
+    start = np.repeat(offsets[:-1], np.diff(offsets))
+    top = np.where(hi > lo, P[np.maximum(hi - 1, 0)], 0.0)
+    base = np.where((lo > start) & (hi > lo), P[np.maximum(lo - 1, 0)], 0.0)
+    return top - base
+
+def forward_count(ts: np.ndarray, offsets: np.ndarray, days: int) -> np.ndarray:
+    """Nº de transacciones en [t_i, t_i + days] desde la fila i (incluida)."""
+    return forward_end(ts, offsets, days) - np.arange(ts.size)
+
+def forward_sum(ts: np.ndarray, offsets: np.ndarray, values, days: int) -> np.ndarray:
+    """Σ values en [t_i, t_i + days] desde la fila i (incluida)."""
+    j = forward_end(ts, offsets, days)
+    return _range_sum(_group_prefix(values, offsets), offsets, np.arange(ts.size), j)
+
+def trailing_count(ts: np.ndarray, offsets: np.ndarray, days: int) -> np.ndarray:
+    """Nº de transacciones en (t_i - days, t_i] hasta la fila i (incluida)."""
+    return np.arange(ts.size) - trailing_start(ts, offsets, days) + 1
+
+def trailing_sum(ts: np.ndarray, offsets: np.ndarray, values, days: int) -> np.ndarray:
+    """Σ values en (t_i - days, t_i] hasta la fila i (incluida), como rolling(f"{days}D").sum()."""
+    lo = trailing_start(ts, offsets, days)
+    return _range_sum(_group_prefix(values, offsets), offsets, lo, np.arange(ts.size) + 1)
+
+# ---------------- por grupo ----------------
+
+def group_max(x, offsets: np.ndarray, empty: Optional[float] = 0.0) -> np.ndarray:
+    """Máximo de x en cada grupo (grupos vacíos → `empty`)."""
+    x = np.asarray(x)
+    sizes = np.diff(offsets)
+    out = np.full(sizes.size, empty, dtype=x.dtype)
+    nz = sizes > 0
+    if nz.any():
+        out[nz] = np.maximum.reduceat(x, offsets[:-1][nz])
+    return out
+
+def max_count_window(ts: np.ndarray, offsets: np.ndarray, days: int) -> np.ndarray:
+    """Máximo nº de tx en cualquier ventana [t, t + days] por grupo."""
+    return group_max(forward_count(ts, offsets, days), offsets, 0)
+
+def max_sum_window(ts: np.ndarray, offsets: np.ndarray, values, days: int) -> np.ndarray:
+    """Máxima Σ values en cualquier ventana [t, t + days] por grupo (nunca < 0, como los bucles originales)."""
+    return np.maximum(group_max(forward_sum(ts, offsets, values, days), offsets, 0.0), 0.0)
@@ -0,0 +1,160 @@
+# layout.py
+"""
+Layout canónico (estilo CSR) de un TxFrame: las filas se ordenan UNA vez por (cliente, fecha) y
+cada cliente es un tramo contiguo descrito por `offsets`. Las reglas piden su subconjunto de
+filas y reciben lo mismo que kernels.group_layout, sin volver a ordenar ni agrupar:
+
+    lay = tx.layout()                                   # se arma una vez por TxFrame
+    order, ts, off = lay.group(g, "customer_id")        # g = filas de tx.select(...)
+    order, ts, off = lay.group(g, ["customer_id", "counterparty_id"])
+
+El subconjunto sale de una máscara sobre el orden ya calculado (lineal). Los grupos quedan en
+el orden del layout (primera aparición en el frame completo), no en el de `g`; dentro de cada
+grupo, por fecha y, a igual fecha, por posición en el frame.
+
+`flags` guarda dirección/tipo de cada fila como bits para filtrar sin pandas; cada valor
+presente en el frame (FLAG_COLS) recibe su bit al armar el layout:
+
+    sel = lay.mask(direction="Inbound", tx_type="Cash")   # bool por fila del layout
+    order, ts, off = lay.group_rows(sel)                   # order = posiciones en tx.df
+"""
+from __future__ import annotations
+import pandas as pd, numpy as np
+from typing import Dict, Iterable, Optional, Tuple, Union
+from windows import group_codes
+from kernels import as_ns, group_layout
+
+# columnas cuyos valores se guardan como bits en `flags`
+FLAG_COLS = ("tx_direction", "tx_type")
+
+def _flag_bits(df: pd.DataFrame) -> Dict[Tuple[str, str], int]:
+    """{(columna, valor): bit} de los valores de FLAG_COLS (categorías si la columna es categórica)."""
+    vals = []
+    for col in FLAG_COLS:
+        if col not in df.columns:
+            continue
+        s = df[col]
+        cats = s.cat.categories if isinstance(s.dtype, pd.CategoricalDtype) else pd.unique(s.dropna())
+        vals += [(col, str(v)) for v in cats]
+    if len(vals) > 64:
+        raise ValueError(f"Demasiados valores de {list(FLAG_COLS)} para flags de 64 bits: {len(vals)}")
+    return {cv: 1 << i for i, cv in enumerate(vals)}
+
+def _flags(df: pd.DataFrame, bits: Dict[Tuple[str, str], int]) -> np.ndarray:
+    dtype = next(t for t in (np.uint8, np.uint16, np.uint32, np.uint64) if len(bits) <= np.iinfo(t).bits)
+    out = np.zeros(len(df), dtype=dtype)
+    for col in FLAG_COLS:
+        if col in df.columns:
+            codes, uniques = pd.factorize(df[col])
+            lut = np.array([bits[col, str(v)] for v in uniques] + [0], dtype=dtype)   # código -1 (nulo) → 0
+            out |= lut[codes]
+    return out
+
+class TxLayout:
+    """
+    Filas válidas (cliente y fecha no nulos) de un frame en orden (cliente, fecha):
+      order    posición en el frame de cada fila del layout
+      ts       fechas (ns) en ese orden
+      offsets  cortes por cliente (len = clientes + 1)
+      flags    bits de dirección/tipo por fila del layout (bits = {(columna, valor): bit})
+    Otras claves (cliente, contraparte) se arman la primera vez que se piden, como una
+    permutación estable de las filas del layout.
+    """
+
+    def __init__(self, df: pd.DataFrame, time_col: str = "tx_date_time"):
+        self.index = df.index
+        self.n_frame = len(df)
+        code = group_codes(df, "customer_id")
+        ts = as_ns(df[time_col])
+        keep = np.flatnonzero((code >= 0) & df[time_col].notna().to_numpy())
+        self.order = keep[np.lexsort((ts[keep], code[keep]))]
+        self.n = int(self.order.size)
+        self.rank = np.full(self.n_frame, -1, dtype=np.int64)     # fila del frame -> fila del layout
+        self.rank[self.order] = np.arange(self.n)
+        self.ts = ts[self.order]
+        gid = code[self.order]
+        self.offsets = self._cuts(gid)
+        self.bits = _flag_bits(df)
+        self.flags = _flags(df, self.bits)[self.order]
+        self._df = df
+        # claves -> (permutación de filas del layout, grupo de cada fila de la permutación)
+        self._keyed: Dict[Tuple[str, ...], Tuple[Optional[np.ndarray], np.ndarray]] = {("customer_id",): (None, gid)}
+
+    def __len__(self) -> int:
+        return self.n
+
+    @staticmethod
+    def _cuts(gid: np.ndarray) -> np.ndarray:
+        """offsets de un arreglo de grupos ya contiguo."""
+        if gid.size == 0:
+            return np.zeros(1, dtype=np.int64)
+        starts = np.flatnonzero(np.r_[True, gid[1:] != gid[:-1]])
+        return np.r_[starts, gid.size].astype(np.int64)
+
+    def _by(self, keys: Tuple[str, ...]) -> Tuple[Optional[np.ndarray], np.ndarray]:
+        got = self._keyed.get(keys)
+        if got is None:
+            if keys[0] != "customer_id":
+                raise ValueError(f"El layout agrupa por cliente primero; claves pedidas: {list(keys)}")
+            miss = [k for k in keys if k not in self._df.columns]
+            if miss:
+                raise KeyError(f"Faltan columnas para el layout: {miss}")
+            code = group_codes(self._df, list(keys))[self.order]
+            valid = np.flatnonzero(code >= 0)
+            # el layout ya está por (cliente, fecha): basta ordenar estable por la clave compuesta
+            perm = valid[np.argsort(code[valid], kind="stable")]
+            got = (perm, code[perm])
+            self._keyed[keys] = got
+        return got
+
+    # ---------------- subconjuntos ----------------
+
+    def _bit(self, col: str, vals) -> np.unsignedinteger:
+        """Bits de esos valores; un valor ausente del frame no marca filas."""
+        vals = [vals] if isinstance(vals, str) else list(vals)
+        out = 0
+        for v in vals:
+            out |= self.bits.get((col, str(v)), 0)
+        return self.flags.dtype.type(out)
+
+    def mask(self, *, direction: Union[str, Iterable[str], None] = None,
+             tx_type: Union[str, Iterable[str], None] = None) -> np.ndarray:
+        """Filas del layout con esa dirección y tipo (bool, orden del layout)."""
+        sel = np.ones(self.n, dtype=bool)
+        if direction is not None:
+            sel &= (self.flags & self._bit("tx_direction", direction)) != 0
+        if tx_type is not None:
+            sel &= (self.flags & self._bit("tx_type", tx_type)) != 0
+        return sel
+
+    def group_rows(self, sel: np.ndarray, keys: Union[str, Iterable[str]] = "customer_id"):
+        """
+        (order, ts, offsets) de las filas del layout marcadas en `sel`, agrupadas por `keys`;
+        `order` son posiciones en el frame del layout.
+        """
+        keys = (keys,) if isinstance(keys, str) else tuple(keys)
+        perm, gid = self._by(keys)
+        if perm is None:
+            rows = np.flatnonzero(sel)
+            g = gid[rows]
+        else:
+            hit = sel[perm]
+            rows, g = perm[hit], gid[hit]
+        return self.order[rows], self.ts[rows], self._cuts(g)
+
+    def group(self, g: pd.DataFrame, keys: Union[str, Iterable[str]] = "customer_id"):
+        """
+        Mismo contrato que kernels.group_layout(g, keys) para filas `g` del frame del layout
+        (índice conservado, p. ej. tx.select(...).loc[mask]). Si el índice de `g` no se puede
+        ubicar en el frame se cae a group_layout.
+        """
+        pos = self.index.get_indexer(g.index) if self.index.is_unique else None
+        if pos is None or (pos < 0).any():
+            return group_layout(g, keys)
+        r = self.rank[pos]
+        sel = np.zeros(self.n, dtype=bool)
+        sel[r[r >= 0]] = True
+        frame_pos, ts, offsets = self.group_rows(sel, keys)
+        at = np.empty(self.n_frame, dtype=np.int64)
+        at[pos] = np.arange(len(pos))
+        return at[frame_pos], ts, offsets
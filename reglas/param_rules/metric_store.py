@@ -0,0 +1,479 @@
+# metric_store.py
+"""
+Métricas por fila / por ventana que calculan igual la parametrización (run_parameters_*) y la
+simulación (prepare_*). Se materializan una vez por (métrica, versión, CSV, sub-subsegmentos,
+argumentos) y el otro lado las lee de vuelta en vez de recalcularlas:
+
+    M = get_metrics(tx, "hanum", "R-High", direction="Inbound")   # S3N, AVG177N por cliente–día
+    D = daily_table(tx, "R-High", direction="Inbound", tx_type="Cash")   # agregado diario
+
+Niveles: memoria del proceso y <dir del CSV>/.tx_cache/metrics/*.feather (memory-mapped).
+La clave incluye el hash del CSV, así que un CSV nuevo nunca reutiliza métricas viejas; si el
+CSV nuevo es el anterior + filas al final (carga mensual), la métrica anterior se extiende y
+su archivo se borra. En memoria solo quedan las métricas de la versión vigente de cada CSV; en
+disco, al escribir se borran las menos usadas hasta quedar bajo METRICS_CACHE_MAX_MB (LRU).
+Subir la versión de una métrica en METRICS cuando cambie su cálculo.
+"""
+from __future__ import annotations
+import hashlib, json, os
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple, Union
+import pandas as pd, numpy as np
+
+from tx_cache import CACHE_DIRNAME, _write_atomic, _feather, source_fingerprint, cache_parent
+from tx_frame import TxFrame, as_tx_frame, schema_tag, tx_days, SUBSUB_COL
+from windows import DailyPanel, day_number, DAY_COL
+
+METRICS_DIRNAME = "metrics"
+METRICS_CACHE_MAX_MB = 512
+
+# ---------------- métricas compartidas ----------------
+# Cada métrica = filtro de filas (rows) + cálculo sobre esas filas. Con el filtro separado se
+# puede extender la métrica guardada de una versión anterior del CSV (ver _extend_*).
+
+def _roll_7d_sum_count(sub: pd.DataFrame) -> pd.DataFrame:
+    out = (
+        sub.set_index("tx_date_time")["tx_base_amount"]
+           .rolling("7D")
+           .agg(["sum", "count"])
+    )
+    out.index = sub.index  # alinear con 'g'
+    return out
+
+def _pgav_group_col(df: pd.DataFrame) -> str:
+    GROUP_COL = SUBSUB_COL if SUBSUB_COL in df.columns else "customer_type"
+    if GROUP_COL not in df.columns:
+        raise KeyError("No encontré ni 'customer_sub_sub_type' ni 'customer_type' en el CSV.")
+    return GROUP_COL
+
+def _pgav_rows(df: pd.DataFrame, *, direction: str) -> pd.DataFrame:
+    GROUP_COL = _pgav_group_col(df)
+    return df[
+        (df["tx_direction"].eq(direction))
+        & (df["tx_type"].eq("Cash"))
+        & (df["tx_base_amount"].notna())
+        & (df["tx_date_time"].notna())
+    ][[GROUP_COL, "tx_date_time", "tx_base_amount"]]
+
+def _pgav_rolling(g: pd.DataFrame) -> pd.DataFrame:
+    GROUP_COL = g.columns[0]
+    g = g.sort_values([GROUP_COL, "tx_date_time"]).reset_index(drop=True)
+    if g.empty:
+        return g.assign(prev_sum7=np.nan, prev_cnt7=np.nan, peer_avg7_excl=np.nan, factor=np.nan)
+
+    # solo las columnas que usa la ventana: la clave de grupo no entra a apply (sin FutureWarning)
+    tmp = g.groupby(GROUP_COL, group_keys=False, observed=True)[["tx_date_time", "tx_base_amount"]] \
+           .apply(_roll_7d_sum_count)
+    g["prev_sum7"] = tmp["sum"] - g["tx_base_amount"]
+    g["prev_cnt7"] = tmp["count"] - 1
+    g["peer_avg7_excl"] = np.where(g["prev_cnt7"] > 0, g["prev_sum7"] / g["prev_cnt7"], np.nan)
+    g["factor"] = np.where(g["peer_avg7_excl"] > 0, g["tx_base_amount"] / g["peer_avg7_excl"], np.nan)
+    return g
+
+def pgav_metrics(df: pd.DataFrame, *, direction: str) -> pd.DataFrame:
+    """PGAV: por tx Cash, suma/conteo de los 7D previos del mismo grupo (excluye la tx) y factor."""
+    return _pgav_rolling(_pgav_rows(df, direction=direction))
+
+def _cash_rows(df: pd.DataFrame, *, direction: str, amount: bool = True) -> pd.DataFrame:
+    m = df["tx_direction"].eq(direction) & df["tx_type"].eq("Cash") & df["tx_date_time"].notna()
+    if amount:
+        m &= df["tx_base_amount"].notna()
+    return df.loc[m, ["customer_id", "tx_date_time"] + (["tx_base_amount"] if amount else [])]
+
+def _hanum_rows(df: pd.DataFrame, *, direction: str) -> pd.DataFrame:
+    return _cash_rows(df, direction=direction, amount=False)
+
+def _hanum_panel(g: pd.DataFrame, keep=None, **_) -> pd.DataFrame:
+    P = DailyPanel.build(g, "customer_id")
+    S3N = P.rolling_sum(P.daily_count(keep), 3)
+    return P.frame(S3N=S3N, AVG177N=P.rolling_mean(S3N, 177, shift=3))
+
+def hanum_metrics(df: pd.DataFrame, *, direction: str) -> pd.DataFrame:
+    """HANUM: cliente–día Cash, S3N = conteo 3D y AVG177N = media 177D de S3N desplazado 3 días."""
+    return _hanum_panel(_hanum_rows(df, direction=direction))
+
+def _hasum_panel(g: pd.DataFrame, keep=None, **_) -> pd.DataFrame:
+    P = DailyPanel.build(g, "customer_id")
+    daily = P.daily_sum(g["tx_base_amount"].abs(), keep)
+    S3 = P.rolling_sum(daily, 3)
+    return P.frame(S3=S3, S180=P.rolling_sum(daily, 180), AVG177=P.rolling_mean(S3, 177, shift=3))
+
+def hasum_metrics(df: pd.DataFrame, *, direction: str) -> pd.DataFrame:
+    """HASUM: cliente–día Cash, S3/S180 = monto abs 3D/180D y AVG177 = media 177D de S3 desplazado 3 días."""
+    return _hasum_panel(_cash_rows(df, direction=direction))
+
+def _numcc_rows(df: pd.DataFrame, *, direction: str, tx_type: str = "Cash", **_) -> pd.DataFrame:
+    cp = df["counterparty_id"].astype(str).str.strip()
+    m = (df["tx_direction"].eq(direction) & df["tx_type"].eq(tx_type) &
+         df["customer_id"].notna() & cp.notna() & cp.ne("NA") & df["tx_date_time"].notna())
+    return df.loc[m, ["customer_id", "tx_date_time"]].assign(counterparty_id=cp[m])
+
+def _numcc_panel(g: pd.DataFrame, keep=None, *, window_days: int = 14, **_) -> pd.DataFrame:
+    P = DailyPanel.build(g, ["customer_id", "counterparty_id"])
+    return P.frame(**{f"C{window_days}": P.rolling_sum(P.daily_count(keep), window_days)})
+
+def numcc_metrics(df: pd.DataFrame, *, direction: str, tx_type: str = "Cash", window_days: int = 14) -> pd.DataFrame:
+    """NUMCC: (cliente, contraparte)–día, C{window_days} = conteo móvil de window_days."""
+    return _numcc_panel(_numcc_rows(df, direction=direction, tx_type=tx_type), window_days=window_days)
+
+def _hsum30_panel(g: pd.DataFrame, keep=None, **_) -> pd.DataFrame:
+    P = DailyPanel.build(g, "customer_id")
+    return P.frame(S30=P.rolling_sum(P.daily_sum(g["tx_base_amount"].abs(), keep), 30))
+
+def hsum30_metrics(df: pd.DataFrame, *, direction: str) -> pd.DataFrame:
+    """P-HSUM: cliente–día Cash, S30 = monto abs 30D."""
+    return _hsum30_panel(_cash_rows(df, direction=direction))
+
+def last_balance_metrics(df: pd.DataFrame) -> pd.DataFrame:
+    """P-%BAL: último saldo visto por cliente (orden por fecha si existe tx_date_time)."""
+    has_time = "tx_date_time" in df.columns
+    cols = ["customer_id", "customer_account_balance"] + (["tx_date_time"] if has_time else [])
+    g = df[cols].dropna(subset=["customer_id", "customer_account_balance"])
+    if has_time:
+        g = g.sort_values(["customer_id", "tx_date_time"])
+    return g.groupby("customer_id", as_index=False, observed=True).tail(1).reset_index(drop=True)
+
+# ---------------- agregado diario ----------------
+# Una fila por (cliente, día, dirección, tipo, moneda) con lo que las reglas de ventana sacaban
+# re-muestreando las tx (conteos, sumas, montos redondos). Se arma una vez por CSV y
+# sub-subsegmento; cada regla filtra sus filas (daily_table) y arma su panel con
+# DailyPanel.from_daily en vez de agrupar las tx de nuevo. Dirección/tipo/moneda nulas se
+# conservan como su propia fila. "date" es el inicio del día en la zona de tx_date_time
+# (sin zona si el CSV no la trae), para que el panel devuelva fechas como las de las tx.
+ROUND_UNIT = 1000
+DAILY_KEYS = ["customer_id", DAY_COL, "tx_direction", "tx_type", "tx_currency"]
+DAILY_VALUES = ["n", "n_amt", "sum", "abs_sum", "round_n", "round_sum"]
+
+def round_amount(amount) -> np.ndarray:
+    """Monto redondo en moneda original: mod(tx_amount, ROUND_UNIT) = 0 (nulo → 0.0001, no redondo)."""
+    amt = pd.to_numeric(pd.Series(amount), errors="coerce").fillna(0.0001)
+    return (np.isfinite(amt) & np.isclose(amt % ROUND_UNIT, 0, atol=1e-9)).to_numpy()
+
+def daily_metrics(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Agregado diario (DAILY_KEYS + date, filas con cliente y fecha) con
+      n          nº de tx             n_amt      nº con tx_base_amount
+      sum        Σ tx_base_amount     abs_sum    Σ |tx_base_amount|
+      round_n    nº de montos redondos (con tx_base_amount)   round_sum  su Σ |tx_base_amount|
+    Las sumas van en el orden de las filas (como DailyPanel.daily_sum sobre las tx).
+    """
+    miss = [c for c in ("customer_id", "tx_date_time", "tx_amount", "tx_base_amount") if c not in df.columns]
+    if miss:
+        raise KeyError(f"Faltan columnas para el agregado diario: {miss}")
+    keys = [k for k in DAILY_KEYS if k in df.columns or k == DAY_COL]
+    g = df.loc[df["customer_id"].notna() & df["tx_date_time"].notna()]
+    if DAY_COL not in g.columns:
+        g = g.assign(**{DAY_COL: tx_days(g["tx_date_time"])})
+
+    gid = g.groupby(keys, sort=False, observed=True, dropna=False).ngroup().to_numpy(np.int64)
+    _, first = np.unique(gid, return_index=True)      # grupos en orden de aparición
+    n_groups = len(first)
+    a = pd.to_numeric(g["tx_base_amount"], errors="coerce").to_numpy(dtype=float)
+    has = ~np.isnan(a)
+    rnd = round_amount(g["tx_amount"]) & has
+    absa = np.abs(a)
+
+    def _sum(w, m):
+        return np.bincount(gid[m], weights=w[m], minlength=n_groups)
+    def _count(m):
+        return np.bincount(gid[m], minlength=n_groups).astype(np.int32)
+
+    out = g[keys].iloc[first].reset_index(drop=True)
+    out[DAY_COL] = out[DAY_COL].astype(np.int32)
+    date = pd.to_datetime(out[DAY_COL].to_numpy(np.int64), unit="D")
+    tz = getattr(g["tx_date_time"].dt, "tz", None)
+    out["date"] = date.tz_localize(tz) if tz is not None else date
+    return out.assign(n=_count(np.ones(len(g), bool)), n_amt=_count(has), sum=_sum(a, has),
+                      abs_sum=_sum(absa, has), round_n=_count(rnd), round_sum=_sum(absa, rnd))
+
+def daily_table(src: Union[str, Path, pd.DataFrame, TxFrame],
+                subsubsegments: Optional[Union[str, Iterable[str]]] = None, *,
+                direction: Union[str, Iterable[str], None] = None,
+                tx_type: Union[str, Iterable[str], None] = None,
+                currency: Union[str, Iterable[str], None] = None,
+                cache: bool = True) -> pd.DataFrame:
+    """Filas del agregado diario (métrica "daily") con esa dirección/tipo/moneda, en su orden."""
+    D = get_metrics(src, "daily", subsubsegments, cache=cache)
+    m = np.ones(len(D), dtype=bool)
+    for col, vals in (("tx_direction", direction), ("tx_type", tx_type), ("tx_currency", currency)):
+        if vals is not None and col in D.columns:
+            m &= D[col].isin([vals] if isinstance(vals, str) else list(vals)).to_numpy()
+    return D if m.all() else D[m].reset_index(drop=True)
+
+# ---------------- extensión con filas nuevas ----------------
+# Con el CSV que solo creció al final (tx_cache.cache_parent), la métrica de la versión anterior
+# se extiende recalculando únicamente lo que tocan las filas nuevas:
+#   - panel clave × día: por clave afectada, desde c = min(primer día nuevo, último día previo + 1)
+#     con `reach` días de historia previa (lo que miran hacia atrás sus ventanas). Si la clave
+#     empieza antes de esa cola se agrega una fila "ancla" (no cuenta) para que el panel arranque
+#     donde corresponde y las medias usen los mismos días que el cálculo completo.
+#   - PGAV (por tx): por grupo, filas desde la primera fecha nueva con 7D de historia previa.
+#   - agregado diario: solo las celdas con filas nuevas, con todas sus filas (resultado exacto).
+# Ventanas largas (> windows.SHORT_WINDOW) y el rolling de PGAV suman en otro orden que el
+# cálculo completo: pueden diferir en el último decimal, nunca en conteos.
+
+def _panel_keys(M: pd.DataFrame) -> list:
+    return [c for c in ("customer_id", "counterparty_id") if c in M.columns]
+
+def _extend_panel(M_old: pd.DataFrame, old: pd.DataFrame, new: pd.DataFrame, *,
+                  rows, panel, reach: int, **kw) -> pd.DataFrame:
+    g_new = rows(new, **kw)
+    if g_new.empty:
+        return M_old
+    keys = _panel_keys(M_old) or ["customer_id"]
+    g_old = rows(old, **kw)
+
+    # por clave afectada: c = primer día a recalcular, lo = inicio de la historia necesaria
+    span = g_new.assign(_day=day_number(g_new["tx_date_time"])).groupby(keys, sort=False, observed=True)["_day"].min().rename("_d0")
+    prev = M_old.assign(_day=day_number(M_old["date"])).groupby(keys, sort=False, observed=True)["_day"].agg(["min", "max"])
+    span = span.to_frame().join(prev, how="left")
+    span["_c"] = np.where(span["max"].notna(), np.minimum(span["_d0"], span["max"] + 1), span["_d0"]).astype(np.int64)
+    span["_lo"] = span["_c"] - reach
+    span = span.reset_index()
+
+    tail = g_old.merge(span[keys + ["_lo"]], on=keys, how="inner")
+    tail = tail[day_number(tail["tx_date_time"]) >= tail["_lo"].to_numpy()].drop(columns="_lo")
+    anchor = span[span["min"].notna() & (span["min"] < span["_lo"])]
+    tz = getattr(g_new["tx_date_time"].dt, "tz", None)
+    anchor_ts = pd.to_datetime(anchor["_lo"].to_numpy(np.int64), unit="D")
+    anchors = anchor[keys].assign(tx_date_time=anchor_ts.tz_localize(tz) if tz is not None else anchor_ts)
+
+    sub = pd.concat([tail, g_new, anchors], ignore_index=True)
+    keep = np.r_[np.ones(len(tail) + len(g_new), bool), np.zeros(len(anchors), bool)]
+    M_sub = panel(sub, keep, **kw)
+
+    cut = span[keys + ["_c"]]
+    M_sub = M_sub.merge(cut, on=keys, how="left")
+    M_sub = M_sub[day_number(M_sub["date"]) >= M_sub["_c"].to_numpy()].drop(columns="_c")
+    c_old = M_old.merge(cut, on=keys, how="left")["_c"].fillna(np.inf).to_numpy()
+    M_keep = M_old[day_number(M_old["date"]) < c_old]
+
+    out = pd.concat([M_keep, M_sub], ignore_index=True)
+    # mismo orden que el cálculo completo: clave por primera aparición en las filas, luego fecha
+    seen = pd.concat([g_old[keys], g_new[keys]], ignore_index=True).drop_duplicates()
+    code = out[keys].merge(seen.assign(_o=np.arange(len(seen))), on=keys, how="left")["_o"].to_numpy()
+    return out.iloc[np.lexsort((day_number(out["date"]), code))].reset_index(drop=True)
+
+def _extend_pgav(M_old: pd.DataFrame, old: pd.DataFrame, new: pd.DataFrame, *, direction: str) -> pd.DataFrame:
+    g_new = _pgav_rows(new, direction=direction)
+    if g_new.empty:
+        return M_old
+    GROUP_COL = g_new.columns[0]
+    d0 = g_new.groupby(GROUP_COL, observed=True)["tx_date_time"].min().rename("_d0").reset_index()
+
+    g_old = _pgav_rows(old, direction=direction)
+    tail = g_old.merge(d0, on=GROUP_COL, how="inner")
+    tail = tail[tail["tx_date_time"] >= tail["_d0"] - pd.Timedelta(days=7)].drop(columns="_d0")
+    part = _pgav_rolling(pd.concat([tail, g_new], ignore_index=True))
+    part = part[part["tx_date_time"] >= part.merge(d0, on=GROUP_COL, how="left")["_d0"].to_numpy()]
+
+    d0_old = M_old.merge(d0, on=GROUP_COL, how="left")["_d0"]
+    M_keep = M_old[~(d0_old.notna() & (M_old["tx_date_time"] >= d0_old)).to_numpy()]
+    out = pd.concat([M_keep, part], ignore_index=True)
+    if not isinstance(out[GROUP_COL].dtype, pd.CategoricalDtype):
+        out[GROUP_COL] = out[GROUP_COL].astype("category")
+    return out.sort_values([GROUP_COL, "tx_date_time"], kind="stable").reset_index(drop=True)
+
+def _extend_last_balance(M_old: pd.DataFrame, old: pd.DataFrame, new: pd.DataFrame) -> pd.DataFrame:
+    return last_balance_metrics(pd.concat([M_old, new[M_old.columns]], ignore_index=True))
+
+def _daily_index(D: pd.DataFrame, keys: list) -> pd.MultiIndex:
+    # categorías de distintas cargas pueden no coincidir: se compara por texto
+    return pd.MultiIndex.from_arrays([D[k].to_numpy() if k == DAY_COL else D[k].astype(str).to_numpy()
+                                      for k in keys])
+
+def _extend_daily(M_old: pd.DataFrame, old: pd.DataFrame, new: pd.DataFrame) -> pd.DataFrame:
+    # celdas tocadas por las filas nuevas: se recalculan con sus filas previas + las nuevas
+    # (mismo orden de suma que el cálculo completo); celdas nuevas al final, en orden de aparición
+    D_new = daily_metrics(new)
+    if D_new.empty:
+        return M_old
+    keys = [k for k in DAILY_KEYS if k in M_old.columns]
+    if DAY_COL not in old.columns:
+        old = old.assign(**{DAY_COL: tx_days(old["tx_date_time"])})
+    tail = old[(old[DAY_COL] >= int(D_new[DAY_COL].min())).to_numpy()]
+    if len(tail):
+        tail = tail[_daily_index(tail, keys).isin(_daily_index(D_new, keys))]
+    part = daily_metrics(pd.concat([tail, new], ignore_index=True))
+
+    at = _daily_index(part, keys).get_indexer(_daily_index(M_old, keys))
+    out = M_old.copy()
+    upd = at >= 0
+    for c in DAILY_VALUES:
+        col = out[c].to_numpy().copy()
+        col[upd] = part[c].to_numpy()[at[upd]]
+        out[c] = col
+    fresh = part[_daily_index(M_old, keys).get_indexer(_daily_index(part, keys)) < 0]
+    out = pd.concat([out, fresh], ignore_index=True)
+    for k in keys:
+        if k != DAY_COL and not isinstance(out[k].dtype, pd.CategoricalDtype):
+            out[k] = out[k].astype("category")
+    return out
+
+def _panel_extender(rows, panel, reach) -> Callable[..., pd.DataFrame]:
+    def extend(M_old, old, new, **kw):
+        r = reach(**kw) if callable(reach) else reach
+        return _extend_panel(M_old, old, new, rows=rows, panel=panel, reach=r, **kw)
+    return extend
+
+# nombre -> (versión, builder(df del sub-subsegmento, **kw), extender(M_previa, df_previo, df_nuevo, **kw))
+# reach = días de historia que mira hacia atrás una celda (AVG177 desplazado 3 sobre S3: 3 + 177 + 2)
+METRICS: Dict[str, Tuple[int, Callable[..., pd.DataFrame], Optional[Callable[..., pd.DataFrame]]]] = {
+    "pgav":         (1, pgav_metrics,   _extend_pgav),
+    "hanum":        (1, hanum_metrics,  _panel_extender(_hanum_rows, _hanum_panel, 182)),
+    "hasum":        (1, hasum_metrics,  _panel_extender(_cash_rows, _hasum_panel, 182)),
+    "numcc":        (1, numcc_metrics,  _panel_extender(_numcc_rows, _numcc_panel,
+                                                        lambda window_days=14, **_: window_days)),
+    "hsum30":       (1, hsum30_metrics, _panel_extender(_cash_rows, _hsum30_panel, 30)),
+    "last_balance": (1, last_balance_metrics, _extend_last_balance),
+    "daily":        (2, daily_metrics,  _extend_daily),
+}
+
+# ---------------- store ----------------
+
+_MEM: Dict[str, pd.DataFrame] = {}
+_MEM_SOURCE: Dict[str, Tuple[str, set]] = {}    # CSV -> (hash vigente, digests suyos en _MEM)
+
+def _remember(path: str, source_hash: str, digest: str, M: pd.DataFrame) -> None:
+    """Guarda M en _MEM; si el CSV cambió, suelta las métricas de su versión anterior."""
+    held, digests = _MEM_SOURCE.get(path, (None, set()))
+    if held != source_hash:
+        for d in digests:
+            _MEM.pop(d, None)
+        digests = set()
+    digests.add(digest)
+    _MEM_SOURCE[path] = (source_hash, digests)
+    _MEM[digest] = M
+
+def _subs_key(subsubsegments) -> Optional[list]:
+    if subsubsegments is None:
+        return None
+    subs = [subsubsegments] if isinstance(subsubsegments, str) else subsubsegments
+    return sorted(set(map(str, subs)))
+
+def _digest(name: str, version: int, source_hash: str, subsubsegments, kw: Dict[str, Any]) -> str:
+    body = {"metric": name, "version": version, "schema": schema_tag(), "source": source_hash,
+            "subsubs": _subs_key(subsubsegments), "kw": {k: kw[k] for k in sorted(kw)}}
+    raw = json.dumps(body, sort_keys=True, default=str).encode("utf-8")
+    return hashlib.blake2b(raw, digest_size=12).hexdigest()
+
+def _metrics_path(src: Union[str, Path], name: str, version: int, digest: str) -> Path:
+    src = Path(src)
+    return src.parent / CACHE_DIRNAME / METRICS_DIRNAME / f"{src.stem}__{name}__v{version}__{digest}.feather"
+
+def _stored(src: Union[str, Path], name: str, version: int, digest: str) -> Optional[pd.DataFrame]:
+    if digest in _MEM:
+        return _MEM[digest]
+    data_p = _metrics_path(src, name, version, digest)
+    if _feather is not None and data_p.exists():
+        try:
+            os.utime(data_p)                               # LRU: último uso
+        except OSError:
+            pass
+        return _feather.read_table(str(data_p), memory_map=True).to_pandas()
+    return None
+
+def _from_parent(tx: TxFrame, name: str, subsubsegments, kw: Dict[str, Any]
+                 ) -> Tuple[Optional[pd.DataFrame], Optional[str]]:
+    """
+    (métrica de la versión anterior del CSV extendida con las filas nuevas, digest de la
+    anterior); (None, None) si no hay base.
+    """
+    version, _, extend = METRICS[name]
+    parent = cache_parent(tx.path, tx.fingerprint["hash"]) if extend is not None else None
+    if not parent:
+        return None, None
+    old_digest = _digest(name, version, parent["hash"], subsubsegments, kw)
+    M_old = _stored(tx.path, name, version, old_digest)
+    if M_old is None:
+        return None, None
+    parts = tx.split_rows(int(parent["rows"]))
+    if parts is None:
+        return None, None
+    old = TxFrame(parts[0]).select(subsubsegments)
+    new = TxFrame(parts[1]).select(subsubsegments)
+    return extend(M_old, old, new, **kw), old_digest
+
+def evict_metrics(src: Union[str, Path], max_mb: float = METRICS_CACHE_MAX_MB, *,
+                  keep: Optional[Path] = None) -> None:
+    """Borra las métricas guardadas menos usadas de la carpeta del CSV hasta quedar bajo max_mb (nunca `keep`)."""
+    files = []
+    for p in (Path(src).parent / CACHE_DIRNAME / METRICS_DIRNAME).glob("*.feather"):
+        try:
+            st = p.stat()
+        except OSError:
+            continue
+        files.append((st.st_mtime_ns, st.st_size, p))
+    total, limit = sum(size for _, size, _ in files), int(max_mb * 1024 * 1024)
+    for _, size, p in sorted(files):
+        if total <= limit:
+            break
+        if p == keep:
+            continue
+        try:
+            p.unlink()
+            total -= size
+        except OSError:         # p. ej. abierto (memory-mapped) en Windows
+            pass
+
+def get_metrics(
+    src: Union[str, Path, pd.DataFrame, TxFrame],
+    name: str,
+    subsubsegments: Optional[Union[str, Iterable[str]]],
+    *,
+    cache: bool = True,
+    **kw: Any,
+) -> pd.DataFrame:
+    """
+    Métrica `name` (ver METRICS) del sub-subsegmento. `src` puede ser la ruta del CSV (solo se
+    carga si la métrica no está guardada), un TxFrame o un DataFrame (este último sin caché).
+    Si el CSV es la versión anterior + filas nuevas y la métrica anterior está guardada, solo
+    se calcula lo que cambian las filas nuevas. Devuelve una copia superficial: se pueden
+    agregar/filtrar columnas sin tocar la caché.
+    """
+    if name not in METRICS:
+        raise KeyError(f"Métrica desconocida: {name}. Opciones: {sorted(METRICS)}")
+    version, build, _ = METRICS[name]
+
+    path, fp = None, None
+    if isinstance(src, TxFrame):
+        # un frame leído con filtros solo sirve para la caché si trae todas las filas del pedido
+        path, fp = src.path, (src.fingerprint if src.covers(subsubsegments) else None)
+    elif isinstance(src, (str, Path)):
+        path = str(src)
+        fp = source_fingerprint(path) if cache else None
+    if not cache or path is None or fp is None:
+        return build(as_tx_frame(src).select(subsubsegments), **kw)
+
+    digest = _digest(name, version, fp["hash"], subsubsegments, kw)
+    M = _stored(path, name, version, digest)
+    if M is None:
+        tx = as_tx_frame(src)
+        M, old_digest = (_from_parent(tx, name, subsubsegments, kw) if tx.fingerprint and tx.covers(subsubsegments)
+                         else (None, None))
+        if M is None:
+            M = build(tx.select(subsubsegments), **kw)
+        M = M.reset_index(drop=True)
+        if _feather is not None:
+            data_p = _metrics_path(path, name, version, digest)
+            data_p.parent.mkdir(parents=True, exist_ok=True)
+            _write_atomic(data_p, lambda p: _feather.write_feather(M, p, compression="uncompressed"))
+            if old_digest is not None:
+                # la versión anterior ya quedó extendida en la nueva: no se vuelve a usar
+                _MEM.pop(old_digest, None)
+                try:
+                    _metrics_path(path, name, version, old_digest).unlink()
+                except OSError:
+                    pass
+            evict_metrics(path, keep=data_p)
+    _remember(path, fp["hash"], digest, M)
+    return M.copy(deep=False)
+
+def clear_metrics(src: Optional[Union[str, Path]] = None) -> None:
+    """Vacía la caché en memoria y, si se da el CSV, borra sus métricas guardadas en disco."""
+    _MEM.clear()
+    _MEM_SOURCE.clear()
+    if src is not None:
+        d = Path(src).parent / CACHE_DIRNAME / METRICS_DIRNAME
+        for p in d.glob(f"{Path(src).stem}__*.feather"):
+            p.unlink()
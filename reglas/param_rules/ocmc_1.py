@@ -2,6 +2,8 @@ from __future__ import annotations
 import pandas as pd, numpy as np, math
 from collections import Counter, deque
 from typing import Iterable, Union, Dict, Any
+from tx_frame import as_tx_frame
+from quantiles import collector
 
 DEFAULT_PCTS = (0.50, 0.75, 0.90, 0.95, 0.97, 0.99)
 
@@ -15,18 +17,14 @@ def run_parameters_ocmc_1(
     percentiles: Iterable[float] = DEFAULT_PCTS,
     verbose: bool = False,
 ) -> Dict[str, Any]:
-    df = pd.read_csv(path, dtype={"customer_id":"string","counterparty_id":"string"}, encoding="utf-8-sig", low_memory=False)
-    df["tx_date_time"]  = pd.to_datetime(df["tx_date_time"], errors="coerce")
-
-    targets = set(_as_list(subsubsegments))
-    df = df[df["customer_sub_sub_type"].astype(str).isin(targets)].copy()
+    df = as_tx_frame(path).select(subsubsegments)
 
     mask = (df["tx_date_time"].notna() & df["customer_id"].notna() &
             df["counterparty_id"].notna() & (df["counterparty_id"].astype(str).str.upper().str.strip() != "NA"))
     g = df.loc[mask, ["customer_id","tx_date_time","counterparty_id"]].copy()
 
-    counts = []
-    for _, sub in g.groupby("customer_id", sort=False):
+    acc = collector()     # por cliente; con backend sketch no retiene todas las ventanas
+    for _, sub in g.groupby("customer_id", sort=False, observed=True):
         sub = sub.sort_values("tx_date_time")
         times = sub["tx_date_time"].to_numpy()
         cps   = sub["counterparty_id"].astype(str).to_numpy()
@@ -34,6 +32,7 @@ def run_parameters_ocmc_1(
         win = deque()
         freq = Counter()
         distinct = 0
+        counts = []
         for t, cp in zip(times, cps):
             win.append((t, cp))
             prev = freq[cp]; freq[cp] += 1
@@ -46,18 +45,18 @@ def run_parameters_ocmc_1(
                 if freq[cp0] == 0: distinct -= 1
 
             counts.append(distinct)
+        acc.update(counts)
 
-    s = pd.Series(counts, dtype=float)
-    if s.empty:
+    if len(acc) == 0:
         tbl = pd.DataFrame({"percentil":[f"p{int(p*100)}" for p in percentiles],
                             "Counterparties_30d":[np.nan]*len(percentiles),
                             "Ceil":[np.nan]*len(percentiles)})
         return {"meta":{"windows":0}, "percentiles": tbl}
 
-    q = s.quantile(list(percentiles))
+    q = acc.quantile(percentiles)
     tbl = pd.DataFrame({
         "percentil": [f"p{int(p*100)}" for p in percentiles],
         "Counterparties_30d": [q.get(p, np.nan) for p in percentiles],
         "Ceil": [int(math.ceil(q.get(p))) if pd.notna(q.get(p, np.nan)) else np.nan for p in percentiles]
     })
-    return {"meta":{"windows":int(len(s))}, "percentiles": tbl}
+    return {"meta":{"windows":int(len(acc))}, "percentiles": tbl}
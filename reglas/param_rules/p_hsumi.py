@@ -1,6 +1,9 @@
 from __future__ import annotations
 import pandas as pd, numpy as np
 from typing import Iterable, Union, Dict, Any
+from tx_frame import as_tx_frame
+from windows import DailyPanel
+from quantiles import quantile
 
 DEFAULT_PCTS = (0.85, 0.90, 0.95, 0.97, 0.99)
 
@@ -12,28 +15,16 @@ def run_parameters_p_hsumi(
     subsubsegments: Union[str, Iterable[str]],
     percentiles: Iterable[float] = DEFAULT_PCTS,
 ) -> Dict[str, Any]:
-    df = pd.read_csv(path, dtype={"customer_id":"string"}, encoding="utf-8-sig", low_memory=False)
-    df["tx_date_time"]   = pd.to_datetime(df["tx_date_time"], errors="coerce")
-    df["tx_base_amount"] = pd.to_numeric(df["tx_base_amount"], errors="coerce")
-    df["tx_direction"]   = df.get("tx_direction","").astype(str).str.title()
-    df["tx_type"]        = df.get("tx_type","").astype(str).str.title()
-
-    targets = set(_as_list(subsubsegments))
-    df = df[df["customer_sub_sub_type"].astype(str).isin(targets)].copy()
+    df = as_tx_frame(path).select(subsubsegments)
 
     g = df[df["tx_direction"].eq("Inbound") & df["tx_type"].eq("Cash")
            & df["tx_date_time"].notna() & df["tx_base_amount"].notna()][["customer_id","tx_date_time","tx_base_amount"]]
 
-    max_rows = []
-    for cid, sub in g.groupby("customer_id", sort=False):
-        daily = sub.set_index("tx_date_time")["tx_base_amount"].abs().resample("D").sum()
-        if daily.empty: continue
-        S30 = daily.rolling("30D").sum()
-        max_rows.append({"customer_id": cid, "S30_max": float(S30.max())})
-
-    R = pd.DataFrame(max_rows)
+    P = DailyPanel.build(g, "customer_id")
+    S30 = P.rolling_sum(P.daily_sum(g["tx_base_amount"].abs()), 30)
+    R = P.keys.assign(S30_max=P.group_max(S30))
     s = R["S30_max"].astype(float) if not R.empty else pd.Series(dtype=float)
-    q = s.quantile(list(percentiles)) if len(s) else pd.Series(index=list(percentiles), dtype=float)
+    q = quantile(s, percentiles)
     tbl = pd.DataFrame({"percentil":[f"p{int(p*100)}" for p in percentiles],
                         "Amount_30d_max_per_customer_CLP":[q.get(p, np.nan) for p in percentiles]})
     return {"meta":{"clients": int(s.shape[0])}, "percentiles": tbl}
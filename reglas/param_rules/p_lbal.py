@@ -1,6 +1,8 @@
 from __future__ import annotations
 import pandas as pd, numpy as np
 from typing import Iterable, Union, Dict, Any
+from tx_frame import as_tx_frame
+from quantiles import percentiles as percentiles_of
 
 DEFAULT_PCTS = (95, 97, 99)
 
@@ -12,14 +14,7 @@ def run_parameters_p_lbal(
     subsubsegments: Union[str, Iterable[str]],
     percentiles: Iterable[int] = DEFAULT_PCTS,
 ) -> Dict[str, Any]:
-    df = pd.read_csv(path, dtype={"customer_id":"string"}, encoding="utf-8-sig", low_memory=False)
-    targets = set(_as_list(subsubsegments))
-    df = df[df["customer_sub_sub_type"].astype(str).isin(targets)].copy()
-
-    df["tx_date_time"]   = pd.to_datetime(df.get("tx_date_time"), errors="coerce")
-    df["tx_base_amount"] = pd.to_numeric(df.get("tx_base_amount"), errors="coerce")
-    df["tx_direction"]   = df.get("tx_direction","").astype(str).str.title()
-    df["tx_type"]        = df.get("tx_type","").astype(str).str.title()
+    df = as_tx_frame(path).select(subsubsegments)
 
     mask = df["tx_direction"].eq("Inbound") & df["tx_type"].eq("Cash") & df["tx_base_amount"].notna()
     g = df.loc[mask, ["customer_id","tx_date_time","customer_account_balance","tx_base_amount"]].copy()
@@ -31,7 +26,7 @@ def run_parameters_p_lbal(
     g["tx_base_amount"] = g["tx_base_amount"].abs()
     s = (g["customer_account_balance"] + g["tx_base_amount"]).astype(float).dropna()
 
-    stats = {p: (float(np.percentile(s, p)) if len(s) else np.nan) for p in percentiles}
+    stats = percentiles_of(s, percentiles)
     tbl = pd.DataFrame({"percentil":[f"p{p}" for p in percentiles], "Balance_after_tx":[stats[p] for p in percentiles]})
     rec = int(round(stats.get(95, np.nan))) if np.isfinite(stats.get(95, np.nan)) else np.nan
     return {"meta":{"n": int(len(s)), "suggested_balance_p95": rec}, "percentiles": tbl}
@@ -1,6 +1,8 @@
 from __future__ import annotations
 import pandas as pd, numpy as np, math
 from typing import Iterable, Union, Dict, Any
+from tx_frame import as_tx_frame
+from quantiles import percentiles as percentiles_of
 
 DEFAULT_PCTS = (90, 95, 97, 99)
 
@@ -12,12 +14,8 @@ def run_parameters_p_lval(
     subsubsegments: Union[str, Iterable[str]],
     percentiles: Iterable[int] = DEFAULT_PCTS,
 ) -> Dict[str, Any]:
-    df = pd.read_csv(path, dtype={"customer_id":"string"}, encoding="utf-8-sig", low_memory=False)
-    targets = set(_as_list(subsubsegments))
-    df = df[df["customer_sub_sub_type"].astype(str).isin(targets)].copy()
+    df = as_tx_frame(path).select(subsubsegments)
 
-    df["tx_base_amount"] = pd.to_numeric(df["tx_base_amount"], errors="coerce")
-    df["customer_expected_amount"] = pd.to_numeric(df["customer_expected_amount"], errors="coerce")
     is_cash = (df["tx_type"].astype(str).str.title() == "Cash")
     m = df.loc[is_cash, ["customer_id","tx_base_amount","customer_expected_amount"]].dropna()
 
@@ -27,7 +25,7 @@ def run_parameters_p_lval(
                             "Factor_int":[np.nan]*len(percentiles)})
         return {"meta":{"n":0, "mean_int": np.nan, "suggested_factor": np.nan}, "percentiles": tbl}
 
-    exp_by_cust = (m.groupby("customer_id", as_index=False)["customer_expected_amount"].max()
+    exp_by_cust = (m.groupby("customer_id", as_index=False, observed=True)["customer_expected_amount"].max()
                      .rename(columns={"customer_expected_amount":"expected_max"}))
     m = m.merge(exp_by_cust, on="customer_id", how="left")
     m = m[(m["expected_max"] > 0) & (m["tx_base_amount"] > 0)].copy()
@@ -43,8 +41,8 @@ def run_parameters_p_lval(
     s_raw = m["factor_raw"].astype(float).replace([np.inf,-np.inf], np.nan).dropna()
     s_int = m["factor_int"].astype(float).replace([np.inf,-np.inf], np.nan).dropna()
 
-    stats_raw = {p: float(np.percentile(s_raw, p)) for p in percentiles} if len(s_raw) else {}
-    stats_int = {p: float(np.percentile(s_int, p)) for p in percentiles} if len(s_int) else {}
+    stats_raw = percentiles_of(s_raw, percentiles) if len(s_raw) else {}
+    stats_int = percentiles_of(s_int, percentiles) if len(s_int) else {}
 
     tbl = pd.DataFrame({
         "percentil":[f"p{p}" for p in percentiles],
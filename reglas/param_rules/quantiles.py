@@ -0,0 +1,187 @@
+# quantiles.py
+"""
+Percentiles de las tablas de parametrización: exactos (pandas/NumPy) o con un sketch KLL
+de memoria acotada para series de cientos de millones de ventanas.
+
+    q = quantile(s, (0.85, 0.90, 0.99))   # pd.Series indexada por q, como s.quantile(list(qs))
+    v = percentile(s, 95)                 # float, como np.percentile(s, 95)
+
+    set_backend("sketch", eps=0.001)      # error de rango ~eps (p99 → entre p98.9 y p99.1)
+    set_backend("exact")                  # por defecto: mismos números que pandas/NumPy
+
+Para juntar valores por bloques, clientes o workers sin retenerlos todos:
+
+    acc = collector()                     # exacto: junta arreglos; sketch: KLLSketch
+    for bloque in ...: acc.update(bloque)
+    acc.merge(otro_acc);  acc.quantile(qs)
+
+Serie vacía → NaN (como las guardas `if len(s) else NaN` de cada regla).
+"""
+from __future__ import annotations
+import math
+from typing import Iterable, List, Optional
+import numpy as np
+import pandas as pd
+
+BACKENDS = ("exact", "sketch")
+DEFAULT_EPS = 0.001
+SKETCH_BLOCK = 1 << 20       # valores por actualización del sketch (acota la memoria temporal)
+
+_BACKEND = "exact"
+_EPS = DEFAULT_EPS
+_SEED = 0
+
+def set_backend(mode: str = "exact", *, eps: float = DEFAULT_EPS, seed: int = 0) -> None:
+    """Backend de percentiles del proceso (los workers lo reciben en su initializer)."""
+    global _BACKEND, _EPS, _SEED
+    if mode not in BACKENDS:
+        raise ValueError(f"backend debe ser uno de {BACKENDS}: {mode!r}")
+    if not 0 < eps < 1:
+        raise ValueError(f"eps debe estar en (0, 1): {eps!r}")
+    _BACKEND, _EPS, _SEED = mode, float(eps), int(seed)
+
+def get_backend() -> tuple:
+    """(modo, eps, seed) actual; sirve como initargs para set_backend en otro proceso."""
+    return _BACKEND, _EPS, _SEED
+
+def _values(x) -> np.ndarray:
+    v = np.asarray(x, dtype=float).ravel()
+    return v[~np.isnan(v)]
+
+# ---------------- sketch ----------------
+
+class KLLSketch:
+    """
+    Sketch KLL de cuantiles (Karnin–Lang–Liberty): compactadores por nivel; el nivel h guarda
+    ítems de peso 2^h y, al llenarse, se ordena y sube uno de cada dos (offset aleatorio).
+    Memoria O(k) ítems, error de rango ~1.65/k con alta probabilidad; mergeable.
+    """
+
+    def __init__(self, k: Optional[int] = None, *, eps: float = DEFAULT_EPS, seed: int = 0):
+        self.k = int(k) if k is not None else max(8, int(math.ceil(1.65 / eps)))
+        self.n = 0
+        self.levels: List[np.ndarray] = [np.empty(0)]
+        self._rng = np.random.default_rng(seed)
+
+    @property
+    def eps(self) -> float:
+        return 1.65 / self.k
+
+    def __len__(self) -> int:
+        return self.n
+
+    def _capacity(self, h: int) -> int:
+        depth = len(self.levels) - 1 - h
+        return max(2, int(math.ceil(self.k * (2.0 / 3.0) ** depth)))
+
+    def _compress(self) -> None:
+        h = 0
+        while h < len(self.levels):
+            buf = self.levels[h]
+            if buf.size > self._capacity(h):
+                if h + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                buf = np.sort(buf)
+                rest = buf[:1] if buf.size % 2 else buf[:0]      # impar: uno queda en el nivel
+                even = buf[rest.size:]
+                up = even[int(self._rng.integers(2))::2]
+                self.levels[h + 1] = np.concatenate([self.levels[h + 1], up])
+                self.levels[h] = rest
+            h += 1
+
+    def update(self, values) -> "KLLSketch":
+        v = _values(values)
+        for i in range(0, v.size, SKETCH_BLOCK):
+            blk = v[i:i + SKETCH_BLOCK]
+            self.levels[0] = np.concatenate([self.levels[0], blk])
+            self.n += int(blk.size)
+            self._compress()
+        return self
+
+    def merge(self, other: "KLLSketch") -> "KLLSketch":
+        if other.k != self.k:
+            raise ValueError(f"No se pueden combinar sketches con distinto k: {self.k} vs {other.k}")
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for h, buf in enumerate(other.levels):
+            self.levels[h] = np.concatenate([self.levels[h], buf])
+        self.n += other.n
+        self._compress()
+        return self
+
+    def quantile(self, qs: Iterable[float]) -> pd.Series:
+        qs = list(qs)
+        if self.n == 0:
+            return pd.Series(index=qs, dtype=float)
+        items = np.concatenate(self.levels)
+        w = np.concatenate([np.full(b.size, 2.0 ** h) for h, b in enumerate(self.levels)])
+        order = np.argsort(items, kind="stable")
+        items, w = items[order], w[order]
+        # rango 0-based del centro de cada ítem (con peso 1 es su posición) e interpolación
+        # lineal en q·(n-1): sin compactar da exactamente lo mismo que pandas
+        rank = np.cumsum(w) - (w + 1.0) / 2.0
+        r = np.asarray(qs, dtype=float) * (self.n - 1)
+        return pd.Series(np.interp(r, rank, items), index=qs, dtype=float)
+
+    def percentile(self, p: float) -> float:
+        return float(self.quantile([p / 100.0]).iloc[0])
+
+class ExactCollector:
+    """Mismo API que KLLSketch pero guarda todo: percentiles idénticos a pandas/NumPy."""
+
+    def __init__(self):
+        self.parts: List[np.ndarray] = []
+        self.n = 0
+
+    def __len__(self) -> int:
+        return self.n
+
+    def update(self, values) -> "ExactCollector":
+        v = np.asarray(values, dtype=float).ravel()
+        self.parts.append(v)
+        self.n += int(v.size)
+        return self
+
+    def merge(self, other: "ExactCollector") -> "ExactCollector":
+        self.parts.extend(other.parts)
+        self.n += other.n
+        return self
+
+    def series(self) -> pd.Series:
+        return pd.Series(np.concatenate(self.parts) if self.parts else np.empty(0), dtype=float)
+
+    def quantile(self, qs: Iterable[float]) -> pd.Series:
+        return quantile(self.series(), qs, backend="exact")
+
+    def percentile(self, p: float) -> float:
+        return percentile(self.series(), p, backend="exact")
+
+def collector(backend: Optional[str] = None):
+    """Acumulador de valores según el backend activo (o el pedido)."""
+    if (backend or _BACKEND) == "sketch":
+        return KLLSketch(eps=_EPS, seed=_SEED)
+    return ExactCollector()
+
+# ---------------- funciones ----------------
+
+def quantile(s, qs: Iterable[float], *, backend: Optional[str] = None) -> pd.Series:
+    """pd.Series {q: valor} como `s.quantile(list(qs))`; NaN si `s` está vacía."""
+    qs = list(qs)
+    if (backend or _BACKEND) == "sketch":
+        return KLLSketch(eps=_EPS, seed=_SEED).update(s).quantile(qs)
+    s = s if isinstance(s, pd.Series) else pd.Series(s, dtype=float)
+    return s.quantile(qs) if len(s) else pd.Series(index=qs, dtype=float)
+
+def percentile(s, p: float, *, backend: Optional[str] = None) -> float:
+    """float como `np.percentile(s, p)` (p en 0–100); NaN si `s` está vacía."""
+    if (backend or _BACKEND) == "sketch":
+        return KLLSketch(eps=_EPS, seed=_SEED).update(s).percentile(p)
+    return float(np.percentile(s, p)) if len(s) else np.nan
+
+def percentiles(s, ps: Iterable[float], *, backend: Optional[str] = None) -> dict:
+    """{p: float} como `{p: float(np.percentile(s, p))}` (un solo sketch para todos los p)."""
+    ps = list(ps)
+    if (backend or _BACKEND) == "sketch":
+        q = KLLSketch(eps=_EPS, seed=_SEED).update(s).quantile([p / 100.0 for p in ps])
+        return dict(zip(ps, map(float, q.to_numpy())))
+    return {p: percentile(s, p, backend="exact") for p in ps}
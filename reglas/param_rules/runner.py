@@ -39,6 +39,23 @@ from stroteur import run_parameters_stroteur
 from strotusd import run_parameters_strotusd
 from sumcci import run_parameters_sumcci
 from sumcco import run_parameters_sumcco
+from tx_frame import as_tx_frame, load_tx_frame
+from quantiles import DEFAULT_EPS, get_backend, set_backend
+from bundle_store import write_bundles
+
+import os, sys, time, tracemalloc, warnings
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, Iterable, Optional
+
+try:
+    import yaml
+except ImportError:  # solo hace falta para leer parametrizacion.yaml
+    yaml = None
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
 
 # --- Helpers de guardado -------------------------------------------------------
 import json
@@ -77,11 +94,31 @@ def _df_to_numeric(df: pd.DataFrame) -> pd.DataFrame:
     return out
 
 
+def _bundle_records(df: pd.DataFrame) -> list:
+    """
+    Filas JSON de una tabla de percentiles (numérica, sin formato de display):
+    - 'percentil' siempre como string
+    - columnas numéricas (o texto que es todo número) como float, vacías como ""
+    - el resto (etiquetas de grupo, etc.) como string
+    """
+    out = {}
+    for c in df.columns:
+        s = df[c]
+        if str(c).lower() == "percentil":
+            out["percentil"] = s.astype(object).where(s.notna(), "").astype(str)
+            continue
+        num = s if pd.api.types.is_numeric_dtype(s) and not pd.api.types.is_bool_dtype(s) \
+            else pd.to_numeric(s, errors="coerce")
+        if num.notna().sum() == s.notna().sum():
+            out[c] = num.astype(float).astype(object).where(num.notna(), "")
+        else:
+            out[c] = s.astype(object).where(s.notna(), "").astype(str)
+    return pd.DataFrame(out, index=df.index).to_dict("records")
+
 def _bundle_from_results(results: dict, subsub: str, tx_path: str) -> dict:
     """
-    Convierte `results` (DFs ya formateados para display) a un JSON
-    con valores NUMÉRICOS por percentil/regla. Soporta que un valor sea
-    un DataFrame o un dict de DataFrames.
+    Convierte `results` (tablas numéricas de cada regla) a un JSON con valores por
+    percentil/regla. Soporta que un valor sea un DataFrame o un dict de DataFrames.
     """
     bundle = {
         "meta": {
@@ -92,53 +129,24 @@ def _bundle_from_results(results: dict, subsub: str, tx_path: str) -> dict:
         "rules": {}
     }
 
-    def df_to_dict(df: pd.DataFrame) -> dict:
-        """
-        Convierte un DataFrame (formateado para display) a una lista de filas JSON.
-        - Intenta parsear cada celda a número (quitando comas).
-        - Si no puede, la deja como string.
-        - 'percentil' siempre se serializa como string.
-        """
-        rows = []
-        for _, r in df.iterrows():
-            row = {}
-            for k, v in r.items():
-                if k.lower() == "percentil":
-                    row["percentil"] = "" if pd.isna(v) else str(v)
-                    continue
-
-                # Intento de parseo numérico por celda
-                s = "" if pd.isna(v) else str(v)
-                if s != "":
-                    # quita separadores de miles si los hubiera
-                    num = pd.to_numeric(s.replace(",", ""), errors="coerce")
-                else:
-                    num = pd.NA
-
-                if pd.notna(num):
-                    row[k] = float(num)
-                else:
-                    # deja el valor como string (etiquetas de grupo, etc.)
-                    row[k] = s
-            rows.append(row)
-        return {"percentiles": rows}
-
-
     for rule_name, obj in results.items():
         if isinstance(obj, dict):  # ej. reglas que devuelven {"number": DF, "amount": DF}
-            bundle["rules"][rule_name] = {}
-            for subname, df in obj.items():
-                bundle["rules"][rule_name][_sanitize_name(subname)] = df_to_dict(df)
+            bundle["rules"][rule_name] = {
+                _sanitize_name(subname): {"percentiles": _bundle_records(df)} for subname, df in obj.items()
+            }
         else:  # DataFrame
-            bundle["rules"][rule_name] = df_to_dict(obj)
+            bundle["rules"][rule_name] = {"percentiles": _bundle_records(obj)}
 
     return bundle
 
-def save_results_bundle(results: dict, out_dir: Path, subsub: str, tx_path: str) -> None:
+def save_results_bundle(results: dict, out_dir: Path, subsub: str, tx_path: str, *,
+                        store_root: Optional[Path] = None) -> None:
     """
     Guarda:
       - Un CSV por regla (o subtabla) con valores numéricos
       - Un JSON maestro con todo centralizado
+      - Si se da store_root (p. ej. outputs/params), el mismo bundle en su almacén columnar,
+        junto a los demás segmentos y generaciones (bundle_store.py)
     """
     out_dir.mkdir(parents=True, exist_ok=True)
 
@@ -159,8 +167,18 @@ def save_results_bundle(results: dict, out_dir: Path, subsub: str, tx_path: str)
     with open(json_path, "w", encoding="utf-8") as f:
         json.dump(bundle, f, ensure_ascii=False, indent=2)
 
+    # 3) Almacén columnar (opcional: requiere pyarrow)
+    store_path = None
+    if store_root is not None:
+        try:
+            store_path = write_bundles(Path(store_root), bundle)
+        except ImportError as e:
+            warnings.warn(f"Almacén de parámetros omitido: {e}")
+
     print(f"\n✔ Parámetros guardados en: {out_dir}")
     print(f"   - JSON maestro: {json_path.name}")
+    if store_path is not None:
+        print(f"   - Almacén: {store_path}")
     print(f"   - CSV por regla (n={len(list(out_dir.glob('*.csv')))} archivos)")
 
 def _fmt_thousands(v, decimals=0):
@@ -201,6 +219,8 @@ def _format_percentiles_any(x):
     return x
 
 def _print_result_block(name: str, obj):
+    """Imprime la tabla de una regla con separador de miles (el formato es solo de display)."""
+    obj = _format_percentiles_any(obj)
     print(f"\n— {name} —")
     if isinstance(obj, pd.DataFrame):
         print(obj.to_string(index=False))
@@ -215,84 +235,181 @@ def _print_result_block(name: str, obj):
     else:
         print(str(obj))
 
-def run_parametrization(tx_path: str, subsub: str):
-    results = {}
-
-    results["OUT>AVG"] = _format_percentiles(run_parameters_out_avg(tx_path, subsubsegments=subsub, verbose=False)["percentiles"])
-    print("OUT>AVG done.")
-    results["IN>AVG"]  = _format_percentiles(run_parameters_in_avg(tx_path,  subsubsegments=subsub, verbose=False)["percentiles"])
-    print("IN>AVG done.")
-    results["HNR-IN"]  = _format_percentiles(run_parameters_hnr_in(tx_path,  subsubsegments=subsub, verbose=False)["percentiles"])
-    print("HNR-IN done.")
-    results["HNR-OUT"] = _format_percentiles(run_parameters_hnr_out(tx_path, subsubsegments=subsub, verbose=False)["percentiles"])
-    print("HNR-OUT done.")
-    results["HANUMI"]  = _format_percentiles(run_parameters_hanumi(tx_path, subsubsegments=subsub)["percentiles"])
-    print("HANUMI done.")
-    results["HANUMO"]  = _format_percentiles(run_parameters_hanumo(tx_path, subsubsegments=subsub)["percentiles"])
-    print("HANUMO done.")
-    results["HASUMI"]  = _format_percentiles(run_parameters_hasumi(tx_path, subsubsegments=subsub)["percentiles"])
-    print("HASUMI done.")
-    results["HASUMO"]  = _format_percentiles(run_parameters_hasumo(tx_path, subsubsegments=subsub)["percentiles"])
-    print("HASUMO done.")
-    results["IN>%OUT"] = _format_percentiles(run_parameters_in_gt_out(tx_path, subsubsegments=subsub)["percentiles"])
-    print("IN>%OUT done.")
-    results["OUT>%IN"] = _format_percentiles(run_parameters_out_gt_in(tx_path, subsubsegments=subsub)["percentiles"])
-    print("OUT>%IN done.")
-    results["IN-OUT-1 Amount"] = _format_percentiles(run_parameters_in_out_1_amount(tx_path, subsubsegments=subsub)["percentiles"])
-    print("IN-OUT-1 Amount done.")
-    results["NUMCCI"]  = _format_percentiles(run_parameters_numcci(tx_path, subsubsegments=subsub)["percentiles"])
-    print("NUMCCI done.")
-    results["NUMCCO"]  = _format_percentiles(run_parameters_numcco(tx_path, subsubsegments=subsub)["percentiles"])
-    print("NUMCCO done.")
-    results["OCMC_1"]  = _format_percentiles(run_parameters_ocmc_1(tx_path, subsubsegments=subsub)["percentiles"])
-    print("OCMC_1 done.")
-    results["P-%BAL"]  = _format_percentiles(run_parameters_p_pct_bal(tx_path, subsubsegments=subsub)["percentiles"])
-    print("P-%BAL done.")
-    results["P-1st"]  = _format_percentiles(run_parameters_p_first(tx_path, subsubsegments=subsub)["percentiles"])
-    print("P-1st done.")
-    results["P-2nd"]  = _format_percentiles(run_parameters_p_second(tx_path, subsubsegments=subsub)["percentiles"])
-    print("P-2nd done.")
-    results["P-HSUMI"]= _format_percentiles(run_parameters_p_hsumi(tx_path, subsubsegments=subsub)["percentiles"])
-    print("P-HSUMI done.")
-    results["P-HSUMO"]= _format_percentiles(run_parameters_p_hsumo(tx_path, subsubsegments=subsub)["percentiles"])
-    print("P-HSUMO done.")
-    results["P-HVI"]  = _format_percentiles(run_parameters_p_hvi(tx_path, subsubsegments=subsub)["percentiles"])
-    print("P-HVI done.")
-    results["P-HVO"]  = _format_percentiles(run_parameters_p_hvo(tx_path, subsubsegments=subsub)["percentiles"])
-    print("P-HVO done.")
-    results["P-LBAL"] = _format_percentiles(run_parameters_p_lbal(tx_path, subsubsegments=subsub)["percentiles"])
-    print("P-LBAL done.")
-    results["P-LVAL"] = _format_percentiles(run_parameters_p_lval(tx_path, subsubsegments=subsub)["percentiles"])
-    print("P-LVAL done.")
-    results["P-TLI"]  = _format_percentiles(run_parameters_p_tli(tx_path, subsubsegments=subsub)["percentiles"])
-    print("P-TLI done.")
-    results["P-TLO"]  = _format_percentiles(run_parameters_p_tlo(tx_path, subsubsegments=subsub)["percentiles"])
-    print("P-TLO done.")
-    results["PGAV-IN"]= _format_percentiles_any(run_parameters_pgav_in(tx_path, subsubsegments=subsub)["percentiles"])
-    print("PGAV-IN done.")
-    results["PGAV-OUT"]= _format_percentiles_any(run_parameters_pgav_out(tx_path, subsubsegments=subsub)["percentiles"])
-    print("PGAV-OUT done.")
-    results["RVT-IN"] = _format_percentiles_any(run_parameters_rvt_in(tx_path, subsubsegments=subsub)["percentiles"])
-    print("RVT-IN done.")
-    results["RVT-OUT"]= _format_percentiles_any(run_parameters_rvt_out(tx_path, subsubsegments=subsub)["percentiles"])
-    print("RVT-OUT done.")
-    results["STRINCLP"]= _format_percentiles(run_parameters_strinclp(tx_path, subsubsegments=subsub)["percentiles"])
-    print("STRINCLP done.")
-    results["STRINEUR"]= _format_percentiles(run_parameters_strineur(tx_path, subsubsegments=subsub)["percentiles"])
-    print("STRINEUR done.")
-    results["STRINUSD"]= _format_percentiles(run_parameters_strinusd(tx_path, subsubsegments=subsub)["percentiles"])
-    print("STRINUSD done.")
-    results["STROTCLP"]= _format_percentiles(run_parameters_strotclp(tx_path, subsubsegments=subsub)["percentiles"])
-    print("STROTCLP done.")
-    results["STROTEUR"]= _format_percentiles(run_parameters_stroteur(tx_path, subsubsegments=subsub)["percentiles"])
-    print("STROTEUR done.")
-    results["STROTUSD"]= _format_percentiles(run_parameters_strotusd(tx_path, subsubsegments=subsub)["percentiles"])
-    print("STROTUSD done.")
-    results["SUMCCI"] = _format_percentiles(run_parameters_sumcci(tx_path, subsubsegments=subsub)["percentiles"])
-    print("SUMCCI done.")
-    results["SUMCCO"] = _format_percentiles(run_parameters_sumcco(tx_path, subsubsegments=subsub)["percentiles"])
-    print("SUMCCO done.")
-
+# (nombre, función, kwargs extra) — el orden define el orden de `results`
+RULES = [
+    ("OUT>AVG",         run_parameters_out_avg,            {"verbose": False}),
+    ("IN>AVG",          run_parameters_in_avg,             {"verbose": False}),
+    ("HNR-IN",          run_parameters_hnr_in,             {"verbose": False}),
+    ("HNR-OUT",         run_parameters_hnr_out,            {"verbose": False}),
+    ("HANUMI",          run_parameters_hanumi,             {}),
+    ("HANUMO",          run_parameters_hanumo,             {}),
+    ("HASUMI",          run_parameters_hasumi,             {}),
+    ("HASUMO",          run_parameters_hasumo,             {}),
+    ("IN>%OUT",         run_parameters_in_gt_out,          {}),
+    ("OUT>%IN",         run_parameters_out_gt_in,          {}),
+    ("IN-OUT-1 Amount", run_parameters_in_out_1_amount,    {}),
+    ("NUMCCI",          run_parameters_numcci,             {}),
+    ("NUMCCO",          run_parameters_numcco,             {}),
+    ("OCMC_1",          run_parameters_ocmc_1,             {}),
+    ("P-%BAL",          run_parameters_p_pct_bal,          {}),
+    ("P-1st",           run_parameters_p_first,            {}),
+    ("P-2nd",           run_parameters_p_second,           {}),
+    ("P-HSUMI",         run_parameters_p_hsumi,            {}),
+    ("P-HSUMO",         run_parameters_p_hsumo,            {}),
+    ("P-HVI",           run_parameters_p_hvi,              {}),
+    ("P-HVO",           run_parameters_p_hvo,              {}),
+    ("P-LBAL",          run_parameters_p_lbal,             {}),
+    ("P-LVAL",          run_parameters_p_lval,             {}),
+    ("P-TLI",           run_parameters_p_tli,              {}),
+    ("P-TLO",           run_parameters_p_tlo,              {}),
+    ("PGAV-IN",         run_parameters_pgav_in,            {}),
+    ("PGAV-OUT",        run_parameters_pgav_out,           {}),
+    ("RVT-IN",          run_parameters_rvt_in,             {}),
+    ("RVT-OUT",         run_parameters_rvt_out,            {}),
+    ("STRINCLP",        run_parameters_strinclp,           {}),
+    ("STRINEUR",        run_parameters_strineur,           {}),
+    ("STRINUSD",        run_parameters_strinusd,           {}),
+    ("STROTCLP",        run_parameters_strotclp,           {}),
+    ("STROTEUR",        run_parameters_stroteur,           {}),
+    ("STROTUSD",        run_parameters_strotusd,           {}),
+    ("SUMCCI",          run_parameters_sumcci,             {}),
+    ("SUMCCO",          run_parameters_sumcco,             {}),
+]
+
+EXECUTORS = ("serial", "process")
+
+# Sub-subsegmentos a parametrizar en run_parametrization_all (clave `subsubsegments`)
+CONFIG_PATH = Path(__file__).resolve().parent.parent / "params" / "parametrizacion.yaml"
+
+# TxFrame del proceso worker (heredado por fork o cargado en el initializer);
+# en run_parametrization_all es {subsub: TxFrame}
+_WORKER_TX = None
+
+def _segment_frames(tx, subsubs: Iterable[str]) -> dict:
+    """{subsub: TxFrame} con una sola partición del frame; los que no tienen filas quedan vacíos."""
+    parts = tx.partition()
+    empty = tx.df.iloc[:0]
+    return {s: parts[s] if s in parts else type(tx)(empty, tx.path, tx.fingerprint,
+                                                    {"subsubsegments": [s], "where": {}, "row_index": True})
+            for s in subsubs}
+
+def _init_worker(src, subsubs: Optional[tuple] = None, quantiles: Optional[tuple] = None) -> None:
+    global _WORKER_TX
+    if quantiles is not None:
+        mode, eps, seed = quantiles
+        set_backend(mode, eps=eps, seed=seed)
+    if _WORKER_TX is None:
+        tx = as_tx_frame(src)
+        _WORKER_TX = tx if subsubs is None else _segment_frames(tx, subsubs)
+
+def _max_rss_mb() -> Optional[float]:
+    """Máximo RSS del proceso desde que arrancó (no se reinicia entre reglas)."""
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(rss / (2**20 if sys.platform == "darwin" else 2**10), 1)
+
+def _run_rule(idx: int, tx, subsub: str, trace_memory: bool = False):
+    """Corre RULES[idx] y devuelve (idx, resultado formateado, stats)."""
+    name, fn, kwargs = RULES[idx]
+    tx = _WORKER_TX if tx is None else tx
+    if isinstance(tx, dict):
+        tx = tx[subsub]
+    # tracemalloc da el pico real de la regla pero la hace varias veces más lenta
+    if trace_memory:
+        tracemalloc.start()
+    t0 = time.perf_counter()
+    try:
+        out = fn(tx, subsubsegments=subsub, **kwargs)["percentiles"]
+    finally:
+        secs = time.perf_counter() - t0
+        peak = tracemalloc.get_traced_memory()[1] if trace_memory else None
+        if trace_memory:
+            tracemalloc.stop()
+    st = {
+        "subsub": subsub,
+        "rule": name,
+        "seconds": round(secs, 3),
+        "peak_mb": None if peak is None else round(peak / 2**20, 1),
+        # acumulado del proceso: en serie incluye el CSV y todas las reglas anteriores
+        "process_max_rss_mb": _max_rss_mb(),
+        "pid": os.getpid(),
+    }
+    return idx, out, st
+
+def run_parametrization(
+    tx_path: str,
+    subsub: str,
+    *,
+    executor: str = "serial",
+    max_workers: Optional[int] = None,
+    stats: Optional[list] = None,
+    trace_memory: bool = False,
+    mem_limit_mb: Optional[float] = None,
+    quantiles: Optional[str] = None,
+    quantile_eps: float = DEFAULT_EPS,
+):
+    """
+    executor="serial": reglas una tras otra en este proceso.
+    executor="process": reglas repartidas en un ProcessPoolExecutor; los workers leen el
+    mismo TxFrame (heredado por fork, o desde la caché memory-mapped de tx_cache).
+    `results` queda siempre en el orden de RULES, con las tablas numéricas de cada regla (el
+    separador de miles se aplica solo al imprimir). Si se pasa `stats` (lista), se agrega
+    un dict por regla con segundos, el máximo RSS acumulado del proceso que la corrió
+    (process_max_rss_mb: no es de la regla) y, con trace_memory=True, el pico de memoria
+    propio de la regla (peak_mb, tracemalloc).
+    Con mem_limit_mb el CSV se lee por bloques y solo se retienen las filas de `subsub`
+    (MemoryError si no caben en el tope); sin él se usa la copia columnar del CSV completo.
+    quantiles="exact" | "sketch" fija el backend de percentiles (ver quantiles.py; sketch con
+    error de rango ~quantile_eps); None deja el del proceso (exacto por defecto).
+    """
+    if executor not in EXECUTORS:
+        raise ValueError(f"executor debe ser uno de {EXECUTORS}: {executor!r}")
+    global _WORKER_TX
+    if quantiles is not None:
+        set_backend(quantiles, eps=quantile_eps)
+
+    # Un solo parseo del CSV; todas las reglas reciben el mismo TxFrame
+    if mem_limit_mb:
+        tx = load_tx_frame(tx_path, subsubsegments=subsub, mem_limit_mb=mem_limit_mb)
+    else:
+        tx = as_tx_frame(tx_path)
+    print(f"TX cargado: {len(tx):,} filas.")
+
+    done = [None] * len(RULES)
+    rule_stats = [None] * len(RULES)
+
+    def _collect(idx, out, st):
+        done[idx], rule_stats[idx] = out, st
+        if st["peak_mb"] is not None:
+            mem = f", pico {st['peak_mb']:.0f} MB"
+        elif st["process_max_rss_mb"] is not None:
+            mem = f", RSS máx. del proceso {st['process_max_rss_mb']:.0f} MB"
+        else:
+            mem = ""
+        print(f"{st['rule']} done ({st['seconds']:.1f}s{mem}).")
+
+    if executor == "serial":
+        for idx in range(len(RULES)):
+            _collect(*_run_rule(idx, tx, subsub, trace_memory))
+    else:
+        # con fork los workers heredan el frame ya cargado (copy-on-write);
+        # con spawn lo recargan desde la caché columnar del CSV (o reciben el frame ya filtrado)
+        _WORKER_TX = tx
+        tx.layout()     # orden (cliente, fecha) una vez; con fork los workers lo heredan
+        try:
+            src = tx.path if tx.path and tx.scope is None else tx
+            with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker,
+                                     initargs=(src, None, get_backend())) as pool:
+                futs = [pool.submit(_run_rule, idx, None, subsub, trace_memory) for idx in range(len(RULES))]
+                for fut in as_completed(futs):
+                    _collect(*fut.result())
+        finally:
+            _WORKER_TX = None
+
+    results = {RULES[i][0]: done[i] for i in range(len(RULES))}
+    if stats is not None:
+        stats.extend(rule_stats)
 
     # ---- Salida única, limpia ----
     print(f"\n=== Parametrización — sub-subsegmento: {subsub} ===")
@@ -301,6 +418,93 @@ def run_parametrization(tx_path: str, subsub: str):
 
     return results
 
+def load_subsubsegments(config_path=CONFIG_PATH) -> Optional[list]:
+    """Lista `subsubsegments` de parametrizacion.yaml (None si falta el archivo o la clave)."""
+    config_path = Path(config_path)
+    if not config_path.exists():
+        return None
+    if yaml is None:
+        raise ImportError(f"Se necesita PyYAML para leer {config_path.name} (pip install pyyaml).")
+    with open(config_path, "r", encoding="utf-8") as f:
+        cfg = yaml.safe_load(f) or {}
+    subs = cfg.get("subsubsegments")
+    return [str(s) for s in subs] if subs else None
+
+def run_parametrization_all(
+    tx_path: str,
+    subsubs: Optional[Iterable[str]] = None,
+    *,
+    out_root: Optional[Path] = None,
+    executor: str = "serial",
+    max_workers: Optional[int] = None,
+    stats: Optional[list] = None,
+    trace_memory: bool = False,
+    quantiles: Optional[str] = None,
+    quantile_eps: float = DEFAULT_EPS,
+    store_root: Optional[Path] = None,
+) -> Dict[str, dict]:
+    """
+    Parametriza varios sub-subsegmentos con una sola lectura del CSV: el TxFrame se parte una
+    vez por customer_sub_sub_type (TxFrame.partition) y cada regla recibe la parte de su
+    segmento en vez de volver a filtrar el archivo completo.
+    subsubs=None usa `subsubsegments` de parametrizacion.yaml y, si no está, todos los del CSV.
+    Con out_root escribe <out_root>/<SUBSUB>/params_<SUBSUB>.json de cada segmento y, con
+    store_root, también el almacén columnar (save_results_bundle).
+    Devuelve {subsub: results} (cada results igual al de run_parametrization).
+    executor="process" reparte los pares (segmento, regla) en un solo pool.
+    quantiles/quantile_eps como en run_parametrization.
+    """
+    if executor not in EXECUTORS:
+        raise ValueError(f"executor debe ser uno de {EXECUTORS}: {executor!r}")
+    global _WORKER_TX
+    if quantiles is not None:
+        set_backend(quantiles, eps=quantile_eps)
+
+    tx = as_tx_frame(tx_path)
+    if subsubs is None:
+        subsubs = load_subsubsegments() or sorted(tx.partition())
+    subsubs = [subsubs] if isinstance(subsubs, str) else list(dict.fromkeys(map(str, subsubs)))
+    frames = _segment_frames(tx, subsubs)
+    print(f"TX cargado: {len(tx):,} filas; sub-subsegmentos: " +
+          ", ".join(f"{s} ({len(frames[s]):,})" for s in subsubs))
+
+    jobs = [(s, idx) for s in subsubs for idx in range(len(RULES))]
+    done, job_stats = {}, {}
+
+    def _collect(sub, idx, out, st):
+        done[sub, idx], job_stats[sub, idx] = out, st
+
+    t0 = time.perf_counter()
+    if executor == "serial":
+        for sub, idx in jobs:
+            _collect(sub, *_run_rule(idx, frames[sub], sub, trace_memory))
+    else:
+        _WORKER_TX = frames
+        for f in frames.values():
+            f.layout()
+        try:
+            src = tx.path if tx.path else tx
+            with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker,
+                                     initargs=(src, tuple(subsubs), get_backend())) as pool:
+                futs = {pool.submit(_run_rule, idx, None, sub, trace_memory): sub for sub, idx in jobs}
+                for fut in as_completed(futs):
+                    _collect(futs[fut], *fut.result())
+        finally:
+            _WORKER_TX = None
+
+    out = {}
+    for sub in subsubs:
+        out[sub] = {RULES[i][0]: done[sub, i] for i in range(len(RULES))}
+        secs = sum(job_stats[sub, i]["seconds"] for i in range(len(RULES)))
+        print(f"{sub}: {len(RULES)} reglas ({secs:.1f}s de cómputo).")
+        if out_root is not None:
+            save_results_bundle(out[sub], Path(out_root) / sub, subsub=sub, tx_path=str(tx_path),
+                                store_root=store_root)
+    print(f"Total: {time.perf_counter() - t0:.1f}s.")
+    if stats is not None:
+        stats.extend(job_stats[j] for j in jobs)
+    return out
+
 if __name__ == "__main__": 
     # EDITA SOLO ESTAS DOS VARIABLES
     SUBSUB   = "I-2"
@@ -311,8 +515,33 @@ if __name__ == "__main__":
     if not TX_PATH.exists():
         raise FileNotFoundError(f"No encuentro el CSV en: {TX_PATH}")
 
-    res = run_parametrization(str(TX_PATH), SUBSUB)
+    # "serial" | "process" (una regla por worker; None = os.cpu_count())
+    EXECUTOR    = "serial"
+    MAX_WORKERS = None
+    # True: pico de memoria propio de cada regla (tracemalloc; bastante más lento)
+    TRACE_MEMORY = False
+    # MB para leer el CSV por bloques reteniendo solo SUBSUB (equipos con poca RAM); None = todo el CSV
+    MEM_LIMIT_MB = None
+    # "exact" | "sketch" (percentiles KLL de memoria acotada, error de rango ~QUANTILE_EPS)
+    QUANTILES    = "exact"
+    QUANTILE_EPS = 0.001
+
+    # True: todos los sub-subsegmentos de parametrizacion.yaml en una sola lectura (ignora SUBSUB)
+    ALL_SUBSUBS = False
+    if ALL_SUBSUBS:
+        run_parametrization_all(str(TX_PATH), out_root=ROOT / "outputs" / "params",
+                                store_root=ROOT / "outputs" / "params",
+                                executor=EXECUTOR, max_workers=MAX_WORKERS, trace_memory=TRACE_MEMORY,
+                                quantiles=QUANTILES, quantile_eps=QUANTILE_EPS)
+        sys.exit(0)
+
+    stats = []
+    res = run_parametrization(str(TX_PATH), SUBSUB, executor=EXECUTOR, max_workers=MAX_WORKERS, stats=stats,
+                              trace_memory=TRACE_MEMORY, mem_limit_mb=MEM_LIMIT_MB, quantiles=QUANTILES, quantile_eps=QUANTILE_EPS)
+
+    print("\n=== Tiempos por regla (más lentas primero) ===")
+    print(pd.DataFrame(stats).sort_values("seconds", ascending=False).to_string(index=False))
 
     # Guarda todo en carpeta de salida (puedes cambiar esta ruta si quieres)
     OUT_DIR = ROOT / "outputs" / "params" / SUBSUB
-    save_results_bundle(res, OUT_DIR, subsub=SUBSUB, tx_path=str(TX_PATH))
+    save_results_bundle(res, OUT_DIR, subsub=SUBSUB, tx_path=str(TX_PATH), store_root=ROOT / "outputs" / "params")
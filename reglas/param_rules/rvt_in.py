@@ -1,26 +1,15 @@
 from __future__ import annotations
 import pandas as pd, numpy as np, math
 from typing import Iterable, Union, Dict, Any
+from tx_frame import as_tx_frame
+from kernels import max_count_window, max_sum_window
+from quantiles import percentile
 
 NUM_QS_DEF = (0.95, 0.97, 0.99)
 AMT_QS_DEF = (0.95, 0.97, 0.99)
 
 def _as_list(x): return [x] if isinstance(x, str) else list(map(str, x))
 
-def _max_count_sum_30d(ts: np.ndarray, amts: np.ndarray, days=30):
-    if ts.size == 0: return (0, 0.0)
-    idx = np.argsort(ts); ts = ts[idx]; amts = amts[idx]
-    j = 0; best_c = 0; best_s = 0.0
-    prefix = np.concatenate([[0.0], np.cumsum(amts)])
-    delta = np.timedelta64(days, "D")
-    for i in range(ts.size):
-        end = ts[i] + delta
-        while j < ts.size and ts[j] <= end: j += 1
-        c = j - i; s = prefix[j] - prefix[i]
-        if c > best_c: best_c = c
-        if s > best_s: best_s = s
-    return (best_c, best_s)
-
 def run_parameters_rvt_in(
     path: str,
     *,
@@ -29,20 +18,13 @@ def run_parameters_rvt_in(
     number_qs: Iterable[float] = NUM_QS_DEF,
     amount_qs: Iterable[float] = AMT_QS_DEF,
 ) -> Dict[str, Any]:
-    df = pd.read_csv(path, dtype={"customer_id":"string"}, encoding="utf-8-sig", low_memory=False)
-    df["tx_date_time"]   = pd.to_datetime(df.get("tx_date_time"), errors="coerce")
-    df["tx_amount"]      = pd.to_numeric(df.get("tx_amount"), errors="coerce")
-    df["tx_base_amount"] = pd.to_numeric(df.get("tx_base_amount"), errors="coerce")
-    df["tx_direction"]   = df.get("tx_direction","").astype(str).str.title()
-    df["tx_type"]        = df.get("tx_type","").astype(str).str.title()
-
-    targets = set(_as_list(subsubsegments))
-    df = df[df["customer_sub_sub_type"].astype(str).isin(targets)].copy()
+    tx = as_tx_frame(path)
+    df = tx.select(subsubsegments)
 
     is_round = np.isfinite(df["tx_amount"]) & np.isclose(df["tx_amount"] % 1000.0, 0.0, atol=1e-9)
     m = (df["tx_direction"].eq("Inbound") & df["tx_type"].eq("Cash") & is_round &
          df["tx_date_time"].notna() & df["tx_base_amount"].notna() & df["customer_id"].notna())
-    g = df.loc[m, ["customer_id","tx_date_time","tx_base_amount"]].sort_values(["customer_id","tx_date_time"]).copy()
+    g = df.loc[m, ["customer_id","tx_date_time","tx_base_amount"]].copy()
     if g.empty:
         tblN = pd.DataFrame({"percentil":[f"p{int(p*100)}" for p in number_qs],
                              "Number_raw":[np.nan]*len(number_qs),
@@ -52,15 +34,13 @@ def run_parameters_rvt_in(
         return {"meta":{"clients":0}, "percentiles":{"number": tblN, "amount": tblA}}
 
     g["amt"] = g["tx_base_amount"].abs().astype(float)
-    out_rows=[]
-    for cid, sub in g.groupby("customer_id", sort=False):
-        mc, ms = _max_count_sum_30d(sub["tx_date_time"].values, sub["amt"].values, window_days)
-        out_rows.append({"customer_id": cid, "max_count_30d": mc, "max_sum_30d": ms})
-
-    res = pd.DataFrame(out_rows)
+    order, ts, off = tx.layout().group(g, "customer_id")
+    amt = g["amt"].to_numpy()[order]
+    res = pd.DataFrame({"max_count_30d": max_count_window(ts, off, window_days),
+                        "max_sum_30d": max_sum_window(ts, off, amt, window_days)})
     sN = res["max_count_30d"].astype(float); sA = res["max_sum_30d"].astype(float)
-    qN = {p: (float(np.percentile(sN, int(p*100))) if len(sN) else np.nan) for p in number_qs}
-    qA = {p: (float(np.percentile(sA, int(p*100))) if len(sA) else np.nan) for p in amount_qs}
+    qN = {p: percentile(sN, int(p*100)) for p in number_qs}
+    qA = {p: percentile(sA, int(p*100)) for p in amount_qs}
 
     df_number = pd.DataFrame({
         "percentil":[f"p{int(p*100)}" for p in number_qs],
@@ -0,0 +1,165 @@
+# tx_cache.py
+from __future__ import annotations
+import hashlib, json, os
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Optional, Union
+import pandas as pd
+
+try:
+    import pyarrow.feather as _feather
+except ImportError:  # sin pyarrow no hay caché: se parsea el CSV cada vez
+    _feather = None
+
+CACHE_DIRNAME = ".tx_cache"
+HASH_CHUNK    = 8 * 1024 * 1024
+
+def cache_available() -> bool:
+    return _feather is not None
+
+def file_hash(path: Union[str, Path]) -> str:
+    """blake2b del contenido (por bloques, no carga el archivo completo)."""
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+def fingerprint(path: Union[str, Path], manifest: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    {size, mtime_ns, hash} del CSV fuente. Si size/mtime coinciden con el manifest
+    se reutiliza su hash; si no, se recalcula sobre el contenido.
+    """
+    st = os.stat(path)
+    fp = {"size": int(st.st_size), "mtime_ns": int(st.st_mtime_ns)}
+    if manifest and manifest.get("size") == fp["size"] and manifest.get("mtime_ns") == fp["mtime_ns"] and manifest.get("hash"):
+        fp["hash"] = manifest["hash"]
+    else:
+        fp["hash"] = file_hash(path)
+    return fp
+
+def _paths(src: Path, schema: Union[int, str]) -> tuple[Path, Path]:
+    d = src.parent / CACHE_DIRNAME
+    return d / f"{src.name}.manifest.json", d / f"{src.name}__v{schema}.feather"
+
+def source_fingerprint(src: Union[str, Path]) -> Dict[str, Any]:
+    """Fingerprint del CSV sin cargarlo (reutiliza el hash del manifest si size/mtime coinciden)."""
+    src = Path(src)
+    manifest_p, _ = _paths(src, 0)
+    return fingerprint(src, _read_manifest(manifest_p))
+
+def _read_manifest(p: Path) -> Optional[Dict[str, Any]]:
+    try:
+        with open(p, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def _write_atomic(p: Path, write: Callable[[str], None]) -> None:
+    tmp = p.with_name(p.name + f".tmp{os.getpid()}")
+    try:
+        write(str(tmp))
+        os.replace(tmp, p)
+    finally:
+        if tmp.exists():
+            tmp.unlink()
+
+def _is_append(src: Path, manifest: Dict[str, Any]) -> bool:
+    """True si el CSV actual es el del manifest + filas nuevas al final (mismo prefijo byte a byte)."""
+    size, h = manifest.get("size"), manifest.get("hash")
+    if not size or not h or os.stat(src).st_size <= size:
+        return False
+    ph = hashlib.blake2b(digest_size=16)
+    with open(src, "rb") as f:
+        left = int(size)
+        while left:
+            chunk = f.read(min(HASH_CHUNK, left))
+            if not chunk:
+                return False
+            ph.update(chunk)
+            left -= len(chunk)
+        f.seek(int(size) - 1)
+        ends_line = f.read(1) == b"\n"
+    return ends_line and ph.hexdigest() == h
+
+def cache_parent(src: Union[str, Path], source_hash: str) -> Optional[Dict[str, Any]]:
+    """
+    {hash, size, rows} de la versión anterior del CSV si la caché de `source_hash` se armó
+    agregando filas a esa versión (las filas previas son las primeras `rows`); si no, None.
+    """
+    manifest = _read_manifest(_paths(Path(src), 0)[0])
+    if manifest and manifest.get("hash") == source_hash:
+        return manifest.get("parent")
+    return None
+
+def _read_feather(p: Path, columns: Optional[list[str]], filter: Any, filter_columns: Iterable[str] = ()) -> pd.DataFrame:
+    read = None if columns is None else list(dict.fromkeys([*columns, *filter_columns]))
+    table = _feather.read_table(str(p), columns=read, memory_map=True)
+    if callable(filter):
+        filter = filter(table.schema)
+    if filter is not None:
+        table = table.filter(filter)
+    if columns is not None and table.column_names != list(columns):
+        table = table.select(list(columns))
+    return table.to_pandas()
+
+def read_cached(
+    src: Union[str, Path],
+    build: Callable[[], pd.DataFrame],
+    *,
+    schema: Union[int, str],
+    append: Optional[Callable[[pd.DataFrame, int], pd.DataFrame]] = None,
+    columns: Optional[list[str]] = None,
+    filter: Any = None,
+    filter_columns: Iterable[str] = (),
+) -> tuple[pd.DataFrame, Dict[str, Any]]:
+    """
+    Devuelve (df, fingerprint). Si existe un .feather válido para el mismo contenido y
+    versión de esquema se lee memory-mapped; si no, se construye con build() y se guarda.
+    Si el CSV solo creció al final (carga mensual) y se da `append(df_anterior, offset)`,
+    se parsean solo los bytes nuevos y el manifest guarda la versión anterior como `parent`.
+    `columns` / `filter` (expresión de pyarrow.compute sobre `columns` + `filter_columns`, o
+    función del esquema Arrow que la devuelve) se aplican sobre la tabla Arrow antes de pasar
+    a pandas: solo se convierten las columnas y filas pedidas. Sin pyarrow se ignoran (el
+    llamador filtra).
+    """
+    src = Path(src)
+    manifest_p, data_p = _paths(src, schema)
+    manifest = _read_manifest(manifest_p)
+    fp = fingerprint(src, manifest)
+
+    if _feather is None:
+        return build(), fp
+
+    if manifest and manifest.get("hash") == fp["hash"] and manifest.get("schema") == schema and data_p.exists():
+        df = _read_feather(data_p, columns, filter, filter_columns)
+        if manifest.get("size") != fp["size"] or manifest.get("mtime_ns") != fp["mtime_ns"]:
+            # mismo contenido con otro mtime (copia/touch): solo se actualiza el manifest
+            _write_manifest(manifest_p, fp, schema, int(manifest.get("rows", 0)), manifest.get("parent"))
+        return df, fp
+
+    parent = None
+    if (append is not None and manifest and manifest.get("schema") == schema and data_p.exists()
+            and _is_append(src, manifest)):
+        # sin memory_map: el archivo se reemplaza más abajo
+        old = _feather.read_table(str(data_p)).to_pandas()
+        df = append(old, int(manifest["size"]))
+        parent = {"hash": manifest["hash"], "size": int(manifest["size"]), "rows": int(len(old))}
+    else:
+        df = build()
+    data_p.parent.mkdir(parents=True, exist_ok=True)
+    # sin compresión para poder mapear el archivo en memoria
+    _write_atomic(data_p, lambda p: _feather.write_feather(df.reset_index(drop=True), p, compression="uncompressed"))
+    _write_manifest(manifest_p, fp, schema, len(df), parent)
+    if columns is not None or filter is not None:
+        df = _read_feather(data_p, columns, filter, filter_columns)
+    return df, fp
+
+def _write_manifest(p: Path, fp: Dict[str, Any], schema: Union[int, str], rows: int,
+                    parent: Optional[Dict[str, Any]] = None) -> None:
+    body = dict(fp, schema=schema, rows=int(rows))
+    if parent:
+        body["parent"] = parent
+    def write(tmp: str) -> None:
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(body, f, indent=2)
+    _write_atomic(p, write)
@@ -0,0 +1,401 @@
+# tx_frame.py
+from __future__ import annotations
+import io
+import numpy as np
+import pandas as pd
+from pandas.tseries.api import guess_datetime_format
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional, Union
+from tx_cache import read_cached, source_fingerprint, cache_available
+from windows import DAY_COL, day_number
+
+try:
+    import pyarrow.compute as _pc
+except ImportError:
+    _pc = None
+
+# Normalización común a todas las reglas (antes repetida en cada módulo)
+READ_DTYPES = {"customer_id": "string", "counterparty_id": "string"}
+DATE_COLS   = ("tx_date_time", "customer_account_creation_date")
+NUM_COLS    = ("tx_amount", "tx_base_amount", "customer_account_balance", "customer_expected_amount")
+TITLE_COLS  = ("tx_direction", "tx_type")
+UPPER_COLS  = ("tx_currency",)
+SUBSUB_COL  = "customer_sub_sub_type"
+
+# Esquema compacto (caché, TxFrame, vistas):
+#   - texto repetido como categórica (códigos enteros + diccionario); customer_id.cat.codes es
+#     el código entero del cliente. Agrupar por estas columnas siempre con observed=True.
+#   - DAY_COL (windows.py): día calendario UTC de tx_date_time (int32, días desde 1970-01-01), NO_DAY si es nula
+#   - AMOUNT_DTYPE: "float32" reduce a la mitad los montos (~7 dígitos significativos: montos
+#     CLP de 1e8+ pierden unidades); por defecto "float64", igual que el CSV
+CAT_COLS    = ("tx_direction", "tx_type", "tx_currency", SUBSUB_COL,
+               "customer_id", "counterparty_id", "customer_name", "customer_type")
+NO_DAY      = np.iinfo(np.int32).min
+AMOUNT_DTYPE = "float64"
+
+# Columnas que leen las reglas (el resto del extracto se descarta en la lectura por bloques)
+TX_COLUMNS  = (
+    "customer_id", "customer_name", "customer_type", SUBSUB_COL, "customer_account_creation_date",
+    "customer_account_balance", "customer_expected_amount", "counterparty_id",
+    "tx_date_time", "tx_amount", "tx_base_amount", "tx_direction", "tx_type", "tx_currency",
+)
+
+# Lectura por bloques: filas de muestra para estimar bytes/fila y fracción del tope por bloque crudo
+SAMPLE_ROWS = 5_000
+CHUNK_SHARE = 0.25
+MIN_CHUNK_ROWS = 1_000
+
+# Subir cuando cambie normalize_tx: invalida la caché columnar
+SCHEMA_VERSION = 2
+
+def schema_tag() -> Union[int, str]:
+    """Versión de la caché columnar (y de las métricas): SCHEMA_VERSION + precisión de montos."""
+    return SCHEMA_VERSION if AMOUNT_DTYPE == "float64" else f"{SCHEMA_VERSION}{AMOUNT_DTYPE}"
+
+def _as_list(x: Union[str, Iterable[str]]) -> list[str]:
+    if isinstance(x, str):
+        return [x]
+    return list(map(str, x))
+
+def _categorical(s: pd.Series) -> pd.Series:
+    # categorías siempre object, como vuelven de la caché Arrow: astype(str) da lo mismo
+    # (nulos → "nan") venga el frame del CSV, de la caché o de la lectura por bloques
+    return s.astype(object).astype("category")
+
+def normalize_tx(df: pd.DataFrame, date_formats: Optional[Dict[str, Optional[str]]] = None) -> pd.DataFrame:
+    """
+    Tipa en su lugar las columnas conocidas según el esquema compacto (fechas + DAY_COL,
+    montos en AMOUNT_DTYPE, texto repetido como categórica).
+    `date_formats` fija el formato de cada fecha (ver csv_date_formats) cuando se normaliza
+    solo un tramo del CSV; sin él pandas lo infiere del primer valor del tramo.
+    """
+    date_formats = date_formats or {}
+    for c in DATE_COLS:
+        if c in df.columns:
+            df[c] = pd.to_datetime(df[c], errors="coerce", format=date_formats.get(c))
+    if "tx_date_time" in df.columns:
+        df[DAY_COL] = tx_days(df["tx_date_time"])
+    for c in NUM_COLS:
+        if c in df.columns:
+            df[c] = pd.to_numeric(df[c], errors="coerce").astype(AMOUNT_DTYPE)
+    for c in TITLE_COLS:
+        if c in df.columns:
+            df[c] = df[c].astype(str).str.title()
+    for c in UPPER_COLS:
+        if c in df.columns:
+            df[c] = df[c].astype(str).str.upper()
+    for c in CAT_COLS:
+        if c in df.columns:
+            df[c] = _categorical(df[c])
+    return df
+
+def tx_days(ts: pd.Series) -> np.ndarray:
+    """DAY_COL de una serie de fechas (NO_DAY en las nulas)."""
+    ts = pd.Series(ts)
+    out = np.full(len(ts), NO_DAY, dtype=np.int32)
+    ok = ts.notna().to_numpy()
+    if ok.any():
+        out[ok] = day_number(ts[ok])
+    return out
+
+def read_tx_csv(path: Union[str, Path]) -> pd.DataFrame:
+    df = pd.read_csv(path, dtype=READ_DTYPES, encoding="utf-8-sig", low_memory=False)
+    return normalize_tx(df)
+
+def csv_date_formats(path: Union[str, Path]) -> Dict[str, Optional[str]]:
+    """
+    Formato de cada columna de fecha tal como lo infiere read_tx_csv (primer valor no nulo).
+    Un tramo o bloque del CSV se normaliza con estos formatos para dar las mismas fechas
+    (y los mismos NaT) que la lectura completa.
+    """
+    head = pd.read_csv(path, dtype=str, encoding="utf-8-sig", nrows=SAMPLE_ROWS,
+                       usecols=lambda c: c in DATE_COLS)
+    out = {}
+    for c in head.columns:
+        first = head[c].dropna()
+        out[c] = guess_datetime_format(first.iloc[0]) if len(first) else None
+    return out
+
+def read_tx_csv_tail(path: Union[str, Path], offset: int) -> pd.DataFrame:
+    """Filas del CSV desde el byte `offset` (con el header del archivo), normalizadas."""
+    with open(path, "rb") as f:
+        header = f.readline()
+        f.seek(offset)
+        body = f.read()
+    df = pd.read_csv(io.BytesIO(header + body), dtype=READ_DTYPES, encoding="utf-8-sig", low_memory=False)
+    return normalize_tx(df, csv_date_formats(path))
+
+def _recategorize(df: pd.DataFrame) -> pd.DataFrame:
+    # concat de categóricas con categorías distintas (o fechas con/sin tz) vuelve a object
+    for c in DATE_COLS:
+        if c in df.columns and df[c].dtype == object:
+            df[c] = pd.to_datetime(df[c], errors="coerce")
+    for c in CAT_COLS:
+        if c in df.columns and not isinstance(df[c].dtype, pd.CategoricalDtype):
+            df[c] = _categorical(df[c])
+    return df
+
+def append_tx(old: pd.DataFrame, new: pd.DataFrame) -> pd.DataFrame:
+    """Historia + filas nuevas; las categorías se rehacen si las filas nuevas traen valores nuevos."""
+    return _recategorize(pd.concat([old, new], ignore_index=True))
+
+def _raw_as_normalized(s: pd.Series, col: str) -> pd.Series:
+    """Valores crudos de `col` tal como quedarían tras normalize_tx (para filtrar antes de tiparlos)."""
+    s = s.astype(str)
+    if col in TITLE_COLS:
+        return s.str.title()
+    if col in UPPER_COLS:
+        return s.str.upper()
+    return s
+
+def _chunk_rows(path: Union[str, Path], usecols, mem_limit_mb: float) -> int:
+    """Filas por bloque para que un bloque crudo ocupe ~CHUNK_SHARE del tope de memoria."""
+    sample = pd.read_csv(path, dtype=READ_DTYPES, encoding="utf-8-sig", usecols=usecols, nrows=SAMPLE_ROWS)
+    per_row = sample.memory_usage(deep=True).sum() / max(len(sample), 1)
+    return max(MIN_CHUNK_ROWS, int(mem_limit_mb * 2**20 * CHUNK_SHARE // max(per_row, 1.0)))
+
+def read_tx_csv_chunked(
+    path: Union[str, Path],
+    *,
+    subsubsegments: Optional[Union[str, Iterable[str]]] = None,
+    where: Optional[Dict[str, Union[str, Iterable[str]]]] = None,
+    columns: Optional[Iterable[str]] = TX_COLUMNS,
+    mem_limit_mb: Optional[float] = None,
+    chunk_rows: Optional[int] = None,
+) -> pd.DataFrame:
+    """
+    Lee el CSV por bloques y deja solo las filas de `subsubsegments` que cumplen `where`
+    ({columna: valores}, p. ej. {"tx_direction": "Inbound", "tx_type": "Cash"}) y las columnas
+    de `columns` (None = todas). Los filtros se aplican sobre el texto crudo de cada bloque y
+    solo las filas que quedan se normalizan. Con `mem_limit_mb` el tamaño de bloque sale del
+    tope y, si las filas retenidas lo superan, se corta con MemoryError.
+    """
+    keep = None if columns is None else set(columns) | {SUBSUB_COL} | set(where or {})
+    if keep is not None and DAY_COL in keep:
+        keep.add("tx_date_time")     # DAY_COL se deriva al normalizar
+    usecols = None if keep is None else (lambda c: c in keep)
+    if chunk_rows is None:
+        chunk_rows = _chunk_rows(path, usecols, mem_limit_mb) if mem_limit_mb else 200_000
+    preds = {c: set(_as_list(v)) for c, v in (where or {}).items()}
+    if subsubsegments is not None:
+        preds[SUBSUB_COL] = set(_as_list(subsubsegments))
+    limit = None if not mem_limit_mb else mem_limit_mb * 2**20
+    formats = csv_date_formats(path)
+
+    parts, held = [], 0
+    reader = pd.read_csv(path, dtype=READ_DTYPES, encoding="utf-8-sig", usecols=usecols, chunksize=chunk_rows)
+    for chunk in reader:
+        m = None
+        for c, vals in preds.items():
+            if c not in chunk.columns:
+                if c == SUBSUB_COL:
+                    continue   # igual que TxFrame.select: sin la columna no se filtra
+                raise KeyError(f"Faltan columnas para filtrar el CSV: {[c]}")
+            hit = _raw_as_normalized(chunk[c], c).isin(vals).to_numpy()
+            m = hit if m is None else (m & hit)
+        part = chunk if m is None else chunk[m]
+        if part.empty:
+            continue
+        part = normalize_tx(part.copy() if m is not None else part, formats)
+        parts.append(part)
+        held += int(part.memory_usage(deep=True).sum())
+        if limit is not None and held > limit:
+            raise MemoryError(
+                f"Las filas seleccionadas de {Path(path).name} superan el tope de {mem_limit_mb:g} MB; "
+                "acota sub-subsegmentos/filtros o sube mem_limit_mb."
+            )
+    if not parts:
+        empty = pd.read_csv(path, dtype=READ_DTYPES, encoding="utf-8-sig", usecols=usecols, nrows=0)
+        return normalize_tx(empty, formats)
+    return _recategorize(pd.concat(parts, ignore_index=True))
+
+def date_bound(x, tz=None) -> pd.Timestamp:
+    """
+    Límite de fecha comparable con tx_date_time de zona `tz`: un límite sin zona se toma como
+    UTC y se pasa a `tz`; con la columna sin zona (CSV sin offsets) queda en hora UTC sin zona.
+    """
+    ts = pd.to_datetime(x, utc=True)
+    return ts.tz_convert(tz) if tz is not None else ts.tz_localize(None)
+
+def _arrow_filter(preds: Dict[str, set], names: Iterable[str], date_from, date_to):
+    """
+    Predicados sobre las columnas ya normalizadas en la caché, como función del esquema Arrow
+    (los límites de fecha toman la zona de tx_date_time guardada).
+    """
+    names = set(names)
+    for c in preds:
+        if c not in names and c != SUBSUB_COL:
+            raise KeyError(f"Faltan columnas para filtrar el CSV: {[c]}")
+
+    def build(schema):
+        expr = None
+        def _and(e):
+            return e if expr is None else (expr & e)
+        for c, vals in preds.items():
+            if c in names:
+                expr = _and(_pc.field(c).isin(sorted(vals)))
+        if date_from is not None or date_to is not None:
+            tz = schema.field("tx_date_time").type.tz
+            if date_from is not None:
+                expr = _and(_pc.field("tx_date_time") >= date_bound(date_from, tz))
+            if date_to is not None:
+                expr = _and(_pc.field("tx_date_time") < date_bound(date_to, tz))
+        return expr
+    return build
+
+def read_tx_view(
+    path: Union[str, Path],
+    *,
+    columns: Optional[Iterable[str]] = None,
+    subsubsegments: Optional[Union[str, Iterable[str]]] = None,
+    where: Optional[Dict[str, Union[str, Iterable[str]]]] = None,
+    date_from=None,
+    date_to=None,
+    cache: bool = True,
+) -> pd.DataFrame:
+    """
+    Solo las filas y columnas pedidas, ya normalizadas:
+      columns        columnas a devolver (None = todas; las que no existen se omiten)
+      subsubsegments customer_sub_sub_type ∈ ...
+      where          {columna: valores} sobre valores normalizados, p. ej. {"tx_direction": "Inbound"}
+      date_from/to   tx_date_time ∈ [date_from, date_to) (ver date_bound)
+    Con la caché columnar los filtros se aplican sobre la tabla Arrow memory-mapped y a pandas
+    solo pasan las filas que quedan (sin copias intermedias). Sin pyarrow (o cache=False) se
+    lee el CSV por bloques con los mismos filtros.
+    """
+    preds = {c: set(_as_list(v)) for c, v in (where or {}).items()}
+    if subsubsegments is not None:
+        preds[SUBSUB_COL] = set(_as_list(subsubsegments))
+    dated = date_from is not None or date_to is not None
+
+    if cache and cache_available() and _pc is not None:
+        names = list(pd.read_csv(path, encoding="utf-8-sig", nrows=0).columns)
+        names += [DAY_COL] if "tx_date_time" in names else []
+        want = names if columns is None else [c for c in columns if c in names]
+        by = [c for c in preds if c in names] + (["tx_date_time"] if dated else [])
+        df, _ = read_cached(path, lambda: read_tx_csv(path), schema=schema_tag(),
+                            append=lambda old, offset: append_tx(old, read_tx_csv_tail(path, offset)),
+                            columns=want, filter=_arrow_filter(preds, names, date_from, date_to),
+                            filter_columns=by)
+        return df
+
+    df = read_tx_csv_chunked(path, subsubsegments=subsubsegments, where=where,
+                             columns=None if columns is None else list(columns) + (["tx_date_time"] if dated else []))
+    tz = getattr(df["tx_date_time"].dt, "tz", None) if dated else None
+    if date_from is not None:
+        df = df[df["tx_date_time"] >= date_bound(date_from, tz)]
+    if date_to is not None:
+        df = df[df["tx_date_time"] < date_bound(date_to, tz)]
+    want = list(df.columns) if columns is None else [c for c in columns if c in df.columns]
+    return df[want].reset_index(drop=True)
+
+class TxFrame:
+    """Transacciones cargadas y normalizadas una sola vez; cada regla toma su sub-subsegmento con select()."""
+
+    def __init__(self, df: pd.DataFrame, path: Optional[str] = None, fingerprint: Optional[Dict[str, Any]] = None,
+                 scope: Optional[Dict[str, Any]] = None):
+        self.df = df
+        self.path = path
+        self.fingerprint = fingerprint
+        # None = todas las filas del CSV; si no, lo que se filtró al leer ({"subsubsegments", "where"};
+        # "row_index" = el índice es la posición de la fila en el CSV, ver partition)
+        self.scope = scope
+        self._layout = None
+
+    @classmethod
+    def from_csv(
+        cls,
+        path: Union[str, Path],
+        *,
+        cache: bool = True,
+        subsubsegments: Optional[Union[str, Iterable[str]]] = None,
+        where: Optional[Dict[str, Union[str, Iterable[str]]]] = None,
+        mem_limit_mb: Optional[float] = None,
+    ) -> "TxFrame":
+        """
+        Con cache=True reutiliza <dir>/.tx_cache/*.feather si el CSV no cambió (size, mtime, hash);
+        si solo se le agregaron filas al final, parsea únicamente las filas nuevas.
+        Con subsubsegments/where/mem_limit_mb el CSV se lee por bloques (read_tx_csv_chunked) y
+        solo se retienen esas filas: no se arma ni se usa la copia columnar del archivo completo.
+        """
+        if subsubsegments is not None or where or mem_limit_mb:
+            df = read_tx_csv_chunked(path, subsubsegments=subsubsegments, where=where, mem_limit_mb=mem_limit_mb)
+            scope = {"subsubsegments": None if subsubsegments is None else _as_list(subsubsegments),
+                     "where": dict(where or {})}
+            return cls(df, str(path), source_fingerprint(path) if cache else None, scope)
+        if not cache:
+            return cls(read_tx_csv(path), str(path))
+        df, fp = read_cached(path, lambda: read_tx_csv(path), schema=schema_tag(),
+                             append=lambda old, offset: append_tx(old, read_tx_csv_tail(path, offset)))
+        return cls(df, str(path), fp)
+
+    def covers(self, subsubsegments: Optional[Union[str, Iterable[str]]] = None) -> bool:
+        """True si el frame tiene todas las filas del CSV para esos sub-subsegmentos."""
+        if self.scope is None:
+            return True
+        if self.scope["where"]:
+            return False
+        held = self.scope["subsubsegments"]
+        return held is None or (subsubsegments is not None and set(_as_list(subsubsegments)) <= set(held))
+
+    def select(self, subsubsegments: Optional[Union[str, Iterable[str]]] = None) -> pd.DataFrame:
+        """Copia filtrada por customer_sub_sub_type (sin filtro si es None o falta la columna)."""
+        df = self.df
+        held = None if self.scope is None else self.scope["subsubsegments"]
+        if held is not None and (subsubsegments is None or not set(_as_list(subsubsegments)) <= set(held)):
+            raise ValueError(f"El TxFrame se leyó solo con los sub-subsegmentos {held}; pedido: {subsubsegments}")
+        if subsubsegments is None or SUBSUB_COL not in df.columns or held == _as_list(subsubsegments):
+            return df.copy()
+        targets = set(_as_list(subsubsegments))
+        return df[df[SUBSUB_COL].astype(str).isin(targets)].copy()
+
+    def partition(self) -> Dict[str, "TxFrame"]:
+        """
+        Un TxFrame por customer_sub_sub_type en una sola pasada (groupby). Cada parte conserva
+        el índice del frame completo, así la caché de métricas puede seguir extendiendo
+        (ver split_rows).
+        """
+        if self.scope is not None or SUBSUB_COL not in self.df.columns:
+            raise ValueError("partition() necesita el CSV completo con customer_sub_sub_type.")
+        out = {}
+        for key, part in self.df.groupby(SUBSUB_COL, observed=True, sort=True):
+            out[str(key)] = TxFrame(part, self.path, self.fingerprint,
+                                    {"subsubsegments": [str(key)], "where": {}, "row_index": True})
+        return out
+
+    def split_rows(self, rows: int) -> Optional[tuple[pd.DataFrame, pd.DataFrame]]:
+        """(filas entre las primeras `rows` del CSV, resto) de este frame; None si no se puede saber."""
+        if self.scope is None:
+            return self.df.iloc[:rows], self.df.iloc[rows:]
+        if self.scope.get("row_index"):
+            before = self.df.index < rows
+            return self.df[before], self.df[~before]
+        return None
+
+    def layout(self):
+        """TxLayout (layout.py) de este frame: orden (cliente, fecha) calculado una sola vez."""
+        if self._layout is None:
+            from layout import TxLayout     # layout → kernels → windows; import diferido
+            self._layout = TxLayout(self.df)
+        return self._layout
+
+    def __len__(self) -> int:
+        return len(self.df)
+
+def load_tx_frame(
+    path: Union[str, Path],
+    *,
+    cache: bool = True,
+    subsubsegments: Optional[Union[str, Iterable[str]]] = None,
+    where: Optional[Dict[str, Union[str, Iterable[str]]]] = None,
+    mem_limit_mb: Optional[float] = None,
+) -> TxFrame:
+    return TxFrame.from_csv(path, cache=cache, subsubsegments=subsubsegments, where=where, mem_limit_mb=mem_limit_mb)
+
+def as_tx_frame(src: Union[str, Path, pd.DataFrame, TxFrame]) -> TxFrame:
+    """Acepta ruta (compatibilidad), DataFrame crudo o TxFrame ya cargado."""
+    if isinstance(src, TxFrame):
+        return src
+    if isinstance(src, pd.DataFrame):
+        return TxFrame(normalize_tx(src.copy()))
+    return load_tx_frame(src)
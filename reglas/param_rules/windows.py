@@ -0,0 +1,208 @@
+# windows.py
+from __future__ import annotations
+import pandas as pd, numpy as np
+from typing import Dict, Iterable, Optional, Union
+
+DAY_NS = 86_400 * 10**9
+# día de tx_date_time ya calculado en el esquema de tx_frame (int32, como day_number)
+DAY_COL = "tx_day"
+# hasta este largo (días) las ventanas se suman directo en vez de por sumas acumuladas
+SHORT_WINDOW = 31
+
+def day_number(ts: pd.Series) -> np.ndarray:
+    """Día calendario (int64, días desde 1970-01-01) en la hora local de la serie, como resample("D")."""
+    ts = pd.Series(ts)
+    if getattr(ts.dt, "tz", None) is not None:
+        ts = ts.dt.tz_localize(None)
+    return ts.values.astype("datetime64[ns]").astype(np.int64) // DAY_NS
+
+def group_codes(df: pd.DataFrame, keys: Union[str, Iterable[str]]) -> np.ndarray:
+    """
+    Grupo de cada fila (int64, en orden de aparición; -1 si alguna clave es nula), igual que
+    groupby(keys, sort=False, observed=True, dropna=True).ngroup(). Con claves categóricas
+    (esquema de tx_frame) se combinan sus códigos enteros en vez de agrupar por texto.
+    """
+    keys = [keys] if isinstance(keys, str) else list(keys)
+    if not all(isinstance(df[k].dtype, pd.CategoricalDtype) for k in keys):
+        return df.groupby(keys, sort=False, observed=True, dropna=True).ngroup().fillna(-1).to_numpy(np.int64)
+    code = np.zeros(len(df), dtype=np.int64)
+    for k in keys:
+        c = df[k].cat.codes.to_numpy().astype(np.int64)
+        ok = (code >= 0) & (c >= 0)
+        code[~ok] = -1
+        code[ok] = pd.factorize(code[ok] * len(df[k].cat.categories) + c[ok])[0]
+    return code
+
+class DailyPanel:
+    """
+    Panel clave × día "ragged": cada clave (cliente, o cliente–contraparte) ocupa sus días
+    contiguos [primer día, último día], igual que `sub.resample("D")` por grupo. Todo vive
+    en arreglos planos (grupo tras grupo) y las ventanas móviles se calculan para todos los
+    grupos a la vez (sumas directas si la ventana es corta, sumas acumuladas si es larga).
+
+    Uso típico:
+        P = DailyPanel.build(g, "customer_id")
+        n = P.daily_count();  S3 = P.rolling_sum(n, 3);  AVG = P.rolling_mean(S3, 177, shift=3)
+        M = P.frame(S3N=S3, AVG177N=AVG)
+    """
+
+    def __init__(self, keys: pd.DataFrame, first_day: np.ndarray, length: np.ndarray,
+                 cell_of_row: np.ndarray, tz=None):
+        self.keys = keys.reset_index(drop=True)       # una fila por grupo
+        self.first_day = first_day.astype(np.int64)   # primer día de cada grupo
+        self.length = length.astype(np.int64)         # días cubiertos por cada grupo
+        self.offsets = np.concatenate([[0], np.cumsum(self.length)]).astype(np.int64)
+        self.n = int(self.offsets[-1])
+        self.group = np.repeat(np.arange(len(self.length)), self.length)
+        self.start = self.offsets[:-1][self.group]     # inicio (plano) del grupo de cada celda
+        self.day = self.first_day[self.group] + (np.arange(self.n) - self.start)
+        self.cell_of_row = cell_of_row                 # celda de cada fila de entrada (-1 si se descartó)
+        self.tz = tz
+
+    # ---------------- construcción ----------------
+
+    @classmethod
+    def build(cls, df: pd.DataFrame, keys: Union[str, Iterable[str]], time_col: str = "tx_date_time",
+              *, tz=None) -> "DailyPanel":
+        """
+        Filas con clave o fecha nula quedan fuera (como groupby/resample). Con time_col=DAY_COL
+        las filas ya traen su día (p. ej. el agregado diario de metric_store) y `tz` es la zona
+        de las fechas de salida.
+        """
+        keys = [keys] if isinstance(keys, str) else list(keys)
+        gid = group_codes(df, keys)
+        day = np.zeros(len(df), dtype=np.int64)
+        if time_col == DAY_COL:
+            d = df[DAY_COL]
+            valid = (gid >= 0) & d.notna().to_numpy()
+            day[valid] = d.to_numpy()[valid].astype(np.int64)
+        else:
+            ts = df[time_col]
+            tz = getattr(ts.dt, "tz", None)
+            valid = (gid >= 0) & ts.notna().to_numpy()
+            if time_col == "tx_date_time" and DAY_COL in df.columns:
+                day[valid] = df[DAY_COL].to_numpy(np.int64)[valid]
+            elif valid.any():
+                day[valid] = day_number(ts[valid])
+
+        n_groups = int(gid.max()) + 1 if len(gid) else 0
+        first = np.full(n_groups, np.iinfo(np.int64).max, dtype=np.int64)
+        last = np.full(n_groups, np.iinfo(np.int64).min, dtype=np.int64)
+        np.minimum.at(first, gid[valid], day[valid])
+        np.maximum.at(last, gid[valid], day[valid])
+        present = first <= last
+
+        # reindexa grupos presentes en orden de aparición
+        remap = np.full(n_groups, -1, dtype=np.int64)
+        remap[present] = np.arange(int(present.sum()))
+        first, last = first[present], last[present]
+        length = last - first + 1
+
+        first_row = pd.Series(np.arange(len(df)))[valid].groupby(gid[valid]).min()
+        key_rows = first_row.reindex(np.flatnonzero(present)).to_numpy()
+        keys_df = df[keys].iloc[key_rows]
+
+        offsets = np.concatenate([[0], np.cumsum(length)])
+        cell = np.full(len(df), -1, dtype=np.int64)
+        g2 = remap[gid[valid]]
+        cell[valid] = offsets[g2] + (day[valid] - first[g2])
+        return cls(keys_df, first, length, cell, tz)
+
+    @classmethod
+    def from_daily(cls, D: pd.DataFrame, keys: Union[str, Iterable[str]] = "customer_id", *, tz=None) -> "DailyPanel":
+        """
+        Panel desde filas ya agregadas por día (metric_store.daily_table): cada fila cae en la
+        celda de su (clave, DAY_COL) y las series diarias salen de sus columnas, p. ej.
+        P.daily_sum(D["abs_sum"]) o P.daily_sum(D["round_n"]) para el conteo. Sin `tz`, las
+        fechas de salida toman la zona de D["date"] (la de las tx; sin zona si no la traen).
+        """
+        if tz is None and "date" in D.columns:
+            tz = getattr(D["date"].dt, "tz", None)
+        return cls.build(D, keys, DAY_COL, tz=tz)
+
+    # ---------------- series diarias ----------------
+
+    def daily_count(self, mask: Optional[np.ndarray] = None) -> np.ndarray:
+        """Nº de filas por celda (resample("D").count de un indicador)."""
+        cell = self.cell_of_row if mask is None else np.where(np.asarray(mask, bool), self.cell_of_row, -1)
+        cell = cell[cell >= 0]
+        return np.bincount(cell, minlength=self.n).astype(float)
+
+    def daily_sum(self, values, mask: Optional[np.ndarray] = None) -> np.ndarray:
+        """Suma por celda (resample("D").sum, NaN cuenta como 0)."""
+        v = np.asarray(values, dtype=float)
+        ok = (self.cell_of_row >= 0) & ~np.isnan(v)
+        if mask is not None:
+            ok &= np.asarray(mask, bool)
+        return np.bincount(self.cell_of_row[ok], weights=v[ok], minlength=self.n)
+
+    # ---------------- ventanas ----------------
+
+    def _prefix(self, x: np.ndarray) -> np.ndarray:
+        """Suma acumulada que se reinicia en cada grupo (evita arrastrar error entre grupos)."""
+        return pd.Series(x, dtype=float).groupby(self.group).cumsum().to_numpy()
+
+    def _window_sum(self, x: np.ndarray, days: int, shift: int = 0) -> tuple[np.ndarray, np.ndarray]:
+        """
+        (Σ, nº de días) de x sobre las celdas [i-shift-days+1, i-shift] de su mismo grupo.
+        Ventanas cortas se suman directo (misma precisión que rolling); las largas por
+        diferencia de sumas acumuladas por grupo.
+        """
+        x = np.asarray(x, dtype=float)
+        idx = np.arange(self.n)
+        hi = idx - shift
+        lo = np.maximum(hi - (days - 1), self.start)
+        cnt = np.maximum(hi - lo + 1, 0)
+        out = np.zeros(self.n)
+        if days <= SHORT_WINDOW:
+            for k in range(shift, shift + days):
+                ok = idx - k >= self.start
+                out[ok] += x[(idx - k)[ok]]
+            return out, cnt
+        P = self._prefix(x)
+        ok = cnt > 0
+        before = np.where(lo[ok] > self.start[ok], P[np.maximum(lo[ok] - 1, 0)], 0.0)
+        out[ok] = P[hi[ok]] - before
+        return out, cnt
+
+    def rolling_sum(self, x: np.ndarray, days: int) -> np.ndarray:
+        """Σ de los últimos `days` días incluido el actual (rolling(f"{days}D").sum())."""
+        return self._window_sum(x, days)[0]
+
+    def rolling_mean(self, x: np.ndarray, days: int, *, shift: int = 0, min_periods: int = 1) -> np.ndarray:
+        """
+        Media de `days` días sobre la serie desplazada `shift` días:
+        x.shift(shift).rolling(f"{days}D", min_periods=...).mean(). NaN si no hay suficientes días.
+        """
+        s, cnt = self._window_sum(x, days, shift)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            out = s / cnt
+        out[cnt < max(min_periods, 1)] = np.nan
+        return out
+
+    def group_max(self, x: np.ndarray) -> np.ndarray:
+        """Máximo de x dentro de cada grupo (un valor por fila de self.keys)."""
+        if self.n == 0:
+            return np.zeros(0)
+        return np.maximum.reduceat(np.asarray(x, dtype=float), self.offsets[:-1])
+
+    # ---------------- salida ----------------
+
+    def dates(self) -> pd.DatetimeIndex:
+        d = pd.DatetimeIndex(self.day.astype("datetime64[D]").astype("datetime64[ns]"))
+        return d.tz_localize(self.tz) if self.tz is not None else d
+
+    def group_any(self, mask) -> np.ndarray:
+        """Por celda: True si el grupo tiene al menos una fila de entrada con mask."""
+        m = np.asarray(mask, bool) & (self.cell_of_row >= 0)
+        hit = np.zeros(len(self.length), dtype=bool)
+        hit[self.group[self.cell_of_row[m]]] = True
+        return hit[self.group]
+
+    def frame(self, date_col: str = "date", **cols) -> pd.DataFrame:
+        """DataFrame largo: claves + fecha + columnas pedidas (una fila por celda)."""
+        out = self.keys.iloc[self.group].reset_index(drop=True)
+        out[date_col] = self.dates()
+        for k, v in cols.items():
+            out[k] = v
+        return out
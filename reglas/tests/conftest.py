@@ -0,0 +1,93 @@
+# conftest.py
+"""CSV sintético de transacciones (mismo esquema que datos_trx__with_subsub.csv) para los tests."""
+from __future__ import annotations
+import contextlib, io, sys
+from pathlib import Path
+import numpy as np
+import pandas as pd
+import pytest
+
+_REGLAS = Path(__file__).resolve().parents[1]
+for d in ("param_rules", "alerts_simulation"):
+    if str(_REGLAS / d) not in sys.path:
+        sys.path.insert(0, str(_REGLAS / d))
+
+N_ROWS = 4000
+N_CUST = 60
+
+def make_tx(n: int = N_ROWS, n_cust: int = N_CUST, seed: int = 7, *, days: int = 300,
+            naive: bool = False) -> pd.DataFrame:
+    """`days` días desde 2024-06-01; naive=True: mismas fechas (hora UTC) escritas sin zona."""
+    rng = np.random.default_rng(seed)
+    cust = np.array([f"C{i:04d}" for i in range(n_cust)])
+    seg = rng.choice(["R-High", "R-Low"], n_cust, p=[.6, .4])
+    ci = rng.choice(n_cust, n, p=(w := rng.pareto(1.2, n_cust) + 0.1) / w.sum())
+    start = pd.Timestamp("2024-06-01", tz="UTC")
+    opened = start + pd.to_timedelta(rng.integers(-20, days // 2, n_cust), "D")
+    ts = start + pd.to_timedelta(rng.integers(0, days * 86400, n), "s")
+    # sin tx antes de abrir la cuenta: esas caen en los primeros días de la cuenta
+    early = ts < opened[ci]
+    ts = ts.where(~early, opened[ci] + pd.to_timedelta(rng.integers(0, 5 * 86400, n), "s"))
+    ts_s = pd.Series(ts.tz_localize(None) if naive else ts).astype(str)
+    ts_s[rng.random(n) < 0.003] = "not a date"
+    amt = np.where(rng.random(n) < 0.3, rng.integers(1, 500, n) * 1000.0, np.round(rng.lognormal(13, 2, n), 2))
+    amt = np.where(rng.random(n) < 0.01, np.nan, amt)
+    cur = rng.choice(["CLP", "USD", "EUR"], n, p=[.7, .2, .1])
+    base = amt * np.where(cur == "CLP", 1.0, np.where(cur == "USD", 950.0, 1020.0))
+    cp = np.array([f"P{x}" for x in rng.integers(0, 30, n)], dtype=object)
+    cp[rng.random(n) < 0.05] = "NA"
+    expected = np.where(rng.random(n_cust) < 0.3, 0.0, np.round(rng.lognormal(14, 1, n_cust), 0))
+    return pd.DataFrame({
+        "customer_id": cust[ci],
+        "customer_name": np.char.add("Name ", cust[ci]),
+        "customer_type": "Retail",
+        "customer_sub_sub_type": seg[ci],
+        "customer_account_creation_date": pd.Series(opened.tz_localize(None) if naive else opened).astype(str).to_numpy()[ci],
+        "customer_account_balance": np.where(rng.random(n) < 0.05, np.nan, np.round(rng.lognormal(16, 2, n), 0)),
+        "customer_expected_amount": expected[ci],
+        "counterparty_id": cp,
+        "tx_date_time": ts_s.values,
+        "tx_amount": amt,
+        "tx_base_amount": base,
+        "tx_direction": rng.choice(["Inbound", "Outbound"], n),
+        "tx_type": rng.choice(["Cash", "Wire", "Check"], n, p=[.65, .25, .1]),
+        "tx_currency": cur,
+    })
+
+def write_csv(df: pd.DataFrame, path: Path) -> Path:
+    df.to_csv(path, index=False, encoding="utf-8-sig")
+    return path
+
+def plain(df: pd.DataFrame) -> pd.DataFrame:
+    """Categóricas como texto (las categorías dependen de la carga) e índice 0..n-1."""
+    out = df.reset_index(drop=True).copy()
+    for c in out.columns:
+        if isinstance(out[c].dtype, pd.CategoricalDtype):
+            out[c] = out[c].astype(object)
+    return out
+
+def quiet(fn, *a, **kw):
+    """fn(*a, **kw) sin lo que imprime (los runners imprimen cada tabla)."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        return fn(*a, **kw)
+
+def assert_results_equal(got: dict, want: dict) -> None:
+    """Resultados de run_parametrization ({regla: tabla o {nombre: tabla}}) iguales."""
+    assert list(got) == list(want)
+    for rule, obj in want.items():
+        tables = obj.items() if isinstance(obj, dict) else [("", obj)]
+        for sub, df in tables:
+            other = got[rule][sub] if sub else got[rule]
+            pd.testing.assert_frame_equal(plain(other), plain(df), obj=f"{rule} {sub}".strip())
+
+@pytest.fixture(scope="session")
+def tx_df() -> pd.DataFrame:
+    return make_tx()
+
+@pytest.fixture
+def tx_csv(tmp_path, tx_df) -> Path:
+    return write_csv(tx_df, tmp_path / "tx.csv")
+
+@pytest.fixture
+def tx_naive_csv(tmp_path) -> Path:
+    return write_csv(make_tx(naive=True), tmp_path / "tx_naive.csv")
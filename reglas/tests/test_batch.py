@@ -0,0 +1,58 @@
+# test_batch.py
+"""Simulación en lote: todas las reglas desde una SimSession == cada simulate_* desde la ruta."""
+from __future__ import annotations
+import pandas as pd
+import pytest
+
+import metric_store as ms
+import runner
+import runner_alerts as ra
+import utils
+from utils import SimSession, load_tx_base
+from conftest import write_csv, plain, quiet
+
+SEG = "R-High"
+COUNT_FROM = pd.Timestamp("2024-09-01", tz="UTC")
+
+@pytest.fixture(scope="module")
+def csv_and_bundle(tmp_path_factory, tx_df):
+    p = write_csv(tx_df, tmp_path_factory.mktemp("batch") / "tx.csv")
+    return p, runner._bundle_from_results(quiet(runner.run_parametrization, str(p), SEG), SEG, str(p))
+
+@pytest.mark.parametrize("filters", [
+    {"subsubs": SEG},
+    {"subsubs": ["R-Low", SEG], "direction": "Inbound", "tx_type": ["Cash", "Wire"]},
+    {"currency": "USD", "columns": ["customer_id", "tx_date_time", "tx_base_amount", "nope"]},
+    {"direction": "Outbound", "date_from": "2024-08-01", "date_to": "2024-12-01"},
+])
+def test_session_view_matches_load_tx_base(tx_csv, filters):
+    s = SimSession(tx_csv)
+    want = load_tx_base(str(tx_csv), **filters)
+    got = load_tx_base(s, **filters)
+    pd.testing.assert_frame_equal(plain(got), plain(want))
+    got["tx_date_time"] = pd.NaT                               # cada llamada recibe su propio frame
+    assert load_tx_base(s, **filters)["tx_date_time"].notna().any()
+
+def test_batch_matches_per_rule(csv_and_bundle, monkeypatch):
+    path, bundle = csv_and_bundle
+    jobs = ra.build_jobs(bundle, [SEG], tipo="nuevo") + ra.build_jobs(bundle, [SEG], tipo="actual")
+    assert {j[1] for j in jobs} == {name for name, _ in ra.SIM_RULES}
+    ms.clear_metrics()
+    loads = []
+    real = utils.load_tx_frame
+    monkeypatch.setattr(utils, "load_tx_frame", lambda *a, **k: loads.append(a) or real(*a, **k))
+    monkeypatch.setattr(utils, "read_tx_view", lambda *a, **k: pytest.fail("una regla releyó el CSV"))
+    batch = quiet(ra.run_jobs, SimSession(path), jobs, count_from=COUNT_FROM)
+    assert len(loads) == 1                                     # una carga para todas las reglas
+    monkeypatch.undo()
+    for (tipo, rule, subsubs, sc), df in zip(jobs, batch):
+        want = ra._SIMULATORS[rule](str(path), subsubs=subsubs, scenarios=sc, count_from=COUNT_FROM)
+        assert list(df["escenario"]) == sc.names, rule
+        assert dict(zip(df["escenario"], df["alertas"])) == dict(zip(want["escenario"], want["alertas"])), rule
+        assert (df["regla"] == rule).all()
+
+def test_build_jobs_actual_only(csv_and_bundle):
+    _, bundle = csv_and_bundle
+    jobs = ra.build_jobs(bundle, [SEG], tipo="actual")
+    assert [j[1] for j in jobs] == [r for r, _ in ra.SIM_RULES if r in {j[1] for j in jobs}]
+    assert all(j[0] == "actual" and j[3].names == ["Actual"] for j in jobs)
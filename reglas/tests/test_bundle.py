@@ -0,0 +1,60 @@
+# test_bundle.py
+"""_bundle_from_results: números tal cual las tablas (sin pasar por el formato de display)."""
+from __future__ import annotations
+import json
+import numpy as np
+import pandas as pd
+import pytest
+
+import runner
+from runner import _bundle_from_results, _bundle_records
+from conftest import write_csv, quiet
+
+SEG = "R-High"
+
+@pytest.fixture(scope="module")
+def results(tmp_path_factory, tx_df):
+    p = write_csv(tx_df, tmp_path_factory.mktemp("bundle") / "tx.csv")
+    return quiet(runner.run_parametrization, str(p), SEG)
+
+def _tables(results):
+    for rule, obj in results.items():
+        if isinstance(obj, dict):
+            for sub, df in obj.items():
+                yield rule, runner._sanitize_name(sub), df
+        else:
+            yield rule, None, obj
+
+def test_bundle_numbers_equal_tables(results):
+    bundle = json.loads(json.dumps(_bundle_from_results(results, SEG, "tx.csv")))   # como se guarda
+    assert bundle["meta"]["subsubsegment"] == SEG
+    n = 0
+    for rule, sub, df in _tables(results):
+        node = bundle["rules"][rule] if sub is None else bundle["rules"][rule][sub]
+        rows = node["percentiles"]
+        assert len(rows) == len(df), rule
+        for c in df.columns:
+            got = [r[c] for r in rows]
+            if str(c).lower() == "percentil":
+                assert all(isinstance(v, str) for v in got)
+                continue
+            if pd.api.types.is_numeric_dtype(df[c]) and not pd.api.types.is_bool_dtype(df[c]):
+                want = df[c].to_numpy(float)
+                got = np.array([np.nan if v == "" else v for v in got], dtype=float)
+                np.testing.assert_array_equal(got, want, err_msg=f"{rule} {c}")
+                n += 1
+    assert n > 0
+
+def test_bundle_records_mixed_columns():
+    df = pd.DataFrame({
+        "percentil": ["p90", "p95", None],
+        "Amount": [1234567.891, np.nan, 3.0],
+        "as_text": ["10", "2.5", None],
+        "label": ["a", "b", None],
+        "mixed": ["1", "x", "3"],
+    })
+    assert _bundle_records(df) == [
+        {"percentil": "p90", "Amount": 1234567.891, "as_text": 10.0, "label": "a", "mixed": "1"},
+        {"percentil": "p95", "Amount": "", "as_text": 2.5, "label": "b", "mixed": "x"},
+        {"percentil": "", "Amount": 3.0, "as_text": "", "label": "", "mixed": "3"},
+    ]
@@ -0,0 +1,69 @@
+# test_bundle_store.py
+"""Almacén columnar de parámetros: mismo contenido que params_<SUBSUB>.json, por segmento y generación."""
+from __future__ import annotations
+import copy, json
+import pytest
+
+import metric_store as ms
+import runner
+from bundle_store import BundleStore, write_bundles
+from conftest import quiet
+
+SEG = "R-High"
+
+@pytest.fixture(autouse=True)
+def _clean_metrics():
+    ms.clear_metrics()
+    yield
+    ms.clear_metrics()
+
+@pytest.fixture
+def saved(tmp_path, tx_csv):
+    """(raíz del almacén, texto del JSON) de una parametrización de SEG guardada con store_root."""
+    res = quiet(runner.run_parametrization, str(tx_csv), SEG)
+    out_dir = tmp_path / "params" / SEG
+    quiet(runner.save_results_bundle, res, out_dir, subsub=SEG, tx_path=str(tx_csv), store_root=tmp_path / "params")
+    return tmp_path / "params", (out_dir / f"params_{SEG}.json").read_text(encoding="utf-8")
+
+def test_bundle_store_roundtrip(saved):
+    root, json_text = saved
+    st = BundleStore.open(root)
+    assert json.dumps(st.to_bundle(SEG), ensure_ascii=False, indent=2) == json_text
+    bundle = json.loads(json_text)
+    row = bundle["rules"]["HANUMI"]["percentiles"][0]
+    assert st.rows(SEG, "HANUMI")[0] == row
+    field = next(k for k, v in row.items() if k != "percentil" and isinstance(v, (int, float)))
+    assert st.value(SEG, "HANUMI", row["percentil"], field) == pytest.approx(row[field])
+
+def test_generations_latest_and_replace(saved):
+    root, json_text = saved
+    base = json.loads(json_text)
+    gen0 = base["meta"]["generated_at"]
+    newer = copy.deepcopy(base)
+    newer["meta"]["generated_at"] = "9999-01-01T00:00:00"
+    newer["rules"]["HANUMI"]["percentiles"][0]["percentil"] = "p00"
+    other = copy.deepcopy(base)
+    other["meta"]["subsubsegment"] = "R-Low"
+    write_bundles(root, [newer, other])
+
+    st = BundleStore.open(root)
+    assert st.segments() == ["R-High", "R-Low"]
+    assert st.generations(SEG) == sorted([gen0, "9999-01-01T00:00:00"])
+    assert st.to_bundle(SEG) == newer                                # sin generación: la más reciente
+    assert st.to_bundle(SEG, generation=gen0) == base
+    # reescribir la misma (generación, segmento) la reemplaza en vez de duplicarla
+    def n_rows():
+        t = BundleStore.open(root).table
+        return int(((t["generation"] == gen0) & (t["segment"] == SEG)).sum())
+    before = n_rows()
+    write_bundles(root, base)
+    assert n_rows() == before > 0
+
+def test_save_without_store_root_writes_only_json(tmp_path, tx_csv):
+    res = quiet(runner.run_parametrization, str(tx_csv), SEG)
+    quiet(runner.save_results_bundle, res, tmp_path / "out" / SEG, subsub=SEG, tx_path=str(tx_csv))
+    assert not list(tmp_path.rglob("params_store*"))
+
+def test_open_missing_store(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        BundleStore.open(tmp_path / "nada")
@@ -0,0 +1,39 @@
+# test_chunked.py
+"""Lectura por bloques con tope de memoria == lectura completa filtrada."""
+from __future__ import annotations
+import pandas as pd
+import pytest
+
+import metric_store as ms
+import runner
+from tx_frame import load_tx_frame, read_tx_csv_chunked
+from conftest import plain, quiet, assert_results_equal
+
+SEG = "R-High"
+
+@pytest.fixture(autouse=True)
+def _clean_metrics():
+    ms.clear_metrics()
+    yield
+    ms.clear_metrics()
+
+def test_chunked_read_matches_full(tx_csv):
+    full = load_tx_frame(tx_csv, cache=False).select(SEG)
+    chunked = read_tx_csv_chunked(tx_csv, subsubsegments=SEG, chunk_rows=500)
+    pd.testing.assert_frame_equal(plain(chunked), plain(full))
+
+def test_chunked_where_matches_full(tx_csv):
+    df = load_tx_frame(tx_csv, cache=False).df
+    m = df["tx_direction"].eq("Inbound") & df["tx_type"].isin(["Cash", "Check"])
+    chunked = read_tx_csv_chunked(tx_csv, where={"tx_direction": "Inbound", "tx_type": ["Cash", "Check"]},
+                                  chunk_rows=700)
+    pd.testing.assert_frame_equal(plain(chunked), plain(df[m]))
+
+def test_chunked_over_limit_raises(tx_csv):
+    with pytest.raises(MemoryError):
+        read_tx_csv_chunked(tx_csv, mem_limit_mb=0.01, chunk_rows=500)
+
+def test_parametrization_mem_limit_matches_full(tx_csv):
+    full = quiet(runner.run_parametrization, str(tx_csv), SEG)
+    chunked = quiet(runner.run_parametrization, str(tx_csv), SEG, mem_limit_mb=64)
+    assert_results_equal(chunked, full)
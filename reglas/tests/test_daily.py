@@ -0,0 +1,45 @@
+# test_daily.py
+"""Agregado diario (métrica "daily") y reglas que arman su panel con DailyPanel.from_daily, con y sin zona."""
+from __future__ import annotations
+import pandas as pd
+import pytest
+
+import metric_store as ms
+from tx_frame import load_tx_frame
+from rvt_in_sim import prepare_rvt_in
+from rvt_out_sim import prepare_rvt_out
+from in_gt_out_sim import prepare_in_gt_out
+from out_pct_in_sim import prepare_out_pct_in
+from in_out_1_sim import prepare_in_out_1
+
+SEG = "R-High"
+COUNT_FROM = "2025-01-01"
+
+RULES = [
+    (prepare_rvt_in, {"lo": {"Number": 0, "Amount": 0}, "hi": {"Number": 2, "Amount": 5e6}}),
+    (prepare_rvt_out, {"lo": {"Number": 0, "Amount": 0}, "hi": {"Number": 2, "Amount": 5e6}}),
+    (prepare_in_gt_out, {"lo": {"Amount_IN_30d": 0}, "hi": {"Amount_IN_30d": 5e6}}),
+    (prepare_out_pct_in, {"lo": {"Amount_OUT_30d": 0}, "hi": {"Amount_OUT_30d": 5e6}}),
+    (prepare_in_out_1, {"lo": {"Amount": 0, "Number": 0, "Percentage": 0}, "hi": {"Amount": 1e6}}),
+]
+
+@pytest.fixture(autouse=True)
+def _clean_metrics():
+    ms.clear_metrics()
+    yield
+    ms.clear_metrics()
+
+def test_daily_date_keeps_source_tz(tx_csv, tx_naive_csv):
+    aware = ms.get_metrics(load_tx_frame(tx_csv), "daily", SEG)
+    naive = ms.get_metrics(load_tx_frame(tx_naive_csv), "daily", SEG)
+    assert str(aware["date"].dt.tz) == "UTC"
+    assert naive["date"].dt.tz is None
+    pd.testing.assert_series_equal(aware["date"].dt.tz_localize(None), naive["date"])
+
+@pytest.mark.parametrize("prepare,scenarios", RULES, ids=[p.__name__ for p, _ in RULES])
+def test_from_daily_rules_on_naive_csv(tx_csv, tx_naive_csv, prepare, scenarios):
+    # mismas horas con y sin zona: mismas alertas (count_from en la zona de cada CSV)
+    naive = prepare(str(tx_naive_csv), subsubs=SEG, count_from=COUNT_FROM).run(scenarios)
+    aware = prepare(str(tx_csv), subsubs=SEG, count_from=pd.Timestamp(COUNT_FROM, tz="UTC")).run(scenarios)
+    pd.testing.assert_frame_equal(naive, aware)
+    assert naive["alertas"].iloc[0] > 0
@@ -0,0 +1,34 @@
+# test_fanout.py
+"""run_jobs: executor="process" da los mismos DataFrames que "serial", en el orden de los jobs."""
+from __future__ import annotations
+import pandas as pd
+import pytest
+
+import runner
+import runner_alerts as ra
+from utils import SimSession
+from conftest import write_csv, quiet
+
+SEG = "R-High"
+COUNT_FROM = pd.Timestamp("2024-09-01", tz="UTC")
+
+@pytest.fixture(scope="module")
+def csv_and_jobs(tmp_path_factory, tx_df):
+    p = write_csv(tx_df, tmp_path_factory.mktemp("fanout") / "tx.csv")
+    bundle = runner._bundle_from_results(quiet(runner.run_parametrization, str(p), SEG), SEG, str(p))
+    # "actual" primero y reglas livianas antes que las de HEAVY_RULES: el pool las reordena
+    return p, ra.build_jobs(bundle, [SEG], tipo="actual") + ra.build_jobs(bundle, [SEG], tipo="nuevo")
+
+def test_process_matches_serial(csv_and_jobs):
+    path, jobs = csv_and_jobs
+    serial = quiet(ra.run_jobs, SimSession(path), jobs, count_from=COUNT_FROM)
+    proc = quiet(ra.run_jobs, SimSession(path), jobs, count_from=COUNT_FROM, executor="process", max_workers=3)
+    assert len(proc) == len(jobs)
+    for job, a, b in zip(jobs, serial, proc):
+        assert (b["regla"] == job[1]).all() and list(b["escenario"]) == job[3].names
+        pd.testing.assert_frame_equal(b.reset_index(drop=True), a.reset_index(drop=True), obj=job[1])
+
+def test_unknown_executor(csv_and_jobs):
+    path, jobs = csv_and_jobs
+    with pytest.raises(ValueError):
+        ra.run_jobs(SimSession(path), jobs, executor="threads")
@@ -0,0 +1,50 @@
+# test_in_out_1.py
+"""IN-OUT-1 vectorizado == por cada OUT, sus IN de 14 días recorridos a mano (definición del docstring)."""
+from __future__ import annotations
+import numpy as np
+import pandas as pd
+import pytest
+
+from in_out_1_sim import prepare_in_out_1, WINDOW_DAYS
+from tx_frame import load_tx_frame
+from conftest import write_csv
+
+SEG = "R-High"
+COUNT_FROM = pd.Timestamp("2024-09-01", tz="UTC")
+
+@pytest.fixture(scope="module")
+def csv(tmp_path_factory, tx_df):
+    return write_csv(tx_df, tmp_path_factory.mktemp("in_out_1") / "tx.csv")
+
+@pytest.fixture(scope="module")
+def brute(csv):
+    """(monto OUT, IN_cnt_14d, IN_sum_14d) de cada OUT contable."""
+    df = load_tx_frame(csv, cache=False).select(SEG)
+    cash = df[df["tx_type"].astype(str).eq("Cash") & df["tx_date_time"].notna() & df["tx_base_amount"].notna()]
+    day = cash["tx_date_time"].dt.floor("D")
+    IN = cash[cash["tx_direction"].astype(str).eq("Inbound")].assign(day=day)
+    OUT = cash[cash["tx_direction"].astype(str).eq("Outbound")].assign(day=day)
+    rows = []
+    for _, o in OUT.iterrows():
+        mine = IN[IN["customer_id"] == o["customer_id"]]
+        if mine.empty:
+            continue                                          # clientes sin IN no alertan
+        s = n = 0.0
+        if mine["day"].min() <= o["day"] <= mine["day"].max():
+            w = mine[(mine["day"] > o["day"] - pd.Timedelta(days=WINDOW_DAYS)) & (mine["day"] <= o["day"])]
+            s, n = w["tx_base_amount"].abs().sum(), float(len(w))
+        if o["tx_date_time"] >= COUNT_FROM:
+            rows.append((abs(o["tx_base_amount"]), n, s))
+    return np.array(rows)
+
+@pytest.mark.parametrize("pars", [
+    {"Amount": 0}, {"Amount": 0, "Number": 0, "Percentage": 0}, {"Amount": 1e6, "Number": 1},
+    {"Amount": 5e5, "Number": 3, "Percentage": 50}, {},
+])
+def test_matches_per_out_loop(csv, brute, pars):
+    A = pars.get("Amount", np.inf)
+    N = pars.get("Number", 2.0)
+    P = pars.get("Percentage", 80)
+    want = int(((brute[:, 0] > A) & (brute[:, 1] > N) & (brute[:, 0] >= P / 100.0 * brute[:, 2])).sum())
+    got = prepare_in_out_1(str(csv), subsubs=SEG, count_from=COUNT_FROM).run({"s": pars})
+    assert int(got["alertas"].iloc[0]) == want
@@ -0,0 +1,77 @@
+# test_incremental.py
+"""
+Append del CSV (carga mensual): copia columnar y métricas guardadas extendidas con las filas
+nuevas == recalculadas sobre el CSV completo, y la parametrización igual a la de cero.
+"""
+from __future__ import annotations
+import pandas as pd
+import pytest
+
+import metric_store as ms
+import runner
+import tx_frame
+from tx_frame import load_tx_frame
+from conftest import write_csv, plain, quiet, assert_results_equal
+
+SEG = "R-High"
+
+METRIC_CALLS = [
+    ("pgav", {"direction": "Inbound"}),
+    ("hanum", {"direction": "Inbound"}),
+    ("hasum", {"direction": "Outbound"}),
+    ("numcc", {"direction": "Inbound"}),
+    ("hsum30", {"direction": "Outbound"}),
+    ("last_balance", {}),
+    ("daily", {}),
+]
+
+@pytest.fixture(autouse=True)
+def _clean_metrics():
+    ms.clear_metrics()
+    yield
+    ms.clear_metrics()
+
+@pytest.mark.parametrize("name,kw", METRIC_CALLS, ids=[m for m, _ in METRIC_CALLS])
+def test_append_extends_like_full_recompute(tmp_path, tx_df, monkeypatch, name, kw):
+    p = tmp_path / "tx.csv"
+    write_csv(tx_df.iloc[: int(len(tx_df) * 0.8)], p)
+    ms.get_metrics(load_tx_frame(p), name, SEG, **kw)
+
+    write_csv(tx_df, p)
+    ms._MEM.clear()
+    version, build, extend = ms.METRICS[name]
+    def _no_build(*a, **k):
+        raise AssertionError(f"{name}: se recalculó completa en vez de extenderse")
+    monkeypatch.setitem(ms.METRICS, name, (version, _no_build, extend))
+    tx = load_tx_frame(p)
+    got = ms.get_metrics(tx, name, SEG, **kw)
+
+    want = build(tx.select(SEG), **kw)
+    pd.testing.assert_frame_equal(plain(got), plain(want), check_dtype=False, rtol=1e-9)
+    # la versión anterior ya no queda en disco
+    assert len(list((tmp_path / ".tx_cache" / "metrics").glob("*.feather"))) == 1
+
+def test_append_reparses_only_new_bytes(tmp_path, tx_df, monkeypatch):
+    p = tmp_path / "tx.csv"
+    write_csv(tx_df.iloc[:3000], p)
+    load_tx_frame(p)
+    write_csv(tx_df, p)
+    with monkeypatch.context() as m:
+        m.setattr(tx_frame, "read_tx_csv", lambda *a, **k: pytest.fail("se releyó el CSV completo"))
+        grown = load_tx_frame(p).df
+    pd.testing.assert_frame_equal(plain(grown), plain(load_tx_frame(p, cache=False).df))
+
+def test_parametrization_after_append_matches_fresh(tmp_path, tx_df):
+    p = tmp_path / "inc" / "tx.csv"
+    p.parent.mkdir()
+    write_csv(tx_df.iloc[:3000], p)
+    quiet(runner.run_parametrization, str(p), SEG)
+    write_csv(tx_df, p)
+    ms._MEM.clear()
+    grown = quiet(runner.run_parametrization, str(p), SEG)
+
+    fresh_p = tmp_path / "fresh" / "tx.csv"
+    fresh_p.parent.mkdir()
+    ms.clear_metrics()
+    fresh = quiet(runner.run_parametrization, str(write_csv(tx_df, fresh_p)), SEG)
+    assert_results_equal(grown, fresh)
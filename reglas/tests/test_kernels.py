@@ -0,0 +1,74 @@
+# test_kernels.py
+"""Ventanas de kernels.py == conteo/suma por fuerza bruta (con y sin numba)."""
+from __future__ import annotations
+import numpy as np
+import pandas as pd
+import pytest
+
+import kernels
+from kernels import (group_layout, forward_count, forward_sum, trailing_count, trailing_sum,
+                     max_count_window, max_sum_window, DAY_NS)
+
+@pytest.fixture(params=["numba", "numpy"])
+def backend(request, monkeypatch):
+    if request.param == "numba":
+        if kernels._numba is None:
+            pytest.skip("numba no instalado")
+    else:
+        monkeypatch.setattr(kernels, "_numba", None)
+    return request.param
+
+@pytest.fixture(scope="module")
+def g():
+    rng = np.random.default_rng(3)
+    n = 1500
+    start = pd.Timestamp("2024-01-01", tz="UTC")
+    # segundos enteros de días enteros: hay empates y bordes exactos de ventana
+    secs = rng.integers(0, 90, n) * 86400 + rng.choice([0, 3600, 86399], n)
+    return pd.DataFrame({
+        "customer_id": rng.choice([f"C{i}" for i in range(12)] + [None], n),
+        "tx_date_time": start + pd.to_timedelta(secs, "s"),
+        "v": rng.normal(0, 1000, n).round(2),
+    })
+
+def _brute(ts, offsets, v, days, forward):
+    cnt, tot = np.zeros(ts.size), np.zeros(ts.size)
+    d = days * DAY_NS
+    for a, b in zip(offsets[:-1], offsets[1:]):
+        t = ts[a:b]
+        for i in range(a, b):
+            m = (t >= ts[i]) & (t <= ts[i] + d) if forward else (t > ts[i] - d) & (t <= ts[i])
+            # en empates de fecha solo cuentan las filas desde/hasta i en el orden del layout
+            pos = np.arange(a, b)
+            m &= pos >= i if forward else pos <= i
+            cnt[i], tot[i] = m.sum(), v[a:b][m].sum()
+    return cnt, tot
+
+@pytest.mark.parametrize("days", [1, 7, 30])
+def test_windows_match_brute(g, backend, days):
+    order, ts, offsets = group_layout(g, "customer_id")
+    v = g["v"].to_numpy()[order]
+    assert offsets[-1] == g["customer_id"].notna().sum()
+    for forward, count, total in ((True, forward_count, forward_sum), (False, trailing_count, trailing_sum)):
+        want_n, want_s = _brute(ts, offsets, v, days, forward)
+        np.testing.assert_array_equal(count(ts, offsets, days), want_n)
+        np.testing.assert_allclose(total(ts, offsets, v, days), want_s, atol=1e-6)
+    want_n, want_s = _brute(ts, offsets, v, days, True)
+    per = [slice(a, b) for a, b in zip(offsets[:-1], offsets[1:])]
+    np.testing.assert_array_equal(max_count_window(ts, offsets, days), [want_n[s].max() for s in per])
+    np.testing.assert_allclose(max_sum_window(ts, offsets, v, days),
+                               [max(want_s[s].max(), 0.0) for s in per], atol=1e-6)
+
+def test_trailing_sum_matches_rolling(g, backend):
+    order, ts, offsets = group_layout(g, "customer_id")
+    s = g.iloc[order].reset_index(drop=True)
+    want = s.groupby("customer_id", sort=False).rolling("30D", on="tx_date_time")["v"].sum()
+    np.testing.assert_allclose(trailing_sum(ts, offsets, s["v"].to_numpy(), 30), want.to_numpy(), atol=1e-6)
+
+def test_empty_layout(backend):
+    g = pd.DataFrame({"customer_id": pd.Series([], dtype=object),
+                      "tx_date_time": pd.Series([], dtype="datetime64[ns, UTC]")})
+    order, ts, offsets = group_layout(g, "customer_id")
+    assert order.size == ts.size == 0 and list(offsets) == [0]
+    assert forward_count(ts, offsets, 7).size == 0
+    assert max_count_window(ts, offsets, 7).size == 0
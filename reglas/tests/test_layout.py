@@ -0,0 +1,51 @@
+# test_layout.py
+"""TxLayout: máscaras por bits == filtros de pandas y grupos == kernels.group_layout."""
+from __future__ import annotations
+import numpy as np
+import pytest
+
+from kernels import group_layout
+from layout import TxLayout
+from tx_frame import load_tx_frame
+
+@pytest.fixture
+def tx(tx_csv):
+    return load_tx_frame(tx_csv)
+
+def _groups(order, ts, offsets):
+    """Filas (y fechas) de cada grupo, sin depender del orden de los grupos."""
+    return sorted((tuple(order[a:b]), tuple(ts[a:b])) for a, b in zip(offsets[:-1], offsets[1:]))
+
+@pytest.mark.parametrize("direction,tx_type", [("Inbound", None), ("Outbound", "Cash"),
+                                               (None, ["Wire", "Check"]), ("Sideways", None)])
+def test_mask_matches_pandas(tx, direction, tx_type):
+    lay = tx.layout()
+    df = tx.df.iloc[lay.order]
+    want = np.ones(len(df), dtype=bool)
+    if direction is not None:
+        want &= df["tx_direction"].astype(str).eq(direction).to_numpy()
+    if tx_type is not None:
+        want &= df["tx_type"].astype(str).isin([tx_type] if isinstance(tx_type, str) else tx_type).to_numpy()
+    np.testing.assert_array_equal(lay.mask(direction=direction, tx_type=tx_type), want)
+
+@pytest.mark.parametrize("keys", ["customer_id", ["customer_id", "counterparty_id"]])
+def test_group_matches_group_layout(tx, keys):
+    g = tx.select("R-High")
+    g = g[g["tx_direction"].astype(str).eq("Inbound") & g["tx_date_time"].notna()]   # group_layout: sin NaT
+    lay = tx.layout()
+    assert lay is tx.layout()                       # uno por frame
+    got = _groups(*lay.group(g, keys))
+    want = _groups(*group_layout(g, keys))
+    assert got == want
+
+def test_layout_skips_null_dates_and_customers(tx):
+    lay = TxLayout(tx.df)
+    valid = tx.df["tx_date_time"].notna() & tx.df["customer_id"].notna()
+    assert len(lay) == int(valid.sum())
+    for a, b in zip(lay.offsets[:-1], lay.offsets[1:]):
+        assert (np.diff(lay.ts[a:b]) >= 0).all()
+    assert (lay.rank[lay.order] == np.arange(len(lay))).all()
+
+def test_group_by_other_first_key_raises(tx):
+    with pytest.raises(ValueError):
+        tx.layout().group_rows(np.ones(len(tx.layout()), bool), "counterparty_id")
@@ -0,0 +1,70 @@
+# test_metric_store.py
+"""Métricas compartidas: misma tabla desde ruta, TxFrame o DataFrame, y una sola construcción."""
+from __future__ import annotations
+import pandas as pd
+import pytest
+
+import metric_store as ms
+import tx_frame
+from metric_store import get_metrics, daily_table
+from tx_frame import load_tx_frame
+from hanumi import run_parameters_hanumi
+from hanumi_sim import prepare_hanumi
+from conftest import plain, quiet
+
+SEG = "R-High"
+
+@pytest.fixture(autouse=True)
+def _clean_metrics():
+    ms.clear_metrics()
+    yield
+    ms.clear_metrics()
+
+CALLS = [
+    ("pgav", {"direction": "Inbound"}),
+    ("hanum", {"direction": "Outbound"}),
+    ("hasum", {"direction": "Inbound"}),
+    ("numcc", {"direction": "Outbound", "tx_type": "Cash", "window_days": 14}),
+    ("hsum30", {"direction": "Inbound"}),
+    ("last_balance", {}),
+    ("daily", {}),
+]
+
+@pytest.mark.parametrize("name,kw", CALLS, ids=[c[0] for c in CALLS])
+def test_same_metrics_from_any_source(tx_csv, name, kw):
+    by_frame = get_metrics(load_tx_frame(tx_csv), name, SEG, **kw)
+    ms._MEM.clear()
+    by_path = get_metrics(str(tx_csv), name, SEG, **kw)               # desde disco
+    raw = pd.read_csv(tx_csv, dtype=tx_frame.READ_DTYPES, encoding="utf-8-sig")
+    by_df = get_metrics(raw, name, SEG, **kw)                         # sin caché
+    pd.testing.assert_frame_equal(plain(by_path), plain(by_frame))
+    pd.testing.assert_frame_equal(plain(by_df), plain(by_frame), check_dtype=False)
+
+def test_stored_metrics_skip_csv(tx_csv, monkeypatch):
+    want = get_metrics(str(tx_csv), "hanum", SEG, direction="Inbound")
+    ms._MEM.clear()
+    monkeypatch.setattr(tx_frame, "read_tx_csv", lambda *a, **k: pytest.fail("se cargó el CSV"))
+    got = get_metrics(str(tx_csv), "hanum", SEG, direction="Inbound")
+    pd.testing.assert_frame_equal(plain(got), plain(want))
+    got["extra"] = 1                                                   # copia: la caché no cambia
+    assert "extra" not in get_metrics(str(tx_csv), "hanum", SEG, direction="Inbound")
+
+def test_parametrization_and_simulation_share_build(tx_csv, monkeypatch):
+    version, build, extend = ms.METRICS["hanum"]
+    built = []
+    monkeypatch.setitem(ms.METRICS, "hanum", (version, lambda df, **kw: built.append(kw) or build(df, **kw), extend))
+    quiet(run_parameters_hanumi, load_tx_frame(tx_csv), subsubsegments=SEG)
+    prepare_hanumi(str(tx_csv), subsubs=SEG)
+    assert built == [{"direction": "Inbound"}]
+
+def test_daily_table_filters(tx_csv):
+    D = daily_table(str(tx_csv), SEG)
+    cash_in = daily_table(str(tx_csv), SEG, direction="Inbound", tx_type="Cash")
+    want = D[D["tx_direction"].eq("Inbound") & D["tx_type"].eq("Cash")]
+    pd.testing.assert_frame_equal(plain(cash_in), plain(want))
+    assert cash_in["n"].sum() == len(load_tx_frame(tx_csv).select(SEG).query(
+        "tx_direction == 'Inbound' and tx_type == 'Cash' and tx_date_time.notna()"))
+
+def test_unknown_metric(tx_csv):
+    with pytest.raises(KeyError):
+        get_metrics(str(tx_csv), "nope", SEG)
@@ -0,0 +1,44 @@
+# test_multi_segment.py
+"""run_parametrization_all == run_parametrization de cada segmento, con una sola lectura del CSV."""
+from __future__ import annotations
+import json
+import pytest
+
+import metric_store as ms
+import runner
+import tx_frame
+from conftest import quiet, assert_results_equal
+
+SEGS = ["R-High", "R-Low"]
+
+@pytest.fixture(autouse=True)
+def _clean_metrics():
+    ms.clear_metrics()
+    yield
+    ms.clear_metrics()
+
+def test_all_matches_per_segment(tx_csv, tmp_path, monkeypatch):
+    calls = []
+    real = tx_frame.read_tx_csv
+    monkeypatch.setattr(tx_frame, "read_tx_csv", lambda p: calls.append(p) or real(p))
+    stats = []
+    got = quiet(runner.run_parametrization_all, str(tx_csv), SEGS, out_root=tmp_path / "out", stats=stats)
+    assert len(calls) == 1
+    assert list(got) == SEGS
+    assert [(s["subsub"], s["rule"]) for s in stats] == [(sub, r[0]) for sub in SEGS for r in runner.RULES]
+    for sub in SEGS:
+        ms._MEM.clear()
+        assert_results_equal(got[sub], quiet(runner.run_parametrization, str(tx_csv), sub))
+        bundle = json.loads((tmp_path / "out" / sub / f"params_{sub}.json").read_text(encoding="utf-8"))
+        assert bundle["meta"]["subsubsegment"] == sub and set(bundle["rules"]) == set(got[sub])
+
+def test_all_process_matches_serial(tx_csv):
+    serial = quiet(runner.run_parametrization_all, str(tx_csv), SEGS)
+    proc = quiet(runner.run_parametrization_all, str(tx_csv), SEGS, executor="process", max_workers=2)
+    for sub in SEGS:
+        assert_results_equal(proc[sub], serial[sub])
+
+def test_all_defaults_to_csv_segments(tx_csv, monkeypatch):
+    assert list(quiet(runner.run_parametrization_all, str(tx_csv), "R-Low")) == ["R-Low"]
+    monkeypatch.setattr(runner, "load_subsubsegments", lambda: None)      # sin parametrizacion.yaml
+    assert list(quiet(runner.run_parametrization_all, str(tx_csv))) == SEGS
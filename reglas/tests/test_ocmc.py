@@ -0,0 +1,40 @@
+# test_ocmc.py
+"""counterparty_windows (ventana incremental de OCMC_1) == definición por fuerza bruta."""
+from __future__ import annotations
+import numpy as np
+import pandas as pd
+import pytest
+
+from ocmc_1_sim import counterparty_windows, _DAY_NS
+
+def _brute(cids, t, cps, window_days):
+    d = t // _DAY_NS
+    uniq = np.zeros(len(t))
+    pair = np.zeros(len(t), dtype=np.int64)
+    for i in range(len(t)):
+        same = cids == cids[i]
+        in_days = same & (d >= d[i] - (window_days - 1)) & (d <= d[i])
+        uniq[i] = len(set(cps[in_days]))
+        lo, hi = (d[i] - (window_days - 1)) * _DAY_NS, d[i] * _DAY_NS
+        pair[i] = (same & (cps == cps[i]) & (t >= lo) & (t <= hi)).sum()
+    return uniq, pair
+
+@pytest.mark.parametrize("window_days", [1, 7, 30])
+def test_matches_brute(window_days):
+    rng = np.random.default_rng(9)
+    n = 1200
+    cids = rng.choice(["A", "B", "C", "D"], n)
+    # días enteros con parte de las tx exactamente a medianoche
+    t = (pd.Timestamp("2024-01-01").value + rng.integers(0, 80, n) * _DAY_NS
+         + np.where(rng.random(n) < 0.2, 0, rng.integers(1, _DAY_NS, n)))
+    cps = rng.choice([f"P{i}" for i in range(8)], n).astype(object)
+    order = np.lexsort((t, cids))
+    cids, t, cps = cids[order], t[order], cps[order]
+    uniq, pair = counterparty_windows(cids, t, cps, window_days)
+    want_u, want_p = _brute(cids, t, cps, window_days)
+    np.testing.assert_array_equal(uniq, want_u)
+    np.testing.assert_array_equal(pair, want_p)
+
+def test_empty():
+    uniq, pair = counterparty_windows(np.array([], object), np.array([], np.int64), np.array([], object))
+    assert uniq.size == pair.size == 0
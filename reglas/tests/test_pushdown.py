@@ -0,0 +1,53 @@
+# test_pushdown.py
+"""Filtros de fila/columna al leer (read_tx_view, SimSession.view) == filtrar el frame completo, con y sin zona."""
+from __future__ import annotations
+import pandas as pd
+import pytest
+
+from tx_frame import load_tx_frame, read_tx_view
+from utils import SimSession
+from conftest import make_tx, write_csv
+
+DATE_FROM, DATE_TO = "2024-09-01", "2025-01-15 12:00"
+COLS = ["customer_id", "tx_date_time", "tx_base_amount"]
+
+def _csv(tmp_path, zone):
+    df = make_tx(naive=zone is None)
+    if zone not in (None, "UTC"):
+        ts = pd.to_datetime(df["tx_date_time"], errors="coerce", utc=True).dt.tz_convert(zone)
+        df["tx_date_time"] = ts.astype(str).where(ts.notna(), "not a date")
+    return write_csv(df, tmp_path / "tx.csv")
+
+def _expected(path) -> pd.DataFrame:
+    df = load_tx_frame(path, cache=False).df
+    tz = df["tx_date_time"].dt.tz
+    lo, hi = pd.Timestamp(DATE_FROM, tz="UTC"), pd.Timestamp(DATE_TO, tz="UTC")
+    if tz is None:
+        lo, hi = lo.tz_localize(None), hi.tz_localize(None)
+    m = (df["customer_sub_sub_type"] == "R-High") & (df["tx_direction"] == "Inbound")
+    m &= (df["tx_date_time"] >= lo) & (df["tx_date_time"] < hi)
+    return df.loc[m, COLS].reset_index(drop=True)
+
+def _plain(df: pd.DataFrame) -> pd.DataFrame:
+    # la caché Arrow devuelve un offset fijo como pytz.FixedOffset: se compara el instante en UTC
+    out = df.astype({c: object for c in df.columns if isinstance(df[c].dtype, pd.CategoricalDtype)})
+    if out["tx_date_time"].dt.tz is not None:
+        out["tx_date_time"] = out["tx_date_time"].dt.tz_convert("UTC")
+    return out
+
+@pytest.mark.parametrize("zone", [None, "UTC", "-03:00"], ids=["naive", "utc", "offset"])
+@pytest.mark.parametrize("cache", [True, False], ids=["arrow", "chunked"])
+def test_read_tx_view_date_bounds(tmp_path, zone, cache):
+    p = _csv(tmp_path, zone)
+    exp = _expected(p)
+    got = read_tx_view(p, columns=COLS, subsubsegments="R-High", where={"tx_direction": "Inbound"},
+                       date_from=DATE_FROM, date_to=DATE_TO, cache=cache)
+    assert 0 < len(got) < len(load_tx_frame(p).df)
+    pd.testing.assert_frame_equal(_plain(got), _plain(exp))
+
+@pytest.mark.parametrize("zone", [None, "UTC"], ids=["naive", "utc"])
+def test_session_view_date_bounds(tmp_path, zone):
+    p = _csv(tmp_path, zone)
+    got = SimSession(p).view(columns=COLS, subsubs="R-High", direction="Inbound",
+                             date_from=DATE_FROM, date_to=pd.Timestamp(DATE_TO))
+    pd.testing.assert_frame_equal(_plain(got), _plain(_expected(p)))
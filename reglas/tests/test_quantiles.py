@@ -0,0 +1,54 @@
+# test_quantiles.py
+"""Backends de percentiles: exacto == pandas/NumPy; sketch KLL dentro de su error de rango."""
+from __future__ import annotations
+import numpy as np
+import pandas as pd
+import pytest
+
+import quantiles as qt
+from quantiles import KLLSketch
+
+@pytest.fixture(autouse=True)
+def _exact_backend():
+    yield
+    qt.set_backend("exact")
+
+def test_exact_backend_matches_pandas_numpy():
+    rng = np.random.default_rng(3)
+    s = pd.Series(rng.lognormal(8, 1.5, 5001))
+    qs = (0.85, 0.9, 0.95, 0.99)
+    pd.testing.assert_series_equal(qt.quantile(s, qs), s.quantile(list(qs)))
+    assert qt.percentiles(s, (95, 99)) == {p: float(np.percentile(s, p)) for p in (95, 99)}
+    acc = qt.collector()
+    for blk in np.array_split(s.to_numpy(), 5):
+        acc.merge(qt.collector().update(blk))
+    assert acc.percentile(97) == float(np.percentile(s, 97))
+    assert np.isnan(qt.percentile(pd.Series(dtype=float), 95))
+
+@pytest.mark.parametrize("eps", [0.01, 0.002])
+def test_kll_rank_error_within_eps(eps):
+    rng = np.random.default_rng(0)
+    x = np.concatenate([rng.lognormal(10, 2, 150_000), rng.normal(0, 1, 50_000)])
+    sk = KLLSketch(eps=eps, seed=1)
+    for blk in np.array_split(x, 7):           # por bloques y con merge, como en los workers
+        sk.merge(KLLSketch(eps=eps, seed=2).update(blk))
+    xs = np.sort(x)
+    qs = np.linspace(0.01, 0.99, 99)
+    est = sk.quantile(qs).to_numpy()
+    rank = np.searchsorted(xs, est, side="left") / len(xs)
+    assert np.max(np.abs(rank - qs)) <= eps
+
+def test_sketch_backend_is_used_and_close():
+    rng = np.random.default_rng(5)
+    s = pd.Series(rng.exponential(100, 200_000))
+    qt.set_backend("sketch", eps=0.005)
+    assert isinstance(qt.collector(), KLLSketch)
+    got = qt.percentile(s, 95)
+    rank = float((s < got).mean())
+    assert abs(rank - 0.95) <= 0.005
+
+def test_set_backend_rejects_unknown():
+    with pytest.raises(ValueError):
+        qt.set_backend("approx")
+    with pytest.raises(ValueError):
+        qt.set_backend("sketch", eps=0)
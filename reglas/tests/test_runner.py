@@ -0,0 +1,34 @@
+# test_runner.py
+"""run_parametrization: ejecutores y estadísticas por regla."""
+from __future__ import annotations
+import pytest
+
+import runner
+from conftest import quiet, assert_results_equal
+
+SEG = "R-High"
+
+def test_process_executor_matches_serial(tx_csv):
+    serial_stats, proc_stats = [], []
+    serial = quiet(runner.run_parametrization, str(tx_csv), SEG, stats=serial_stats)
+    proc = quiet(runner.run_parametrization, str(tx_csv), SEG, executor="process", max_workers=2,
+                 stats=proc_stats)
+    assert_results_equal(proc, serial)
+    assert [s["rule"] for s in proc_stats] == [name for name, _, _ in runner.RULES]
+
+def test_rule_stats_memory_fields(tx_csv):
+    stats = []
+    quiet(runner.run_parametrization, str(tx_csv), SEG, stats=stats)
+    assert all(s["peak_mb"] is None and "process_max_rss_mb" in s for s in stats)
+    # el máximo RSS es del proceso: nunca baja de una regla a la siguiente
+    rss = [s["process_max_rss_mb"] for s in stats]
+    if rss[0] is not None:
+        assert rss == sorted(rss)
+
+    traced = []
+    quiet(runner.run_parametrization, str(tx_csv), SEG, stats=traced, trace_memory=True)
+    assert all(s["peak_mb"] is not None and s["peak_mb"] >= 0 for s in traced)
+
+def test_unknown_executor(tx_csv):
+    with pytest.raises(ValueError):
+        runner.run_parametrization(str(tx_csv), SEG, executor="threads")
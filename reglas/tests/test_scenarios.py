@@ -0,0 +1,65 @@
+# test_scenarios.py
+"""
+compile_scenarios == los build_*_scenarios originales: los escenarios p*/Actual de
+data/sim_golden.json salieron de esos builders sobre el bundle del CSV golden (con los números
+redondeados por el formato de display de entonces, de ahí la tolerancia de 0.5).
+"""
+from __future__ import annotations
+import json
+from pathlib import Path
+import numpy as np
+import pandas as pd
+import pytest
+
+import runner
+import runner_alerts as ra
+from scenarios import Param, RuleSpec, SPECS, compile_rule, compile_scenarios
+from conftest import make_tx, write_csv, quiet
+
+GOLDEN = json.loads((Path(__file__).parent / "data" / "sim_golden.json").read_text(encoding="utf-8"))
+ROUNDING = 0.5
+
+@pytest.fixture(scope="module")
+def golden_bundle(tmp_path_factory):
+    p = write_csv(make_tx(**GOLDEN["make_tx"]), tmp_path_factory.mktemp("golden") / "tx.csv")
+    res = quiet(runner.run_parametrization, str(p), GOLDEN["subsub"])
+    return str(p), runner._bundle_from_results(res, GOLDEN["subsub"], str(p))
+
+def test_matches_original_builders(golden_bundle):
+    mats = compile_scenarios(golden_bundle[1], actual=ra.ACTUAL_PARAMS)
+    assert list(mats) == list(SPECS)
+    for rule, spec in GOLDEN["rules"].items():
+        want = {k: {p: v for p, v in d.items() if v is not None}
+                for k, d in spec["scenarios"].items() if k != "tiny"}
+        got = mats[rule].to_dict()
+        assert list(got) == list(want), rule
+        for name, pars in want.items():
+            assert sorted(got[name]) == sorted(pars), (rule, name)
+            for p, v in pars.items():
+                assert abs(got[name][p] - v) <= ROUNDING, (rule, name, p)
+
+@pytest.mark.parametrize("rule", ["PGAV-IN", "HANUMI", "IN-OUT-1", "P-LVAL"])
+def test_matrix_and_dict_simulate_the_same(golden_bundle, rule):
+    path, bundle = golden_bundle
+    m = compile_scenarios(bundle, {rule: SPECS[rule]}, actual=ra.ACTUAL_PARAMS)[rule]
+    kw = dict(subsubs=[GOLDEN["subsub"]], count_from=pd.Timestamp(GOLDEN["count_from"], tz="UTC"))
+    by_matrix = ra._SIMULATORS[rule](path, scenarios=m, **kw)
+    by_dict = ra._SIMULATORS[rule](path, scenarios=m.to_dict(), **kw)
+    pd.testing.assert_frame_equal(by_matrix.reset_index(drop=True), by_dict.reset_index(drop=True))
+
+def test_compile_rule_aliases_gaps_and_actual():
+    spec = RuleSpec("R", (Param("Amount", ("Amount_CLP", "Amount"), "amount"), Param("Number", ("Number",), "number")),
+                    bundle_key="R bundle", actual_key="R act")
+    bundle = {"rules": {"R bundle": {
+        "amount": {"percentiles": [{"percentil": "p90", "Amount_CLP": "", "Amount": 10.0},
+                                   {"percentil": "p95", "Amount_CLP": 30.0, "Amount": 20.0}]},
+        "number": {"percentiles": [{"percentil": "p95", "Number": 4}, {"percentil": "", "Number": 9}]},
+    }}}
+    m = compile_rule(bundle, spec, actual={"R act": {"Amount": 1, "Extra": 2}})
+    assert m.names == ["p90", "p95", "Actual"]
+    assert m.params == ["Amount", "Number", "Extra"]
+    assert np.isnan(m.column("Number")[0])
+    assert m.to_dict() == {"p90": {"Amount": 10.0}, "p95": {"Amount": 30.0, "Number": 4.0},
+                           "Actual": {"Amount": 1.0, "Extra": 2.0}}
+    assert m.select(["Actual", "p90"]).names == ["p90", "Actual"]
+    assert len(compile_rule({}, spec)) == 0
@@ -0,0 +1,40 @@
+# test_schema.py
+"""Esquema compacto de tx_frame: categóricas, día int32 y montos en AMOUNT_DTYPE."""
+from __future__ import annotations
+import numpy as np
+import pandas as pd
+import pytest
+
+import tx_frame
+from tx_frame import CAT_COLS, NUM_COLS, NO_DAY, load_tx_frame, schema_tag
+from windows import DAY_COL
+
+@pytest.mark.parametrize("cache", [True, False])
+def test_loaded_dtypes(tx_csv, cache):
+    df = load_tx_frame(tx_csv, cache=cache).df
+    for c in CAT_COLS:
+        assert isinstance(df[c].dtype, pd.CategoricalDtype), c
+    for c in NUM_COLS:
+        assert df[c].dtype == np.float64, c
+    assert df[DAY_COL].dtype == np.int32
+    ts = df["tx_date_time"]
+    ok = ts.notna().to_numpy()
+    assert (df[DAY_COL].to_numpy()[~ok] == NO_DAY).all()
+    want = ts[ok].dt.floor("D").dt.tz_localize(None).to_numpy().astype("datetime64[D]").astype(np.int64)
+    np.testing.assert_array_equal(df[DAY_COL].to_numpy()[ok], want)
+
+def test_categorical_text_matches_raw(tx_csv, tx_df):
+    df = load_tx_frame(tx_csv).df
+    assert (df["customer_id"].astype(str).to_numpy() == tx_df["customer_id"].to_numpy()).all()
+    assert set(df["tx_direction"].cat.categories) == {"Inbound", "Outbound"}
+    assert set(df["tx_currency"].cat.categories) == {"CLP", "USD", "EUR"}
+
+def test_float32_amounts(tx_csv, monkeypatch):
+    full = load_tx_frame(tx_csv, cache=False).df
+    tag = schema_tag()
+    monkeypatch.setattr(tx_frame, "AMOUNT_DTYPE", "float32")
+    assert schema_tag() != tag                      # otra copia columnar, no se mezcla con la float64
+    df = load_tx_frame(tx_csv).df
+    for c in NUM_COLS:
+        assert df[c].dtype == np.float32, c
+        np.testing.assert_allclose(df[c].to_numpy(np.float64), full[c].to_numpy(), rtol=1e-6)
@@ -0,0 +1,19 @@
+# test_session.py
+"""SimSession: vistas servidas desde memoria."""
+from __future__ import annotations
+
+import utils
+from utils import SimSession
+
+def test_session_views_bounded(tx_csv, monkeypatch):
+    monkeypatch.setattr(utils, "SESSION_VIEWS_MAX", 3)
+    s = SimSession(tx_csv)
+    days = [f"2024-{m:02d}-01" for m in range(6, 12)]
+    for d in days:
+        s.view(columns=["customer_id"], date_from=d)
+    assert len(s._views) == 3
+    first = s.view(columns=["customer_id"], date_from=days[3])   # uso reciente: no se descarta
+    s.view(columns=["customer_id"], subsubs="R-High")
+    kept = [None if k[4] is None else k[4].strftime("%Y-%m-%d") for k in s._views]
+    assert kept == [days[5], days[3], None]
+    assert s.view(columns=["customer_id"], date_from=days[3]).equals(first)
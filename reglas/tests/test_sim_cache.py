@@ -0,0 +1,106 @@
+# test_sim_cache.py
+"""SimCache: aciertos por umbrales, invalidación por cambio del CSV o del código, LRU."""
+from __future__ import annotations
+import numpy as np
+import pandas as pd
+
+import runner_alerts as ra
+import sim_cache
+from sim_cache import SimCache, code_version, scenario_key
+from scenarios import ScenarioMatrix
+from utils import SimSession
+from conftest import make_tx, write_csv, quiet
+
+RULE = "RVT-IN"
+SUBSUBS = ["R-High"]
+COUNT_FROM = pd.Timestamp("2024-06-01", tz="UTC")
+
+def _matrix(names=("a", "b", "c"), amounts=(0, 1e5, 1e6), rule=RULE) -> ScenarioMatrix:
+    return ScenarioMatrix(rule, list(names), ["Number", "Amount"],
+                          np.array([[1, a] for a in amounts], dtype=float))
+
+def _key(cache, path):
+    return cache.key(RULE, ra._SIMULATORS[RULE], SimSession(path).fingerprint(), SUBSUBS, COUNT_FROM)
+
+def _simulate(path, sc):
+    return ra._SIMULATORS[RULE](str(path), subsubs=SUBSUBS, scenarios=sc, count_from=COUNT_FROM)
+
+def test_store_then_lookup(tx_csv):
+    cache = SimCache.for_source(tx_csv)
+    key, sc = _key(cache, tx_csv), _matrix()
+    hits, missing = cache.lookup(key, sc)
+    assert hits == {} and missing.names == sc.names
+    df = _simulate(tx_csv, sc)
+    cache.store(key, missing, df)
+    hits, missing = cache.lookup(key, sc)
+    assert not len(missing)
+    assert hits == dict(zip(df["escenario"], df["alertas"].astype(int)))
+    # por umbrales, no por nombre: un escenario renombrado también es acierto
+    hits, missing = cache.lookup(key, _matrix(names=("x", "y", "z")))
+    assert not len(missing) and list(hits) == ["x", "y", "z"]
+    # solo el escenario nuevo queda por simular
+    _, missing = cache.lookup(key, _matrix(names=("a", "d"), amounts=(0, 5e5)))
+    assert missing.names == ["d"]
+
+def test_csv_change_invalidates(tmp_path):
+    path = write_csv(make_tx(seed=3), tmp_path / "tx.csv")
+    cache = SimCache.for_source(path)
+    key = _key(cache, path)
+    cache.store(key, _matrix(), _simulate(path, _matrix()))
+    write_csv(make_tx(seed=4), path)
+    new = _key(cache, path)
+    assert new != key
+    hits, missing = cache.lookup(new, _matrix())
+    assert hits == {} and len(missing) == 3
+
+def test_code_change_invalidates(tx_csv, tmp_path, monkeypatch):
+    engine = tmp_path / "engine.py"
+    engine.write_text("X = 1\n", encoding="utf-8")
+    monkeypatch.setattr(sim_cache, "ENGINE_FILES", sim_cache.ENGINE_FILES + [engine])
+    monkeypatch.setattr(sim_cache, "_CODE", {})
+    cache = SimCache.for_source(tx_csv)
+    fn = ra._SIMULATORS[RULE]
+    v0, key = code_version(fn), _key(cache, tx_csv)
+    assert code_version(fn) == v0                       # memo por proceso
+    engine.write_text("X = 2\n", encoding="utf-8")
+    monkeypatch.setattr(sim_cache, "_CODE", {})
+    assert code_version(fn) != v0
+    assert _key(cache, tx_csv) != key
+    # el módulo propio de cada regla: otra regla, otra versión
+    assert code_version(ra._SIMULATORS["RVT-OUT"]) != code_version(fn)
+
+def test_no_fingerprint_no_cache(tx_csv):
+    cache = SimCache.for_source(tx_csv)
+    assert cache.key(RULE, ra._SIMULATORS[RULE], None, SUBSUBS, COUNT_FROM) is None
+    sc = _matrix()
+    hits, missing = cache.lookup(None, sc)
+    assert hits == {} and missing is sc
+
+def test_scenario_key_canonical():
+    assert scenario_key({"Number": 6, "Amount": 1e5}) == scenario_key({"Amount": 100000, "Number": 6.0})
+    assert scenario_key({"Number": 6}) != scenario_key({"Number": 7})
+
+def test_evict_lru(tmp_path):
+    cache = SimCache(tmp_path, max_mb=0)
+    sc = _matrix()
+    df = pd.DataFrame({"escenario": sc.names, "alertas": [1, 2, 3]})
+    cache.store("old.json", sc, df)
+    cache.store("new.json", sc, df)
+    assert [p.name for p in tmp_path.glob("*.json")] == ["new.json"]   # nunca el recién escrito
+    cache.max_bytes = 10 ** 6
+    cache.store("old.json", sc, df)
+    assert sorted(p.name for p in tmp_path.glob("*.json")) == ["new.json", "old.json"]
+    cache.clear()
+    assert not list(tmp_path.glob("*.json"))
+
+def test_run_jobs_with_cache(tx_csv):
+    cache = SimCache.for_source(tx_csv)
+    jobs = [("nuevo", r, SUBSUBS, _matrix(rule=r)) for r in (RULE, "RVT-OUT")]
+    fresh = quiet(ra.run_jobs, SimSession(tx_csv), jobs, count_from=COUNT_FROM)
+    first = quiet(ra.run_jobs, SimSession(tx_csv), jobs, count_from=COUNT_FROM, cache=cache)
+    session = SimSession(tx_csv)
+    again = quiet(ra.run_jobs, session, jobs, count_from=COUNT_FROM, cache=cache)
+    assert session._tx is None                          # todo desde caché: el CSV no se carga
+    for a, b, c in zip(fresh, first, again):
+        pd.testing.assert_frame_equal(a.reset_index(drop=True), b.reset_index(drop=True))
+        pd.testing.assert_frame_equal(a.reset_index(drop=True), c.reset_index(drop=True))
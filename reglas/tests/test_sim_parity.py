@@ -0,0 +1,35 @@
+# test_sim_parity.py
+"""
+Alertas por regla y escenario == las de las simulaciones originales (un filtro de pandas por
+escenario), guardadas en data/sim_golden.json sobre make_tx(**golden["make_tx"]) con los
+escenarios p* y Actual del bundle de ese CSV más "tiny" (todos los umbrales en 0).
+"""
+from __future__ import annotations
+import json
+from pathlib import Path
+import numpy as np
+import pandas as pd
+import pytest
+
+import metric_store as ms
+import runner_alerts as ra
+from conftest import make_tx, write_csv
+
+GOLDEN = json.loads((Path(__file__).parent / "data" / "sim_golden.json").read_text(encoding="utf-8"))
+
+@pytest.fixture(scope="module")
+def golden_csv(tmp_path_factory):
+    ms.clear_metrics()
+    yield write_csv(make_tx(**GOLDEN["make_tx"]), tmp_path_factory.mktemp("golden") / "tx.csv")
+    ms.clear_metrics()
+
+@pytest.mark.parametrize("rule", list(GOLDEN["rules"]))
+def test_sim_matches_golden(golden_csv, rule):
+    spec = GOLDEN["rules"][rule]
+    scenarios = {k: {p: (np.nan if v is None else v) for p, v in d.items()} for k, d in spec["scenarios"].items()}
+    df = ra._SIMULATORS[rule](str(golden_csv), subsubs=[GOLDEN["subsub"]], scenarios=scenarios,
+                              count_from=pd.Timestamp(GOLDEN["count_from"], tz="UTC"))
+    assert dict(zip(df["escenario"], df["alertas"].astype(int))) == spec["alerts"]
+
+def test_golden_covers_every_rule():
+    assert sorted(GOLDEN["rules"]) == sorted(name for name, _ in ra.SIM_RULES)
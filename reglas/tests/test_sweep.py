@@ -0,0 +1,66 @@
+# test_sweep.py
+"""Curvas y superficies de sweep == run() escenario por escenario sobre las mismas métricas."""
+from __future__ import annotations
+import json
+from pathlib import Path
+import numpy as np
+import pandas as pd
+import pytest
+
+import metric_store as ms
+import sweep as sw
+from conftest import make_tx, write_csv
+
+GOLDEN = json.loads((Path(__file__).parent / "data" / "sim_golden.json").read_text(encoding="utf-8"))
+COUNT_FROM = pd.Timestamp(GOLDEN["count_from"], tz="UTC")
+
+@pytest.fixture(scope="module")
+def csv(tmp_path_factory):
+    ms.clear_metrics()
+    sw.clear_cache()
+    yield str(write_csv(make_tx(**GOLDEN["make_tx"]), tmp_path_factory.mktemp("sweep") / "tx.csv"))
+    sw.clear_cache()
+    ms.clear_metrics()
+
+def _grid(rm, param: str, base: dict) -> np.ndarray:
+    """Umbrales alrededor del escenario: 0, el valor del escenario y cuantiles de la columna barrida."""
+    pts = [0.0, float(base.get(param, 0.0))]
+    if param in rm.params and rm.ix is not None:
+        col = rm.params[param][0]
+        vals = rm.ix.cols[col] if hasattr(rm.ix, "cols") else rm.ix.after
+        vals = vals[~np.isnan(vals)]
+        if vals.size:
+            pts += list(np.quantile(vals, [0.1, 0.5, 0.9, 0.99]))
+    return np.unique(pts)
+
+@pytest.mark.parametrize("rule", sorted(sw.PREPARERS))
+def test_curve_matches_run(csv, rule):
+    rm = sw.rule_metrics(rule, csv, subsubs=GOLDEN["subsub"], count_from=COUNT_FROM)
+    base = GOLDEN["rules"][rule]["scenarios"]["tiny"]
+    for param in base:
+        grid = _grid(rm, param, base)
+        curve = sw.sweep(rule, param, grid, tx_path=csv, subsubs=GOLDEN["subsub"], count_from=COUNT_FROM, base=base)
+        want = rm.run({f"g{i}": dict(base, **{param: g}) for i, g in enumerate(grid)})
+        assert curve["alertas"].tolist() == want["alertas"].tolist(), param
+
+def test_surface_matches_run(csv):
+    rule, px, py = "RVT-IN", "Number", "Amount"
+    rm = sw.rule_metrics(rule, csv, subsubs=GOLDEN["subsub"], count_from=COUNT_FROM)
+    gx, gy = [0, 1, 3, 6], [0, 1e5, 1e6, 1e7]
+    sup = sw.sweep_2d(rule, px, gx, py, gy, metrics=rm)
+    for x in gx:
+        for y in gy:
+            assert sup.loc[x, y] == rm.count({px: x, py: y})
+
+def test_metrics_cache_lru_and_csv_version(tmp_path, tx_df, monkeypatch):
+    monkeypatch.setattr(sw, "SWEEP_CACHE_SIZE", 2)
+    sw.clear_cache()
+    p = write_csv(tx_df.iloc[:3000], tmp_path / "tx.csv")
+    for rule in ("RVT-IN", "RVT-OUT", "HNR-IN"):
+        sw.rule_metrics(rule, str(p), subsubs="R-High")
+    assert [k[0] for k in sw._METRICS] == ["RVT-OUT", "HNR-IN"]
+    old = sw.rule_metrics("HNR-IN", str(p), subsubs="R-High")
+    write_csv(tx_df, p)                                   # el CSV cambia: no se reutiliza
+    new = sw.rule_metrics("HNR-IN", str(p), subsubs="R-High")
+    assert new is not old and len(sw._METRICS) == 1
+    sw.clear_cache()
@@ -0,0 +1,77 @@
+# test_thresholds.py
+"""Índices de umbrales y de cruces: conteos == máscara de pandas/NumPy fila a fila."""
+from __future__ import annotations
+import itertools
+import numpy as np
+import pandas as pd
+import pytest
+
+from thresholds import ThresholdIndex, CrossingIndex, RuleMetrics, _OPS
+
+@pytest.fixture(scope="module")
+def frame() -> pd.DataFrame:
+    rng = np.random.default_rng(11)
+    n = 3000
+    a = rng.integers(0, 40, n).astype(float)            # muchos empates
+    a[rng.random(n) < 0.05] = np.nan
+    b = np.round(rng.lognormal(10, 1.5, n), 0)
+    b[rng.random(n) < 0.05] = np.nan
+    return pd.DataFrame({"A": a, "B": b, "keep": rng.random(n) < 0.8})
+
+def _brute(df: pd.DataFrame, conds) -> int:
+    m = df["keep"].to_numpy().copy()
+    for col, (op, t) in conds.items():
+        m &= _OPS[op](df[col].to_numpy(), t)
+    return int(m.sum())
+
+@pytest.mark.parametrize("op_a,op_b", list(itertools.product(_OPS, _OPS)))
+def test_count_matches_mask(frame, op_a, op_b):
+    ix = ThresholdIndex(frame, ["A", "B"], mask=frame["keep"])
+    for ta, tb in [(-1, 0), (0, 1e4), (12, 22026), (20.5, 5e4), (39, 1e7), (100, 1.0)]:
+        conds = {"A": (op_a, ta), "B": (op_b, tb)}
+        assert ix.count(**conds) == _brute(frame, conds), conds
+        assert ix.count(A=(op_a, ta)) == _brute(frame, {"A": (op_a, ta)})
+        assert len(ix.select(**conds)["B"]) == _brute(frame, conds)
+
+def test_nan_threshold_gives_zero(frame):
+    ix = ThresholdIndex(frame, ["A", "B"])
+    assert ix.count(A=(">", np.nan)) == 0
+    assert ix.count(A=(">", 0), B=("<=", np.nan)) == 0
+
+def test_rule_metrics_run_matches_count(frame):
+    ix = ThresholdIndex(frame, ["A", "B"], mask=frame["keep"])
+    rm = RuleMetrics(ix, {"Number": ("A", ">"), "Amount": ("B", ">=")},
+                     lambda p: {"A": (">", float(p.get("Number", np.inf))), "B": (">=", float(p.get("Amount", 0)))})
+    sc = {"p90": {"Number": 30, "Amount": 1e5}, "p95": {"Number": 35}, "none": {}}
+    got = rm.run(sc)
+    want = [_brute(frame, {"A": (">", 30), "B": (">=", 1e5)}), _brute(frame, {"A": (">", 35), "B": (">=", 0)}), 0]
+    assert got["alertas"].tolist() == want
+    assert RuleMetrics.empty().run(sc)["alertas"].tolist() == [0, 0, 0]
+
+def test_missing_column_raises(frame):
+    with pytest.raises(KeyError):
+        ThresholdIndex(frame, ["A", "Z"])
+
+# ---------------- cruces de umbral ----------------
+
+def test_crossing_curve_matches_mask():
+    rng = np.random.default_rng(4)
+    before = np.round(rng.lognormal(12, 2, 4000), 0)
+    after = before + np.round(rng.lognormal(11, 2, 4000), 0) * (rng.random(4000) < 0.9)   # algunos sin cambio
+    before[:20] = np.nan
+    keep = rng.random(4000) < 0.7
+    cx = CrossingIndex(before, after, col="S", mask=keep)
+    grid = np.r_[np.quantile(after[~np.isnan(before)], np.linspace(0, 1, 60)), before[100:110], np.nan]
+    ok = keep & ~np.isnan(before)
+    want = [int(np.sum(ok & (before <= t) & (t < after))) for t in grid]
+    assert cx.curve("S", "cross", grid).tolist() == want
+    assert [cx.count(S=("cross", t)) for t in grid] == want
+
+def test_crossing_rejects_bad_input():
+    with pytest.raises(ValueError):
+        CrossingIndex([2.0], [1.0], col="S")
+    cx = CrossingIndex([1.0], [2.0], col="S")
+    with pytest.raises(KeyError):
+        cx.count(T=("cross", 1.5))
+    with pytest.raises(ValueError):
+        cx.curve("S", ">", [1.5])
@@ -0,0 +1,52 @@
+# test_tx_cache.py
+"""Caché columnar del CSV normalizado: acierto por contenido, invalidación por CSV o esquema."""
+from __future__ import annotations
+import os
+import pandas as pd
+import pytest
+
+import tx_frame
+from tx_cache import CACHE_DIRNAME, cache_available, source_fingerprint
+from tx_frame import load_tx_frame
+from conftest import make_tx, write_csv, plain
+
+pytestmark = pytest.mark.skipif(not cache_available(), reason="sin pyarrow no hay caché columnar")
+
+def _no_csv(monkeypatch):
+    monkeypatch.setattr(tx_frame, "read_tx_csv", lambda *a, **k: pytest.fail("se releyó el CSV"))
+
+def test_second_load_reads_cache(tx_csv, monkeypatch):
+    first = load_tx_frame(tx_csv)
+    assert len(list((tx_csv.parent / CACHE_DIRNAME).glob("*.feather"))) == 1
+    with monkeypatch.context() as m:
+        _no_csv(m)
+        again = load_tx_frame(tx_csv)
+    assert again.fingerprint == first.fingerprint == source_fingerprint(tx_csv)
+    pd.testing.assert_frame_equal(plain(again.df), plain(first.df))
+    pd.testing.assert_frame_equal(plain(again.df), plain(load_tx_frame(tx_csv, cache=False).df))
+
+def test_touch_keeps_cache(tx_csv, monkeypatch):
+    fp = load_tx_frame(tx_csv).fingerprint
+    st = os.stat(tx_csv)
+    os.utime(tx_csv, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    with monkeypatch.context() as m:
+        _no_csv(m)
+        again = load_tx_frame(tx_csv)
+    assert again.fingerprint["hash"] == fp["hash"] and again.fingerprint["mtime_ns"] != fp["mtime_ns"]
+
+def test_rewritten_csv_is_reparsed(tmp_path):
+    p = write_csv(make_tx(seed=1), tmp_path / "tx.csv")
+    old = load_tx_frame(p)
+    write_csv(make_tx(seed=2), p)
+    new = load_tx_frame(p)
+    assert new.fingerprint["hash"] != old.fingerprint["hash"]
+    pd.testing.assert_frame_equal(plain(new.df), plain(load_tx_frame(p, cache=False).df))
+
+def test_schema_change_invalidates(tx_csv, monkeypatch):
+    load_tx_frame(tx_csv)
+    monkeypatch.setattr(tx_frame, "SCHEMA_VERSION", tx_frame.SCHEMA_VERSION + 1)
+    calls = []
+    real = tx_frame.read_tx_csv
+    monkeypatch.setattr(tx_frame, "read_tx_csv", lambda p: calls.append(p) or real(p))
+    load_tx_frame(tx_csv)
+    assert calls
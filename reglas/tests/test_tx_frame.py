@@ -0,0 +1,60 @@
+# test_tx_frame.py
+"""Un solo TxFrame para todas las reglas: mismo resultado con ruta, DataFrame o TxFrame."""
+from __future__ import annotations
+import pandas as pd
+import pytest
+
+import metric_store as ms
+import runner
+import tx_frame
+from tx_frame import TxFrame, as_tx_frame, load_tx_frame
+from conftest import plain, quiet
+
+SEG = "R-High"
+
+@pytest.fixture(autouse=True)
+def _clean_metrics():
+    ms.clear_metrics()
+    yield
+    ms.clear_metrics()
+
+def test_run_parses_csv_once(tx_csv, monkeypatch):
+    calls = []
+    real = tx_frame.read_tx_csv
+    monkeypatch.setattr(tx_frame, "read_tx_csv", lambda p: calls.append(p) or real(p))
+    quiet(runner.run_parametrization, str(tx_csv), SEG)
+    assert len(calls) == 1
+
+@pytest.mark.parametrize("name,fn,kw", runner.RULES, ids=[r[0] for r in runner.RULES])
+def test_rule_accepts_path_frame_and_dataframe(tx_csv, name, fn, kw):
+    tx = load_tx_frame(tx_csv)
+    want = quiet(fn, tx, subsubsegments=SEG, **kw)["percentiles"]
+    raw = pd.read_csv(tx_csv, dtype=tx_frame.READ_DTYPES, encoding="utf-8-sig")
+    for src in (str(tx_csv), raw):
+        ms._MEM.clear()
+        got = quiet(fn, src, subsubsegments=SEG, **kw)["percentiles"]
+        tables = want.items() if isinstance(want, dict) else [("", want)]
+        for sub, df in tables:
+            other = got[sub] if sub else got
+            pd.testing.assert_frame_equal(plain(other), plain(df), obj=f"{name} {sub}".strip())
+
+def test_select_and_partition(tx_csv):
+    tx = load_tx_frame(tx_csv)
+    assert as_tx_frame(tx) is tx
+    high = tx.select(SEG)
+    assert set(high["customer_sub_sub_type"].astype(str)) == {SEG}
+    assert len(tx.select()) == len(tx)
+    parts = tx.partition()
+    assert sorted(parts) == ["R-High", "R-Low"]
+    pd.testing.assert_frame_equal(plain(parts[SEG].select(SEG)), plain(high))
+    assert parts[SEG].covers(SEG) and not parts[SEG].covers("R-Low")
+    with pytest.raises(ValueError):
+        parts[SEG].select("R-Low")
+    with pytest.raises(ValueError):
+        parts[SEG].partition()
+
+def test_as_tx_frame_normalizes_raw(tx_df):
+    tx = as_tx_frame(tx_df)
+    assert isinstance(tx, TxFrame) and tx.fingerprint is None
+    assert pd.api.types.is_datetime64_any_dtype(tx.df["tx_date_time"])
+    assert tx_df["tx_date_time"].dtype == object          # el original no se toca
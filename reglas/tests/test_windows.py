@@ -0,0 +1,58 @@
+# test_windows.py
+"""DailyPanel == groupby("customer_id") + resample("D") + rolling de pandas."""
+from __future__ import annotations
+import numpy as np
+import pandas as pd
+import pytest
+
+from windows import DailyPanel, day_number
+from conftest import make_tx
+
+@pytest.fixture(scope="module")
+def tx():
+    df = make_tx(n=3000, n_cust=25, seed=5)
+    df["tx_date_time"] = pd.to_datetime(df["tx_date_time"], errors="coerce", utc=True)
+    return df
+
+def _resampled(tx, col=None):
+    """Serie diaria por cliente como los bucles originales (suma o conteo)."""
+    parts = []
+    for cid, sub in tx.dropna(subset=["tx_date_time"]).groupby("customer_id", sort=False):
+        r = sub.set_index("tx_date_time").resample("D")
+        s = r[col].sum() if col else r["customer_id"].count().astype(float)
+        parts.append(s.rename("v").reset_index().assign(customer_id=cid))
+    return pd.concat(parts, ignore_index=True)
+
+def test_daily_series_match_resample(tx):
+    P = DailyPanel.build(tx, "customer_id")
+    want_n = _resampled(tx)
+    want_s = _resampled(tx, "tx_base_amount")
+    got = P.frame(n=P.daily_count(), s=P.daily_sum(tx["tx_base_amount"]))
+    assert list(got["customer_id"]) == list(want_n["customer_id"])
+    assert (got["date"].to_numpy() == want_n["tx_date_time"].to_numpy()).all()
+    np.testing.assert_array_equal(got["n"], want_n["v"])
+    np.testing.assert_allclose(got["s"], want_s["v"], rtol=1e-12)
+
+@pytest.mark.parametrize("days", [3, 30, 177])
+def test_rolling_matches_pandas(tx, days):
+    P = DailyPanel.build(tx, "customer_id")
+    want = _resampled(tx, "tx_base_amount")
+    g = want.groupby("customer_id", sort=False)["v"]
+    roll = g.transform(lambda s: s.rolling(days, min_periods=1).sum())
+    mean = g.transform(lambda s: s.shift(3).rolling(days, min_periods=1).mean())
+    s = P.daily_sum(tx["tx_base_amount"])
+    np.testing.assert_allclose(P.rolling_sum(s, days), roll, rtol=1e-9)
+    np.testing.assert_allclose(P.rolling_mean(s, days, shift=3), mean, rtol=1e-9)
+    np.testing.assert_allclose(P.group_max(s), g.max().to_numpy(), rtol=1e-12)
+
+def test_mask_and_dropped_rows(tx):
+    P = DailyPanel.build(tx, "customer_id")
+    inbound = (tx["tx_direction"] == "Inbound").to_numpy()
+    assert P.daily_count(inbound).sum() == (inbound & tx["tx_date_time"].notna().to_numpy()).sum()
+    assert (P.cell_of_row[tx["tx_date_time"].isna().to_numpy()] == -1).all()
+
+def test_day_number_local_calendar():
+    ts = pd.Series(pd.to_datetime(["2024-06-01 23:30", "2024-06-02 00:10"]).tz_localize("America/Santiago"))
+    d = day_number(ts)
+    assert d[1] - d[0] == 1
+    assert d[0] == day_number(pd.Series(pd.to_datetime(["2024-06-01"])))[0]